@@ -63,7 +63,8 @@ class ActionCatalog:
                 "criterio_principal": "Criterio principal: {'tabla': 'alumnos|datos_escolares', 'campo': 'campo_dinamico', 'operador': '=|LIKE|>|<|>=|<=|BETWEEN|IS_NULL|IS_NOT_NULL|STARTS_WITH|ENDS_WITH|IN|NOT_IN', 'valor': 'valor_buscar'}",
                 "filtros_adicionales": "Lista opcional de filtros extra con misma estructura que criterio_principal",
                 "join_logic": "Tipo de JOIN (INNER|LEFT) - opcional, por defecto LEFT",
-                "limit": "Límite de resultados - opcional"
+                "limit": "Límite de resultados - opcional",
+                "escuelas": "CCT de las escuelas o 'todas' para consultar toda la zona escolar - OPCIONAL (por defecto solo esta escuela)"
             },
             output_type="alumno_o_lista_alumnos",
             usage_example="Para cualquier búsqueda: nombres, CURP, fechas, grados, turnos, rangos, criterios múltiples, etc.",
@@ -78,7 +79,8 @@ class ActionCatalog:
             input_params={
                 "criterio_principal": "Criterio principal: {'tabla': 'alumnos|datos_escolares', 'campo': 'campo_dinamico', 'operador': '=|LIKE|>|<|>=|<=|BETWEEN|IS_NULL|IS_NOT_NULL|STARTS_WITH|ENDS_WITH|IN|NOT_IN', 'valor': 'valor_buscar'}",
                 "filtros_adicionales": "Lista opcional de filtros extra con misma estructura que criterio_principal",
-                "join_logic": "Tipo de JOIN (INNER|LEFT) - opcional, por defecto LEFT"
+                "join_logic": "Tipo de JOIN (INNER|LEFT) - opcional, por defecto LEFT",
+                "escuelas": "CCT de las escuelas o 'todas' para consultar toda la zona escolar - OPCIONAL (por defecto solo esta escuela)"
             },
             output_type="numero_total",
             usage_example="🎯 USAR SOLO PARA: 'cuántos nacidos ENTRE 2015-2016 Y del turno matutino Y con nombres que EMPIECEN con MAR'",
@@ -94,11 +96,12 @@ class ActionCatalog:
             input_params={
                 "tiene_calificaciones": "true para alumnos CON calificaciones, false para alumnos SIN calificaciones",
                 "incluir_conteo": "Si incluir conteo de resultados (true/false)",
-                "mostrar_detalles": "Si mostrar datos completos o solo conteo (true/false)"
+                "mostrar_detalles": "Si mostrar datos completos o solo conteo (true/false)",
+                "escuelas": "CCT de las escuelas o 'todas' para consultar toda la zona escolar - OPCIONAL (por defecto solo esta escuela)"
             },
             output_type="lista_alumnos_filtrados_o_conteo",
             usage_example="Para 'alumnos con calificaciones', 'cuántos tienen calificaciones', 'estudiantes sin calificaciones'",
-            sql_template="SELECT a.*, de.* FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE (de.calificaciones IS NOT NULL AND de.calificaciones != '[]' AND de.calificaciones != '') = {tiene_calificaciones}"
+            sql_template="SELECT a.*, de.* FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.tiene_calificaciones = {tiene_calificaciones}"
         )
 
         # 🗑️ ELIMINADA: Definición duplicada de CALCULAR_ESTADISTICA
@@ -111,7 +114,8 @@ class ActionCatalog:
             input_params={
                 "criterio_filtro": "Criterios de filtrado (opcional)",
                 "ordenar_por": "Campo para ordenar (nombre, grado, etc.)",
-                "incluir_calificaciones": "Si incluir calificaciones (true/false)"
+                "incluir_calificaciones": "Si incluir calificaciones (true/false)",
+                "escuelas": "CCT de las escuelas o 'todas' para consultar toda la zona escolar - OPCIONAL (por defecto solo esta escuela)"
             },
             output_type="reporte_completo",
             usage_example="Para 'lista completa de 2do A' o 'reporte de todos los alumnos'",
@@ -148,6 +152,23 @@ class ActionCatalog:
             requires_combination=False
         )
 
+        actions["GENERAR_CONSTANCIAS_GRUPO"] = ActionDefinition(
+            name="GENERAR_CONSTANCIAS_GRUPO",
+            description="Genera constancias para TODOS los alumnos de un grado o grupo (lote en paralelo)",
+            category="constancia",
+            input_params={
+                "tipo_constancia": "Tipo de constancia (estudio, calificaciones, traslado)",
+                "grado": "Grado escolar (1-6)",
+                "grupo": "Letra del grupo (A, B, ...) - OPCIONAL, sin grupo es todo el grado",
+                "turno": "MATUTINO o VESPERTINO - OPCIONAL",
+                "incluir_foto": "Si incluir foto del alumno (true/false) - OPCIONAL",
+                "formato": "archivos (un PDF por alumno), pdf (además un PDF combinado) o zip - OPCIONAL"
+            },
+            output_type="lote_constancias",
+            usage_example="Para 'constancias de estudio para todo 3°A' o 'constancias de calificaciones de todo 5to grado en un solo PDF'",
+            requires_combination=False
+        )
+
         actions["TRANSFORMAR_PDF"] = ActionDefinition(
             name="TRANSFORMAR_PDF",
             description="Transforma un PDF cargado a una constancia del tipo especificado",
@@ -167,17 +188,20 @@ class ActionCatalog:
             description="📊 ACCIÓN PRINCIPAL PARA CONTEOS Y ESTADÍSTICAS. Maneja desde conteos simples hasta análisis complejos.",
             category="estadistica",
             input_params={
-                "tipo": "Tipo: 'conteo' (total simple), 'distribucion' (por grupos), 'promedio' (calificaciones), 'comparacion' (con vs sin)",
-                "agrupar_por": "Campo para agrupar: grado, grupo, turno, ciclo_escolar - REQUERIDO para distribuciones",
-                "campo": "Campo a analizar: calificaciones, edad - OPCIONAL para conteos",
+                "tipo": "Tipo: 'conteo' (total simple), 'distribucion' (por grupos), 'promedio' (calificaciones), 'ranking' (mejores/peores promedios), 'comparacion' (entre grupos, entre periodos o con vs sin calificaciones)",
+                "agrupar_por": "Campo para agrupar: grado, grupo, turno, ciclo_escolar - REQUERIDO para distribuciones. En comparacion también 'periodo' (cambio entre periodos) o 'calificaciones' (con vs sin)",
+                "campo": "Campo a analizar: calificaciones, edad o una materia (ej. matematicas) - OPCIONAL para conteos",
                 "filtro": "Criterios de filtrado como dict - OPCIONAL",
                 "orden": "Orden para rankings (asc, desc) - OPCIONAL",
                 "limite": "Límite de resultados para rankings - OPCIONAL",
-                "incluir_detalles": "Si incluir datos detallados o solo resumen - OPCIONAL"
+                "periodo": "Periodo de calificaciones para ranking/comparacion: i, ii, iii o promedio (por defecto) - OPCIONAL",
+                "comparar": "Valores a comparar en comparacion, ej. ['A', 'B'] - OPCIONAL",
+                "incluir_detalles": "Si incluir datos detallados o solo resumen - OPCIONAL",
+                "escuelas": "CCT de las escuelas o 'todas' para consultar toda la zona escolar - OPCIONAL (por defecto solo esta escuela)"
             },
             output_type="estadistica_calculada",
-            usage_example="🎯 USA PARA TODO CONTEO: 'cuántos alumnos hay' (tipo=conteo), 'cuántos de 3er grado' (tipo=conteo, filtro={grado:3}), 'distribución por grado' (tipo=distribucion), 'promedio de calificaciones'",
-            decision_guide="✅ PRIMERA OPCIÓN para: cualquier conteo, distribuciones, promedios, estadísticas. ❌ NO uses para: búsquedas de alumnos específicos",
+            usage_example="🎯 USA PARA TODO CONTEO: 'cuántos alumnos hay' (tipo=conteo), 'cuántos de 3er grado' (tipo=conteo, filtro={grado:3}), 'distribución por grado' (tipo=distribucion), 'promedio de calificaciones', 'los 5 mejores promedios de 3er grado' (tipo=ranking, limite=5, filtro={grado:3}), 'compara el grupo A con el B en matemáticas' (tipo=comparacion, agrupar_por=grupo, comparar=['A','B'], campo=matematicas)",
+            decision_guide="✅ PRIMERA OPCIÓN para: cualquier conteo, distribuciones, promedios, rankings, comparaciones, estadísticas. ❌ NO uses para: búsquedas de alumnos específicos",
             requires_combination=False
         )
 
@@ -261,6 +285,7 @@ class ActionCatalog:
             "CONTAR_ALUMNOS": [],  # Sin parámetros requeridos
             "PREPARAR_DATOS_CONSTANCIA": ["alumno_identificador", "tipo_constancia"],
             "GENERAR_CONSTANCIA_COMPLETA": ["alumno_identificador", "tipo_constancia"],
+            "GENERAR_CONSTANCIAS_GRUPO": ["tipo_constancia", "grado"],
             "CALCULAR_ESTADISTICA": ["tipo"],  # Solo tipo es requerido
             "BUSCAR_Y_FILTRAR": [],  # 🔧 CORREGIDO: Sin parámetros requeridos (acepta múltiples formatos)
             # "ANALIZAR_Y_REPORTAR": ["tipo_analisis"],  # ❌ ELIMINADO - No implementada
@@ -327,6 +352,10 @@ class ActionCatalog:
 ✅ "constancia de estudios para Juan" → GENERAR_CONSTANCIA_COMPLETA
 ✅ "certificado de calificaciones" → GENERAR_CONSTANCIA_COMPLETA
 
+🥇 PARA UN GRUPO O GRADO COMPLETO - GENERAR_CONSTANCIAS_GRUPO:
+✅ "constancias de estudio para todo 3°A" → GENERAR_CONSTANCIAS_GRUPO (tipo_constancia: "estudio", grado: 3, grupo: "A")
+✅ "constancias de calificaciones de 5to en un solo PDF" → GENERAR_CONSTANCIAS_GRUPO (tipo_constancia: "calificaciones", grado: 5, formato: "pdf")
+
 ═══════════════════════════════════════════════════════════════════════════════
 🔄 PARA TRANSFORMACIONES:
 ═══════════════════════════════════════════════════════════════════════════════
@@ -341,7 +370,7 @@ class ActionCatalog:
 
 1. **PARA CUALQUIER CONTEO** → SIEMPRE usar CALCULAR_ESTADISTICA primero
 2. **PARA BÚSQUEDAS** → BUSCAR_UNIVERSAL
-3. **PARA CONSTANCIAS** → GENERAR_CONSTANCIA_COMPLETA
+3. **PARA CONSTANCIAS** → GENERAR_CONSTANCIA_COMPLETA (un alumno) o GENERAR_CONSTANCIAS_GRUPO (grupo/grado completo)
 4. **PARA TRANSFORMACIONES** → TRANSFORMAR_PDF
 
 🎯 REGLA DE ORO: CALCULAR_ESTADISTICA maneja el 95% de conteos y estadísticas.
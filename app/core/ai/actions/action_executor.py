@@ -11,10 +11,24 @@ RESPONSABILIDADES:
 - Retornar resultados estructurados
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import datetime
 import logging
 import os
 from .action_catalog import ActionCatalog
+from app.core.database.query_builder import (
+    COLUMNAS_PERMITIDAS, OPERADORES_PERMITIDOS, ConstructorConsulta, ConsultaParametrizada,
+    IdentificadorNoPermitido, columna, columna_sin_tabla, normalizar_criterio
+)
+from app.core.database.schema_catalog import get_schema_catalog
+from app.data.indices.cubo_agregados import DIMENSIONES, normalizar_valor
+
+
+# Acciones que se pueden repartir entre las escuelas de la zona (parámetro "escuelas")
+ACCIONES_FEDERABLES = frozenset({
+    "BUSCAR_UNIVERSAL", "CONTAR_UNIVERSAL", "CALCULAR_ESTADISTICA",
+    "GENERAR_LISTADO_COMPLETO", "FILTRAR_POR_CALIFICACIONES",
+})
 
 
 class ActionExecutor:
@@ -34,7 +48,7 @@ class ActionExecutor:
         self.db_path = getattr(sql_executor, 'db_path', 'resources/data/alumnos.db')
         # 🎯 INICIALIZAR MAPEADOR CENTRALIZADO DE CAMPOS
         from app.core.database.field_mapper import FieldMapper
-        self.field_mapper = FieldMapper()
+        self.field_mapper = FieldMapper(self.db_path)
 
     def _debug_pause_if_enabled(self, message: str):
         """🛑 PAUSA DE DEBUG CONTROLADA POR VARIABLE DE ENTORNO"""
@@ -130,6 +144,10 @@ class ActionExecutor:
         # Validar que la acción existe en el catálogo
         self.catalog.get_action_definition(action_name)
 
+        # 🏫 Consulta de zona: la misma acción en cada escuela y resultados combinados
+        if params.get("escuelas") and action_name in ACCIONES_FEDERABLES:
+            return self._execute_federado(action_request)
+
         # Ejecutar según el tipo de acción
         if action_name == "BUSCAR_UNIVERSAL":
             return self._execute_buscar_universal(params)
@@ -143,6 +161,8 @@ class ActionExecutor:
             return self._execute_preparar_constancia(params)
         elif action_name == "GENERAR_CONSTANCIA_COMPLETA":
             return self._execute_generar_constancia_completa(params)
+        elif action_name == "GENERAR_CONSTANCIAS_GRUPO":
+            return self._execute_generar_constancias_grupo(params)
         elif action_name == "FILTRAR_POR_CALIFICACIONES":
             return self._execute_filtrar_por_calificaciones(params)
         elif action_name == "TRANSFORMAR_PDF":
@@ -155,6 +175,117 @@ class ActionExecutor:
 
 
 
+    def _execute_federado(self, action_request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        🏫 EJECUTA UNA ACCIÓN EN VARIAS ESCUELAS DE LA ZONA
+
+        Cada escuela responde con su propio ActionExecutor (su base, su caché,
+        su presupuesto) en paralelo; los resultados se combinan en
+        _combinar_resultados_escuelas.
+        """
+        from app.core.database.federacion import get_federacion
+
+        params = action_request.get("parametros", {})
+        federacion = get_federacion()
+        escuelas = federacion.seleccionar(params.get("escuelas"))
+        if not escuelas:
+            disponibles = ", ".join(e.cct for e in federacion.escuelas())
+            return self._error_result(f"Ninguna escuela coincide con {params.get('escuelas')}. Disponibles: {disponibles}")
+
+        solicitud = dict(action_request, parametros={k: v for k, v in params.items() if k != "escuelas"})
+        self.logger.info(f"🏫 {solicitud['accion_principal']} en {len(escuelas)} escuela(s): "
+                         f"{', '.join(e.cct for e in escuelas)}")
+
+        resultados = federacion.en_paralelo(
+            lambda escuela: ActionExecutor(federacion.sql_executor(escuela))._execute_single_action(solicitud),
+            escuelas
+        )
+        return self._combinar_resultados_escuelas(solicitud, resultados)
+
+    def _combinar_resultados_escuelas(self, action_request: Dict[str, Any], resultados: list) -> Dict[str, Any]:
+        """
+        Junta los resultados de cada escuela en uno solo
+
+        - Conteos simples ([{"total": n}]): se suman
+        - Conteos agrupados y distribuciones: se suman por grupo (porcentajes recalculados)
+        - Ranking de alumnos: se reordena y se renumera entre todas las escuelas
+        - Resto (búsquedas, listados, promedios): filas de todas las escuelas
+          con columnas cct y escuela
+        """
+        params = action_request.get("parametros", {})
+        exitosos = [(escuela, r) for escuela, r, _ in resultados if r and r.get("success")]
+        fallidos = [(escuela, error or (r or {}).get("message")) for escuela, r, error in resultados
+                    if not (r and r.get("success"))]
+        if not exitosos:
+            detalle = "; ".join(f"{escuela.cct}: {motivo}" for escuela, motivo in fallidos)
+            return self._error_result(f"Ninguna escuela respondió: {detalle}")
+
+        base = dict(exitosos[0][1])
+        tipo = base.get("estadistica_tipo")
+        campo = base.get("campo_agrupado")
+        filas_por_escuela = [(escuela, r.get("data") or []) for escuela, r in exitosos]
+
+        def es_total(filas):
+            return len(filas) == 1 and isinstance(filas[0], dict) and set(filas[0]) == {"total"}
+
+        if all(es_total(filas) for _, filas in filas_por_escuela):
+            total = sum(filas[0]["total"] or 0 for _, filas in filas_por_escuela)
+            data = [{"total": total}]
+            base["total_elementos"] = total
+            mensaje = f"Total: {total}"
+        elif tipo in ("conteo_agrupado", "distribucion") and campo:
+            cantidades: Dict[Any, int] = {}
+            for _, filas in filas_por_escuela:
+                for fila in filas:
+                    cantidades[fila[campo]] = cantidades.get(fila[campo], 0) + fila.get("cantidad", 0)
+            total = sum(cantidades.values())
+            data = [{campo: grupo, "cantidad": cantidad} for grupo, cantidad in cantidades.items()]
+            if tipo == "distribucion":
+                for fila in data:
+                    fila["porcentaje"] = round(fila["cantidad"] / total * 100, 1) if total else 0
+                    fila["total_referencia"] = total
+            try:
+                data.sort(key=lambda fila: int(fila[campo]))
+            except (ValueError, TypeError):
+                data.sort(key=lambda fila: str(fila[campo]))
+            base["total_elementos"] = total
+            base["grupos"] = len(data)
+            base.pop("data_legacy", None)
+            mensaje = f"{'Distribución' if tipo == 'distribucion' else 'Conteo'} por {campo}: {len(data)} grupos, {total} total"
+        elif tipo == "ranking_alumnos":
+            descendente = str(params.get("orden") or "desc").lower() != "asc"
+            data = [{**escuela.etiqueta(), **fila} for escuela, filas in filas_por_escuela for fila in filas]
+            data.sort(key=lambda fila: fila["promedio"], reverse=descendente)
+            try:
+                limite = int(params.get("limite") or 10)
+            except (TypeError, ValueError):
+                limite = 10
+            data = data[:limite]
+            for i, fila in enumerate(data):
+                # Posición de competencia; el percentil de cada escuela no aplica a la zona
+                empatado = i > 0 and fila["promedio"] == data[i - 1]["promedio"]
+                fila["posicion"] = data[i - 1]["posicion"] if empatado else i + 1
+                fila.pop("percentil", None)
+            mensaje = f"Ranking de la zona: {len(data)} alumnos"
+        else:
+            data = [{**escuela.etiqueta(), **fila} if isinstance(fila, dict) else fila
+                    for escuela, filas in filas_por_escuela for fila in filas]
+            mensaje = f"{len(data)} resultado(s)"
+
+        if fallidos:
+            mensaje += f" (sin respuesta: {', '.join(escuela.cct for escuela, _ in fallidos)})"
+        base.update({
+            "data": data,
+            "row_count": len(data),
+            "message": f"Zona escolar, {len(exitosos)} escuela(s) — {mensaje}",
+            "escuelas_consultadas": [escuela.cct for escuela, _ in exitosos],
+            "escuelas_con_error": [{"cct": escuela.cct, "error": str(motivo)} for escuela, motivo in fallidos],
+            "por_escuela": [{**escuela.etiqueta(), "row_count": r.get("row_count", 0),
+                             "total": filas[0]["total"] if es_total(filas) else r.get("total_elementos")}
+                            for (escuela, r), (_, filas) in zip(exitosos, filas_por_escuela)],
+        })
+        return base
+
     def _execute_buscar_universal(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         🆕 EJECUTA BÚSQUEDA UNIVERSAL DINÁMICA (CORREGIDO)
@@ -193,7 +324,7 @@ class ActionExecutor:
 
             for filtro in filtros_adicionales:
                 campo = filtro.get("campo", "")
-                if "promedio" in campo.lower():
+                if "promedio" in campo.lower() and not self.field_mapper.is_valid_field(campo):
                     filtros_promedio.append(filtro)
                     self.logger.info(f"🧠 Criterio de promedio detectado en filtros - se manejará en filtros dinámicos: {filtro}")
                 else:
@@ -201,7 +332,7 @@ class ActionExecutor:
 
             # Verificar si el criterio principal también es de promedio
             campo_principal = criterio_principal.get("campo", "") if criterio_principal else ""
-            if "promedio" in campo_principal.lower():
+            if "promedio" in campo_principal.lower() and not self.field_mapper.is_valid_field(campo_principal):
                 filtros_promedio.append(criterio_principal)
                 self.logger.info(f"🧠 Criterio principal de promedio detectado - se manejará en filtros dinámicos: {criterio_principal}")
 
@@ -244,7 +375,8 @@ class ActionExecutor:
             campos_solicitados = params.get("campos_solicitados", [])
 
             # 🔧 CONSTRUIR SQL DINÁMICAMENTE CON CAMPOS ESPECÍFICOS
-            sql = self._build_dynamic_sql(criterio_principal, filtros_adicionales, join_logic, limit, campos_solicitados)
+            consulta = self._build_dynamic_sql(criterio_principal, filtros_adicionales, join_logic, limit, campos_solicitados)
+            sql = consulta.como_texto()
 
             debug_detailed(self.logger, f"🔧 SQL generado: {sql}")
 
@@ -265,7 +397,7 @@ class ActionExecutor:
             # 🚀 EJECUTAR CONSULTA CON LÍMITE APROPIADO
             # Para BUSCAR_UNIVERSAL, usar límite alto o el especificado en parámetros
             query_limit = limit if limit else 1000  # Límite alto por defecto para búsquedas
-            result = self.sql_executor.execute_query(sql, query_limit)
+            result = self.sql_executor.execute_query(consulta.sql, query_limit, consulta.params)
 
 
 
@@ -280,7 +412,7 @@ class ActionExecutor:
                     "sql_executed": sql  # 🆕 AGREGAR SQL PARA ANÁLISIS DINÁMICO
                 }
             else:
-                return self._error_result(f"Error en búsqueda universal: {result.message}")
+                return self._error_result(f"Error en búsqueda universal: {result.message}", result)
 
         except Exception as e:
             self.logger.error(f"Error en búsqueda universal: {e}")
@@ -320,15 +452,17 @@ class ActionExecutor:
                 return self._error_result(f"criterio_principal incompleto - falta valor: {criterio_principal}")
 
             # 🎯 CONSTRUIR SQL DE CONTEO (MISMA LÓGICA QUE BUSCAR_UNIVERSAL)
-            sql = f"""
+            constructor = ConstructorConsulta(f"""
             SELECT COUNT(*) as total
             FROM alumnos a
-            {join_logic} JOIN datos_escolares de ON a.id = de.alumno_id
+            {self._join_seguro(join_logic)} JOIN datos_escolares de ON a.id = de.alumno_id
             WHERE 1=1
-            """
+            """)
 
             # Agregar criterio principal con operadores avanzados
-            sql += self._build_where_condition(tabla_principal, campo_principal, criterio_principal.get("operador", "="), valor_principal)
+            self._build_where_condition(constructor, tabla_principal, campo_principal, criterio_principal.get("operador", "="), valor_principal)
+
+            criterios = [(tabla_principal, campo_principal, operador_principal, valor_principal)]
 
             # Agregar filtros adicionales con operadores avanzados
             for filtro in filtros_adicionales:
@@ -338,26 +472,33 @@ class ActionExecutor:
                 operador_filtro = filtro.get("operador", "=")
 
                 if campo_filtro and valor_filtro:
-                    sql += self._build_where_condition(tabla_filtro, campo_filtro, operador_filtro, valor_filtro)
+                    self._build_where_condition(constructor, tabla_filtro, campo_filtro, operador_filtro, valor_filtro)
+                    criterios.append((tabla_filtro, campo_filtro, operador_filtro, valor_filtro))
 
+            consulta = constructor.construir()
+            sql = consulta.como_texto()
             self.logger.info(f"🔧 SQL de conteo generado: {sql}")
 
-            # 🚀 EJECUTAR CONSULTA DE CONTEO
-            result = self.sql_executor.execute_query(sql)
-
-            if result.success:
-                total = result.data[0]['total'] if result.data else 0
-                self.logger.info(f"✅ Conteo universal completado: {total} resultado(s)")
-                return {
-                    "success": True,
-                    "data": [{"total": total}],
-                    "row_count": 1,
-                    "action_used": "CONTAR_UNIVERSAL",
-                    "message": f"Conteo universal completado: {total} resultado(s)",
-                    "sql_executed": sql
-                }
-            else:
-                return self._error_result(f"Error en conteo universal: {result.message}")
+            # 🧊 Igualdades sobre ciclo/grado/grupo/turno: se responde desde el cubo
+            filas = self._contar_en_cubo(None, self._filtros_cubo_criterios(criterios),
+                                         solo_con_registro=self._join_seguro(join_logic) == "INNER")
+            if filas is None:
+                # 🚀 EJECUTAR CONSULTA DE CONTEO
+                result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
+                if not result.success:
+                    return self._error_result(f"Error en conteo universal: {result.message}", result)
+                filas = result.data
+
+            total = filas[0]['total'] if filas else 0
+            self.logger.info(f"✅ Conteo universal completado: {total} resultado(s)")
+            return {
+                "success": True,
+                "data": [{"total": total}],
+                "row_count": 1,
+                "action_used": "CONTAR_UNIVERSAL",
+                "message": f"Conteo universal completado: {total} resultado(s)",
+                "sql_executed": sql
+            }
 
         except Exception as e:
             self.logger.error(f"Error en conteo universal: {e}")
@@ -378,184 +519,199 @@ class ActionExecutor:
             criterio_valor = params.get("criterio_valor")
             agrupar_por = params.get("agrupar_por")
 
+            # Agregar filtro si existe
+            filtro = {criterio_campo: criterio_valor} if criterio_campo and criterio_valor else {}
+
             # SQL base
             if agrupar_por:
                 # Conteo agrupado
-                sql = f"""
-                SELECT {agrupar_por}, COUNT(*) as cantidad
+                columna_grupo = columna_sin_tabla(agrupar_por)
+                constructor = ConstructorConsulta(f"""
+                SELECT {columna_grupo}, COUNT(*) as cantidad
                 FROM alumnos a
                 LEFT JOIN datos_escolares de ON a.id = de.alumno_id
                 WHERE 1=1
-                """
-
-                # Agregar filtro si existe
-                if criterio_campo and criterio_valor:
-                    if criterio_campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                        sql += f" AND de.{criterio_campo} = '{str(criterio_valor).upper()}'"
-                    elif criterio_campo in ['nombre', 'curp', 'matricula']:
-                        sql += f" AND a.{criterio_campo} LIKE '%{str(criterio_valor).upper()}%'"
-
-                sql += f" GROUP BY {agrupar_por} ORDER BY {agrupar_por}"
+                """)
+                self._aplicar_filtro_simple(constructor, filtro)
+                consulta = constructor.construir(f" GROUP BY {columna_grupo} ORDER BY {columna_grupo}")
 
             else:
                 # Conteo simple
-                sql = """
+                constructor = ConstructorConsulta("""
                 SELECT COUNT(*) as total
                 FROM alumnos a
                 LEFT JOIN datos_escolares de ON a.id = de.alumno_id
                 WHERE 1=1
-                """
-
-                # Agregar filtro si existe
-                if criterio_campo and criterio_valor:
-                    if criterio_campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                        sql += f" AND de.{criterio_campo} = '{str(criterio_valor).upper()}'"
-                    elif criterio_campo in ['nombre', 'curp', 'matricula']:
-                        sql += f" AND a.{criterio_campo} LIKE '%{str(criterio_valor).upper()}%'"
+                """)
+                self._aplicar_filtro_simple(constructor, filtro)
+                consulta = constructor.construir()
 
+            sql = consulta.como_texto()
             self.logger.info(f"🔧 SQL de CONTAR_ALUMNOS: {sql}")
 
-            # Ejecutar consulta
-            result = self.sql_executor.execute_query(sql)
-
-            if result.success:
-                if agrupar_por:
-                    # Resultado agrupado
-                    total_registros = len(result.data)
-                    total_alumnos = sum(row.get('cantidad', 0) for row in result.data)
-                    mensaje = f"Conteo agrupado por {agrupar_por}: {total_registros} grupos, {total_alumnos} alumnos total"
-                else:
-                    # Resultado simple
-                    total_alumnos = result.data[0]['total'] if result.data else 0
-                    mensaje = f"Total de alumnos: {total_alumnos}"
+            # Consultar el cubo; SQL si el filtro o la agrupación no están en él
+            # (aquí "calificaciones" agrupa por el JSON crudo, no por CON/SIN)
+            filas = None
+            if str(agrupar_por or "").lower() != "calificaciones":
+                filas = self._contar_en_cubo(agrupar_por, self._filtros_cubo_simple(filtro))
+            if filas is None:
+                result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
+                if not result.success:
+                    return self._error_result(f"Error en CONTAR_ALUMNOS: {result.message}", result)
+                filas = result.data
 
-                self.logger.info(f"✅ CONTAR_ALUMNOS completado: {mensaje}")
-                return {
-                    "success": True,
-                    "data": result.data,
-                    "row_count": len(result.data),
-                    "action_used": "CONTAR_ALUMNOS",
-                    "message": mensaje,
-                    "sql_executed": sql,
-                    "total_alumnos": total_alumnos if not agrupar_por else sum(row.get('cantidad', 0) for row in result.data)
-                }
+            if agrupar_por:
+                # Resultado agrupado
+                total_registros = len(filas)
+                total_alumnos = sum(row.get('cantidad', 0) for row in filas)
+                mensaje = f"Conteo agrupado por {agrupar_por}: {total_registros} grupos, {total_alumnos} alumnos total"
             else:
-                return self._error_result(f"Error en CONTAR_ALUMNOS: {result.message}")
+                # Resultado simple
+                total_alumnos = filas[0]['total'] if filas else 0
+                mensaje = f"Total de alumnos: {total_alumnos}"
+
+            self.logger.info(f"✅ CONTAR_ALUMNOS completado: {mensaje}")
+            return {
+                "success": True,
+                "data": filas,
+                "row_count": len(filas),
+                "action_used": "CONTAR_ALUMNOS",
+                "message": mensaje,
+                "sql_executed": sql,
+                "total_alumnos": total_alumnos
+            }
 
         except Exception as e:
             self.logger.error(f"Error en CONTAR_ALUMNOS: {e}")
             return self._error_result(f"Error interno: {str(e)}")
 
-    def _build_where_condition(self, tabla: str, campo: str, operador: str, valor: str) -> str:
+    def _build_where_condition(self, constructor: ConstructorConsulta, tabla: str, campo: str, operador: str, valor: str):
         """
-        🎯 CONSTRUYE CONDICIONES WHERE CON OPERADORES AVANZADOS
+        🎯 AGREGA CONDICIONES WHERE CON OPERADORES AVANZADOS
 
         Soporta: =, LIKE, >, <, >=, <=, BETWEEN, IS_NULL, IS_NOT_NULL,
                 STARTS_WITH, ENDS_WITH, NOT_IN, IN
-        """
-        try:
-            # Determinar prefijo de tabla
-            tabla_prefix = "a" if tabla == "alumnos" else "de"
-
-            # Limpiar valores para evitar inyección SQL
-            valor_limpio = str(valor).replace("'", "''") if valor else ""
-
-            # Construir condición según operador
-            if operador.upper() == "=":
-                # Manejo especial para calificaciones
-                if campo == "calificaciones" and valor_limpio == "[]":
-                    # SIN CALIFICACIONES
-                    return f" AND ({tabla_prefix}.{campo} IS NULL OR {tabla_prefix}.{campo} = '' OR {tabla_prefix}.{campo} = '[]')"
-                else:
-                    return f" AND {tabla_prefix}.{campo} = '{valor_limpio}'"
-
-            elif operador.upper() == "LIKE":
-                return f" AND {tabla_prefix}.{campo} LIKE '%{valor_limpio}%'"
-
-            elif operador.upper() == "STARTS_WITH":
-                return f" AND {tabla_prefix}.{campo} LIKE '{valor_limpio}%'"
-
-            elif operador.upper() == "ENDS_WITH":
-                return f" AND {tabla_prefix}.{campo} LIKE '%{valor_limpio}'"
-
-            elif operador.upper() in [">", "<", ">=", "<="]:
-                return f" AND {tabla_prefix}.{campo} {operador} '{valor_limpio}'"
-
-            elif operador.upper() == "BETWEEN":
-                # Valor debe ser "valor1,valor2"
-                if "," in valor_limpio:
-                    valor1, valor2 = valor_limpio.split(",", 1)
-                    return f" AND {tabla_prefix}.{campo} BETWEEN '{valor1.strip()}' AND '{valor2.strip()}'"
-                else:
-                    self.logger.warning(f"BETWEEN requiere formato 'valor1,valor2', recibido: {valor}")
-                    return f" AND {tabla_prefix}.{campo} = '{valor_limpio}'"
 
-            elif operador.upper() == "IS_NULL":
-                return f" AND {tabla_prefix}.{campo} IS NULL"
+        Los valores viajan como parámetros enlazados; tabla, campo y operador
+        se validan contra la lista blanca de query_builder.
 
-            elif operador.upper() == "IS_NOT_NULL":
-                return f" AND {tabla_prefix}.{campo} IS NOT NULL"
-
-            elif operador.upper() == "IN":
-                # Valor debe ser "valor1,valor2,valor3" o "[valor1,valor2,valor3]"
-                if valor_limpio.startswith("[") and valor_limpio.endswith("]"):
-                    # Formato lista JSON
-                    valores = valor_limpio[1:-1].split(",")
-                else:
-                    # Formato separado por comas
-                    valores = valor_limpio.split(",")
-
-                # 🔧 CORRECCIÓN: Para campos numéricos (id), no agregar comillas
-                if campo.lower() in ['id', 'alumno_id']:
-                    # Campos numéricos - sin comillas
-                    valores_formateados = [v.strip() for v in valores if v.strip().isdigit()]
-                else:
-                    # Campos de texto - con comillas
-                    valores_formateados = [f"'{v.strip()}'" for v in valores if v.strip()]
+        Raises:
+            IdentificadorNoPermitido: si el campo no existe en la tabla
+        """
+        # Cualquier tabla distinta de alumnos se trata como datos_escolares (prefijo "de")
+        tabla = "alumnos" if tabla == "alumnos" else "datos_escolares"
+        operador = str(operador or "=").upper()
+
+        if operador not in OPERADORES_PERMITIDOS:
+            self.logger.warning(f"Operador no reconocido: {operador}, usando = por defecto")
+        elif operador == "BETWEEN" and "," not in str(valor):
+            self.logger.warning(f"BETWEEN requiere formato 'valor1,valor2', recibido: {valor}")
+
+        constructor.filtro(tabla, campo, operador, valor)
+
+    def _aplicar_filtro_simple(self, constructor: ConstructorConsulta, filtro: dict):
+        """Aplica filtros {campo: valor} de estadísticas (igualdad en datos escolares, LIKE en alumnos)"""
+        if not isinstance(filtro, dict):
+            return
+        for campo, valor in filtro.items():
+            if campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
+                constructor.filtro('datos_escolares', campo, '=', str(valor).upper())
+            elif campo in ['nombre', 'curp', 'matricula']:
+                constructor.filtro('alumnos', campo, 'LIKE', str(valor).upper())
+
+    # ------------------------------------------------------------------
+    # 🧊 Cubo de agregados: conteos sin recorrer alumnos ⨝ datos_escolares
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filtros_cubo_simple(filtro: dict) -> Optional[Dict[str, set]]:
+        """
+        Traduce los filtros de _aplicar_filtro_simple a filtros del cubo
 
-                if valores_formateados:
-                    return f" AND {tabla_prefix}.{campo} IN ({','.join(valores_formateados)})"
-                else:
-                    return f" AND {tabla_prefix}.{campo} = '{valor_limpio}'"
+        Returns:
+            {dimensión: valores aceptados}, o None si algún filtro (LIKE sobre
+            nombre, curp o matrícula) solo puede resolverse con SQL
+        """
+        filtros = {}
+        if not isinstance(filtro, dict):
+            return filtros
+        for campo, valor in filtro.items():
+            if campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
+                filtros[campo] = {normalizar_valor(campo, str(valor).upper())}
+            elif campo in ['nombre', 'curp', 'matricula']:
+                return None
+        return filtros
 
-            elif operador.upper() == "NOT_IN":
-                # Similar a IN pero con NOT
-                if valor_limpio.startswith("[") and valor_limpio.endswith("]"):
-                    valores = valor_limpio[1:-1].split(",")
-                else:
-                    valores = valor_limpio.split(",")
+    @staticmethod
+    def _filtros_cubo_criterios(criterios: List[tuple]) -> Optional[Dict[str, set]]:
+        """
+        Traduce criterios (tabla, campo, operador, valor) de CONTAR_UNIVERSAL
 
-                # 🔧 CORRECCIÓN: Para campos numéricos (id), no agregar comillas
-                if campo.lower() in ['id', 'alumno_id']:
-                    # Campos numéricos - sin comillas
-                    valores_formateados = [v.strip() for v in valores if v.strip().isdigit()]
-                else:
-                    # Campos de texto - con comillas
-                    valores_formateados = [f"'{v.strip()}'" for v in valores if v.strip()]
+        El cubo responde "=" e "IN" sobre sus dimensiones y calificaciones "[]"
+        (con/sin calificaciones); cualquier otro criterio devuelve None (SQL).
+        """
+        filtros: Dict[str, set] = {}
+        for tabla, campo, operador, valor in criterios:
+            tabla = "alumnos" if tabla == "alumnos" else "datos_escolares"
+            operador = str(operador or "=").upper()
+            if operador not in OPERADORES_PERMITIDOS:
+                operador = "="
+            forma, params = normalizar_criterio(tabla, campo, operador, valor)
+
+            if isinstance(forma, str):
+                # Única forma literal: calificaciones "[]" (= sin calificaciones, != con)
+                dimension = 'tiene_calificaciones'
+                aceptados = {0, None} if operador == "=" else {1}
+            else:
+                _, dimension, operador_forma, _ = forma
+                if tabla != "datos_escolares" or dimension not in DIMENSIONES or operador_forma not in ("=", "IN"):
+                    return None
+                aceptados = {normalizar_valor(dimension, v) for v in params}
 
-                if valores_formateados:
-                    return f" AND {tabla_prefix}.{campo} NOT IN ({','.join(valores_formateados)})"
-                else:
-                    return f" AND {tabla_prefix}.{campo} != '{valor_limpio}'"
+            # Varios criterios sobre la misma dimensión se combinan con AND
+            filtros[dimension] = filtros[dimension] & aceptados if dimension in filtros else aceptados
+        return filtros
 
-            elif operador.upper() == "!=":
-                # Manejo especial para calificaciones
-                if campo == "calificaciones" and valor_limpio == "[]":
-                    # CON CALIFICACIONES
-                    return f" AND {tabla_prefix}.{campo} IS NOT NULL AND {tabla_prefix}.{campo} != '' AND {tabla_prefix}.{campo} != '[]'"
-                else:
-                    return f" AND {tabla_prefix}.{campo} != '{valor_limpio}'"
+    def _contar_en_cubo(self, agrupar_por: Optional[str], filtros: Optional[Dict[str, set]],
+                        solo_con_registro: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Responde un conteo desde el cubo con las mismas filas que daría el SQL
 
-            else:
-                # Operador no reconocido, usar = por defecto
-                self.logger.warning(f"Operador no reconocido: {operador}, usando = por defecto")
-                return f" AND {tabla_prefix}.{campo} = '{valor_limpio}'"
+        - Sin agrupar: [{"total": n}]
+        - Por dimensión: [{agrupar_por: valor, "cantidad": n}] en orden de ORDER BY
+        - Por "calificaciones": [{"grupo_calificaciones": "CON_/SIN_CALIFICACIONES", "cantidad": n}]
 
+        Returns:
+            Filas del resultado, o None si hay que usar SQL (filtros o agrupación
+            fuera del cubo, cubo deshabilitado o no disponible)
+        """
+        cubo = getattr(self.sql_executor, 'cubo', None)
+        if cubo is None or filtros is None:
+            return None
+        try:
+            if not agrupar_por:
+                return [{"total": cubo.contar(filtros, solo_con_registro)}]
+
+            if agrupar_por.lower() == "calificaciones":
+                conteos = cubo.distribucion('tiene_calificaciones', filtros, solo_con_registro)
+                con = sum(cantidad for valor, cantidad in conteos.items() if valor == 1)
+                sin = sum(conteos.values()) - con
+                filas = [("CON_CALIFICACIONES", con), ("SIN_CALIFICACIONES", sin)]
+                return [{"grupo_calificaciones": grupo, "cantidad": cantidad}
+                        for grupo, cantidad in filas if cantidad]
+
+            if agrupar_por in DIMENSIONES:
+                return [{agrupar_por: valor, "cantidad": cantidad}
+                        for valor, cantidad in cubo.distribucion_ordenada(agrupar_por, filtros, solo_con_registro)]
         except Exception as e:
-            self.logger.error(f"Error construyendo condición WHERE: {e}")
-            # Fallback seguro
-            tabla_prefix = "a" if tabla == "alumnos" else "de"
-            return f" AND {tabla_prefix}.{campo} = '{valor}'"
+            self.logger.warning(f"Cubo de agregados no disponible, se usa SQL: {e}")
+        return None
+
+    @staticmethod
+    def _join_seguro(join_logic: str) -> str:
+        """Tipo de JOIN permitido (LEFT por defecto)"""
+        join_logic = str(join_logic or "LEFT").upper().strip()
+        return join_logic if join_logic in ("LEFT", "INNER") else "LEFT"
 
     def _validate_and_map_criterion(self, criterion: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -597,22 +753,18 @@ class ActionExecutor:
         🔒 VALIDAR CAMPO DINÁMICAMENTE CONTRA ESTRUCTURA DE BD
         """
         try:
-            # Importar DatabaseAnalyzer dinámicamente para evitar dependencias circulares
-            from app.core.database.database_analyzer import DatabaseAnalyzer
-
-            analyzer = DatabaseAnalyzer(self.db_path)
-            estructura = analyzer.get_database_structure()
+            # Catálogo compartido: no consulta la BD salvo que haya cambiado el esquema
+            catalogo = get_schema_catalog(self.db_path)
 
             # Validar que la tabla existe
-            if tabla not in estructura.get("tables", {}):
+            if catalogo.tabla(tabla) is None:
                 self.logger.warning(f"Tabla '{tabla}' no encontrada")
                 return False
 
             # Validar que el campo existe en la tabla
-            campos_validos = estructura.get("tables", {}).get(tabla, {}).get("columns", {})
-            if campo not in campos_validos:
+            if not catalogo.tiene_columna(tabla, campo):
                 self.logger.warning(f"Campo '{campo}' no encontrado en tabla '{tabla}'")
-                self.logger.info(f"Campos válidos: {list(campos_validos.keys())}")
+                self.logger.info(f"Campos válidos: {list(catalogo.columnas(tabla))}")
                 return False
 
             return True
@@ -621,20 +773,23 @@ class ActionExecutor:
             self.logger.error(f"Error validando campo dinámicamente: {e}")
             return False
 
-    def _build_dynamic_sql(self, criterio_principal: Dict, filtros_adicionales: list, join_logic: str, limit: int = None, campos_solicitados: list = None) -> str:
+    def _build_dynamic_sql(self, criterio_principal: Dict, filtros_adicionales: list, join_logic: str, limit: int = None, campos_solicitados: list = None) -> ConsultaParametrizada:
         """
         🔧 CONSTRUIR SQL DINÁMICAMENTE BASADO EN CRITERIOS Y CAMPOS SOLICITADOS
+
+        El texto SQL depende solo de la forma de los criterios (campos y operadores);
+        los valores van como parámetros para reutilizar la sentencia preparada.
         """
         # 🔧 CONSTRUIR SELECT DINÁMICO BASADO EN CAMPOS SOLICITADOS
         select_clause = self._build_select_clause(campos_solicitados)
 
         # Base query con JOINs automáticos
-        sql = f"""
+        constructor = ConstructorConsulta(f"""
         {select_clause}
         FROM alumnos a
-        {join_logic} JOIN datos_escolares de ON a.id = de.alumno_id
+        {self._join_seguro(join_logic)} JOIN datos_escolares de ON a.id = de.alumno_id
         WHERE 1=1
-        """
+        """)
 
         # 🎯 AGREGAR CRITERIO PRINCIPAL CON OPERADORES AVANZADOS
         tabla_principal = criterio_principal.get("tabla", "alumnos")
@@ -645,29 +800,20 @@ class ActionExecutor:
         # Manejar operadores especiales JSON primero
         if operador_principal.upper() == "JSON_PROMEDIO":
             # Filtrar por promedio general de calificaciones (promedio de todos los promedios)
-            tabla_prefix = "a" if tabla_principal == "alumnos" else "de"
-            promedio_minimo = float(valor_principal)
-            sql += f"""
-            AND (
-                SELECT AVG(CAST(json_extract(value, '$.promedio') AS REAL))
-                FROM json_each({tabla_prefix}.{campo_principal})
-                WHERE json_extract(value, '$.promedio') IS NOT NULL
-                AND json_extract(value, '$.promedio') != 0
-            ) > {promedio_minimo}"""
+            constructor.fragmento(" AND de.promedio_general > ?", float(valor_principal))
         elif operador_principal.upper() == "JSON_MATERIA":
             # Filtrar por promedio de materia específica (formato: "MATEMATICAS:8.0")
-            tabla_prefix = "a" if tabla_principal == "alumnos" else "de"
             materia, promedio = valor_principal.split(":")
-            promedio_minimo = float(promedio)
-            sql += f"""
-            AND EXISTS (
-                SELECT 1 FROM json_each({tabla_prefix}.{campo_principal})
-                WHERE json_extract(value, '$.nombre') = '{materia.upper()}'
-                AND json_extract(value, '$.promedio') > {promedio_minimo}
-            )"""
+            constructor.fragmento("""
+            AND de.id IN (
+                SELECT datos_escolares_id FROM calificaciones
+                WHERE materia = ?
+                AND periodo = 'promedio'
+                AND calificacion > ?
+            )""", materia.strip().upper(), float(promedio))
         else:
             # Usar el nuevo método para operadores estándar y avanzados
-            sql += self._build_where_condition(tabla_principal, campo_principal, operador_principal, valor_principal)
+            self._build_where_condition(constructor, tabla_principal, campo_principal, operador_principal, valor_principal)
 
         # 🎯 AGREGAR FILTROS ADICIONALES CON OPERADORES AVANZADOS
         for filtro in filtros_adicionales:
@@ -681,17 +827,16 @@ class ActionExecutor:
 
             # Manejar operadores especiales JSON primero
             if operador_filtro.upper() == "JSON_CONTAINS":
-                tabla_prefix = "a" if tabla_filtro == "alumnos" else "de"
-                sql += f" AND {tabla_prefix}.{campo_filtro} LIKE '%{valor_filtro}%'"
+                self._build_where_condition(constructor, tabla_filtro, campo_filtro, "LIKE", valor_filtro)
             else:
                 # Usar el nuevo método para operadores estándar y avanzados
-                sql += self._build_where_condition(tabla_filtro, campo_filtro, operador_filtro, valor_filtro)
+                self._build_where_condition(constructor, tabla_filtro, campo_filtro, operador_filtro, valor_filtro)
 
         # 🎯 AGREGAR LÍMITE SI SE ESPECIFICA
         if limit:
-            sql += f" LIMIT {limit}"
+            return constructor.construir(" LIMIT ?", int(limit))
 
-        return sql.strip()
+        return constructor.construir()
 
     def _build_select_clause(self, campos_solicitados: list = None) -> str:
         """
@@ -838,8 +983,14 @@ class ActionExecutor:
             elif campo_lower in ['grupo']:
                 campos_mapeados.append('de.grupo')
             else:
-                # Fallback: asumir tabla alumnos
-                campos_mapeados.append(f'a.{campo_lower}')
+                # Fallback: asumir tabla alumnos (solo columnas conocidas)
+                try:
+                    if campo_lower in COLUMNAS_PERMITIDAS['alumnos']:
+                        campos_mapeados.append(columna('alumnos', campo_lower))
+                    else:
+                        campos_mapeados.append(columna_sin_tabla(campo_lower))
+                except IdentificadorNoPermitido:
+                    self.logger.warning(f"   ├── ⚠️ Campo ignorado (no existe): {campo}")
 
         if campos_mapeados:
             select_clause = f"SELECT {', '.join(campos_mapeados)}"
@@ -1429,10 +1580,11 @@ RESPONDE SOLO EN FORMATO JSON:
             # 🎯 NIVEL 2: PROMEDIOS IMPLEMENTADOS
             elif tipo == "promedio":
                 return self._calcular_promedio(agrupar_por, filtro, params)
+            # 🎯 NIVEL 3: ANALÍTICA DE CALIFICACIONES (NumPy)
             elif tipo == "ranking":
-                return self._error_result("Rankings en desarrollo")
+                return self._calcular_ranking(agrupar_por, filtro, params)
             elif tipo == "comparacion":
-                return self._error_result("Comparaciones en desarrollo")
+                return self._calcular_comparacion(agrupar_por, filtro, params)
             else:
                 return self._error_result(f"Tipo de estadística no soportado: {tipo}")
 
@@ -1447,10 +1599,10 @@ RESPONDE SOLO EN FORMATO JSON:
             if agrupar_por:
                 # 🎯 CASO ESPECIAL: AGRUPAR POR CALIFICACIONES (CON vs SIN)
                 if agrupar_por.lower() == "calificaciones":
-                    sql = """
+                    constructor = ConstructorConsulta("""
                     SELECT
                         CASE
-                            WHEN de.calificaciones IS NOT NULL AND de.calificaciones != '' AND de.calificaciones != '[]'
+                            WHEN de.tiene_calificaciones = 1
                             THEN 'CON_CALIFICACIONES'
                             ELSE 'SIN_CALIFICACIONES'
                         END as grupo_calificaciones,
@@ -1458,42 +1610,36 @@ RESPONDE SOLO EN FORMATO JSON:
                     FROM alumnos a
                     LEFT JOIN datos_escolares de ON a.id = de.alumno_id
                     WHERE 1=1
-                    """
+                    """)
 
                     # Aplicar filtros si existen
-                    if isinstance(filtro, dict):
-                        for campo, valor in filtro.items():
-                            if campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                                sql += f" AND de.{campo} = '{str(valor).upper()}'"
-                            elif campo in ['nombre', 'curp', 'matricula']:
-                                sql += f" AND a.{campo} LIKE '%{str(valor).upper()}%'"
-
-                    sql += " GROUP BY grupo_calificaciones ORDER BY grupo_calificaciones"
+                    self._aplicar_filtro_simple(constructor, filtro)
+                    consulta = constructor.construir(" GROUP BY grupo_calificaciones ORDER BY grupo_calificaciones")
                 else:
                     # 📊 CONTEO AGRUPADO NORMAL (ej: por grado, por turno)
-                    sql = f"""
-                    SELECT {agrupar_por}, COUNT(*) as cantidad
+                    columna_grupo = columna_sin_tabla(agrupar_por)
+                    constructor = ConstructorConsulta(f"""
+                    SELECT {columna_grupo}, COUNT(*) as cantidad
                     FROM alumnos a
                     LEFT JOIN datos_escolares de ON a.id = de.alumno_id
                     WHERE 1=1
-                    """
+                    """)
 
                     # Aplicar filtros si existen
-                    if isinstance(filtro, dict):
-                        for campo, valor in filtro.items():
-                            if campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                                sql += f" AND de.{campo} = '{str(valor).upper()}'"
-                            elif campo in ['nombre', 'curp', 'matricula']:
-                                sql += f" AND a.{campo} LIKE '%{str(valor).upper()}%'"
+                    self._aplicar_filtro_simple(constructor, filtro)
+                    consulta = constructor.construir(f" GROUP BY {columna_grupo} ORDER BY {columna_grupo}")
 
-                    sql += f" GROUP BY {agrupar_por} ORDER BY {agrupar_por}"
+                sql = consulta.como_texto()
+                filas = self._contar_en_cubo(agrupar_por, self._filtros_cubo_simple(filtro))
+                if filas is None:
+                    result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
+                    filas = result.data if result.success else None
 
-                result = self.sql_executor.execute_query(sql)
-                if result.success:
+                if filas is not None:
                     # 🔧 FORMATEAR RESULTADOS COMO LISTA DE OBJETOS
                     conteo_lista = []
                     total = 0
-                    for row in result.data:
+                    for row in filas:
                         # 🔧 MANEJAR CASO ESPECIAL DE CALIFICACIONES
                         if agrupar_por.lower() == "calificaciones":
                             grupo = row['grupo_calificaciones']
@@ -1535,28 +1681,29 @@ RESPONDE SOLO EN FORMATO JSON:
                         "campo_agrupado": agrupar_por
                     }
                 else:
-                    return self._error_result(f"Error en consulta agrupada: {result.message}")
+                    return self._error_result(f"Error en consulta agrupada: {result.message}", result)
 
             else:
                 # 📊 CONTEO SIMPLE (total de alumnos)
-                sql = """
+                constructor = ConstructorConsulta("""
                 SELECT COUNT(*) as total
                 FROM alumnos a
                 LEFT JOIN datos_escolares de ON a.id = de.alumno_id
                 WHERE 1=1
-                """
+                """)
 
                 # Aplicar filtros si existen
-                if isinstance(filtro, dict):
-                    for campo, valor in filtro.items():
-                        if campo in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                            sql += f" AND de.{campo} = '{str(valor).upper()}'"
-                        elif campo in ['nombre', 'curp', 'matricula']:
-                            sql += f" AND a.{campo} LIKE '%{str(valor).upper()}%'"
-
-                result = self.sql_executor.execute_query(sql)
-                if result.success and result.data:
-                    total = result.data[0]['total']
+                self._aplicar_filtro_simple(constructor, filtro)
+                consulta = constructor.construir()
+                sql = consulta.como_texto()
+
+                filas = self._contar_en_cubo(None, self._filtros_cubo_simple(filtro))
+                if filas is None:
+                    result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
+                    filas = result.data if result.success else None
+
+                if filas:
+                    total = filas[0]['total']
                     return {
                         "success": True,
                         "data": [{"total": total}],
@@ -1568,7 +1715,7 @@ RESPONDE SOLO EN FORMATO JSON:
                         "total_elementos": total
                     }
                 else:
-                    return self._error_result(f"Error en conteo simple: {result.message}")
+                    return self._error_result(f"Error en conteo simple: {result.message}", result)
 
         except Exception as e:
             self.logger.error(f"Error en _calcular_conteo: {e}")
@@ -1642,26 +1789,29 @@ RESPONDE SOLO EN FORMATO JSON:
             campo = params.get("campo", "edad")
 
             if campo == "edad":
+                # Edad aproximada a mitad de mes desde las columnas indexadas anio/mes_nacimiento
+                hoy = datetime.date.today()
+                referencia = hoy.year + (hoy.month - 1) / 12 + (hoy.day - 1) / 365.25
+                edad_sql = f"({referencia:.4f} - (a.anio_nacimiento + (a.mes_nacimiento - 0.5) / 12.0))"
+
                 # 🎯 CALCULAR EDAD DESDE FECHA_NACIMIENTO
                 if agrupar_por:
                     # Promedio de edad agrupado
-                    sql = f"""
-                    SELECT de.{agrupar_por},
-                           AVG((julianday('now') - julianday(a.fecha_nacimiento)) / 365.25) as promedio_edad
+                    columna_grupo = columna_sin_tabla(f"de.{agrupar_por}")
+                    constructor = ConstructorConsulta(f"""
+                    SELECT {columna_grupo},
+                           AVG({edad_sql}) as promedio_edad
                     FROM alumnos a
                     LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE a.fecha_nacimiento IS NOT NULL
-                    """
+                    WHERE a.anio_nacimiento IS NOT NULL
+                    """)
 
                     # Aplicar filtros si existen
-                    if isinstance(filtro, dict):
-                        for campo_filtro, valor in filtro.items():
-                            if campo_filtro in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                                sql += f" AND de.{campo_filtro} = '{str(valor).upper()}'"
+                    self._aplicar_filtro_simple(constructor, filtro)
+                    consulta = constructor.construir(f" GROUP BY {columna_grupo} ORDER BY {columna_grupo}")
+                    sql = consulta.como_texto()
 
-                    sql += f" GROUP BY de.{agrupar_por} ORDER BY de.{agrupar_por}"
-
-                    result = self.sql_executor.execute_query(sql)
+                    result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
                     if result.success:
                         # Formatear resultados agrupados
                         promedios = {}
@@ -1682,23 +1832,22 @@ RESPONDE SOLO EN FORMATO JSON:
                             "grupos": len(promedios)
                         }
                     else:
-                        return self._error_result(f"Error en consulta de promedio: {result.message}")
+                        return self._error_result(f"Error en consulta de promedio: {result.message}", result)
                 else:
                     # Promedio general de edad
-                    sql = """
-                    SELECT AVG((julianday('now') - julianday(a.fecha_nacimiento)) / 365.25) as promedio_edad
+                    constructor = ConstructorConsulta(f"""
+                    SELECT AVG({edad_sql}) as promedio_edad
                     FROM alumnos a
                     LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE a.fecha_nacimiento IS NOT NULL
-                    """
+                    WHERE a.anio_nacimiento IS NOT NULL
+                    """)
 
                     # Aplicar filtros si existen
-                    if isinstance(filtro, dict):
-                        for campo_filtro, valor in filtro.items():
-                            if campo_filtro in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                                sql += f" AND de.{campo_filtro} = '{str(valor).upper()}'"
+                    self._aplicar_filtro_simple(constructor, filtro)
+                    consulta = constructor.construir()
+                    sql = consulta.como_texto()
 
-                    result = self.sql_executor.execute_query(sql)
+                    result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
                     if result.success and result.data:
                         promedio = round(result.data[0]['promedio_edad'], 1)
                         return {
@@ -1712,35 +1861,26 @@ RESPONDE SOLO EN FORMATO JSON:
                             "campo_calculado": "edad"
                         }
                     else:
-                        return self._error_result(f"Error calculando promedio general: {result.message}")
+                        return self._error_result(f"Error calculando promedio general: {result.message}", result)
             elif campo == "calificaciones":
                 # 🎯 CALCULAR PROMEDIO GENERAL DE CALIFICACIONES
                 if agrupar_por:
                     # Promedio de calificaciones agrupado
-                    sql = f"""
-                    SELECT de.{agrupar_por},
-                           AVG(
-                               (SELECT AVG(CAST(json_extract(value, '$.promedio') AS REAL))
-                                FROM json_each(de.calificaciones)
-                                WHERE json_extract(value, '$.promedio') IS NOT NULL
-                                AND json_extract(value, '$.promedio') != 0)
-                           ) as promedio_calificaciones
+                    columna_grupo = columna_sin_tabla(f"de.{agrupar_por}")
+                    constructor = ConstructorConsulta(f"""
+                    SELECT {columna_grupo},
+                           AVG(de.promedio_general) as promedio_calificaciones
                     FROM alumnos a
-                    LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NOT NULL
-                      AND de.calificaciones != '[]'
-                      AND de.calificaciones != ''
-                    """
+                    JOIN datos_escolares de ON a.id = de.alumno_id
+                    WHERE de.promedio_general IS NOT NULL
+                    """)
 
                     # Aplicar filtros si existen
-                    if isinstance(filtro, dict):
-                        for campo_filtro, valor in filtro.items():
-                            if campo_filtro in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                                sql += f" AND de.{campo_filtro} = '{str(valor).upper()}'"
-
-                    sql += f" GROUP BY de.{agrupar_por} ORDER BY de.{agrupar_por}"
+                    self._aplicar_filtro_simple(constructor, filtro)
+                    consulta = constructor.construir(f" GROUP BY {columna_grupo} ORDER BY {columna_grupo}")
+                    sql = consulta.como_texto()
 
-                    result = self.sql_executor.execute_query(sql)
+                    result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
                     if result.success:
                         # Formatear resultados agrupados
                         promedios = {}
@@ -1761,30 +1901,22 @@ RESPONDE SOLO EN FORMATO JSON:
                             "grupos": len(promedios)
                         }
                     else:
-                        return self._error_result(f"Error en consulta de promedio: {result.message}")
+                        return self._error_result(f"Error en consulta de promedio: {result.message}", result)
                 else:
                     # Promedio general de calificaciones
-                    sql = """
-                    SELECT AVG(
-                        (SELECT AVG(CAST(json_extract(value, '$.promedio') AS REAL))
-                         FROM json_each(de.calificaciones)
-                         WHERE json_extract(value, '$.promedio') IS NOT NULL
-                         AND json_extract(value, '$.promedio') != 0)
-                    ) as promedio_general
+                    constructor = ConstructorConsulta("""
+                    SELECT AVG(de.promedio_general) as promedio_general
                     FROM alumnos a
-                    LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NOT NULL
-                      AND de.calificaciones != '[]'
-                      AND de.calificaciones != ''
-                    """
+                    JOIN datos_escolares de ON a.id = de.alumno_id
+                    WHERE de.promedio_general IS NOT NULL
+                    """)
 
                     # Aplicar filtros si existen
-                    if isinstance(filtro, dict):
-                        for campo_filtro, valor in filtro.items():
-                            if campo_filtro in ['grado', 'grupo', 'turno', 'ciclo_escolar']:
-                                sql += f" AND de.{campo_filtro} = '{str(valor).upper()}'"
+                    self._aplicar_filtro_simple(constructor, filtro)
+                    consulta = constructor.construir()
+                    sql = consulta.como_texto()
 
-                    result = self.sql_executor.execute_query(sql)
+                    result = self.sql_executor.execute_query(consulta.sql, params=consulta.params)
                     if result.success and result.data:
                         promedio = round(result.data[0]['promedio_general'], 2) if result.data[0]['promedio_general'] else 0
                         return {
@@ -1798,7 +1930,7 @@ RESPONDE SOLO EN FORMATO JSON:
                             "campo_calculado": "calificaciones"
                         }
                     else:
-                        return self._error_result(f"Error calculando promedio general: {result.message}")
+                        return self._error_result(f"Error calculando promedio general: {result.message}", result)
             else:
                 return self._error_result(f"Campo '{campo}' no soportado para promedios. Campos disponibles: 'edad', 'calificaciones'.")
 
@@ -1806,6 +1938,143 @@ RESPONDE SOLO EN FORMATO JSON:
             self.logger.error(f"Error en _calcular_promedio: {e}")
             return self._error_result(f"Error calculando promedio: {str(e)}")
 
+    def _analitica(self):
+        """Analítica de calificaciones de esta base, o None si NumPy no está instalado"""
+        from app.data.indices.analitica_calificaciones import NUMPY_DISPONIBLE, get_analitica_calificaciones
+        return get_analitica_calificaciones(self.db_path) if NUMPY_DISPONIBLE else None
+
+    @staticmethod
+    def _periodo_solicitado(params: dict) -> str:
+        """Periodo de calificaciones pedido (i, ii, iii o promedio final)"""
+        from app.data.indices.analitica_calificaciones import PERIODOS
+        periodo = str(params.get("periodo") or "promedio").lower().strip()
+        return periodo if periodo in PERIODOS else "promedio"
+
+    @staticmethod
+    def _materia_solicitada(params: dict) -> Optional[str]:
+        """Materia a analizar; "calificaciones" (o nada) significa todas"""
+        campo = params.get("materia") or params.get("campo")
+        return None if not campo or str(campo).lower() in ("calificaciones", "promedio", "edad") else str(campo)
+
+    def _calcular_ranking(self, agrupar_por: str, filtro: dict, params: dict) -> Dict[str, Any]:
+        """
+        Ranking por promedio de calificaciones
+
+        Sin agrupar_por: los N mejores (orden=desc) o peores (orden=asc) alumnos.
+        Con agrupar_por (grado, grupo, turno, ciclo_escolar): los grupos ordenados
+        por su promedio.
+        """
+        analitica = self._analitica()
+        if analitica is None:
+            return self._error_result("Los rankings requieren NumPy (pip install numpy)")
+
+        try:
+            limite = int(params.get("limite") or 10)
+        except (TypeError, ValueError):
+            limite = 10
+        descendente = str(params.get("orden") or "desc").lower() != "asc"
+        periodo = self._periodo_solicitado(params)
+        materia = self._materia_solicitada(params)
+        if materia and not analitica.tiene_materia(materia):
+            return self._error_result(f"No hay calificaciones de la materia '{materia}'")
+        descripcion = materia.upper() if materia else "promedio general"
+
+        try:
+            if agrupar_por:
+                filas = analitica.por_grupo(agrupar_por, periodo, materia, filtro)
+                filas.sort(key=lambda fila: fila["promedio"], reverse=descendente)
+                for posicion, fila in enumerate(filas, start=1):
+                    fila["posicion"] = posicion
+                filas = filas[:limite]
+                mensaje = f"Ranking de {agrupar_por} por {descripcion}: {len(filas)} grupos"
+                tipo_resultado = "ranking_grupos"
+            else:
+                filas = analitica.ranking(limite, descendente, periodo, materia, filtro)
+                mensaje = (f"{'Mejores' if descendente else 'Menores'} {len(filas)} promedios "
+                           f"({descripcion})")
+                tipo_resultado = "ranking_alumnos"
+        except KeyError as e:
+            return self._error_result(str(e).strip("'"))
+
+        return {
+            "success": True,
+            "data": filas,
+            "row_count": len(filas),
+            "action_used": "CALCULAR_ESTADISTICA",
+            "message": mensaje,
+            "sql_executed": "",
+            "metodo": f"Analítica en memoria sobre calificaciones (periodo {periodo})",
+            "estadistica_tipo": tipo_resultado,
+            "campo_calculado": materia or "calificaciones",
+            "campo_agrupado": agrupar_por or None
+        }
+
+    def _calcular_comparacion(self, agrupar_por: str, filtro: dict, params: dict) -> Dict[str, Any]:
+        """
+        Comparación de calificaciones
+
+        - agrupar_por=periodo: promedio de cada materia en i, ii, iii y el cambio entre periodos
+        - agrupar_por=calificaciones: alumnos con vs sin calificaciones (conteo)
+        - agrupar_por=grado/grupo/turno/ciclo_escolar (grupo por defecto): resumen de
+          cada grupo y promedio de cada materia por grupo; "comparar" limita los
+          grupos (p. ej. ["A", "B"])
+        """
+        agrupar_por = str(agrupar_por or "grupo").lower().strip()
+        if agrupar_por == "calificaciones":
+            return self._calcular_distribucion("calificaciones", filtro, False)
+
+        analitica = self._analitica()
+        if analitica is None:
+            return self._error_result("Las comparaciones requieren NumPy (pip install numpy)")
+
+        materia = self._materia_solicitada(params)
+        if materia and not analitica.tiene_materia(materia):
+            return self._error_result(f"No hay calificaciones de la materia '{materia}'")
+        periodo = self._periodo_solicitado(params)
+        comparar = params.get("comparar") or params.get("valores")
+        if isinstance(comparar, str):
+            comparar = [v.strip() for v in comparar.strip("[]").replace("'", "").replace('"', "").split(",") if v.strip()]
+
+        try:
+            if agrupar_por == "periodo":
+                filas = analitica.deltas_periodo(materia, filtro)
+                return {
+                    "success": True,
+                    "data": filas,
+                    "row_count": len(filas),
+                    "action_used": "CALCULAR_ESTADISTICA",
+                    "message": f"Comparación entre periodos: {len(filas)} materias",
+                    "sql_executed": "",
+                    "metodo": "Analítica en memoria sobre calificaciones (periodos i, ii, iii)",
+                    "estadistica_tipo": "comparacion_periodos",
+                    "campo_calculado": materia or "calificaciones",
+                    "campo_agrupado": "periodo"
+                }
+
+            filas = analitica.por_grupo(agrupar_por, periodo, materia, filtro, comparar)
+            detalle = analitica.por_materia(periodo, filtro, agrupar_por, comparar, materia)
+        except KeyError as e:
+            return self._error_result(str(e).strip("'"))
+
+        if not filas:
+            return self._error_result("No hay calificaciones para comparar con esos criterios")
+
+        mejor = max(filas, key=lambda fila: fila["promedio"])
+        return {
+            "success": True,
+            "data": filas,
+            "row_count": len(filas),
+            "action_used": "CALCULAR_ESTADISTICA",
+            "message": f"Comparación por {agrupar_por}: {len(filas)} grupos, mayor promedio en "
+                       f"{mejor[agrupar_por]} ({mejor['promedio']})",
+            "sql_executed": "",
+            "metodo": f"Analítica en memoria sobre calificaciones (periodo {periodo})",
+            "estadistica_tipo": "comparacion_grupos",
+            "campo_calculado": materia or "calificaciones",
+            "campo_agrupado": agrupar_por,
+            "detalle_materias": detalle["matriz"]
+        }
+
     def _execute_listado_completo(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         📋 EJECUTA LISTADO COMPLETO
@@ -1855,7 +2124,7 @@ RESPONDE SOLO EN FORMATO JSON:
                     "message": f"Listado completo generado: {result.row_count} resultado(s)"
                 }
             else:
-                return self._error_result(f"Error en listado completo: {result.message}")
+                return self._error_result(f"Error en listado completo: {result.message}", result)
 
         except Exception as e:
             self.logger.error(f"Error en listado completo: {e}")
@@ -1884,16 +2153,17 @@ RESPONDE SOLO EN FORMATO JSON:
                     return self._error_result(f"No se encontró alumno con ID {alumno_identificador}")
             else:
                 # Buscar por nombre o CURP
-                sql = f"""
+                sql = """
                 SELECT a.*, de.grado, de.grupo, de.turno, de.ciclo_escolar
                 FROM alumnos a
                 LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-                WHERE a.nombre LIKE '%{alumno_identificador.upper()}%'
-                   OR a.curp LIKE '%{alumno_identificador.upper()}%'
+                WHERE a.nombre LIKE ?
+                   OR a.curp LIKE ?
                 LIMIT 1
                 """
+                patron = f"%{alumno_identificador.upper()}%"
 
-                result = self.sql_executor.execute_query(sql, 10)  # Límite bajo para búsqueda individual
+                result = self.sql_executor.execute_query(sql, 10, (patron, patron))  # Límite bajo para búsqueda individual
                 if not result.success or result.row_count == 0:
                     return self._error_result(f"No se encontró alumno: {alumno_identificador}")
 
@@ -2000,6 +2270,64 @@ RESPONDE SOLO EN FORMATO JSON:
 
 
 
+    def _execute_generar_constancias_grupo(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecuta la generación de constancias para todo un grado o grupo"""
+
+        tipo_constancia = self._normalizar_tipo_constancia(params.get("tipo_constancia", "estudio"))
+        # "3", 3, "3°" o "3ro" → 3
+        import re
+        coincidencia = re.search(r"\d+", str(params.get("grado") or ""))
+        grado = int(coincidencia.group()) if coincidencia else None
+        grupo = str(params["grupo"]).strip().upper() if params.get("grupo") else None
+        turno = str(params["turno"]).strip().upper() if params.get("turno") else None
+        formato = str(params.get("formato", "archivos")).lower()
+
+        incluir_foto = params.get("incluir_foto")
+        if isinstance(incluir_foto, str):
+            incluir_foto = incluir_foto.lower() in ['true', '1', 'yes', 'sí']
+
+        try:
+            from app.core.service_provider import ServiceProvider
+            constancia_service = ServiceProvider.get_instance().constancia_service
+
+            def progreso(hechos, total, nombre):
+                if hechos == total or hechos % 10 == 0:
+                    self.logger.info(f"📄 Constancias del grupo: {hechos}/{total}")
+
+            success, message, data = constancia_service.generar_constancias_grupo(
+                tipo_constancia, grado=grado, grupo=grupo, turno=turno,
+                incluir_foto=incluir_foto, formato=formato, progreso=progreso
+            )
+            if not success:
+                return self._error_result(message)
+
+            destino = data.get("archivo_combinado") or data.get("directorio")
+            descripcion = f"{grado}° {grupo}" if grupo else f"{grado}°"
+            return {
+                "success": True,
+                "data": [data],
+                "row_count": data.get("generadas", 0),
+                "action_used": "GENERAR_CONSTANCIAS_GRUPO",
+                "message": f"{message} ({descripcion}). Archivos en: {destino}",
+                "sql_executed": "",
+                "metodo": f"Constancias de {tipo_constancia} para {descripcion}",
+                "files": [destino]
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error generando constancias del grupo: {e}")
+            return self._error_result(f"Error interno: {str(e)}")
+
+    @staticmethod
+    def _normalizar_tipo_constancia(tipo: str) -> str:
+        """estudios/calificacion/... → estudio, calificaciones, traslado"""
+        tipo = str(tipo or "estudio").lower()
+        if tipo.startswith("calif"):
+            return "calificaciones"
+        if tipo.startswith("trasl"):
+            return "traslado"
+        return "estudio"
+
     def _execute_filtrar_por_calificaciones(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Ejecuta filtrado por calificaciones"""
 
@@ -2019,9 +2347,7 @@ RESPONDE SOLO EN FORMATO JSON:
                     SELECT a.*, de.*
                     FROM alumnos a
                     JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NOT NULL
-                      AND de.calificaciones != ''
-                      AND de.calificaciones != '[]'
+                    WHERE de.tiene_calificaciones = 1
                     ORDER BY a.nombre
                     """
                     mensaje = "Alumnos con calificaciones registradas"
@@ -2031,9 +2357,7 @@ RESPONDE SOLO EN FORMATO JSON:
                     SELECT a.*, de.*
                     FROM alumnos a
                     JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NULL
-                       OR de.calificaciones = ''
-                       OR de.calificaciones = '[]'
+                    WHERE de.tiene_calificaciones = 0
                     ORDER BY a.nombre
                     """
                     mensaje = "Alumnos sin calificaciones registradas"
@@ -2044,9 +2368,7 @@ RESPONDE SOLO EN FORMATO JSON:
                     SELECT COUNT(*) as total
                     FROM alumnos a
                     JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NOT NULL
-                      AND de.calificaciones != ''
-                      AND de.calificaciones != '[]'
+                    WHERE de.tiene_calificaciones = 1
                     """
                     mensaje = "Conteo de alumnos con calificaciones"
                 else:
@@ -2054,9 +2376,7 @@ RESPONDE SOLO EN FORMATO JSON:
                     SELECT COUNT(*) as total
                     FROM alumnos a
                     JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NULL
-                       OR de.calificaciones = ''
-                       OR de.calificaciones = '[]'
+                    WHERE de.tiene_calificaciones = 0
                     """
                     mensaje = "Conteo de alumnos sin calificaciones"
 
@@ -2075,7 +2395,7 @@ RESPONDE SOLO EN FORMATO JSON:
                     "filtro_aplicado": "con_calificaciones" if tiene_cal_bool else "sin_calificaciones"
                 }
             else:
-                return self._error_result(f"Error filtrando por calificaciones: {result.message}")
+                return self._error_result(f"Error filtrando por calificaciones: {result.message}", result)
 
         except Exception as e:
             self.logger.error(f"Error en _execute_filtrar_por_calificaciones: {e}")
@@ -2149,14 +2469,9 @@ RESPONDE SOLO EN FORMATO JSON:
     def _get_database_structure_for_llm(self) -> str:
         """Obtiene estructura dinámica de la base de datos para LLM"""
         try:
-            from app.core.database.database_analyzer import DatabaseAnalyzer
-            analyzer = DatabaseAnalyzer(self.db_path)
-            structure = analyzer.get_database_structure()
-
             structure_text = ""
-            for table_name, table_info in structure.get("tables", {}).items():
-                columns = table_info.get("columns", {})
-                column_list = ", ".join(columns.keys())
+            for table_name, table_info in get_schema_catalog(self.db_path).tablas().items():
+                column_list = ", ".join(table_info.nombres_columnas)
                 structure_text += f"- Tabla '{table_name}': {column_list}\n"
 
             return structure_text.strip()
@@ -2180,12 +2495,22 @@ RESPONDE SOLO EN FORMATO JSON:
             self.logger.error(f"Error obteniendo ejemplos dinámicos: {e}")
             return "- Ejemplos no disponibles dinámicamente"
 
-    def _error_result(self, message: str) -> Dict[str, Any]:
-        """Genera resultado de error estándar"""
-        return {
+    def _error_result(self, message: str, query_result=None) -> Dict[str, Any]:
+        """
+        Genera resultado de error estándar
+
+        Si viene el QueryResult fallido, se propagan su código de error y la
+        sugerencia de reintento (p. ej. consulta cancelada por presupuesto).
+        """
+        result = {
             "success": False,
             "data": [],
             "row_count": 0,
             "action_used": "ERROR",
             "message": message
         }
+        if query_result is not None and query_result.error_code:
+            result["error_code"] = query_result.error_code
+            if query_result.retry_hint:
+                result["retry_hint"] = query_result.retry_hint
+        return result
@@ -13,7 +13,7 @@ Responsabilidades:
 
 import logging
 from typing import Dict, Any, Optional, List, Tuple
-from app.core.database.database_analyzer import DatabaseAnalyzer
+from app.core.database.schema_catalog import get_schema_catalog
 
 
 class FieldMapper:
@@ -27,10 +27,8 @@ class FieldMapper:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
-        self.database_analyzer = DatabaseAnalyzer(db_path)
-        
-        # Cache de estructura para evitar consultas repetidas
-        self._structure_cache = None
+        # Catálogo compartido: la estructura se lee una vez por versión del esquema
+        self.catalog = get_schema_catalog(db_path)
         
         # 🚫 HARDCODEO ELIMINADO - USAR SOLO LLM INTELIGENTE
         # Todos los mapeos ahora se manejan por LLM con contexto estructural
@@ -317,11 +315,9 @@ class FieldMapper:
 
     def _get_database_structure(self) -> Dict[str, Any]:
         """
-        📊 OBTIENE ESTRUCTURA DE LA BASE DE DATOS (CON CACHE)
+        📊 OBTIENE ESTRUCTURA DE LA BASE DE DATOS (DEL CATÁLOGO COMPARTIDO)
         """
-        if self._structure_cache is None:
-            self._structure_cache = self.database_analyzer.get_database_structure()
-        return self._structure_cache
+        return self.catalog.estructura()
     
     def get_available_fields(self, tabla: str = "alumnos") -> List[str]:
         """
@@ -1,9 +1,9 @@
 """
 Analizador de esquema de base de datos para generar contexto SQL
 """
-import sqlite3
 from typing import Dict, List, Any, Tuple
 from dataclasses import dataclass
+from app.core.database.schema_catalog import get_schema_catalog
 
 @dataclass
 class ColumnInfo:
@@ -24,102 +24,51 @@ class TableInfo:
     sample_data: List[Dict[str, Any]]
 
 class DatabaseAnalyzer:
-    """Analizador de esquema de base de datos"""
+    """Analizador de esquema de base de datos (vista sobre el catálogo compartido)"""
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self.catalog = get_schema_catalog(db_path)
         self.tables_info = {}
     
     def analyze_database(self) -> Dict[str, TableInfo]:
         """Analiza toda la base de datos y retorna información completa"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Obtener lista de tablas
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            for table_name in tables:
-                self.tables_info[table_name] = self._analyze_table(cursor, table_name)
-            
-            conn.close()
+            self.tables_info = {
+                nombre: self._table_info(tabla)
+                for nombre, tabla in self.catalog.tablas().items()
+            }
             return self.tables_info
             
         except Exception as e:
             print(f"Error analizando base de datos: {e}")
             return {}
     
-    def _analyze_table(self, cursor, table_name: str) -> TableInfo:
-        """Analiza una tabla específica"""
-        # Obtener información de columnas
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns_data = cursor.fetchall()
-        
-        columns = []
-        for col_data in columns_data:
-            column = ColumnInfo(
-                name=col_data['name'],
-                type=col_data['type'],
-                nullable=not col_data['notnull'],
-                default_value=col_data['dflt_value'],
-                primary_key=bool(col_data['pk'])
+    @staticmethod
+    def _table_info(tabla) -> TableInfo:
+        """Convierte una TablaCatalogo al formato de este analizador"""
+        columns = [
+            ColumnInfo(
+                name=col.nombre,
+                type=col.tipo,
+                nullable=not col.not_null,
+                default_value=col.default,
+                primary_key=bool(col.pk)
             )
-            columns.append(column)
-        
-        # Obtener foreign keys
-        cursor.execute(f"PRAGMA foreign_key_list({table_name})")
-        fk_data = cursor.fetchall()
-        foreign_keys = [(fk['from'], fk['table'], fk['to']) for fk in fk_data]
-        
-        # Obtener datos de muestra (máximo 5 registros)
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT 5")
-        sample_data = [dict(row) for row in cursor.fetchall()]
+            for col in tabla.columnas
+        ]
+        foreign_keys = [(fk.columna, fk.tabla_ref, fk.columna_ref) for fk in tabla.llaves_foraneas]
         
         return TableInfo(
-            name=table_name,
+            name=tabla.nombre,
             columns=columns,
             foreign_keys=foreign_keys,
-            sample_data=sample_data
+            sample_data=[tabla.muestra] if tabla.muestra else []
         )
     
     def generate_sql_context(self) -> str:
         """Genera contexto SQL para el LLM"""
-        if not self.tables_info:
-            self.analyze_database()
-        
-        context_parts = []
-        context_parts.append("=== ESTRUCTURA DE LA BASE DE DATOS ===\n")
-        
-        for table_name, table_info in self.tables_info.items():
-            context_parts.append(f"TABLA: {table_name}")
-            context_parts.append("-" * 40)
-            
-            # Columnas
-            context_parts.append("COLUMNAS:")
-            for col in table_info.columns:
-                pk_marker = " (PK)" if col.primary_key else ""
-                nullable_marker = " NULL" if col.nullable else " NOT NULL"
-                context_parts.append(f"  • {col.name}: {col.type}{pk_marker}{nullable_marker}")
-            
-            # Foreign Keys
-            if table_info.foreign_keys:
-                context_parts.append("\nRELACIONES:")
-                for fk in table_info.foreign_keys:
-                    context_parts.append(f"  • {fk[0]} → {fk[1]}.{fk[2]}")
-            
-            # Datos de muestra
-            if table_info.sample_data:
-                context_parts.append("\nDATO DE MUESTRA:")
-                sample = table_info.sample_data[0]
-                for key, value in sample.items():
-                    if value is not None:
-                        context_parts.append(f"  • {key}: {value}")
-            
-            context_parts.append("\n")
-        
-        return "\n".join(context_parts)
+        return self.catalog.contexto_sql()
     
     def get_table_relationships(self) -> str:
         """Genera descripción de relaciones entre tablas"""
@@ -56,16 +56,14 @@ class MasterKnowledge:
                                         "conteos simples (cuántos alumnos)",
                                         "conteos agrupados (por grado, turno, grupo)",
                                         "distribuciones porcentuales",
-                                        "promedio de edad (calculado desde fecha_nacimiento)"
-                                    ],
-                                    "limited": [
-                                        "promedio de calificaciones (JSON complejo, análisis básico)"
-                                    ],
-                                    "not_available": [
-                                        "rankings de estudiantes",
-                                        "comparaciones entre grupos",
+                                        "promedio de edad (calculado desde fecha_nacimiento)",
+                                        "promedio de calificaciones (general, por grupo o por materia)",
+                                        "rankings de estudiantes (mejores/peores promedios)",
+                                        "comparaciones entre grupos y entre periodos",
                                         "análisis por materia específica"
-                                    ]
+                                    ],
+                                    "limited": [],
+                                    "not_available": []
                                 },
                                 "examples": ["cuántos alumnos hay", "distribución por grados"]
                             },
@@ -87,13 +85,8 @@ class MasterKnowledge:
                     }
                 },
                 "technical_limitations": {
-                    "calificaciones_json": {
-                        "issue": "Calificaciones almacenadas en JSON, no tabla separada",
-                        "impact": "Análisis por materia específica es complejo",
-                        "workaround": "Solo análisis general de presencia/ausencia"
-                    },
                     "advanced_analytics": {
-                        "issue": "Rankings y comparaciones en desarrollo",
+                        "issue": "Rankings y comparaciones requieren NumPy instalado",
                         "alternatives": ["distribuciones", "conteos agrupados", "promedios generales"]
                     }
                 }
@@ -255,44 +248,29 @@ class MasterKnowledge:
         
         query_text = query_details.get("original_query", "").lower() if query_details else ""
         
-        # Detectar solicitudes no disponibles
-        if any(word in query_text for word in ["ranking", "mejor", "peor", "comparar"]):
+        # Rankings, comparaciones y análisis por materia dependen de NumPy
+        from app.data.indices.analitica_calificaciones import NUMPY_DISPONIBLE
+        if not NUMPY_DISPONIBLE and any(word in query_text for word in ["ranking", "mejor", "peor", "comparar"]):
             return {
                 "can_handle": False,
                 "confidence": 0.3,
-                "limitations": ["Rankings y comparaciones están en desarrollo"],
+                "limitations": ["Rankings y comparaciones requieren NumPy instalado"],
                 "alternatives": [
                     "Puedo mostrar distribuciones por grado",
                     "Puedo calcular conteos agrupados",
                     "Puedo generar estadísticas generales"
                 ],
-                "explanation": "Los rankings no están disponibles en este momento, pero puedo ofrecer análisis alternativos",
+                "explanation": "Los rankings no están disponibles en este equipo, pero puedo ofrecer análisis alternativos",
                 "best_interpreter": "StudentQueryInterpreter"
             }
-        
-        # Detectar análisis por materia específica
-        materias = ["matemáticas", "español", "ciencias", "historia", "geografía"]
-        if any(materia in query_text for materia in materias):
-            return {
-                "can_handle": False,
-                "confidence": 0.4,
-                "limitations": ["Análisis por materia específica es limitado (calificaciones en JSON)"],
-                "alternatives": [
-                    "Puedo calcular promedio general de calificaciones",
-                    "Puedo mostrar quién tiene/no tiene calificaciones",
-                    "Puedo generar distribuciones por grado"
-                ],
-                "explanation": "El análisis por materia específica tiene limitaciones técnicas",
-                "best_interpreter": "StudentQueryInterpreter"
-            }
-        
+
         # Estadísticas disponibles
         return {
             "can_handle": True,
             "confidence": 0.95,
-            "limitations": ["Promedios de calificaciones son básicos (JSON)"],
+            "limitations": [],
             "alternatives": [],
-            "explanation": "Estadísticas básicas y distribuciones están completamente disponibles",
+            "explanation": "Estadísticas, distribuciones, rankings y comparaciones están disponibles",
             "best_interpreter": "StudentQueryInterpreter"
         }
 
@@ -389,9 +367,7 @@ class MasterKnowledge:
         query_lower = user_query.lower()
 
         if any(word in query_lower for word in ["ranking", "mejor", "peor", "comparar"]):
-            return "Los rankings de estudiantes no están disponibles en este momento"
-        elif any(word in query_lower for word in ["matemáticas", "español", "ciencias", "historia"]):
-            return "El análisis por materia específica tiene limitaciones técnicas"
+            return "Los rankings de estudiantes requieren NumPy instalado"
         else:
             return "Esa consulta específica no está disponible"
 
@@ -401,9 +377,7 @@ class MasterKnowledge:
         query_lower = user_query.lower()
 
         if any(word in query_lower for word in ["ranking", "mejor", "peor"]):
-            return "Los rankings y comparaciones están en desarrollo"
-        elif any(word in query_lower for word in ["promedio", "materia"]):
-            return "Los promedios por materia específica tienen limitaciones técnicas"
+            return "Los rankings y comparaciones requieren NumPy instalado"
         else:
             # 🔧 ARREGLO: No rechazar conteos básicos que SÍ están disponibles
             return "Estadísticas básicas y conteos están disponibles"
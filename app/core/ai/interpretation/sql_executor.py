@@ -1,167 +1,239 @@
 """
 Ejecutor de consultas SQL generadas por IA
 """
+import logging
+import os
 import sqlite3
-import re
-from typing import List, Dict, Any, Tuple
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from app.core.logging import get_logger
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.filas_consulta import FilasConsulta
+from app.core.database.result_cache import get_result_cache, es_cacheable
+from app.core.database.query_builder import ConstructorConsulta, ConsultaParametrizada
+from app.data.indices.cubo_agregados import get_cubo_agregados
+
+# Códigos de error estructurados de QueryResult
+ERROR_NO_PERMITIDA = "CONSULTA_NO_PERMITIDA"
+ERROR_PRESUPUESTO = "PRESUPUESTO_EXCEDIDO"
+ERROR_SQL = "ERROR_SQL"
+
+SUGERENCIA_PRESUPUESTO = (
+    "Reintenta con una consulta más acotada: agrega filtros (grado, grupo, turno, "
+    "nombre), une las tablas con ON, evita subconsultas sobre todas las filas y "
+    "pide solo las columnas necesarias."
+)
+SUGERENCIA_NO_PERMITIDA = "Genera una sola consulta SELECT de solo lectura."
+
 
 @dataclass
 class QueryResult:
     """Resultado de una consulta SQL"""
     success: bool
+    # FilasConsulta en consultas exitosas: len() no convierte filas a dict
     data: List[Dict[str, Any]]
     message: str
     query_executed: str
     row_count: int
+    # Error estructurado (None si la consulta fue exitosa)
+    error_code: Optional[str] = None
+    retry_hint: Optional[str] = None
+    # True si el tope de filas cortó el resultado
+    truncated: bool = False
+    # True si se sirvió desde el caché de resultados
+    cached: bool = False
+
+
+class PresupuestoConsulta:
+    """
+    Límite de trabajo de una consulta, revisado desde el progress handler de SQLite
+
+    SQLite llama a revisar() cada `intervalo` instrucciones de su máquina
+    virtual; si devuelve True la consulta se interrumpe (OperationalError
+    "interrupted") sin dejar la conexión en mal estado.
+    """
+
+    def __init__(self, max_segundos: float, max_pasos: int, intervalo: int):
+        self.max_segundos = max_segundos
+        self.max_pasos = max_pasos
+        self.intervalo = max(1, intervalo)
+        self.inicio = time.perf_counter()
+        self.pasos = 0
+        self.motivo: Optional[str] = None
+
+    def revisar(self) -> bool:
+        self.pasos += self.intervalo
+        if self.pasos > self.max_pasos:
+            self.motivo = f"más de {self.max_pasos:,} pasos de ejecución"
+        elif time.perf_counter() - self.inicio > self.max_segundos:
+            self.motivo = f"más de {self.max_segundos:g} s de ejecución"
+        return self.motivo is not None
+
 
 class SQLExecutor:
-    """Ejecutor seguro de consultas SQL"""
+    """
+    Ejecutor seguro de consultas SQL
+
+    La seguridad no depende de revisar el texto: las consultas corren en una
+    conexión mode=ro cuyo autorizador solo permite lecturas (ConnectionManager),
+    con un presupuesto de pasos/tiempo y un tope de filas leído con fetchmany.
+    Los resultados se guardan en un caché compartido que se invalida con cada
+    commit (PRAGMA data_version).
+    """
 
     def __init__(self, db_path: str):
+        from app.core.config import Config
+
         self.db_path = db_path
         self.logger = get_logger(__name__)
-
-        # Palabras clave permitidas (solo SELECT)
-        self.allowed_keywords = {
-            'select', 'from', 'where', 'join', 'left', 'right', 'inner', 'outer',
-            'on', 'and', 'or', 'like', 'in', 'not', 'null', 'is', 'order', 'by',
-            'group', 'having', 'limit', 'offset', 'as', 'distinct', 'union',
-            'case', 'when', 'then', 'else', 'end'
-        }
-
-        # Palabras clave prohibidas (modificación de datos)
-        self.forbidden_keywords = {
-            'insert', 'update', 'delete', 'drop', 'create', 'alter', 'truncate',
-            'replace', 'merge', 'exec', 'execute', 'sp_', 'xp_'
-        }
-
-    def execute_query(self, sql_query: str, limit: int = 100) -> QueryResult:
+        self.connection_manager = get_connection_manager(db_path)
+
+        settings = Config.DATABASE
+        self.max_segundos = float(settings.get('ai_query_max_seconds', 5.0))
+        self.max_pasos = int(settings.get('ai_query_max_vm_steps', 50_000_000))
+        self.intervalo_progreso = int(settings.get('ai_query_progress_interval', 10_000))
+        self.max_filas = int(settings.get('ai_query_max_rows', 5000))
+        self.cache = get_result_cache(db_path) if settings.get('ai_query_cache_enabled', True) else None
+
+        # Conteos por ciclo/grado/grupo/turno sin recorrer la base; el cubo global
+        # es de Config.DB_PATH, así que otra base se consulta solo con SQL
+        cubo = get_cubo_agregados() if settings.get('aggregate_cube_enabled', True) else None
+        mismo_archivo = cubo is not None and os.path.abspath(str(cubo.db_path)) == os.path.abspath(str(db_path))
+        self.cubo = cubo if mismo_archivo else None
+
+    def execute_query(self, sql_query: str, limit: int = 100, params: tuple = ()) -> QueryResult:
         """
         Ejecuta una consulta SQL de forma segura
 
         Args:
-            sql_query: Consulta SQL a ejecutar
-            limit: Límite máximo de resultados
+            sql_query: Consulta SQL a ejecutar (puede llevar marcadores ?)
+            limit: Límite máximo de resultados (acotado por ai_query_max_rows)
+            params: Valores para los marcadores ? de la consulta
 
         Returns:
-            QueryResult con los resultados
+            QueryResult con los resultados, o con error_code/retry_hint si falló
         """
+        # Filtro barato antes de preparar: el autorizador es la verdadera barrera
+        is_safe, error_msg = self._validate_query_safety(sql_query)
+        if not is_safe:
+            return self._error(ERROR_NO_PERMITIDA, f"Consulta no segura: {error_msg}", "",
+                               SUGERENCIA_NO_PERMITIDA)
+
+        max_filas = max(1, min(limit or self.max_filas, self.max_filas))
+
+        # La versión se lee antes de ejecutar: un commit concurrente invalida, nunca engaña
+        clave = version = None
+        if self.cache is not None and es_cacheable(sql_query):
+            try:
+                clave = self.cache.clave(sql_query, params, max_filas)
+                version = self.connection_manager.version_datos()
+                en_cache = self.cache.obtener(clave, version)
+            except (sqlite3.Error, TypeError) as e:
+                self.logger.debug(f"Caché de resultados omitido: {e}")
+                clave = en_cache = None
+            if en_cache is not None:
+                data, truncated = en_cache
+                self.logger.debug(f"🗃️ Resultado desde caché ({len(data)} filas): {sql_query}")
+                return self._resultado(sql_query, data, truncated, max_filas, cached=True)
+
+        presupuesto = PresupuestoConsulta(self.max_segundos, self.max_pasos, self.intervalo_progreso)
+
+        self.logger.info(f"Ejecutando SQL en: {self.db_path}")
+        self.logger.debug(f"SQL Query: {sql_query}")
+        if params:
+            self.logger.debug(f"SQL Params: {params}")
+
+        # Conexión de solo lectura reutilizada por hilo (pool de IA)
+        conn = self.connection_manager.get_readonly_connection()
+        conn.set_progress_handler(presupuesto.revisar, presupuesto.intervalo)
+        cursor = conn.cursor()
         try:
-            # Validar seguridad de la consulta
-            is_safe, error_msg = self._validate_query_safety(sql_query)
-            if not is_safe:
-                return QueryResult(
-                    success=False,
-                    data=[],
-                    message=f"Consulta no segura: {error_msg}",
-                    query_executed="",
-                    row_count=0
+            cursor.execute(sql_query, params)
+
+            # Filas leídas con fetchmany; cada una pasa a dict solo cuando alguien la lee
+            data, truncated = FilasConsulta.desde_cursor(cursor, max_filas)
+
+            self.logger.info(f"Resultados obtenidos: {len(data)}{' (truncado)' if truncated else ''}")
+            if data and self.logger.isEnabledFor(logging.DEBUG):
+                # Solo una muestra: formatear todo el resultado costaba más que la consulta
+                self.logger.debug(f"Datos (primeras {min(3, len(data))} de {len(data)}): {data[:3]}")
+
+            if clave is not None:
+                self.cache.guardar(clave, version, data, truncated)
+            return self._resultado(sql_query, data, truncated, max_filas)
+
+        except sqlite3.OperationalError as e:
+            if presupuesto.motivo:
+                self.logger.warning(f"⏱️ Consulta cancelada ({presupuesto.motivo}): {sql_query}")
+                return self._error(
+                    ERROR_PRESUPUESTO,
+                    f"La consulta fue cancelada por exceder el presupuesto ({presupuesto.motivo}). "
+                    f"{SUGERENCIA_PRESUPUESTO}",
+                    sql_query, SUGERENCIA_PRESUPUESTO
                 )
-
-            # Añadir LIMIT si no existe
-            sql_query = self._ensure_limit(sql_query, limit)
-
-            # Ejecutar consulta
-            self.logger.info(f"Ejecutando SQL en: {self.db_path}")
-            self.logger.debug(f"SQL Query: {sql_query}")
-
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            cursor.execute(sql_query)
-            rows = cursor.fetchall()
-
-            # Convertir a lista de diccionarios
-            data = [dict(row) for row in rows]
-
-            self.logger.info(f"Resultados obtenidos: {len(data)}")
-            self.logger.debug(f"Datos: {data}")
-
-            conn.close()
-
-            return QueryResult(
-                success=True,
-                data=data,
-                message=f"Consulta ejecutada exitosamente. {len(data)} resultados.",
-                query_executed=sql_query,
-                row_count=len(data)
-            )
-
+            return self._error_sqlite(e, sql_query)
         except sqlite3.Error as e:
-            return QueryResult(
-                success=False,
-                data=[],
-                message=f"Error SQL: {str(e)}",
-                query_executed=sql_query,
-                row_count=0
-            )
+            return self._error_sqlite(e, sql_query)
         except Exception as e:
-            return QueryResult(
-                success=False,
-                data=[],
-                message=f"Error inesperado: {str(e)}",
-                query_executed=sql_query,
-                row_count=0
-            )
-
-    def _validate_query_safety(self, sql_query: str) -> Tuple[bool, str]:
-        """Valida que la consulta sea segura (solo SELECT)"""
-        # Convertir a minúsculas para análisis
-        query_lower = sql_query.lower().strip()
-
-        # Debe empezar con SELECT
-        if not query_lower.startswith('select'):
-            return False, "Solo se permiten consultas SELECT"
+            return self._error(ERROR_SQL, f"Error inesperado: {str(e)}", sql_query)
+        finally:
+            cursor.close()
+            conn.set_progress_handler(None, 0)
 
-        # Buscar palabras clave prohibidas
-        words = re.findall(r'\b\w+\b', query_lower)
-        for word in words:
-            if word in self.forbidden_keywords:
-                return False, f"Palabra clave prohibida: {word}"
-
-        # Verificar que no haya múltiples statements
-        if ';' in sql_query and not sql_query.strip().endswith(';'):
-            return False, "No se permiten múltiples statements"
+    @staticmethod
+    def _resultado(sql_query: str, data: List[Dict[str, Any]], truncated: bool,
+                   max_filas: int, cached: bool = False) -> QueryResult:
+        message = f"Consulta ejecutada exitosamente. {len(data)} resultados."
+        if truncated:
+            message += f" Resultado limitado a las primeras {max_filas} filas."
+        return QueryResult(
+            success=True,
+            data=data,
+            message=message,
+            query_executed=sql_query,
+            row_count=len(data),
+            truncated=truncated,
+            cached=cached
+        )
+
+    def estadisticas_cache(self) -> Dict[str, Any]:
+        """Aciertos/fallos del caché de resultados (diagnóstico)"""
+        if self.cache is None:
+            return {'habilitado': False}
+        return {'habilitado': True, **self.cache.estadisticas()}
+
+    def _error_sqlite(self, error: sqlite3.Error, sql_query: str) -> QueryResult:
+        """Traduce un error de SQLite (incluida la negación del autorizador)"""
+        if "not authorized" in str(error) or "one statement at a time" in str(error):
+            return self._error(ERROR_NO_PERMITIDA, f"Consulta no permitida: {str(error)}",
+                               sql_query, SUGERENCIA_NO_PERMITIDA)
+        return self._error(ERROR_SQL, f"Error SQL: {str(error)}", sql_query)
 
-        # Verificar que no haya comentarios maliciosos
-        if '--' in sql_query or '/*' in sql_query:
-            return False, "No se permiten comentarios en las consultas"
+    @staticmethod
+    def _error(code: str, message: str, sql_query: str, retry_hint: Optional[str] = None) -> QueryResult:
+        return QueryResult(
+            success=False,
+            data=[],
+            message=message,
+            query_executed=sql_query,
+            row_count=0,
+            error_code=code,
+            retry_hint=retry_hint
+        )
 
+    def _validate_query_safety(self, sql_query: str) -> Tuple[bool, str]:
+        """Descarta lo que no es una consulta (el autorizador rechaza cualquier escritura)"""
+        primera_palabra = sql_query.lstrip(" \t\r\n(").split(None, 1)[:1]
+        if not primera_palabra or primera_palabra[0].lower() not in ('select', 'with'):
+            return False, "Solo se permiten consultas SELECT"
         return True, ""
 
-    def _ensure_limit(self, sql_query: str, max_limit: int) -> str:
-        """Asegura que la consulta tenga un LIMIT apropiado"""
-        query_lower = sql_query.lower()
-
-        # NO añadir LIMIT a consultas COUNT, SUM, AVG, etc.
-        if any(func in query_lower for func in ['count(', 'sum(', 'avg(', 'max(', 'min(']):
-            return sql_query.rstrip(';')
-
-        # Si ya tiene LIMIT, verificar que no sea excesivo
-        if 'limit' in query_lower:
-            # Extraer el valor del LIMIT existente
-            limit_match = re.search(r'limit\s+(\d+)', query_lower)
-            if limit_match:
-                existing_limit = int(limit_match.group(1))
-                if existing_limit > max_limit:
-                    # Reemplazar con el límite máximo
-                    sql_query = re.sub(r'limit\s+\d+', f'LIMIT {max_limit}', sql_query, flags=re.IGNORECASE)
-            return sql_query
-
-        # Si no tiene LIMIT, añadirlo (solo para consultas SELECT normales)
-        sql_query = sql_query.rstrip(';')
-        return f"{sql_query} LIMIT {max_limit}"
-
     def test_connection(self) -> bool:
         """Prueba la conexión a la base de datos"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            conn.close()
+            conn = self.connection_manager.get_readonly_connection()
+            conn.execute("SELECT 1").fetchone()
             return True
         except Exception:
             return False
@@ -173,6 +245,11 @@ class SQLExecutor:
         try:
             print("📊 Generando estadísticas del sistema...")
 
+            stats_results = self._estadisticas_desde_cubo()
+            if stats_results is not None:
+                response = self._format_statistics_response(stats_results)
+                return True, response, {"statistics": stats_results}
+
             # Ejecutar consultas para estadísticas básicas
             stats_queries = {
                 "total_alumnos": "SELECT COUNT(*) as total FROM alumnos",
@@ -190,17 +267,14 @@ class SQLExecutor:
                 "con_calificaciones": """
                     SELECT COUNT(*) as total
                     FROM datos_escolares
-                    WHERE calificaciones IS NOT NULL
-                    AND calificaciones != ''
-                    AND calificaciones != '[]'
+                    WHERE tiene_calificaciones = 1
                 """,
                 "sin_calificaciones": """
                     SELECT COUNT(*) as total
                     FROM alumnos a
                     LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-                    WHERE de.calificaciones IS NULL
-                    OR de.calificaciones = ''
-                    OR de.calificaciones = '[]'
+                    WHERE de.tiene_calificaciones = 0
+                    OR de.tiene_calificaciones IS NULL
                 """
             }
 
@@ -226,6 +300,30 @@ class SQLExecutor:
             print(f"Error generando estadísticas: {e}")
             return False, "No pude generar las estadísticas del sistema en este momento. ¿Te gustaría consultar información específica de alumnos?", {}
 
+    def _estadisticas_desde_cubo(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Mismos resultados que las consultas de generate_statistics, leídos del cubo
+
+        Returns:
+            Diccionario {estadística: filas} o None si el cubo no está disponible
+        """
+        if self.cubo is None:
+            return None
+        try:
+            por_turno = self.cubo.distribucion_ordenada('turno', solo_con_registro=True)
+            return {
+                "total_alumnos": [{"total": self.cubo.total_alumnos()}],
+                "por_grado": [{"grado": grado, "cantidad": cantidad} for grado, cantidad
+                              in self.cubo.distribucion_ordenada('grado', solo_con_registro=True)],
+                "por_turno": [{"turno": turno, "cantidad": cantidad} for turno, cantidad in por_turno],
+                "con_calificaciones": [{"total": self.cubo.contar({'tiene_calificaciones': [1]},
+                                                                  solo_con_registro=True)}],
+                "sin_calificaciones": [{"total": self.cubo.contar({'tiene_calificaciones': [0, None]})}],
+            }
+        except Exception as e:
+            self.logger.warning(f"Cubo de agregados no disponible, se usa SQL: {e}")
+            return None
+
     def _format_statistics_response(self, stats_results: Dict[str, List[Dict]]) -> str:
         """
         Formatea los resultados de estadísticas en una respuesta natural
@@ -287,55 +385,55 @@ Esta información te ayuda a tener una visión general del estado académico de
             return "📊 Estadísticas básicas disponibles. ¿Te gustaría consultar información específica de alumnos?"
 
 class SQLQueryBuilder:
-    """Constructor de consultas SQL basado en patrones comunes"""
+    """Constructor de consultas SQL parametrizadas basado en patrones comunes"""
 
     @staticmethod
-    def build_search_by_name(name: str) -> str:
+    def build_search_by_name(name: str) -> ConsultaParametrizada:
         """Construye consulta para buscar por nombre"""
-        return f"""
+        return ConstructorConsulta("""
         SELECT a.id, a.nombre, a.curp, a.matricula, a.fecha_nacimiento,
                de.grado, de.grupo, de.turno, de.ciclo_escolar, de.escuela
         FROM alumnos a
         LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-        WHERE a.nombre LIKE '%{name}%'
+        WHERE 1=1""").filtro('alumnos', 'nombre', 'LIKE', name).construir("""
         ORDER BY a.nombre
-        """
+        """)
 
     @staticmethod
-    def build_search_by_criteria(criterio: str, valor: str) -> str:
+    def build_search_by_criteria(criterio: str, valor: str) -> ConsultaParametrizada:
         """Construye consulta para buscar por criterio específico"""
-        return f"""
+        return ConstructorConsulta("""
         SELECT a.id, a.nombre, a.curp, a.matricula,
                de.grado, de.grupo, de.turno, de.ciclo_escolar, de.escuela
         FROM alumnos a
         JOIN datos_escolares de ON a.id = de.alumno_id
-        WHERE de.{criterio} = '{valor}'
+        WHERE 1=1""").filtro('datos_escolares', criterio, '=', valor).construir("""
         ORDER BY a.nombre
-        """
+        """)
 
     @staticmethod
-    def build_student_details(name: str) -> str:
+    def build_student_details(name: str) -> ConsultaParametrizada:
         """Construye consulta para detalles completos de un alumno"""
-        return f"""
+        return ConstructorConsulta("""
         SELECT a.*, de.ciclo_escolar, de.grado, de.grupo, de.turno,
                de.escuela, de.cct, de.calificaciones
         FROM alumnos a
         LEFT JOIN datos_escolares de ON a.id = de.alumno_id
-        WHERE a.nombre LIKE '%{name}%'
+        WHERE 1=1""").filtro('alumnos', 'nombre', 'LIKE', name).construir("""
         ORDER BY de.id DESC
         LIMIT 1
-        """
+        """)
 
     @staticmethod
-    def build_list_all_students() -> str:
+    def build_list_all_students() -> ConsultaParametrizada:
         """Construye consulta para listar todos los alumnos"""
-        return """
+        return ConsultaParametrizada("""
         SELECT a.id, a.nombre, a.curp, a.matricula,
                de.grado, de.grupo, de.turno, de.ciclo_escolar
         FROM alumnos a
         LEFT JOIN datos_escolares de ON a.id = de.alumno_id
         ORDER BY a.nombre
-        """
+        """)
 
 # 🆕 INSTANCIAS POR HILO PARA EVITAR PROBLEMAS DE SQLITE THREADING
 import threading
@@ -1723,8 +1723,8 @@ Mantengo contexto activo para posibles continuaciones."""
         Formatea los datos específicamente para el prompt de validación
         """
         try:
-            # Detectar si es una consulta COUNT
-            if 'count(' in sql_query.lower() or any(key.lower() in ['total', 'count(*)', 'count', 'cantidad'] for row in data for key in row.keys()):
+            # Detectar si es una consulta COUNT (todas las filas tienen las columnas de la primera)
+            if 'count(' in sql_query.lower() or (data and any(key.lower() in ['total', 'count(*)', 'count', 'cantidad'] for key in data[0].keys())):
                 if data and len(data) > 0:
                     first_row = data[0]
                     for key, value in first_row.items():
@@ -1733,7 +1733,7 @@ Mantengo contexto activo para posibles continuaciones."""
 TIPO DE CONSULTA: COUNT (conteo)
 RESULTADO NUMÉRICO: {value}
 INTERPRETACIÓN: La consulta devolvió un conteo de {value} alumnos
-DATOS BRUTOS: {data}
+DATOS BRUTOS: {data if len(data) <= 15 else data[:10]}
 """
 
             # Para consultas SELECT normales
@@ -1907,86 +1907,17 @@ DATOS OBTENIDOS: {data if row_count <= 15 else data[:10]}
             return None
 
     def _fuzzy_search_students(self, nombre_buscado: str, alumno_service) -> List:
-        """Búsqueda con tolerancia a errores tipográficos"""
+        """Búsqueda con tolerancia a errores tipográficos (una consulta al índice de nombres)"""
         try:
-            # 🎯 ESTRATEGIAS DE BÚSQUEDA TOLERANTE:
-
-            # 1. Buscar por cada palabra del nombre
-            palabras = nombre_buscado.split()
-            candidatos = []
-
-            for palabra in palabras:
-                if len(palabra) >= 3:  # Solo palabras de 3+ caracteres
-                    resultados = alumno_service.buscar_alumnos(palabra)
-                    candidatos.extend(resultados)
-
-            # 2. Buscar variaciones comunes de nombres
-            variaciones = self._generate_name_variations(nombre_buscado)
-            for variacion in variaciones:
-                resultados = alumno_service.buscar_alumnos(variacion)
-                candidatos.extend(resultados)
-
-            # 3. Eliminar duplicados
-            alumnos_unicos = []
-            ids_vistos = set()
-
-            for alumno in candidatos:
-                alumno_dict = alumno.to_dict() if hasattr(alumno, 'to_dict') else alumno
-                alumno_id = alumno_dict.get('id')
-                if alumno_id not in ids_vistos:
-                    ids_vistos.add(alumno_id)
-                    alumnos_unicos.append(alumno_dict)
-
-            # 4. Filtrar por similitud de nombre
-            if alumnos_unicos:
-                alumnos_filtrados = self._filter_by_name_similarity(nombre_buscado, alumnos_unicos)
-                if alumnos_filtrados:
-                    self.logger.info(f"✅ Encontrados {len(alumnos_filtrados)} candidatos con búsqueda tolerante")
-                    return alumnos_filtrados
-
-            return []
+            alumnos = alumno_service.buscar_alumnos_similares(nombre_buscado)
+            if alumnos:
+                self.logger.info(f"✅ Encontrados {len(alumnos)} candidatos con búsqueda tolerante")
+            return alumnos
 
         except Exception as e:
             self.logger.error(f"Error en búsqueda tolerante: {e}")
             return []
 
-    def _generate_name_variations(self, nombre: str) -> List[str]:
-        """Genera variaciones comunes de nombres para búsqueda tolerante"""
-        variaciones = []
-        nombre_lower = nombre.lower()
-
-        # Correcciones comunes de nombres
-        correcciones = {
-            'habriela': 'gabriela',
-            'habriel': 'gabriel',
-            'nataly': 'natalia',
-            'nathalia': 'natalia',
-            'maria': 'maría',
-            'jose': 'josé',
-            'jesus': 'jesús',
-            'andres': 'andrés',
-            'adrian': 'adrián',
-            'sebastian': 'sebastián'
-        }
-
-        # Aplicar correcciones
-        for error, correccion in correcciones.items():
-            if error in nombre_lower:
-                variacion = nombre_lower.replace(error, correccion)
-                variaciones.append(variacion.title())
-
-        # Variaciones sin acentos
-        sin_acentos = nombre.replace('á', 'a').replace('é', 'e').replace('í', 'i').replace('ó', 'o').replace('ú', 'u')
-        if sin_acentos != nombre:
-            variaciones.append(sin_acentos)
-
-        # Variaciones con acentos comunes
-        con_acentos = nombre.replace('a', 'á').replace('e', 'é').replace('i', 'í').replace('o', 'ó').replace('u', 'ú')
-        if con_acentos != nombre:
-            variaciones.append(con_acentos)
-
-        return list(set(variaciones))  # Eliminar duplicados
-
     def _handle_multiple_students(self, alumnos: List, nombre_buscado: str) -> Optional[Dict[str, Any]]:
         """Maneja múltiples coincidencias de estudiantes de forma inteligente"""
         try:
@@ -6,6 +6,7 @@ Elimina duplicación y centraliza contexto común siguiendo la filosofía del si
 from typing import Dict, List, Optional
 from .base_prompt_manager import BasePromptManager
 from app.core.ai.student_action_catalog import StudentActionCatalog
+from app.core.database.schema_catalog import get_schema_catalog
 
 
 class StudentQueryPromptManager(BasePromptManager):
@@ -29,7 +30,6 @@ class StudentQueryPromptManager(BasePromptManager):
         super().__init__()  # Inicializar BasePromptManager
         self.database_analyzer = database_analyzer
         self._school_context_cache = None
-        self._database_context_cache = None
 
     @property
     def school_context(self) -> str:
@@ -77,14 +77,18 @@ ESTRUCTURA DISPONIBLE:
 
     def get_database_context(self) -> str:
         """
-        Contexto de BD centralizado con cache
+        Contexto de BD centralizado
 
-        Se obtiene dinámicamente del DatabaseAnalyzer y se cachea
-        para evitar regeneración innecesaria
+        Se toma del catálogo de esquema compartido, que lo regenera solo
+        cuando cambia el esquema (PRAGMA schema_version)
         """
-        if self._database_context_cache is None and self.database_analyzer:
-            self._database_context_cache = self.database_analyzer.generate_sql_context()
-        return self._database_context_cache or ""
+        try:
+            if self.database_analyzer:
+                return self.database_analyzer.generate_sql_context()
+            return get_schema_catalog().contexto_sql()
+        except Exception as e:
+            print(f"❌ DEBUG - Error obteniendo contexto de BD: {e}")
+            return ""
 
     def get_compact_database_context(self) -> str:
         """
@@ -98,9 +102,14 @@ ESTRUCTURA ESENCIAL DE LA BASE DE DATOS:
 
 TABLA: alumnos
 - id (PK), curp, nombre, matricula, fecha_nacimiento, fecha_registro
+- anio_nacimiento, mes_nacimiento (derivados de fecha_nacimiento, indexados)
 
 TABLA: datos_escolares
 - id (PK), alumno_id (FK), ciclo_escolar, grado, grupo, turno, escuela, cct, calificaciones
+- tiene_calificaciones (0/1), promedio_general (promedio de materias calificadas) - indexados
+
+TABLA: calificaciones
+- datos_escolares_id (FK), alumno_id, materia, periodo ('i', 'ii', 'iii', 'promedio'), calificacion
 
 RELACIÓN: alumnos.id = datos_escolares.alumno_id
 
@@ -109,6 +118,7 @@ VALORES VÁLIDOS:
 - grupo: A, B, C
 - turno: MATUTINO, VESPERTINO
 - calificaciones: JSON ([] = sin calificaciones, datos = con calificaciones)
+- Para filtrar "con/sin calificaciones" usar tiene_calificaciones = 1 / 0
 """
 
     def get_unified_continuation_prompt(self, user_query: str, continuation_type: str,
@@ -469,7 +479,7 @@ RESPONDE ÚNICAMENTE con el SQL optimizado:
         - Testing y desarrollo
         """
         self._school_context_cache = None
-        self._database_context_cache = None
+        get_schema_catalog().invalidar()
         print("🧹 DEBUG - Cache de PromptManager limpiado")
 
     def get_context_summary(self) -> dict:
@@ -483,7 +493,6 @@ RESPONDE ÚNICAMENTE con el SQL optimizado:
         """
         return {
             "school_context_cached": self._school_context_cache is not None,
-            "database_context_cached": self._database_context_cache is not None,
             "database_analyzer_available": self.database_analyzer is not None,
             "school_context_length": len(self.school_context) if self._school_context_cache else 0,
             "database_context_length": len(self.get_database_context())
@@ -1002,7 +1011,8 @@ ACCIONES TÉCNICAS DISPONIBLES:
 📊 CALIFICACIONES (Campo JSON):
 - "sin calificaciones" / "null" → operador: "=", valor: "[]" (lista vacía)
 - "con calificaciones" / "not null" → operador: "!=", valor: "[]" (no vacía)
-- FUTURO: Si detectas tabla 'calificaciones' separada → usa EXISTS/NOT EXISTS
+- "promedio mayor a 8" → campo: "promedio_general", operador: ">", valor: "8"
+- "nacidos en 2016" → tabla: "alumnos", campo: "anio_nacimiento", operador: "=", valor: "2016"
 
 👤 NOMBRES Y APELLIDOS:
 - "apellido: Martinez" → tabla: "alumnos", campo: "nombre", operador: "LIKE", valor: "Martinez"
@@ -1244,18 +1254,18 @@ EJEMPLOS INTELIGENTES BASADOS EN LA ESTRUCTURA REAL:
 - "dame el nombre de cualquier alumno de 3er grado" → SELECT a.nombre FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.grado = 3 LIMIT 1
 - "dame un alumno de primer grado" → SELECT a.nombre FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.grado = 1 LIMIT 1
 - "la CURP de María García" → SELECT curp FROM alumnos WHERE nombre LIKE '%MARIA%' AND nombre LIKE '%GARCIA%'
-- "estudiantes nacidos en 2018" → SELECT nombre, curp, fecha_nacimiento FROM alumnos WHERE STRFTIME('%Y', fecha_nacimiento) = '2018'
-- "alumnos que tengan calificaciones" → SELECT a.nombre, a.curp, de.grado, de.grupo FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.calificaciones IS NOT NULL AND de.calificaciones != '[]' AND de.calificaciones != ''
-- "2 alumnos al azar que tengan calificaciones" → SELECT a.nombre, a.curp, de.grado, de.grupo FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.calificaciones IS NOT NULL AND de.calificaciones != '[]' AND de.calificaciones != '' ORDER BY RANDOM() LIMIT 2
-- "alumnos sin calificaciones" → SELECT a.nombre, a.curp, de.grado, de.grupo FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.calificaciones IS NULL OR de.calificaciones = '[]' OR de.calificaciones = ''
-
-🧮 EJEMPLOS ANALÍTICOS AVANZADOS (calificaciones como lista de materias):
-- "promedio general de 5to grado" → SELECT AVG(CAST(JSON_EXTRACT(materia.value, '$.promedio') AS REAL)) as promedio_general FROM datos_escolares de, JSON_EACH(de.calificaciones) as materia WHERE de.grado = 5 AND de.calificaciones IS NOT NULL AND de.calificaciones != '[]'
-- "cuántos alumnos de 5to grado tienen calificaciones" → SELECT COUNT(DISTINCT de.alumno_id) as cantidad FROM datos_escolares de WHERE de.grado = 5 AND de.calificaciones IS NOT NULL AND de.calificaciones != '[]' AND de.calificaciones != ''
-- "alumnos de 5to grado con sus promedios" → SELECT a.nombre, de.grado, de.grupo, AVG(CAST(JSON_EXTRACT(materia.value, '$.promedio') AS REAL)) as promedio_alumno FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id, JSON_EACH(de.calificaciones) as materia WHERE de.grado = 5 AND de.calificaciones IS NOT NULL GROUP BY a.id, a.nombre ORDER BY promedio_alumno DESC
-- "qué grupo tiene mejor rendimiento en 3er grado" → SELECT de.grupo, AVG(CAST(JSON_EXTRACT(materia.value, '$.promedio') AS REAL)) as promedio_grupo FROM datos_escolares de, JSON_EACH(de.calificaciones) as materia WHERE de.grado = 3 AND de.calificaciones IS NOT NULL GROUP BY de.grupo ORDER BY promedio_grupo DESC
-- "distribución de alumnos por grado con calificaciones" → SELECT de.grado, COUNT(DISTINCT de.alumno_id) as alumnos_con_calificaciones FROM datos_escolares de WHERE de.calificaciones IS NOT NULL AND de.calificaciones != '[]' GROUP BY de.grado ORDER BY de.grado
-- "estadísticas de calificaciones por materia en 4to grado" → SELECT JSON_EXTRACT(materia.value, '$.nombre') as materia_nombre, AVG(CAST(JSON_EXTRACT(materia.value, '$.promedio') AS REAL)) as promedio_materia, COUNT(*) as total_alumnos FROM datos_escolares de, JSON_EACH(de.calificaciones) as materia WHERE de.grado = 4 AND de.calificaciones IS NOT NULL GROUP BY materia_nombre ORDER BY promedio_materia DESC
+- "estudiantes nacidos en 2018" → SELECT nombre, curp, fecha_nacimiento FROM alumnos WHERE anio_nacimiento = 2018
+- "alumnos que tengan calificaciones" → SELECT a.nombre, a.curp, de.grado, de.grupo FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.tiene_calificaciones = 1
+- "2 alumnos al azar que tengan calificaciones" → SELECT a.nombre, a.curp, de.grado, de.grupo FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.tiene_calificaciones = 1 ORDER BY RANDOM() LIMIT 2
+- "alumnos sin calificaciones" → SELECT a.nombre, a.curp, de.grado, de.grupo FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.tiene_calificaciones = 0
+
+🧮 EJEMPLOS ANALÍTICOS AVANZADOS (promedio_general por alumno, tabla calificaciones por materia):
+- "promedio general de 5to grado" → SELECT AVG(de.promedio_general) as promedio_general FROM datos_escolares de WHERE de.grado = 5
+- "cuántos alumnos de 5to grado tienen calificaciones" → SELECT COUNT(DISTINCT de.alumno_id) as cantidad FROM datos_escolares de WHERE de.grado = 5 AND de.tiene_calificaciones = 1
+- "alumnos de 5to grado con sus promedios" → SELECT a.nombre, de.grado, de.grupo, de.promedio_general as promedio_alumno FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id WHERE de.grado = 5 AND de.promedio_general IS NOT NULL ORDER BY promedio_alumno DESC
+- "qué grupo tiene mejor rendimiento en 3er grado" → SELECT de.grupo, AVG(de.promedio_general) as promedio_grupo FROM datos_escolares de WHERE de.grado = 3 GROUP BY de.grupo ORDER BY promedio_grupo DESC
+- "distribución de alumnos por grado con calificaciones" → SELECT de.grado, COUNT(DISTINCT de.alumno_id) as alumnos_con_calificaciones FROM datos_escolares de WHERE de.tiene_calificaciones = 1 GROUP BY de.grado ORDER BY de.grado
+- "estadísticas de calificaciones por materia en 4to grado" → SELECT c.materia as materia_nombre, AVG(c.calificacion) as promedio_materia, COUNT(*) as total_alumnos FROM calificaciones c JOIN datos_escolares de ON de.id = c.datos_escolares_id WHERE de.grado = 4 AND c.periodo = 'promedio' GROUP BY c.materia ORDER BY promedio_materia DESC
 
 RESPONDE ÚNICAMENTE con la consulta SQL, sin explicaciones adicionales.
 """
@@ -210,6 +210,7 @@ class StudentActionCatalog:
 
 ✅ "constancia de estudios para Juan" → GENERAR_CONSTANCIA_COMPLETA (alumno_identificador: "Juan", tipo_constancia: "estudio")
 ✅ "certificado de calificaciones" → GENERAR_CONSTANCIA_COMPLETA (tipo_constancia: "calificaciones")
+✅ "constancias de estudio para todo 3°A" → GENERAR_CONSTANCIAS_GRUPO (tipo_constancia: "estudio", grado: 3, grupo: "A")
 
 ═══════════════════════════════════════════════════════════════════════════════
 🔄 TRANSFORMACIONES → TRANSFORMAR_PDF:
@@ -236,6 +237,7 @@ class StudentActionCatalog:
    
 3. **¿Es una CONSTANCIA?** → GENERAR_CONSTANCIA_COMPLETA
    - Palabras clave: "constancia", "certificado", "generar"
+   - Para todo un grupo o grado ("todo 3°A", "todos los de 5to") → GENERAR_CONSTANCIAS_GRUPO
    
 4. **¿Es una TRANSFORMACIÓN?** → TRANSFORMAR_PDF
    - Palabras clave: "transformar", "convertir" + "PDF"
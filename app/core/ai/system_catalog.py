@@ -254,6 +254,7 @@ class SystemCatalog:
                     "CONTAR_UNIVERSAL",
                     "PREPARAR_DATOS_CONSTANCIA",
                     "GENERAR_CONSTANCIA_COMPLETA",
+                    "GENERAR_CONSTANCIAS_GRUPO",
                     "GENERAR_LISTADO_COMPLETO",
                     "FILTRAR_POR_CALIFICACIONES",
                     "TRANSFORMAR_PDF"
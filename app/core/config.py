@@ -169,7 +169,45 @@ class Config:
         'connection_timeout': 30,
         'max_connections': 10,
         'query_limit_default': 300,
-        'backup_on_startup': True
+        'backup_on_startup': True,
+        # Pragmas aplicados por ConnectionManager a cada conexión
+        'busy_timeout_ms': 5000,
+        'cache_size_kb': 16384,
+        'mmap_size_mb': 256,
+        'synchronous': 'NORMAL',
+        # Sentencias preparadas que sqlite3 reutiliza por conexión
+        'cached_statements': 256,
+        # Presupuesto de cada consulta de IA (SQLExecutor): se cancela al excederlo
+        'ai_query_max_seconds': 5.0,
+        'ai_query_max_vm_steps': 50_000_000,   # Instrucciones de la máquina virtual de SQLite
+        'ai_query_progress_interval': 10_000,  # Instrucciones entre revisiones del presupuesto
+        'ai_query_max_rows': 5000,             # Tope absoluto de filas (además del limit pedido)
+        # Caché de resultados de SQLExecutor (se invalida con PRAGMA data_version)
+        'ai_query_cache_enabled': True,
+        'ai_query_cache_mb': 16,
+        # Cubo de conteos en memoria (ciclo, grado, grupo, turno, calificaciones)
+        'aggregate_cube_enabled': True,
+        # Escritor único: las escrituras de servicios van a un hilo con cola y commits agrupados
+        'single_writer_enabled': True,
+        'writer_max_batch': 64                 # Comandos como máximo por transacción
+    }
+
+    # Respaldos en línea (almacén por contenido en backups/almacen)
+    BACKUP = {
+        'pages_per_step': 256,         # Páginas copiadas por paso de Connection.backup
+        'chunk_size_kb': 256,          # Tamaño de fragmento (múltiplo del page_size)
+        'compress': True,              # Comprimir fragmentos con zlib
+        'compression_level': 6,
+        # Retención: últimos N, uno por día durante D días, uno por mes durante M meses
+        'keep_last': 7,
+        'keep_daily': 14,
+        'keep_monthly': 12
+    }
+
+    # Zona escolar: bases de otras escuelas consultadas junto con la local
+    FEDERACION = {
+        'map_file': 'zona_escolar.json',  # Junto a school_config.json
+        'max_workers': 4                  # Escuelas consultadas en paralelo
     }
 
     # Configuración de PDF
@@ -187,7 +225,20 @@ class Config:
             'margin-bottom': '0.75in',
             'margin-left': '0.75in',
             'encoding': 'UTF-8'
-        }
+        },
+        # Constancias por lote: procesos de wkhtmltopdf en paralelo (acotado a los núcleos)
+        'batch_max_workers': 4,
+        # Renderizador por tipo de constancia: 'nativo' (reportlab, en el proceso)
+        # o 'wkhtmltopdf' (plantilla HTML). wkhtmltopdf es el respaldo del nativo
+        'renderer_default': 'nativo',
+        'renderers': {
+            'estudio': 'nativo',
+            'calificaciones': 'nativo',
+            'traslado': 'nativo'
+        },
+        # Caché de constancias renderizadas (vista previa y definitiva cuestan un solo renderizado)
+        'render_cache_enabled': True,
+        'render_cache_max_mb': 200
     }
 
     # Fecha actual formateada
@@ -67,8 +67,8 @@ class SchoolConfigManager:
             return
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            from app.core.database.connection_manager import get_connection_manager
+            cursor = get_connection_manager(self.db_path).get_readonly_connection().cursor()
             
             # Detectar cantidad de alumnos
             cursor.execute("SELECT COUNT(*) FROM alumnos")
@@ -94,7 +94,7 @@ class SchoolConfigManager:
             }
             
             self.logger.info(f"✅ Estadísticas de BD detectadas: {total_students} alumnos, grados {grades}")
-            conn.close()
+            cursor.close()
             
         except Exception as e:
             self.logger.error(f"❌ Error detectando estadísticas de BD: {e}")
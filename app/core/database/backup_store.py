@@ -0,0 +1,430 @@
+"""
+💾 ALMACÉN DE RESPALDOS EN LÍNEA
+Copias de la base de datos con la API de respaldo de SQLite (por pasos, sin
+cerrar conexiones) guardadas en un almacén direccionado por contenido:
+
+    almacen/
+      fragmentos/ab/abcdef...     fragmentos de tamaño fijo, nombrados por su SHA-256
+      fragmentos/ab/abcdef....z   (el mismo fragmento comprimido con zlib)
+      instantaneas/<id>.json      manifiesto: lista ordenada de fragmentos
+
+SQLite modifica páginas en su lugar, así que entre dos respaldos solo cambian
+los fragmentos que contienen páginas modificadas; el resto ya está en el
+almacén y no se vuelve a escribir.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+from app.core.logging import get_logger
+
+# Progreso de una copia: (páginas restantes, páginas totales)
+ProgresoRespaldo = Callable[[int, int], None]
+
+
+@dataclass
+class SnapshotInfo:
+    """Manifiesto de una instantánea del almacén"""
+    id: str
+    created: str
+    reason: str
+    db_size: int
+    page_size: int
+    chunk_size: int
+    sha256: str
+    chunks: List[str] = field(default_factory=list)
+    # Estadísticas de la escritura (no afectan la restauración)
+    new_chunks: int = 0
+    bytes_written: int = 0
+
+    @property
+    def fecha(self) -> datetime:
+        return datetime.fromisoformat(self.created)
+
+    def describe(self) -> str:
+        """Texto corto para listas de la interfaz"""
+        tamano_mb = self.db_size / (1024 * 1024)
+        motivo = f" - {self.reason}" if self.reason else ""
+        return f"{self.fecha.strftime('%Y-%m-%d %H:%M:%S')} ({tamano_mb:.2f} MB){motivo}"
+
+
+class BackupStore:
+    """
+    💾 ALMACÉN DE INSTANTÁNEAS DEDUPLICADAS
+
+    Responsabilidades:
+    - Copiar la base en línea con Connection.backup por pasos (lectores y chat no se bloquean)
+    - Partir la copia en fragmentos alineados a páginas y guardar solo los nuevos
+    - Restaurar una instantánea sobre la base en uso, también con la API de respaldo
+    - Aplicar la política de retención y eliminar fragmentos huérfanos
+    """
+
+    def __init__(self, root: Union[str, Path], settings: Optional[Dict] = None):
+        from app.core.config import Config
+
+        self.root = Path(root)
+        self.chunks_dir = self.root / "fragmentos"
+        self.snapshots_dir = self.root / "instantaneas"
+        self.settings = dict(Config.BACKUP)
+        if settings:
+            self.settings.update(settings)
+        self.logger = get_logger(__name__)
+        # Un respaldo, restauración o limpieza a la vez por almacén
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Creación
+    # ------------------------------------------------------------------
+
+    def create_snapshot(self, source: Union[str, sqlite3.Connection], reason: str = "",
+                        progress: Optional[ProgresoRespaldo] = None) -> SnapshotInfo:
+        """
+        Crea una instantánea de la base de datos sin cerrar sus conexiones
+
+        Args:
+            source: Ruta de la base o conexión abierta a ella
+            reason: Motivo (manual, antes de restaurar, automático, ...)
+            progress: Callback opcional (restantes, total) por cada paso
+
+        Returns:
+            SnapshotInfo con el manifiesto guardado
+        """
+        with self._lock:
+            self._ensure_dirs()
+            tmp_path = self._temp_db_path()
+            try:
+                self._copy_online(source, tmp_path, progress)
+                return self._store_file(tmp_path, reason)
+            finally:
+                self._remove_quietly(tmp_path)
+
+    def _copy_online(self, source: Union[str, sqlite3.Connection], dest_path: str,
+                     progress: Optional[ProgresoRespaldo]):
+        """Copia source a dest_path con la API de respaldo, en pasos de pages_per_step páginas"""
+        own_connection = not isinstance(source, sqlite3.Connection)
+        src = sqlite3.connect(str(source)) if own_connection else source
+        dest = sqlite3.connect(dest_path)
+        try:
+            # Entre pasos se libera el bloqueo de lectura: otras conexiones siguen trabajando
+            src.backup(dest, pages=int(self.settings.get('pages_per_step', 256)), progress=self._adapt_progress(progress))
+            # La copia queda en modo rollback (un solo archivo) para fragmentarla
+            dest.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dest.close()
+            if own_connection:
+                src.close()
+
+    def _store_file(self, db_file: str, reason: str) -> SnapshotInfo:
+        """Fragmenta un archivo de base de datos y escribe su manifiesto"""
+        page_size = self._read_page_size(db_file)
+        chunk_size = self._chunk_size(page_size)
+
+        digest_total = hashlib.sha256()
+        chunks: List[str] = []
+        new_chunks = 0
+        bytes_written = 0
+
+        with open(db_file, 'rb') as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                digest_total.update(data)
+                chunk_hash = hashlib.sha256(data).hexdigest()
+                chunks.append(chunk_hash)
+                written = self._write_chunk(chunk_hash, data)
+                if written:
+                    new_chunks += 1
+                    bytes_written += written
+
+        now = datetime.now()
+        info = SnapshotInfo(
+            id=now.strftime("%Y%m%d_%H%M%S_%f"),
+            created=now.isoformat(timespec='seconds'),
+            reason=reason,
+            db_size=os.path.getsize(db_file),
+            page_size=page_size,
+            chunk_size=chunk_size,
+            sha256=digest_total.hexdigest(),
+            chunks=chunks,
+            new_chunks=new_chunks,
+            bytes_written=bytes_written
+        )
+        self._write_atomic(self._manifest_path(info.id), json.dumps(asdict(info), indent=1).encode('utf-8'))
+
+        self.logger.info(
+            f"💾 Instantánea {info.id}: {len(chunks)} fragmentos, {new_chunks} nuevos "
+            f"({bytes_written / 1024:.1f} KB escritos de {info.db_size / 1024:.1f} KB)"
+        )
+        return info
+
+    def _write_chunk(self, chunk_hash: str, data: bytes) -> int:
+        """Guarda un fragmento si aún no existe; devuelve los bytes escritos (0 si ya estaba)"""
+        raw_path = self._chunk_path(chunk_hash, compressed=False)
+        compressed_path = self._chunk_path(chunk_hash, compressed=True)
+        if raw_path.exists() or compressed_path.exists():
+            return 0
+
+        if self.settings.get('compress', True):
+            payload = zlib.compress(data, int(self.settings.get('compression_level', 6)))
+            path = compressed_path
+        else:
+            payload = data
+            path = raw_path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(path, payload)
+        return len(payload)
+
+    # ------------------------------------------------------------------
+    # Lectura y restauración
+    # ------------------------------------------------------------------
+
+    def list_snapshots(self) -> List[SnapshotInfo]:
+        """Instantáneas del almacén, de la más reciente a la más antigua"""
+        if not self.snapshots_dir.exists():
+            return []
+
+        snapshots = []
+        for manifest in self.snapshots_dir.glob("*.json"):
+            try:
+                snapshots.append(self._load_manifest(manifest))
+            except (OSError, ValueError, TypeError) as e:
+                self.logger.warning(f"⚠️ Manifiesto ilegible {manifest.name}: {e}")
+        snapshots.sort(key=lambda info: info.id, reverse=True)
+        return snapshots
+
+    def get_snapshot(self, snapshot_id: str) -> Optional[SnapshotInfo]:
+        """Obtiene el manifiesto de una instantánea (None si no existe)"""
+        path = self._manifest_path(snapshot_id)
+        if not path.exists():
+            return None
+        return self._load_manifest(path)
+
+    def export_snapshot(self, snapshot_id: str, dest_path: Union[str, Path]) -> str:
+        """
+        Reconstruye una instantánea como archivo .db independiente
+
+        Raises:
+            ValueError: si la instantánea no existe o no coincide con su SHA-256
+        """
+        info = self.get_snapshot(snapshot_id)
+        if info is None:
+            raise ValueError(f"No existe la instantánea {snapshot_id}")
+
+        dest_path = str(dest_path)
+        tmp_path = dest_path + ".tmp"
+        digest_total = hashlib.sha256()
+        try:
+            with open(tmp_path, 'wb') as out:
+                for chunk_hash in info.chunks:
+                    data = self._read_chunk(chunk_hash)
+                    digest_total.update(data)
+                    out.write(data)
+            if digest_total.hexdigest() != info.sha256:
+                raise ValueError(f"La instantánea {snapshot_id} está dañada (SHA-256 no coincide)")
+            os.replace(tmp_path, dest_path)
+        finally:
+            self._remove_quietly(tmp_path)
+        return dest_path
+
+    def restore_into(self, source_file: Union[str, Path], target: Union[str, sqlite3.Connection],
+                     progress: Optional[ProgresoRespaldo] = None):
+        """
+        Copia un archivo .db sobre la base en uso con la API de respaldo
+
+        Las demás conexiones no se cierran: ven el contenido restaurado en su
+        siguiente transacción.
+        """
+        own_connection = not isinstance(target, sqlite3.Connection)
+        dest = sqlite3.connect(str(target)) if own_connection else target
+        src = sqlite3.connect(f"file:{Path(source_file).as_posix()}?mode=ro", uri=True)
+        try:
+            src.backup(dest, pages=int(self.settings.get('pages_per_step', 256)), progress=self._adapt_progress(progress))
+        finally:
+            src.close()
+            if own_connection:
+                dest.close()
+
+    def restore_snapshot(self, snapshot_id: str, target: Union[str, sqlite3.Connection],
+                         progress: Optional[ProgresoRespaldo] = None):
+        """Restaura una instantánea del almacén sobre la base en uso"""
+        with self._lock:
+            self._ensure_dirs()
+            tmp_path = self._temp_db_path()
+            try:
+                self.export_snapshot(snapshot_id, tmp_path)
+                self.restore_into(tmp_path, target, progress)
+            finally:
+                self._remove_quietly(tmp_path)
+
+    def _read_chunk(self, chunk_hash: str) -> bytes:
+        compressed_path = self._chunk_path(chunk_hash, compressed=True)
+        if compressed_path.exists():
+            return zlib.decompress(compressed_path.read_bytes())
+        return self._chunk_path(chunk_hash, compressed=False).read_bytes()
+
+    # ------------------------------------------------------------------
+    # Retención
+    # ------------------------------------------------------------------
+
+    def apply_retention(self) -> Tuple[List[str], int]:
+        """
+        Elimina las instantáneas fuera de la política y los fragmentos huérfanos
+
+        Se conservan las keep_last más recientes, la más reciente de cada uno de
+        los últimos keep_daily días y la más reciente de cada uno de los últimos
+        keep_monthly meses.
+
+        Returns:
+            Tupla (ids de instantáneas eliminadas, fragmentos eliminados)
+        """
+        with self._lock:
+            snapshots = self.list_snapshots()
+            keep = self._snapshots_to_keep(snapshots)
+
+            removed = []
+            for info in snapshots:
+                if info.id not in keep:
+                    self._remove_quietly(self._manifest_path(info.id))
+                    removed.append(info.id)
+
+            referenced: Set[str] = set()
+            for info in snapshots:
+                if info.id in keep:
+                    referenced.update(info.chunks)
+            removed_chunks = self._collect_garbage(referenced)
+
+        if removed or removed_chunks:
+            self.logger.info(f"🧹 Retención: {len(removed)} instantáneas y {removed_chunks} fragmentos eliminados")
+        return removed, removed_chunks
+
+    def _snapshots_to_keep(self, snapshots: List[SnapshotInfo]) -> Set[str]:
+        """IDs que la política de retención conserva (snapshots: más reciente primero)"""
+        keep = {info.id for info in snapshots[:int(self.settings.get('keep_last', 7))]}
+
+        for period_key, limit in ((lambda d: d.strftime("%Y-%m-%d"), int(self.settings.get('keep_daily', 14))),
+                                  (lambda d: d.strftime("%Y-%m"), int(self.settings.get('keep_monthly', 12)))):
+            seen_periods = []
+            for info in snapshots:
+                period = period_key(info.fecha)
+                if period in seen_periods:
+                    continue
+                if len(seen_periods) >= limit:
+                    break
+                seen_periods.append(period)
+                keep.add(info.id)
+        return keep
+
+    def _collect_garbage(self, referenced: Set[str]) -> int:
+        """Borra los fragmentos que ninguna instantánea conservada usa"""
+        if not self.chunks_dir.exists():
+            return 0
+        removed = 0
+        for path in self.chunks_dir.glob("*/*"):
+            chunk_hash = path.name[:-2] if path.name.endswith(".z") else path.name
+            if chunk_hash not in referenced and not path.name.endswith(".tmp"):
+                self._remove_quietly(path)
+                removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Utilidades
+    # ------------------------------------------------------------------
+
+    def disk_usage(self) -> int:
+        """Bytes ocupados por el almacén (fragmentos y manifiestos)"""
+        if not self.root.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.root.rglob("*") if path.is_file())
+
+    def _chunk_size(self, page_size: int) -> int:
+        """Tamaño de fragmento configurado, redondeado a páginas completas"""
+        pages = max(1, int(self.settings.get('chunk_size_kb', 256)) * 1024 // page_size)
+        return pages * page_size
+
+    @staticmethod
+    def _read_page_size(db_file: str) -> int:
+        # Encabezado de SQLite: bytes 16-17, big endian; 1 significa 65536
+        with open(db_file, 'rb') as f:
+            header = f.read(18)
+        if len(header) < 18:
+            return 4096
+        page_size = int.from_bytes(header[16:18], 'big')
+        return 65536 if page_size == 1 else page_size or 4096
+
+    @staticmethod
+    def _adapt_progress(progress: Optional[ProgresoRespaldo]):
+        if progress is None:
+            return None
+        return lambda status, remaining, total: progress(remaining, total)
+
+    def _chunk_path(self, chunk_hash: str, compressed: bool) -> Path:
+        return self.chunks_dir / chunk_hash[:2] / (chunk_hash + (".z" if compressed else ""))
+
+    def _manifest_path(self, snapshot_id: str) -> Path:
+        return self.snapshots_dir / f"{snapshot_id}.json"
+
+    @staticmethod
+    def _load_manifest(path: Path) -> SnapshotInfo:
+        return SnapshotInfo(**json.loads(path.read_text(encoding='utf-8')))
+
+    def _ensure_dirs(self):
+        self.chunks_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+
+    def _temp_db_path(self) -> str:
+        fd, path = tempfile.mkstemp(suffix=".db", dir=str(self.root))
+        os.close(fd)
+        return path
+
+    @staticmethod
+    def _write_atomic(path: Path, payload: bytes):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _remove_quietly(self, path: Union[str, Path]):
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            candidate = f"{path}{suffix}"
+            try:
+                if os.path.exists(candidate):
+                    os.remove(candidate)
+            except OSError as e:
+                self.logger.debug(f"No se pudo eliminar {candidate}: {e}")
+
+
+# Un almacén por directorio
+_backup_stores: Dict[str, BackupStore] = {}
+_stores_lock = threading.Lock()
+
+def get_backup_store(root: Optional[Union[str, Path]] = None) -> BackupStore:
+    """
+    Obtiene el almacén de respaldos global
+
+    Args:
+        root: Directorio del almacén (por defecto <datos>/backups/almacen)
+
+    Returns:
+        Instancia compartida del BackupStore
+    """
+    if root is None:
+        from app.core.executable_paths import get_path_manager
+        root = get_path_manager().get_data_dir() / "backups" / "almacen"
+
+    key = os.path.abspath(str(root))
+    with _stores_lock:
+        store = _backup_stores.get(key)
+        if store is None:
+            store = BackupStore(key)
+            _backup_stores[key] = store
+    return store
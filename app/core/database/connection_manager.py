@@ -0,0 +1,235 @@
+"""
+🔌 GESTOR CENTRALIZADO DE CONEXIONES SQLITE
+Entrega conexiones de larga vida por hilo (modo WAL y pragmas afinados)
+y un pool separado de solo lectura para consultas generadas por IA
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.core.logging import get_logger
+
+
+# Operaciones que el autorizador de las conexiones de solo lectura deja pasar
+ACCIONES_LECTURA = frozenset({
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+})
+
+# PRAGMA de introspección (con argumento de tabla/índice) y de consulta (sin asignación)
+PRAGMAS_INTROSPECCION = frozenset({
+    'table_info', 'table_xinfo', 'index_list', 'index_info', 'index_xinfo', 'foreign_key_list',
+})
+PRAGMAS_CONSULTA = frozenset({
+    'data_version', 'schema_version', 'user_version', 'page_count', 'page_size',
+})
+
+
+def autorizador_solo_lectura(accion: int, arg1: Optional[str], arg2: Optional[str],
+                             db_name: Optional[str], origen: Optional[str]) -> int:
+    """
+    Autorizador de SQLite para SQL generado por IA: solo lecturas
+
+    SQLite lo consulta al preparar cada sentencia, así que cualquier escritura,
+    DDL, ATTACH o PRAGMA de asignación falla antes de ejecutarse sin importar
+    cómo esté escrita la consulta.
+    """
+    if accion in ACCIONES_LECTURA:
+        return sqlite3.SQLITE_OK
+    if accion == sqlite3.SQLITE_PRAGMA:
+        nombre = (arg1 or '').lower()
+        if nombre in PRAGMAS_INTROSPECCION or (nombre in PRAGMAS_CONSULTA and arg2 is None):
+            return sqlite3.SQLITE_OK
+    # FTS5 y los PRAGMA tabulares (pragma_table_info) declaran su esquema al
+    # conectarse y SQLite lo notifica como UPDATE de sqlite_master; la conexión
+    # sigue siendo mode=ro + query_only, así que no puede escribir nada
+    if accion == sqlite3.SQLITE_UPDATE and arg1 == 'sqlite_master':
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+class ConnectionManager:
+    """
+    🔌 GESTOR DE CONEXIONES POR HILO
+
+    Responsabilidades:
+    - Reutilizar una conexión de lectura/escritura por hilo (sin connect/close por consulta)
+    - Mantener un pool separado de conexiones de solo lectura (mode=ro + autorizador) para SQL de IA
+    - Activar WAL para que el hilo del chat y las ventanas de búsqueda no se bloqueen
+    - Aplicar pragmas de rendimiento de forma uniforme
+    """
+
+    def __init__(self, db_path: str, solo_lectura: bool = False):
+        from app.core.config import Config
+
+        self.db_path = os.path.abspath(str(db_path))
+        self.logger = get_logger(__name__)
+        self.settings = Config.DATABASE
+        # Bases ajenas (otras escuelas de la zona): ni WAL ni conexiones de escritura
+        self.solo_lectura = solo_lectura
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._wal_ready = False
+        # Conexión dedicada a leer PRAGMA data_version (nunca escribe)
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_lock = threading.Lock()
+        # Aumenta en close_all: data_version de una conexión nueva no es comparable
+        self._generacion = 0
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtiene la conexión de lectura/escritura del hilo actual"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            if self.solo_lectura:
+                raise sqlite3.OperationalError(f"Base de datos abierta solo para lectura: {self.db_path}")
+            conn = self._open(readonly=False)
+            self._local.connection = conn
+        return conn
+
+    def get_readonly_connection(self) -> sqlite3.Connection:
+        """Obtiene la conexión de solo lectura del hilo actual (SQL generado por IA)"""
+        conn = getattr(self._local, 'readonly_connection', None)
+        if conn is None:
+            conn = self._open(readonly=True)
+            self._local.readonly_connection = conn
+        return conn
+
+    def version_datos(self) -> Tuple[int, int]:
+        """
+        Versión de los datos compartida por todos los hilos: (generación, data_version)
+
+        PRAGMA data_version cambia en una conexión cada vez que otra conexión
+        confirma cambios; como esta conexión nunca escribe, cualquier commit
+        (incluidas migraciones y restauraciones) produce un valor distinto.
+        """
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = self._open(readonly=True)
+            version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            return self._generacion, version
+
+    def _open(self, readonly: bool) -> sqlite3.Connection:
+        """Abre una conexión nueva y le aplica los pragmas del sistema"""
+        self._ensure_wal_mode()
+
+        timeout = self.settings.get('connection_timeout', 30)
+        cached_statements = self.settings.get('cached_statements', 256)
+        if readonly:
+            uri = f"file:{self.db_path}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False,
+                                   cached_statements=cached_statements)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=False,
+                                   cached_statements=cached_statements)
+
+        conn.row_factory = sqlite3.Row
+        self._apply_pragmas(conn, readonly)
+
+        with self._lock:
+            self._connections.append(conn)
+
+        self.logger.debug(
+            f"🔌 Conexión {'solo lectura' if readonly else 'lectura/escritura'} abierta "
+            f"para hilo {threading.current_thread().ident}: {self.db_path}"
+        )
+        return conn
+
+    def _apply_pragmas(self, conn: sqlite3.Connection, readonly: bool):
+        """Aplica los pragmas de rendimiento configurados"""
+        conn.execute(f"PRAGMA busy_timeout = {int(self.settings.get('busy_timeout_ms', 5000))}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.settings.get('cache_size_kb', 16384))}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.settings.get('mmap_size_mb', 256)) * 1024 * 1024}")
+        conn.execute(f"PRAGMA synchronous = {self.settings.get('synchronous', 'NORMAL')}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+            # Último paso: a partir de aquí solo se preparan sentencias de lectura
+            conn.set_authorizer(autorizador_solo_lectura)
+
+    def _ensure_wal_mode(self):
+        """Activa journal_mode=WAL una sola vez (es persistente en el archivo)"""
+        if self._wal_ready or self.solo_lectura:
+            return
+
+        with self._lock:
+            if self._wal_ready:
+                return
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=self.settings.get('connection_timeout', 30))
+                mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+                conn.close()
+                self.logger.info(f"✅ Base de datos en modo {str(mode).upper()}: {self.db_path}")
+            except sqlite3.Error as e:
+                # Base de datos en medio de solo lectura: se sigue con el modo actual
+                self.logger.warning(f"⚠️ No se pudo activar WAL en {self.db_path}: {e}")
+            self._wal_ready = True
+
+    def close_thread_connections(self):
+        """Cierra las conexiones del hilo actual (al terminar un worker)"""
+        for attr in ('connection', 'readonly_connection'):
+            conn = getattr(self._local, attr, None)
+            if conn is not None:
+                self._close(conn)
+                setattr(self._local, attr, None)
+
+    def close_all(self):
+        """Cierra todas las conexiones abiertas por el gestor"""
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            self._close(conn)
+        # Las referencias por hilo quedan invalidadas: se reabren bajo demanda
+        self._local = threading.local()
+        with self._version_lock:
+            self._version_conn = None
+            self._generacion += 1
+
+    def _close(self, conn: sqlite3.Connection):
+        """Cierra una conexión y la retira del registro"""
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            self.logger.debug(f"Error cerrando conexión: {e}")
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+
+
+# Un gestor por archivo de base de datos
+_connection_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+def get_connection_manager(db_path: Optional[str] = None, solo_lectura: bool = False) -> ConnectionManager:
+    """
+    Obtiene el gestor de conexiones global para una base de datos
+
+    Args:
+        db_path: Ruta a la base de datos (por defecto Config.DB_PATH)
+        solo_lectura: No modificar nunca el archivo (bases de otras escuelas)
+
+    Returns:
+        Instancia compartida del ConnectionManager. Si ya existe uno de solo
+        lectura para la ruta, se entrega ese aunque no se pida solo_lectura
+        (SQLExecutor y el catálogo de esquema de esas bases solo leen)
+
+    Raises:
+        ValueError: Si se pide solo_lectura y la ruta ya tiene un gestor que escribe
+    """
+    if db_path is None:
+        from app.core.config import Config
+        db_path = Config.DB_PATH
+
+    key = os.path.abspath(str(db_path))
+    with _managers_lock:
+        manager = _connection_managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(key, solo_lectura)
+            _connection_managers[key] = manager
+        elif solo_lectura and not manager.solo_lectura:
+            raise ValueError(f"La base ya está abierta para escritura, no se puede abrir solo para lectura: {key}")
+    return manager
@@ -3,11 +3,9 @@
 Proporciona información estructural en tiempo real para los LLMs
 """
 
-import sqlite3
-import json 
 import logging
 from typing import Dict, List, Any, Optional
-from pathlib import Path
+from app.core.database.schema_catalog import get_schema_catalog
 
 class DatabaseAnalyzer:
     """
@@ -23,24 +21,38 @@ class DatabaseAnalyzer:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
-        self._structure_cache = None
-        self._materias_cache = None
+        # Estructura y materias vienen del catálogo compartido (se recarga solo si cambia el esquema)
+        self.catalog = get_schema_catalog(db_path)
     
     def get_database_structure(self) -> Dict[str, Any]:
         """
         📊 OBTENER ESTRUCTURA COMPLETA DE LA BASE DE DATOS
         """
-        if self._structure_cache is None:
-            self._structure_cache = self._analyze_structure()
-        return self._structure_cache
+        try:
+            return self.catalog.estructura()
+        except Exception as e:
+            self.logger.error(f"Error analizando estructura: {e}")
+            return {"tables": {}}
     
     def get_available_materias(self) -> List[str]:
         """
         📚 OBTENER LISTA DE MATERIAS DISPONIBLES
         """
-        if self._materias_cache is None:
-            self._materias_cache = self._extract_materias()
-        return self._materias_cache
+        try:
+            return self.catalog.materias()
+        except Exception as e:
+            self.logger.error(f"Error extrayendo materias: {e}")
+            return []
+    
+    def generate_sql_context(self) -> str:
+        """
+        🧠 CONTEXTO SQL (TABLAS, RELACIONES Y MUESTRA) PARA LLMs
+        """
+        try:
+            return self.catalog.contexto_sql()
+        except Exception as e:
+            self.logger.error(f"Error generando contexto SQL: {e}")
+            return ""
     
     def get_field_info(self, table: str = "datos_escolares") -> Dict[str, str]:
         """
@@ -107,76 +119,6 @@ class DatabaseAnalyzer:
             "grupos_disponibles": config.available_groups
         }
     
-    def _analyze_structure(self) -> Dict[str, Any]:
-        """
-        🔍 ANALIZAR ESTRUCTURA INTERNA
-        """
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Obtener tablas
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = [row[0] for row in cursor.fetchall()]
-                
-                structure = {"tables": {}}
-                
-                for table in tables:
-                    if table.startswith('sqlite_'):
-                        continue
-                    
-                    # Obtener columnas
-                    cursor.execute(f"PRAGMA table_info({table})")
-                    columns = {row[1]: row[2] for row in cursor.fetchall()}
-                    
-                    # Obtener conteo
-                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                    count = cursor.fetchone()[0]
-                    
-                    structure["tables"][table] = {
-                        "columns": columns,
-                        "count": count
-                    }
-                
-                return structure
-                
-        except Exception as e:
-            self.logger.error(f"Error analizando estructura: {e}")
-            return {"tables": {}}
-    
-    def _extract_materias(self) -> List[str]:
-        """
-        📚 EXTRAER MATERIAS DE CALIFICACIONES REALES
-        """
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Obtener todas las calificaciones no vacías
-                cursor.execute("""
-                    SELECT calificaciones 
-                    FROM datos_escolares 
-                    WHERE calificaciones != '[]' AND calificaciones IS NOT NULL
-                    LIMIT 50
-                """)
-                
-                materias_set = set()
-                
-                for row in cursor.fetchall():
-                    try:
-                        calificaciones = json.loads(row[0])
-                        for cal in calificaciones:
-                            if isinstance(cal, dict) and "nombre" in cal:
-                                materias_set.add(cal["nombre"])
-                    except (json.JSONDecodeError, TypeError):
-                        continue
-                
-                return sorted(list(materias_set))
-                
-        except Exception as e:
-            self.logger.error(f"Error extrayendo materias: {e}")
-            return []
-    
     def get_llm_context_info(self) -> str:
         """
         🧠 INFORMACIÓN ESTRUCTURADA PARA LLMs
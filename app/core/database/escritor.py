@@ -0,0 +1,366 @@
+"""
+✍️ HILO ESCRITOR ÚNICO DE LA BASE DE DATOS
+Todas las escrituras pasan por una cola atendida por un solo hilo, que agrupa
+los comandos consecutivos en una misma transacción (un commit por grupo)
+"""
+
+import functools
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Acciones posteriores al commit del grupo que se está ejecutando (solo en el hilo escritor)
+_contexto = threading.local()
+
+
+def al_confirmar(funcion: Callable, *args):
+    """
+    Ejecuta funcion(*args) cuando los cambios ya están confirmados
+
+    Fuera del hilo escritor el repositorio acaba de hacer su commit y se ejecuta
+    de inmediato. Dentro de un grupo se difiere al COMMIT del grupo: el índice
+    de nombres y el cubo releen por la conexión de solo lectura, que todavía no
+    ve lo escrito, y si el comando se revierte no deben enterarse.
+    """
+    pendientes = getattr(_contexto, 'pendientes', None)
+    if pendientes is None:
+        funcion(*args)
+    else:
+        pendientes.append((funcion, args))
+
+
+class ConexionAgrupada:
+    """
+    Conexión del hilo escritor tal como la ven repositorios y servicios
+
+    Delega todo en la sqlite3.Connection real salvo commit (lo hace el grupo
+    completo) y rollback (deshace solo el comando actual, hasta su SAVEPOINT).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, escritor: 'EscritorBaseDatos'):
+        self._conn = conn
+        self._escritor = escritor
+
+    def commit(self):
+        """El COMMIT lo hace el escritor al terminar el grupo"""
+
+    def rollback(self):
+        """Deshace lo escrito por el comando actual (no el resto del grupo)"""
+        self._escritor._revertir_comando()
+
+    def close(self):
+        """La conexión pertenece al escritor; se cierra al detenerlo"""
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+class SesionEscritura:
+    """Servicios del hilo escritor, creados bajo demanda sobre su conexión"""
+
+    def __init__(self, conn: ConexionAgrupada):
+        self.conn = conn
+        self._servicios: Dict[type, Any] = {}
+
+    def servicio(self, clase: type):
+        """Instancia de clase (AlumnoService, ConstanciaService, ...) sobre la conexión del escritor"""
+        servicio = self._servicios.get(clase)
+        if servicio is None:
+            servicio = clase(db_connection=self.conn)
+            # La conexión es del escritor: el servicio no debe cerrarla
+            servicio.shared_connection = True
+            self._servicios[clase] = servicio
+        return servicio
+
+    @property
+    def alumno_service(self):
+        from app.services.alumno_service import AlumnoService
+        return self.servicio(AlumnoService)
+
+    @property
+    def constancia_service(self):
+        from app.services.constancia_service import ConstanciaService
+        return self.servicio(ConstanciaService)
+
+
+class _Comando:
+    __slots__ = ('funcion', 'args', 'kwargs', 'futuro')
+
+    def __init__(self, funcion: Callable, args: tuple, kwargs: dict):
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.futuro = Future()
+
+
+# Marca de fin en la cola
+_DETENER = object()
+
+
+class EscritorBaseDatos:
+    """
+    ✍️ ESCRITOR ÚNICO
+
+    Responsabilidades:
+    - Ejecutar en un solo hilo cada escritura enviada (enviar → Future)
+    - Agrupar los comandos que ya esperan en la cola en una transacción:
+      BEGIN IMMEDIATE, un SAVEPOINT por comando y un solo COMMIT
+    - Aislar fallos: un comando que falla se revierte hasta su SAVEPOINT sin
+      afectar a los demás del grupo
+    - Avisar al índice de nombres y al cubo solo después del COMMIT
+
+    Al haber un único escritor no hay esperas por "database is locked" entre
+    los hilos de la aplicación; las lecturas siguen en la conexión de cada hilo.
+    """
+
+    def __init__(self, db_path: str, max_lote: int = 64):
+        self.db_path = os.path.abspath(db_path)
+        self.max_lote = max(1, max_lote)
+        self._cola: "queue.Queue" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._hilo_lock = threading.Lock()
+
+        # Estado del grupo en curso (solo lo toca el hilo escritor)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._sesion: Optional[SesionEscritura] = None
+        self._inicio_pendientes = 0
+
+        self._stats = {'grupos': 0, 'comandos': 0, 'fallidos': 0, 'max_grupo': 0}
+
+    # ------------------------------------------------------------------
+    # API para los demás hilos
+    # ------------------------------------------------------------------
+
+    def enviar(self, funcion: Callable, *args, **kwargs) -> Future:
+        """
+        Encola funcion(sesion, *args, **kwargs) y devuelve su Future
+
+        funcion recibe una SesionEscritura (conn, alumno_service,
+        constancia_service) y se ejecuta en el hilo escritor. Desde el propio
+        hilo escritor se ejecuta en el momento, dentro del grupo actual.
+        """
+        if self.en_hilo_escritor():
+            futuro = Future()
+            try:
+                futuro.set_result(funcion(self._sesion, *args, **kwargs))
+            except Exception as e:
+                futuro.set_exception(e)
+            return futuro
+
+        comando = _Comando(funcion, args, kwargs)
+        self._iniciar()
+        self._cola.put(comando)
+        return comando.futuro
+
+    def ejecutar(self, funcion: Callable, *args, **kwargs) -> Any:
+        """Como enviar, pero espera y devuelve el resultado (o relanza la excepción)"""
+        return self.enviar(funcion, *args, **kwargs).result()
+
+    def en_hilo_escritor(self) -> bool:
+        """True si el hilo actual es el escritor"""
+        return self._hilo is not None and threading.current_thread() is self._hilo
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Grupos confirmados, comandos ejecutados, fallidos y tamaño del grupo más grande"""
+        return dict(self._stats, en_cola=self._cola.qsize())
+
+    def detener(self, timeout: Optional[float] = 10.0):
+        """Ejecuta lo que quede en la cola y termina el hilo (se reinicia con el próximo enviar)"""
+        with self._hilo_lock:
+            hilo = self._hilo
+            if hilo is None or not hilo.is_alive():
+                return
+            self._cola.put(_DETENER)
+        hilo.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Hilo escritor
+    # ------------------------------------------------------------------
+
+    def _iniciar(self):
+        with self._hilo_lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="EscritorBaseDatos", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        from app.core.database.connection_manager import get_connection_manager
+
+        manager = get_connection_manager(self.db_path)
+        self._conn = manager.get_connection()
+        self._sesion = SesionEscritura(ConexionAgrupada(self._conn, self))
+
+        detener = False
+        while not detener:
+            comando = self._cola.get()
+            if comando is _DETENER:
+                break
+
+            # Lo que ya esté esperando entra en el mismo grupo
+            lote = [comando]
+            while len(lote) < self.max_lote:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is _DETENER:
+                    detener = True
+                    break
+                lote.append(siguiente)
+
+            try:
+                self._ejecutar_grupo(lote)
+            except Exception as e:
+                # El hilo no debe morir: los comandos sin resolver reciben el error
+                logger.error(f"❌ Error inesperado en el escritor: {e}")
+                for pendiente in lote:
+                    if not pendiente.futuro.done():
+                        pendiente.futuro.set_exception(e)
+
+        self._sesion = None
+        self._conn = None
+        manager.close_thread_connections()
+
+    def _ejecutar_grupo(self, lote: List[_Comando]):
+        conn = self._conn
+        resultados: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        pendientes: List[Tuple[Callable, tuple]] = []
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            # Otro proceso retuvo la base más allá de busy_timeout
+            logger.error(f"❌ No se pudo iniciar la transacción de escritura: {e}")
+            for comando in lote:
+                comando.futuro.set_exception(e)
+            return
+
+        _contexto.pendientes = pendientes
+        try:
+            for comando in lote:
+                if not comando.futuro.set_running_or_notify_cancel():
+                    continue
+                self._inicio_pendientes = len(pendientes)
+                conn.execute("SAVEPOINT comando")
+                try:
+                    resultado = comando.funcion(self._sesion, *comando.args, **comando.kwargs)
+                except Exception as e:
+                    self._revertir_comando()
+                    resultados.append((comando.futuro, None, e))
+                else:
+                    resultados.append((comando.futuro, resultado, None))
+
+                if conn.in_transaction:
+                    conn.execute("RELEASE comando")
+                else:
+                    # Alguien confirmó por la conexión real; el resto del grupo sigue en otra transacción
+                    logger.warning("⚠️ Un comando cerró la transacción del grupo")
+                    conn.execute("BEGIN IMMEDIATE")
+
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error al confirmar el grupo de escrituras: {e}")
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            resultados = [(futuro, None, e) for futuro, _, _ in resultados]
+            pendientes.clear()
+        finally:
+            _contexto.pendientes = None
+
+        for funcion, args in pendientes:
+            try:
+                funcion(*args)
+            except Exception as e:
+                logger.warning(f"⚠️ Error al actualizar índices tras el commit: {e}")
+
+        self._stats['grupos'] += 1
+        self._stats['comandos'] += len(resultados)
+        self._stats['max_grupo'] = max(self._stats['max_grupo'], len(resultados))
+        for futuro, resultado, error in resultados:
+            if error is not None:
+                self._stats['fallidos'] += 1
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(resultado)
+
+    def _revertir_comando(self):
+        """Deshace el comando actual hasta su SAVEPOINT y descarta sus acciones posteriores"""
+        conn = self._conn
+        pendientes = getattr(_contexto, 'pendientes', None)
+        if pendientes is None or not conn.in_transaction:
+            conn.rollback()
+            return
+        conn.execute("ROLLBACK TO comando")
+        del pendientes[self._inicio_pendientes:]
+
+
+def en_escritor(metodo: Callable) -> Callable:
+    """
+    Decorador para métodos de servicio que escriben en la base de datos
+
+    Si el servicio tiene un escritor asignado (self.escritor, lo pone
+    ServiceProvider) y no estamos ya en su hilo, la llamada se ejecuta allí
+    sobre la instancia del mismo servicio del escritor y se espera el
+    resultado. Sin escritor se ejecuta como siempre en el hilo que llama.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        escritor = getattr(self, 'escritor', None)
+        if escritor is None or escritor.en_hilo_escritor():
+            return metodo(self, *args, **kwargs)
+        return escritor.ejecutar(_llamar_en_sesion, type(self), metodo.__name__, args, kwargs)
+    return envoltura
+
+
+def enviar_escritura(servicio: Any, nombre: str, *args, **kwargs) -> Future:
+    """
+    Llama al método @en_escritor nombre del servicio sin esperar el resultado
+
+    Para la interfaz: el hilo que llama sigue libre y el resultado (o la
+    excepción) llega por el Future cuando el grupo del escritor se confirma.
+    Sin escritor, o desde su propio hilo, se ejecuta en el momento y el
+    Future se devuelve ya resuelto.
+    """
+    escritor = getattr(servicio, 'escritor', None)
+    if escritor is not None:
+        return escritor.enviar(_llamar_en_sesion, type(servicio), nombre, args, kwargs)
+
+    futuro = Future()
+    try:
+        futuro.set_result(getattr(servicio, nombre)(*args, **kwargs))
+    except Exception as e:
+        futuro.set_exception(e)
+    return futuro
+
+
+def _llamar_en_sesion(sesion: SesionEscritura, clase: type, nombre: str, args: tuple, kwargs: dict):
+    return getattr(sesion.servicio(clase), nombre)(*args, **kwargs)
+
+
+# Instancias globales por ruta de base de datos
+_escritores: Dict[str, EscritorBaseDatos] = {}
+_escritores_lock = threading.Lock()
+
+
+def get_escritor(db_path: Optional[str] = None) -> EscritorBaseDatos:
+    """Obtiene el escritor único de la base de datos (Config.DB_PATH por defecto)"""
+    from app.core.config import Config
+
+    if db_path is None:
+        db_path = Config.DB_PATH
+    key = os.path.abspath(db_path)
+
+    with _escritores_lock:
+        escritor = _escritores.get(key)
+        if escritor is None:
+            escritor = EscritorBaseDatos(key, Config.DATABASE.get('writer_max_batch', 64))
+            _escritores[key] = escritor
+    return escritor
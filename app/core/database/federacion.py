@@ -0,0 +1,289 @@
+"""
+🏫 FEDERACIÓN DE ESCUELAS DE UNA ZONA ESCOLAR
+Cada escuela conserva su propia base de datos (una por CCT) y sigue
+funcionando sola; esta capa las reúne para responder preguntas de toda la
+zona: reparte la consulta entre las bases en paralelo y junta los resultados.
+
+El mapa de la zona es un JSON junto a school_config.json:
+
+    {
+        "zona": "Zona 045",
+        "escuelas": [
+            {"cct": "10DPR0392H", "nombre": "Primaria Benito Juárez", "db_path": "escuelas/10DPR0392H.db"},
+            {"cct": "10DPR0410F", "nombre": "Primaria Miguel Hidalgo", "db_path": "escuelas/10DPR0410F.db"}
+        ]
+    }
+
+Las rutas relativas se resuelven contra la carpeta del mapa. La escuela local
+(Config.DB_PATH) siempre forma parte de la federación aunque no esté en el mapa.
+
+Se usa una conexión por base (ConnectionManager de cada archivo) en lugar de
+ATTACH: las conexiones de solo lectura del SQL de IA no permiten ATTACH, SQLite
+limita el número de bases adjuntas y cada escuela conserva su propio WAL,
+caché de resultados y presupuesto de consulta.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from app.core.logging import get_logger
+
+
+@dataclass(frozen=True)
+class EscuelaFederada:
+    """Una escuela de la zona y su base de datos"""
+    cct: str
+    nombre: str
+    db_path: str
+    local: bool = False
+
+    def etiqueta(self) -> Dict[str, str]:
+        """Columnas con las que se marca cada fila de esta escuela"""
+        return {"cct": self.cct, "escuela": self.nombre}
+
+
+class EscuelaOmitida(Exception):
+    """La base de una escuela de la zona no se puede consultar (no se lee o su esquema es anterior)"""
+
+
+# (escuela, resultado, error): resultado es None si la escuela falló
+ResultadoEscuela = Tuple[EscuelaFederada, Any, Optional[Exception]]
+
+
+class FederacionEscolar:
+    """
+    🏫 ENRUTADOR DE CONSULTAS ENTRE ESCUELAS
+
+    Responsabilidades:
+    - Mantener el mapa CCT → base de datos de la zona
+    - Ejecutar una función o una consulta en varias escuelas en paralelo
+    - Juntar filas (marcadas con cct/escuela) y sumar conteos
+    """
+
+    def __init__(self, escuelas: List[EscuelaFederada], zona: str = "", max_workers: int = 4):
+        self.logger = get_logger(__name__)
+        self.zona = zona
+        self._escuelas = escuelas
+        self._max_workers = max(1, max_workers)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Bases de otras escuelas ya revisadas: ruta -> None (vigente) o motivo para omitirla
+        self._revisadas: Dict[str, Optional[str]] = {}
+        self._sql_executors: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Escuelas
+    # ------------------------------------------------------------------
+
+    def escuelas(self) -> List[EscuelaFederada]:
+        """Todas las escuelas de la federación (la local primero)"""
+        return list(self._escuelas)
+
+    def es_zona(self) -> bool:
+        """True si hay más de una escuela que consultar"""
+        return len(self._escuelas) > 1
+
+    def seleccionar(self, escuelas: Union[None, str, Iterable[str]] = None) -> List[EscuelaFederada]:
+        """
+        Escuelas pedidas por CCT
+
+        Args:
+            escuelas: None, "todas" o "zona" para todas; un CCT, "CCT1,CCT2" o una lista de CCT
+        """
+        if escuelas is None or (isinstance(escuelas, str) and escuelas.strip().lower() in ("", "todas", "zona", "all")):
+            return self.escuelas()
+        if isinstance(escuelas, str):
+            escuelas = escuelas.strip("[]").replace("'", "").replace('"', "").split(",")
+        pedidas = {str(cct).strip().upper() for cct in escuelas if str(cct).strip()}
+        return [escuela for escuela in self._escuelas if escuela.cct.upper() in pedidas]
+
+    def sql_executor(self, escuela: EscuelaFederada):
+        """
+        SQLExecutor de la base de una escuela
+
+        Las bases de otras escuelas se abren solo para lectura y nunca se
+        migran desde aquí: una base con esquema anterior se omite (lanza
+        EscuelaOmitida, que en_paralelo informa como escuela sin respuesta)
+        hasta que su escuela actualice el sistema.
+        """
+        from app.core.ai.interpretation.sql_executor import SQLExecutor
+
+        with self._lock:
+            if not escuela.local:
+                self._revisar_esquema(escuela)
+            executor = self._sql_executors.get(escuela.db_path)
+            if executor is None:
+                executor = SQLExecutor(escuela.db_path)
+                self._sql_executors[escuela.db_path] = executor
+            return executor
+
+    def _revisar_esquema(self, escuela: EscuelaFederada):
+        """Abre la base de otra escuela solo para lectura y verifica su esquema (una vez)"""
+        from app.core.database.connection_manager import get_connection_manager
+        from app.core.database.schema_migrator import SchemaMigrator, version_esquema
+
+        if escuela.db_path not in self._revisadas:
+            motivo = None
+            try:
+                version = version_esquema(escuela.db_path)
+                if version < SchemaMigrator.ULTIMA_VERSION:
+                    motivo = (f"esquema v{version} anterior a v{SchemaMigrator.ULTIMA_VERSION}; "
+                              f"se omite hasta que la escuela actualice el sistema")
+                else:
+                    get_connection_manager(escuela.db_path, solo_lectura=True)
+            except Exception as e:
+                # Puede ser pasajero (unidad de red, archivo copiándose): se vuelve a intentar
+                raise EscuelaOmitida(f"Escuela {escuela.cct}: no se pudo leer {escuela.db_path}: {e}")
+            self._revisadas[escuela.db_path] = motivo
+
+        motivo = self._revisadas[escuela.db_path]
+        if motivo is not None:
+            raise EscuelaOmitida(f"Escuela {escuela.cct}: {motivo}")
+
+    # ------------------------------------------------------------------
+    # Ejecución en paralelo
+    # ------------------------------------------------------------------
+
+    def en_paralelo(self, funcion: Callable[[EscuelaFederada], Any],
+                    escuelas: Optional[List[EscuelaFederada]] = None) -> List[ResultadoEscuela]:
+        """
+        Ejecuta funcion(escuela) en cada escuela y devuelve los resultados en el orden de entrada
+
+        Un error en una escuela no detiene a las demás: se devuelve en el tercer elemento.
+        """
+        escuelas = self.escuelas() if escuelas is None else escuelas
+        if len(escuelas) == 1:
+            return [self._ejecutar(funcion, escuelas[0])]
+
+        pool = self._obtener_pool()
+        futuros = [pool.submit(self._ejecutar, funcion, escuela) for escuela in escuelas]
+        return [futuro.result() for futuro in futuros]
+
+    def _ejecutar(self, funcion: Callable[[EscuelaFederada], Any], escuela: EscuelaFederada) -> ResultadoEscuela:
+        try:
+            return escuela, funcion(escuela), None
+        except Exception as e:
+            self.logger.warning(f"⚠️ Escuela {escuela.cct} no respondió: {e}")
+            return escuela, None, e
+
+    def _obtener_pool(self) -> ThreadPoolExecutor:
+        """Hilos persistentes: cada uno conserva sus conexiones por base entre consultas"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=min(self._max_workers, len(self._escuelas)),
+                                                thread_name_prefix="federacion")
+            return self._pool
+
+    def consultar(self, sql: str, params: tuple = (), limit: int = 100,
+                  escuelas: Union[None, str, Iterable[str]] = None) -> Tuple[List[Dict[str, Any]], List[ResultadoEscuela]]:
+        """
+        Ejecuta la misma consulta en cada escuela y junta las filas
+
+        Returns:
+            (filas marcadas con cct/escuela, resultados por escuela con su QueryResult)
+        """
+        resultados = self.en_paralelo(
+            lambda escuela: self.sql_executor(escuela).execute_query(sql, limit=limit, params=params),
+            self.seleccionar(escuelas)
+        )
+        filas = []
+        for escuela, resultado, _ in resultados:
+            if resultado is not None and resultado.success:
+                filas.extend({**escuela.etiqueta(), **fila} for fila in resultado.data)
+        return filas, resultados
+
+    def contar(self, sql: str, params: tuple = (), columna: str = "total",
+               escuelas: Union[None, str, Iterable[str]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Suma un conteo de una sola fila (SELECT COUNT(*) AS total ...) en todas las escuelas
+
+        Returns:
+            (total de la zona, [{cct, escuela, total}] por escuela; total None si falló)
+        """
+        filas, resultados = self.consultar(sql, params, limit=1, escuelas=escuelas)
+        por_escuela = {fila["cct"]: fila.get(columna) or 0 for fila in filas}
+        desglose = [{**escuela.etiqueta(), columna: por_escuela.get(escuela.cct)}
+                    for escuela, _, _ in resultados]
+        return sum(por_escuela.values()), desglose
+
+    def cerrar(self):
+        """Detiene los hilos de la federación"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+def ruta_mapa_zona() -> str:
+    """Ruta del mapa de la zona (junto a school_config.json)"""
+    from app.core.config import Config
+    from app.core.executable_paths import get_path_manager
+
+    nombre = Config.FEDERACION.get('map_file', 'zona_escolar.json')
+    return os.path.join(str(get_path_manager().get_config_path().parent), nombre)
+
+
+def cargar_federacion(ruta_mapa: Optional[str] = None) -> FederacionEscolar:
+    """
+    Arma la federación con la escuela local y las del mapa de la zona
+
+    Las escuelas cuya base no existe se omiten con una advertencia (abrir la
+    ruta crearía un archivo vacío).
+    """
+    from app.core.config import Config
+
+    logger = get_logger(__name__)
+    ruta_mapa = ruta_mapa or ruta_mapa_zona()
+
+    try:
+        cct_local, nombre_local = Config.get_school_cct(), Config.get_school_name()
+    except Exception:
+        cct_local, nombre_local = "LOCAL", "Escuela local"
+    db_local = os.path.abspath(Config.DB_PATH)
+    escuelas = [EscuelaFederada(cct_local, nombre_local, db_local, local=True)]
+
+    zona = ""
+    if os.path.exists(ruta_mapa):
+        try:
+            with open(ruta_mapa, "r", encoding="utf-8") as f:
+                mapa = json.load(f)
+            zona = mapa.get("zona", "")
+            base = os.path.dirname(os.path.abspath(ruta_mapa))
+            vistos = {cct_local.upper(): db_local}
+            for entrada in mapa.get("escuelas", []):
+                cct = str(entrada.get("cct", "")).strip().upper()
+                db_path = os.path.abspath(os.path.join(base, str(entrada.get("db_path", ""))))
+                if not cct or not entrada.get("db_path"):
+                    logger.warning(f"⚠️ Entrada incompleta en {ruta_mapa}: {entrada}")
+                elif cct in vistos or db_path in vistos.values():
+                    continue  # La escuela local o una repetida
+                elif not os.path.exists(db_path):
+                    logger.warning(f"⚠️ Base de {cct} no encontrada, se omite: {db_path}")
+                else:
+                    escuelas.append(EscuelaFederada(cct, entrada.get("nombre") or cct, db_path))
+                    vistos[cct] = db_path
+        except (OSError, ValueError) as e:
+            logger.error(f"Error leyendo el mapa de la zona {ruta_mapa}: {e}")
+
+    if len(escuelas) > 1:
+        logger.info(f"🏫 Federación {zona or 'de zona'}: {len(escuelas)} escuelas")
+    return FederacionEscolar(escuelas, zona, Config.FEDERACION.get('max_workers', 4))
+
+
+# Instancia global de la federación
+_federacion = None
+_federacion_lock = threading.Lock()
+
+def get_federacion(recargar: bool = False) -> FederacionEscolar:
+    """Obtiene la federación de la zona (se lee el mapa la primera vez o con recargar=True)"""
+    global _federacion
+
+    with _federacion_lock:
+        if _federacion is None or recargar:
+            if _federacion is not None:
+                _federacion.cerrar()
+            _federacion = cargar_federacion()
+    return _federacion
@@ -4,13 +4,16 @@ Mapea campos de usuario a campos de base de datos de forma dinámica y configura
 """
 
 from typing import Dict, Any, Optional, List
+from app.core.database.schema_catalog import get_schema_catalog
 from app.core.logging import get_logger
 
 class FieldMapper:
     """Mapea campos de usuario a campos de base de datos dinámicamente"""
     
-    def __init__(self):
+    def __init__(self, db_path: Optional[str] = None):
         self.logger = get_logger(__name__)
+        # Columnas reales (catálogo compartido) para campos sin alias
+        self.catalog = get_schema_catalog(db_path)
         
         # Mapeo dinámico de campos - configurable por escuela
         self._field_mapping = {
@@ -30,6 +33,15 @@ class FieldMapper:
             'escuela': {'tabla': 'datos_escolares', 'campo': 'escuela'},
             'ciclo_escolar': {'tabla': 'datos_escolares', 'campo': 'ciclo_escolar'},
             'calificaciones': {'tabla': 'datos_escolares', 'campo': 'calificaciones'},
+
+            # Columnas derivadas (indexadas, mantenidas por triggers)
+            'tiene_calificaciones': {'tabla': 'datos_escolares', 'campo': 'tiene_calificaciones'},
+            'promedio_general': {'tabla': 'datos_escolares', 'campo': 'promedio_general'},
+            'promedio': {'tabla': 'datos_escolares', 'campo': 'promedio_general'},
+            'anio_nacimiento': {'tabla': 'alumnos', 'campo': 'anio_nacimiento'},
+            'año_nacimiento': {'tabla': 'alumnos', 'campo': 'anio_nacimiento'},
+            'año de nacimiento': {'tabla': 'alumnos', 'campo': 'anio_nacimiento'},
+            'mes_nacimiento': {'tabla': 'alumnos', 'campo': 'mes_nacimiento'},
             
             # Aliases comunes
             'id': {'tabla': 'alumnos', 'campo': 'id'},
@@ -85,8 +97,19 @@ class FieldMapper:
         return self._field_mapping.copy()
     
     def is_valid_field(self, user_field: str) -> bool:
-        """Verifica si un campo de usuario es válido"""
-        return user_field.lower().strip() in self._field_mapping
+        """Verifica si un campo de usuario es válido (alias o columna real)"""
+        user_field_lower = user_field.lower().strip()
+        return user_field_lower in self._field_mapping or self._find_column_table(user_field_lower) is not None
+
+    def _find_column_table(self, campo: str, tabla: str = None) -> Optional[str]:
+        """Tabla que contiene la columna según el catálogo (la indicada primero)"""
+        try:
+            if tabla and self.catalog.tiene_columna(tabla, campo):
+                return tabla
+            return self.catalog.tabla_de_columna(campo)
+        except Exception as e:
+            self.logger.debug(f"Catálogo de esquema no disponible: {e}")
+            return None
 
     def validate_and_map_criterion(self, criterion: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -109,6 +132,12 @@ class FieldMapper:
             # Mapear el campo
             mapped_field = self.map_user_field_to_db(campo)
             if not mapped_field:
+                # Sin alias: si es una columna real, corregir la tabla si hace falta
+                tabla = self._find_column_table(campo, criterion.get('tabla'))
+                if tabla and tabla != criterion.get('tabla'):
+                    mapped_criterion = criterion.copy()
+                    mapped_criterion['tabla'] = tabla
+                    return mapped_criterion
                 # Si no se puede mapear, usar el criterio original
                 return criterion
 
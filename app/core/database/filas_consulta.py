@@ -0,0 +1,170 @@
+"""
+Filas de una consulta que se convierten a diccionario solo cuando se leen
+"""
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, Tuple, Union
+
+# Una fila pendiente (sqlite3.Row, inmutable) o ya convertida (dict)
+Fila = Union[sqlite3.Row, Dict[str, Any]]
+
+
+class FilasConsulta(list):
+    """
+    Lista de resultados de una consulta que entrega diccionarios
+
+    Se comporta como la lista de dict(row) que devolvía SQLExecutor, pero guarda
+    los sqlite3.Row tal como salen del cursor y cada uno se convierte la primera
+    vez que alguien lo lee: len() (row_count) no convierte nada y mostrar 10 de
+    1000 resultados crea solo 10 diccionarios. La fila convertida queda en su
+    lugar, así que modificarla persiste como en una lista normal.
+
+    Las filas que se agreguen después deben ser diccionarios. json.dumps sin
+    indent recorre la lista desde C: llamar antes a materializar().
+    """
+
+    __slots__ = ('_pendientes',)
+
+    def __init__(self, filas: Iterable[Fila] = ()):
+        super().__init__(filas)
+        self._pendientes = True
+
+    @classmethod
+    def desde_cursor(cls, cursor: sqlite3.Cursor, max_filas: int,
+                     tamano_lote: int = 500) -> Tuple['FilasConsulta', bool]:
+        """
+        Lee hasta max_filas del cursor con fetchmany, sin convertirlas
+
+        Se pide una fila extra para saber si el tope cortó el resultado. El
+        cursor se agota aquí (dentro del presupuesto de la consulta y sin dejar
+        abierta la transacción de lectura); lo diferido es la conversión.
+
+        Returns:
+            (filas, truncado)
+        """
+        filas = cls()
+        while len(filas) <= max_filas:
+            lote = cursor.fetchmany(min(tamano_lote, max_filas + 1 - len(filas)))
+            if not lote:
+                break
+            list.extend(filas, lote)
+
+        truncado = len(filas) > max_filas
+        if truncado:
+            list.__delitem__(filas, slice(max_filas, None))
+        return filas, truncado
+
+    # ------------------------------------------------------------------
+    # Conversión
+    # ------------------------------------------------------------------
+
+    def _fila(self, indice: int) -> Dict[str, Any]:
+        fila = list.__getitem__(self, indice)
+        if type(fila) is sqlite3.Row:
+            fila = dict(fila)
+            list.__setitem__(self, indice, fila)
+        return fila
+
+    def materializar(self) -> 'FilasConsulta':
+        """Convierte todas las filas pendientes (para código que lee la lista desde C)"""
+        if self._pendientes:
+            for indice, fila in enumerate(list.__iter__(self)):
+                if type(fila) is sqlite3.Row:
+                    list.__setitem__(self, indice, dict(fila))
+            self._pendientes = False
+        return self
+
+    def crudas(self) -> Tuple[Fila, ...]:
+        """
+        Filas sin convertir (sqlite3.Row) y copias de las ya convertidas
+
+        Es lo que guarda el caché de resultados: los Row son inmutables y se
+        comparten entre resultados sin copiarlos.
+        """
+        return tuple(dict(fila) if isinstance(fila, dict) else fila for fila in list.__iter__(self))
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            # Como en una lista, un corte es una lista nueva (solo se convierte lo cortado)
+            return [self._fila(i) for i in range(*indice.indices(len(self)))]
+        if not self._pendientes:
+            return list.__getitem__(self, indice)
+        return self._fila(indice)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self._pendientes:
+            return list.__iter__(self)
+        return self._iterar()
+
+    def _iterar(self) -> Iterator[Dict[str, Any]]:
+        indice = 0
+        while indice < len(self):
+            yield self._fila(indice)
+            indice += 1
+        self._pendientes = False
+
+    def __reversed__(self):
+        return list.__reversed__(self.materializar())
+
+    def __contains__(self, valor) -> bool:
+        return list.__contains__(self.materializar(), valor)
+
+    def index(self, *args):
+        return list.index(self.materializar(), *args)
+
+    def count(self, valor) -> int:
+        return list.count(self.materializar(), valor)
+
+    def pop(self, indice: int = -1):
+        if self._pendientes and len(self):
+            self._fila(indice)
+        return list.pop(self, indice)
+
+    def remove(self, valor):
+        list.remove(self.materializar(), valor)
+
+    def sort(self, *args, **kwargs):
+        list.sort(self.materializar(), *args, **kwargs)
+
+    def copy(self) -> 'FilasConsulta':
+        return FilasConsulta(self.crudas())
+
+    # ------------------------------------------------------------------
+    # Operadores (list los resuelve leyendo los elementos desde C)
+    # ------------------------------------------------------------------
+
+    def __eq__(self, otra):
+        if isinstance(otra, FilasConsulta):
+            otra.materializar()
+        return list.__eq__(self.materializar(), otra)
+
+    def __ne__(self, otra):
+        if isinstance(otra, FilasConsulta):
+            otra.materializar()
+        return list.__ne__(self.materializar(), otra)
+
+    __hash__ = None
+
+    def __add__(self, otra):
+        if not isinstance(otra, list):
+            return NotImplemented
+        return list(self) + list(otra)
+
+    def __radd__(self, otra):
+        if not isinstance(otra, list):
+            return NotImplemented
+        return list(otra) + list(self)
+
+    def __mul__(self, veces):
+        return list(self) * veces
+
+    __rmul__ = __mul__
+
+    def __reduce__(self):
+        return FilasConsulta, (list(self),)
+
+    def __repr__(self) -> str:
+        return list.__repr__(self.materializar())
@@ -0,0 +1,229 @@
+"""
+🧱 CONSTRUCTOR DE CONSULTAS PARAMETRIZADAS
+Genera SQL con parámetros enlazados (?) e identificadores validados contra una
+lista blanca. Las plantillas se cachean por "forma" de los criterios (tabla,
+campo, operador, número de valores): "grado=3, grupo=A" y "grado=5, grupo=B"
+producen el mismo texto SQL y reutilizan la sentencia preparada de sqlite3.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Union
+
+# Alias usados por ActionExecutor en FROM alumnos a JOIN datos_escolares de
+ALIAS_TABLAS = {
+    'alumnos': 'a',
+    'datos_escolares': 'de',
+}
+
+# Columnas que se pueden usar en WHERE / GROUP BY desde criterios del LLM
+COLUMNAS_PERMITIDAS = {
+    'alumnos': frozenset({
+        'id', 'curp', 'nombre', 'matricula', 'fecha_nacimiento', 'fecha_registro',
+        'anio_nacimiento', 'mes_nacimiento',
+    }),
+    'datos_escolares': frozenset({
+        'id', 'alumno_id', 'ciclo_escolar', 'grado', 'grupo', 'turno', 'escuela', 'cct',
+        'calificaciones', 'tiene_calificaciones', 'promedio_general',
+    }),
+}
+
+OPERADORES_PERMITIDOS = frozenset({
+    '=', '!=', 'LIKE', 'STARTS_WITH', 'ENDS_WITH', '>', '<', '>=', '<=',
+    'BETWEEN', 'IS_NULL', 'IS_NOT_NULL', 'IN', 'NOT_IN',
+})
+
+CAMPOS_NUMERICOS_ID = frozenset({'id', 'alumno_id'})
+
+# (tabla, campo, operador, número de parámetros) o un fragmento SQL fijo
+Forma = Union[Tuple[str, str, str, int], str]
+
+
+class IdentificadorNoPermitido(ValueError):
+    """Tabla, columna u operador fuera de la lista blanca"""
+
+
+@dataclass(frozen=True)
+class ConsultaParametrizada:
+    """Texto SQL con marcadores ? y sus parámetros"""
+    sql: str
+    params: Tuple[Any, ...] = ()
+
+    def como_texto(self) -> str:
+        """
+        SQL con los valores sustituidos, solo para logs y para el análisis de
+        criterios del MasterInterpreter (nunca se ejecuta)
+        """
+        partes = self.sql.split('?')
+        if len(partes) - 1 != len(self.params):
+            return self.sql
+        texto = partes[0]
+        for valor, resto in zip(self.params, partes[1:]):
+            texto += _literal(valor) + resto
+        return texto
+
+
+def _literal(valor: Any) -> str:
+    if valor is None:
+        return 'NULL'
+    if isinstance(valor, (int, float)):
+        return str(valor)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def columna(tabla: str, campo: str) -> str:
+    """Devuelve "alias.campo" validando tabla y columna"""
+    columnas = COLUMNAS_PERMITIDAS.get(tabla)
+    if columnas is None:
+        raise IdentificadorNoPermitido(f"Tabla no permitida: {tabla}")
+    if campo not in columnas:
+        raise IdentificadorNoPermitido(f"Campo no permitido en {tabla}: {campo}")
+    return f"{ALIAS_TABLAS[tabla]}.{campo}"
+
+
+def columna_sin_tabla(campo: str) -> str:
+    """
+    Resuelve un campo sin tabla (p. ej. agrupar_por="grado") a "alias.campo"
+
+    Los campos de datos_escolares tienen prioridad, como en las consultas
+    originales (de.grado, de.turno, ...).
+    """
+    campo = str(campo).strip().lower()
+    if '.' in campo:
+        alias, campo = campo.split('.', 1)
+        for tabla, alias_tabla in ALIAS_TABLAS.items():
+            if alias in (alias_tabla, tabla):
+                return columna(tabla, campo)
+        raise IdentificadorNoPermitido(f"Alias no permitido: {alias}")
+    for tabla in ('datos_escolares', 'alumnos'):
+        if campo in COLUMNAS_PERMITIDAS[tabla]:
+            return columna(tabla, campo)
+    raise IdentificadorNoPermitido(f"Campo no permitido: {campo}")
+
+
+@lru_cache(maxsize=256)
+def plantilla_condicion(tabla: str, campo: str, operador: str, num_valores: int = 1) -> str:
+    """Fragmento " AND ..." con marcadores para una forma de criterio"""
+    if operador not in OPERADORES_PERMITIDOS:
+        raise IdentificadorNoPermitido(f"Operador no permitido: {operador}")
+    col = columna(tabla, campo)
+
+    if operador == 'IS_NULL':
+        return f" AND {col} IS NULL"
+    if operador == 'IS_NOT_NULL':
+        return f" AND {col} IS NOT NULL"
+    if operador in ('LIKE', 'STARTS_WITH', 'ENDS_WITH'):
+        return f" AND {col} LIKE ?"
+    if operador == 'BETWEEN':
+        return f" AND {col} BETWEEN ? AND ?"
+    if operador in ('IN', 'NOT_IN'):
+        marcadores = ','.join('?' * num_valores)
+        negacion = 'NOT ' if operador == 'NOT_IN' else ''
+        return f" AND {col} {negacion}IN ({marcadores})"
+    return f" AND {col} {operador} ?"
+
+
+@lru_cache(maxsize=128)
+def plantilla_consulta(base: str, formas: Tuple[Forma, ...], sufijo: str = "") -> str:
+    """SQL completo para una combinación de criterios (cacheado por forma)"""
+    partes = [base]
+    for forma in formas:
+        partes.append(forma if isinstance(forma, str) else plantilla_condicion(*forma))
+    partes.append(sufijo)
+    return ''.join(partes)
+
+
+def _separar_valores(valor: str) -> List[str]:
+    """Convierte "a,b,c" o "[a,b,c]" en lista"""
+    if valor.startswith("[") and valor.endswith("]"):
+        valor = valor[1:-1]
+    return [v.strip().strip("'\"") for v in valor.split(",") if v.strip()]
+
+
+def normalizar_criterio(tabla: str, campo: str, operador: str, valor: Any) -> Tuple[Forma, Tuple[Any, ...]]:
+    """
+    Traduce un criterio del LLM a (forma, parámetros)
+
+    Mantiene la semántica de los operadores que interpretaba
+    ActionExecutor._build_where_condition.
+
+    Raises:
+        IdentificadorNoPermitido: si la tabla, el campo o el operador no son válidos
+    """
+    operador = str(operador or '=').upper()
+    if operador not in OPERADORES_PERMITIDOS:
+        operador = '='
+    texto = str(valor) if valor is not None else ""
+    columna(tabla, campo)  # Validar antes de construir cualquier fragmento
+    alias = ALIAS_TABLAS[tabla]
+
+    # "[]" en calificaciones significa con/sin calificaciones (columna derivada)
+    if campo == 'calificaciones' and texto == '[]' and operador in ('=', '!='):
+        if operador == '=':
+            # NULL: alumno sin registro escolar en LEFT JOIN
+            return f" AND ({alias}.tiene_calificaciones = 0 OR {alias}.tiene_calificaciones IS NULL)", ()
+        return f" AND {alias}.tiene_calificaciones = 1", ()
+
+    if operador in ('IS_NULL', 'IS_NOT_NULL'):
+        return (tabla, campo, operador, 0), ()
+    if operador == 'LIKE':
+        return (tabla, campo, operador, 1), (f"%{texto}%",)
+    if operador == 'STARTS_WITH':
+        return (tabla, campo, operador, 1), (f"{texto}%",)
+    if operador == 'ENDS_WITH':
+        return (tabla, campo, operador, 1), (f"%{texto}",)
+    if operador == 'BETWEEN':
+        if "," not in texto:
+            return (tabla, campo, '=', 1), (texto,)
+        inicio, fin = texto.split(",", 1)
+        return (tabla, campo, operador, 2), (inicio.strip(), fin.strip())
+    if operador in ('IN', 'NOT_IN'):
+        valores = _separar_valores(texto)
+        if campo in CAMPOS_NUMERICOS_ID:
+            valores = [int(v) for v in valores if v.isdigit()]
+        if not valores:
+            return (tabla, campo, '=' if operador == 'IN' else '!=', 1), (texto,)
+        return (tabla, campo, operador, len(valores)), tuple(valores)
+    return (tabla, campo, operador, 1), (texto,)
+
+
+class ConstructorConsulta:
+    """
+    Acumula criterios sobre una consulta base y produce una ConsultaParametrizada
+
+    Ejemplo:
+        constructor = ConstructorConsulta("SELECT COUNT(*) AS total FROM alumnos a "
+                                          "LEFT JOIN datos_escolares de ON a.id = de.alumno_id WHERE 1=1")
+        constructor.filtro('datos_escolares', 'grado', '=', 3)
+        consulta = constructor.construir()
+    """
+
+    def __init__(self, base: str):
+        self.base = base
+        self._formas: List[Forma] = []
+        self._params: List[Any] = []
+
+    def filtro(self, tabla: str, campo: str, operador: str, valor: Any) -> 'ConstructorConsulta':
+        """Agrega un criterio validado (ver normalizar_criterio)"""
+        forma, params = normalizar_criterio(tabla, campo, operador, valor)
+        self._formas.append(forma)
+        self._params.extend(params)
+        return self
+
+    def fragmento(self, sql: str, *params: Any) -> 'ConstructorConsulta':
+        """Agrega un fragmento SQL fijo (sin valores interpolados) con sus parámetros"""
+        self._formas.append(sql)
+        self._params.extend(params)
+        return self
+
+    def construir(self, sufijo: str = "", *params_sufijo: Any) -> ConsultaParametrizada:
+        sql = plantilla_consulta(self.base, tuple(self._formas), sufijo)
+        return ConsultaParametrizada(sql, tuple(self._params) + params_sufijo)
+
+
+def estadisticas_cache() -> dict:
+    """Aciertos/fallos de los cachés de plantillas (diagnóstico)"""
+    return {
+        'condiciones': plantilla_condicion.cache_info()._asdict(),
+        'consultas': plantilla_consulta.cache_info()._asdict(),
+    }
@@ -0,0 +1,194 @@
+"""
+🗃️ CACHÉ DE RESULTADOS DE CONSULTAS
+Guarda en memoria los resultados de SELECT repetidos (estadísticas,
+distribuciones por grado, "los de 3°A" otra vez tras una pregunta de
+seguimiento) y los descarta en cuanto cambia la base de datos.
+
+La validez se decide con ConnectionManager.version_datos() (PRAGMA
+data_version): cualquier commit de cualquier conexión vacía el caché, así que
+un resultado servido desde memoria es siempre idéntico al que daría la base.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from app.core.logging import get_logger
+from app.core.database.filas_consulta import Fila, FilasConsulta
+
+# Literales entre comillas (se conservan intactos) o espacios en blanco
+_PATRON_NORMALIZAR = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|\s+")
+
+# Funciones cuyo resultado cambia sin que cambien los datos
+_PATRON_NO_DETERMINISTA = re.compile(
+    r"\b(random|randomblob|changes|total_changes|last_insert_rowid)\s*\(|"
+    r"'now'|\bcurrent_(date|time|timestamp)\b",
+    re.IGNORECASE
+)
+
+Filas = List[Dict[str, Any]]
+
+# Lo que guarda cada entrada: sqlite3.Row compartidos y copias de los dict
+FilasGuardadas = Tuple[Fila, ...]
+
+
+def normalizar_sql(sql: str) -> str:
+    """Colapsa espacios fuera de los literales para que el formato no cambie la clave"""
+    return _PATRON_NORMALIZAR.sub(lambda m: m.group(1) or ' ', sql).strip().rstrip(';').strip()
+
+
+def es_cacheable(sql: str) -> bool:
+    """False si la consulta usa funciones no deterministas (random(), 'now', ...)"""
+    return _PATRON_NO_DETERMINISTA.search(sql) is None
+
+
+def estimar_bytes(filas: Iterable[Fila]) -> int:
+    """Tamaño aproximado de las filas (claves compartidas, solo valores)"""
+    total = 0
+    for fila in filas:
+        total += 64
+        for valor in (fila.values() if isinstance(fila, dict) else fila):
+            if isinstance(valor, (str, bytes)):
+                total += len(valor) + 48
+            else:
+                total += 24
+    return total
+
+
+class CacheResultados:
+    """
+    Caché LRU de resultados acotado por bytes
+
+    Las entradas se guardan con la versión de datos vigente al ejecutar la
+    consulta; la versión se lee ANTES de ejecutarla, de modo que un commit
+    concurrente solo puede hacer que una entrada se descarte de más, nunca que
+    se sirva un resultado viejo.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.logger = get_logger(__name__)
+
+        self._entradas: "OrderedDict[Hashable, Tuple[FilasGuardadas, bool, int]]" = OrderedDict()
+        self._version: Optional[Tuple[int, int]] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.expulsiones = 0
+
+    @staticmethod
+    def clave(sql: str, params, max_filas: int) -> Hashable:
+        """SQL normalizado + parámetros enlazados (posicionales o con nombre) + tope de filas"""
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        return normalizar_sql(sql), tuple(params or ()), max_filas
+
+    def obtener(self, clave: Hashable, version: Tuple[int, int]) -> Optional[Tuple[Filas, bool]]:
+        """
+        Devuelve (filas, truncado) si la consulta está en caché para esta versión
+
+        Las filas son una FilasConsulta nueva: quien las recibe puede
+        modificarlas. Los sqlite3.Row se comparten (son inmutables) y se
+        convierten a dict al leerlos, como en un resultado recién ejecutado.
+        """
+        with self._lock:
+            self._sincronizar_version(version)
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            filas, truncado, _ = entrada
+        return FilasConsulta(dict(fila) if isinstance(fila, dict) else fila for fila in filas), truncado
+
+    def guardar(self, clave: Hashable, version: Tuple[int, int], filas: Filas, truncado: bool):
+        """Guarda una copia de las filas si la versión sigue vigente y caben en el límite"""
+        if isinstance(filas, FilasConsulta):
+            # Sin convertir a dict: se guardan los sqlite3.Row tal cual
+            copia = filas.crudas()
+        else:
+            copia = tuple(dict(fila) for fila in filas)
+        tamano = estimar_bytes(copia)
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            if self._version != version:
+                # Hubo un commit mientras se ejecutaba: el resultado ya no es de la versión vigente
+                return
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._entradas[clave] = (copia, truncado, tamano)
+            self._bytes += tamano
+
+            while self._bytes > self.max_bytes and self._entradas:
+                _, (_, _, liberados) = self._entradas.popitem(last=False)
+                self._bytes -= liberados
+                self.expulsiones += 1
+
+    def limpiar(self):
+        """Descarta todas las entradas"""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def _sincronizar_version(self, version: Tuple[int, int]):
+        """Vacía el caché si la base cambió desde la última consulta (con el lock tomado)"""
+        if self._version == version:
+            return
+        if self._entradas:
+            self.invalidaciones += 1
+            self.logger.debug(f"🗃️ Caché de resultados invalidado ({len(self._entradas)} entradas)")
+        self._entradas.clear()
+        self._bytes = 0
+        self._version = version
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos, fallos y ocupación (diagnóstico)"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0.0,
+                'invalidaciones': self.invalidaciones,
+                'expulsiones': self.expulsiones,
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Un caché por archivo de base de datos (compartido por los hilos del chat)
+_result_caches: Dict[str, CacheResultados] = {}
+_caches_lock = threading.Lock()
+
+def get_result_cache(db_path: Optional[str] = None) -> CacheResultados:
+    """
+    Obtiene el caché de resultados global para una base de datos
+
+    Args:
+        db_path: Ruta a la base de datos (por defecto Config.DB_PATH)
+
+    Returns:
+        Instancia compartida del CacheResultados
+    """
+    from app.core.config import Config
+
+    if db_path is None:
+        db_path = Config.DB_PATH
+
+    key = os.path.abspath(str(db_path))
+    with _caches_lock:
+        cache = _result_caches.get(key)
+        if cache is None:
+            max_mb = Config.DATABASE.get('ai_query_cache_mb', 16)
+            cache = CacheResultados(int(max_mb * 1024 * 1024))
+            _result_caches[key] = cache
+    return cache
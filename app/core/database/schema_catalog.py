@@ -0,0 +1,355 @@
+"""
+📚 CATÁLOGO DE ESQUEMA COMPARTIDO
+Estructura de la base de datos (columnas, llaves foráneas, índices, filas
+estimadas desde sqlite_stat1) y materias registradas, leída una sola vez por
+proceso y reutilizada por FieldMapper, ActionExecutor, los prompt managers y
+la ventana de administración.
+
+    - La estructura se recarga solo cuando cambia PRAGMA schema_version
+      (migraciones, CREATE/ALTER/DROP, ANALYZE)
+    - Las materias y los conteos exactos dependen de los datos: se recalculan
+      cuando cambia PRAGMA data_version
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.database.connection_manager import get_connection_manager
+from app.core.logging import get_logger
+
+# Tablas internas de SQLite y del índice FTS (alumnos_fts y sus tablas sombra)
+PREFIJOS_EXCLUIDOS = ('sqlite_', 'alumnos_fts')
+
+
+@dataclass(frozen=True)
+class ColumnaCatalogo:
+    """Columna tal como la describe PRAGMA table_info"""
+    cid: int
+    nombre: str
+    tipo: str
+    not_null: bool
+    default: Any
+    pk: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato de PRAGMA table_info (usado por la ventana de administración)"""
+        return {
+            'cid': self.cid,
+            'name': self.nombre,
+            'type': self.tipo,
+            'notnull': int(self.not_null),
+            'dflt_value': self.default,
+            'pk': self.pk
+        }
+
+
+@dataclass(frozen=True)
+class LlaveForanea:
+    """columna → tabla_ref.columna_ref"""
+    columna: str
+    tabla_ref: str
+    columna_ref: str
+
+
+@dataclass(frozen=True)
+class IndiceCatalogo:
+    """Índice de una tabla con sus columnas en orden"""
+    nombre: str
+    columnas: Tuple[str, ...]
+    unico: bool
+
+
+@dataclass
+class TablaCatalogo:
+    """Descripción de una tabla"""
+    nombre: str
+    columnas: List[ColumnaCatalogo] = field(default_factory=list)
+    llaves_foraneas: List[LlaveForanea] = field(default_factory=list)
+    indices: List[IndiceCatalogo] = field(default_factory=list)
+    # Desde sqlite_stat1 (COUNT(*) si la tabla nunca se analizó)
+    filas_estimadas: int = 0
+    # Una fila de ejemplo para el contexto del LLM
+    muestra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def nombres_columnas(self) -> List[str]:
+        return [c.nombre for c in self.columnas]
+
+    def tipos_columnas(self) -> Dict[str, str]:
+        """{columna: tipo}"""
+        return {c.nombre: c.tipo for c in self.columnas}
+
+    def tiene_columna(self, campo: str) -> bool:
+        return any(c.nombre == campo for c in self.columnas)
+
+
+class SchemaCatalog:
+    """
+    📚 CATÁLOGO DE ESQUEMA DE UNA BASE DE DATOS
+
+    Todas las lecturas usan la conexión de solo lectura del hilo actual; los
+    resultados se comparten entre hilos y se protegen con un lock.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.logger = get_logger(__name__)
+        self.connection_manager = get_connection_manager(db_path)
+        self._lock = threading.RLock()
+
+        self._version_esquema: Optional[int] = None
+        self._tablas: Dict[str, TablaCatalogo] = {}
+        self._contexto_sql: Optional[str] = None
+        self._estructura: Optional[Dict[str, Any]] = None
+
+        self._version_datos: Optional[Tuple[int, int]] = None
+        self._materias: Optional[List[str]] = None
+        self._conteos: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Estructura (depende de schema_version)
+    # ------------------------------------------------------------------
+
+    def tablas(self) -> Dict[str, TablaCatalogo]:
+        """Tablas de usuario por nombre (sin tablas internas ni del índice FTS)"""
+        with self._lock:
+            self._asegurar_esquema()
+            return self._tablas
+
+    def tabla(self, nombre: str) -> Optional[TablaCatalogo]:
+        return self.tablas().get(nombre)
+
+    def columnas(self, tabla: str) -> Dict[str, str]:
+        """{columna: tipo} de una tabla ({} si no existe)"""
+        info = self.tabla(tabla)
+        return info.tipos_columnas() if info else {}
+
+    def tiene_columna(self, tabla: str, campo: str) -> bool:
+        info = self.tabla(tabla)
+        return info is not None and info.tiene_columna(campo)
+
+    def tabla_de_columna(self, campo: str, preferidas: Tuple[str, ...] = ('datos_escolares', 'alumnos')) -> Optional[str]:
+        """Tabla que contiene una columna (primero las preferidas)"""
+        tablas = self.tablas()
+        for nombre in preferidas + tuple(t for t in tablas if t not in preferidas):
+            info = tablas.get(nombre)
+            if info and info.tiene_columna(campo):
+                return nombre
+        return None
+
+    def estructura(self) -> Dict[str, Any]:
+        """
+        Estructura en el formato histórico de DatabaseAnalyzer:
+        {"tables": {tabla: {"columns": {col: tipo}, "count": filas_estimadas}}}
+        """
+        with self._lock:
+            self._asegurar_esquema()
+            if self._estructura is None:
+                self._estructura = {
+                    "tables": {
+                        nombre: {"columns": info.tipos_columnas(), "count": info.filas_estimadas}
+                        for nombre, info in self._tablas.items()
+                    }
+                }
+            return self._estructura
+
+    def contexto_sql(self) -> str:
+        """Descripción de tablas, relaciones y una fila de muestra para el LLM"""
+        with self._lock:
+            self._asegurar_esquema()
+            if self._contexto_sql is None:
+                self._contexto_sql = self._generar_contexto_sql()
+            return self._contexto_sql
+
+    # ------------------------------------------------------------------
+    # Datos (dependen de data_version)
+    # ------------------------------------------------------------------
+
+    def materias(self) -> List[str]:
+        """Todas las materias con calificaciones registradas (ordenadas)"""
+        with self._lock:
+            self._asegurar_datos()
+            if self._materias is None:
+                self._materias = self._cargar_materias()
+            return list(self._materias)
+
+    def contar_filas(self, tabla: str) -> int:
+        """COUNT(*) exacto de una tabla del catálogo"""
+        with self._lock:
+            if tabla not in self.tablas():
+                raise KeyError(f"Tabla no encontrada en el catálogo: {tabla}")
+            self._asegurar_datos()
+            if tabla not in self._conteos:
+                conn = self.connection_manager.get_readonly_connection()
+                self._conteos[tabla] = conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+            return self._conteos[tabla]
+
+    def invalidar(self):
+        """Fuerza la recarga completa en el próximo acceso"""
+        with self._lock:
+            self._version_esquema = None
+            self._version_datos = None
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def _asegurar_esquema(self):
+        conn = self.connection_manager.get_readonly_connection()
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version == self._version_esquema:
+            return
+        self._tablas = self._cargar_tablas(conn)
+        self._contexto_sql = None
+        self._estructura = None
+        self._version_esquema = version
+        # Columnas nuevas pueden cambiar las materias (p. ej. al materializar calificaciones)
+        self._version_datos = None
+        self.logger.debug(f"📚 Catálogo de esquema cargado (schema_version={version}): {list(self._tablas)}")
+
+    def _asegurar_datos(self):
+        self._asegurar_esquema()
+        version = self.connection_manager.version_datos()
+        if version == self._version_datos:
+            return
+        self._materias = None
+        self._conteos = {}
+        self._version_datos = version
+
+    def _cargar_tablas(self, conn: sqlite3.Connection) -> Dict[str, TablaCatalogo]:
+        nombres = [
+            fila[0] for fila in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid"
+            )
+            if not fila[0].startswith(PREFIJOS_EXCLUIDOS)
+        ]
+        estimaciones = self._cargar_estimaciones(conn)
+
+        tablas = {}
+        for nombre in nombres:
+            info = TablaCatalogo(nombre=nombre)
+            info.columnas = [
+                ColumnaCatalogo(fila['cid'], fila['name'], fila['type'], bool(fila['notnull']),
+                                fila['dflt_value'], fila['pk'])
+                for fila in conn.execute(f'PRAGMA table_info("{nombre}")')
+            ]
+            info.llaves_foraneas = [
+                LlaveForanea(fila['from'], fila['table'], fila['to'])
+                for fila in conn.execute(f'PRAGMA foreign_key_list("{nombre}")')
+            ]
+            for fila in conn.execute(f'PRAGMA index_list("{nombre}")'):
+                columnas = tuple(
+                    c['name'] for c in conn.execute(f'PRAGMA index_info("{fila["name"]}")')
+                    if c['name'] is not None
+                )
+                info.indices.append(IndiceCatalogo(fila['name'], columnas, bool(fila['unique'])))
+
+            if nombre in estimaciones:
+                info.filas_estimadas = estimaciones[nombre]
+            else:
+                info.filas_estimadas = conn.execute(f'SELECT COUNT(*) FROM "{nombre}"').fetchone()[0]
+
+            fila_muestra = conn.execute(f'SELECT * FROM "{nombre}" LIMIT 1').fetchone()
+            info.muestra = dict(fila_muestra) if fila_muestra else {}
+            tablas[nombre] = info
+        return tablas
+
+    @staticmethod
+    def _cargar_estimaciones(conn: sqlite3.Connection) -> Dict[str, int]:
+        """Filas por tabla según sqlite_stat1 (el primer número de stat)"""
+        existe = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+        if not existe:
+            return {}
+        estimaciones: Dict[str, int] = {}
+        for tabla, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+            try:
+                filas = int(str(stat).split()[0])
+            except (ValueError, IndexError):
+                continue
+            estimaciones[tabla] = max(filas, estimaciones.get(tabla, 0))
+        return estimaciones
+
+    def _cargar_materias(self) -> List[str]:
+        conn = self.connection_manager.get_readonly_connection()
+        try:
+            # Tabla materializada (v6): DISTINCT sobre idx_calificaciones_materia_periodo
+            if self.tiene_columna('calificaciones', 'materia'):
+                return [fila[0] for fila in conn.execute(
+                    "SELECT DISTINCT materia FROM calificaciones ORDER BY materia"
+                ) if fila[0]]
+
+            # Esquemas anteriores: recorrer todo el JSON
+            materias = set()
+            for (calificaciones,) in conn.execute(
+                "SELECT calificaciones FROM datos_escolares WHERE calificaciones IS NOT NULL AND calificaciones != '[]'"
+            ):
+                try:
+                    for cal in json.loads(calificaciones):
+                        if isinstance(cal, dict) and cal.get("nombre"):
+                            materias.add(cal["nombre"])
+                except (json.JSONDecodeError, TypeError):
+                    continue
+            return sorted(materias)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error extrayendo materias: {e}")
+            return []
+
+    def _generar_contexto_sql(self) -> str:
+        partes = ["=== ESTRUCTURA DE LA BASE DE DATOS ===\n"]
+
+        for nombre, info in self._tablas.items():
+            partes.append(f"TABLA: {nombre}")
+            partes.append("-" * 40)
+
+            partes.append("COLUMNAS:")
+            for col in info.columnas:
+                pk_marker = " (PK)" if col.pk else ""
+                nullable_marker = " NOT NULL" if col.not_null else " NULL"
+                partes.append(f"  • {col.nombre}: {col.tipo}{pk_marker}{nullable_marker}")
+
+            if info.llaves_foraneas:
+                partes.append("\nRELACIONES:")
+                for fk in info.llaves_foraneas:
+                    partes.append(f"  • {fk.columna} → {fk.tabla_ref}.{fk.columna_ref}")
+
+            if info.muestra:
+                partes.append("\nDATO DE MUESTRA:")
+                for key, value in info.muestra.items():
+                    if value is not None:
+                        partes.append(f"  • {key}: {value}")
+
+            partes.append("\n")
+
+        return "\n".join(partes)
+
+
+# Un catálogo por archivo de base de datos
+_schema_catalogs: Dict[str, SchemaCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+def get_schema_catalog(db_path: Optional[str] = None) -> SchemaCatalog:
+    """
+    Obtiene el catálogo de esquema global para una base de datos
+
+    Args:
+        db_path: Ruta a la base de datos (por defecto Config.DB_PATH)
+
+    Returns:
+        Instancia compartida del SchemaCatalog
+    """
+    if db_path is None:
+        from app.core.config import Config
+        db_path = Config.DB_PATH
+
+    key = os.path.abspath(str(db_path))
+    with _catalogs_lock:
+        catalog = _schema_catalogs.get(key)
+        if catalog is None:
+            catalog = SchemaCatalog(key)
+            _schema_catalogs[key] = catalog
+    return catalog
@@ -3,12 +3,121 @@
 Maneja la creación y migración de tablas para sistema escolar completo
 """
 
+import os
 import sqlite3
 import json
 from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 from app.core.logging import get_logger
 
+# Consultas de acceso frecuente que nunca deben recorrer una tabla completa
+# (nombre, sql, parámetros de ejemplo)
+CANONICAL_QUERIES: List[Tuple[str, str, tuple]] = [
+    ("datos_escolares_ultimo_por_alumno",
+     "SELECT id, alumno_id, ciclo_escolar, grado, grupo, turno, escuela, cct, calificaciones "
+     "FROM datos_escolares WHERE alumno_id = ? ORDER BY id DESC LIMIT 1", (1,)),
+    ("datos_escolares_por_alumno",
+     "SELECT id, alumno_id, ciclo_escolar, grado, grupo, turno, escuela, cct, calificaciones "
+     "FROM datos_escolares WHERE alumno_id = ? ORDER BY id DESC", (1,)),
+    ("constancias_por_alumno",
+     "SELECT id, alumno_id, fecha_generacion FROM constancias "
+     "WHERE alumno_id = ? ORDER BY fecha_generacion DESC", (1,)),
+    ("constancias_recientes",
+     "SELECT id, alumno_id, fecha_generacion FROM constancias "
+     "ORDER BY fecha_generacion DESC LIMIT ?", (10,)),
+    ("alumnos_por_curp",
+     "SELECT id, curp, nombre FROM alumnos WHERE curp = ?", ("",)),
+    ("alumnos_por_nombre",
+     "SELECT id, curp, nombre FROM alumnos WHERE nombre = ?", ("",)),
+    ("alumnos_listado",
+     "SELECT id, curp, nombre FROM alumnos ORDER BY nombre LIMIT ? OFFSET ?", (100, 0)),
+    ("alumnos_con_datos_escolares_vigentes",
+     "SELECT a.id, a.nombre, de.grado, de.grupo FROM alumnos a "
+     "LEFT JOIN datos_escolares de ON de.id = (SELECT MAX(id) FROM datos_escolares WHERE alumno_id = a.id) "
+     "ORDER BY a.nombre LIMIT ? OFFSET ?", (100, 0)),
+    ("alumnos_por_grado",
+     "SELECT a.id, a.nombre FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id "
+     "WHERE de.grado = ?", (1,)),
+    ("alumnos_por_grado_grupo",
+     "SELECT a.id, a.nombre FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id "
+     "WHERE de.grado = ? AND de.grupo = ?", (1, "A")),
+    ("alumnos_por_grado_grupo_turno",
+     "SELECT a.id, a.nombre FROM alumnos a JOIN datos_escolares de ON a.id = de.alumno_id "
+     "WHERE de.grado = ? AND de.grupo = ? AND de.turno = ?", (1, "A", "MATUTINO")),
+    ("calificaciones_por_materia",
+     "SELECT datos_escolares_id FROM calificaciones "
+     "WHERE materia = ? AND periodo = 'promedio' AND calificacion > ?", ("LENGUAJES", 8.0)),
+    ("calificaciones_promedio_por_registro",
+     "SELECT datos_escolares_id, AVG(calificacion) FROM calificaciones "
+     "WHERE periodo = 'promedio' AND calificacion != 0 GROUP BY datos_escolares_id", ()),
+    ("datos_escolares_con_calificaciones",
+     "SELECT COUNT(*) FROM datos_escolares WHERE tiene_calificaciones = ? AND grado = ?", (1, 1)),
+    ("datos_escolares_por_promedio_general",
+     "SELECT id, alumno_id FROM datos_escolares WHERE promedio_general > ?", (8.0,)),
+    ("alumnos_por_anio_nacimiento",
+     "SELECT id, nombre FROM alumnos WHERE anio_nacimiento = ?", (2018,)),
+    # AlumnoRepository.list_page_with_datos_escolares: paginación por (nombre, id)
+    ("alumnos_pagina_por_nombre",
+     "SELECT id, nombre FROM alumnos WHERE (nombre, id) > (?, ?) ORDER BY nombre, id LIMIT ?",
+     ('M', 0, 100)),
+]
+
+# Extrae una fila por (registro, materia, periodo) del JSON de datos_escolares.calificaciones
+# {fila}: alias del registro ("new" dentro de triggers, "de" en el respaldo inicial)
+# {origen}: tabla adicional del FROM (vacío en triggers)
+SQL_EXTRAER_CALIFICACIONES = """
+    SELECT {fila}.id, {fila}.alumno_id,
+           json_extract(materia.value, '$.nombre'),
+           periodo.clave,
+           CAST(json_extract(materia.value, '$.' || periodo.clave) AS REAL)
+    FROM {origen}
+         json_each(CASE WHEN json_valid({fila}.calificaciones) THEN {fila}.calificaciones ELSE '[]' END) AS materia,
+         (SELECT 'i' AS clave UNION ALL SELECT 'ii' UNION ALL SELECT 'iii' UNION ALL SELECT 'promedio') AS periodo
+    WHERE materia.type = 'object'
+      AND json_extract(materia.value, '$.nombre') IS NOT NULL
+      AND json_extract(materia.value, '$.' || periodo.clave) IS NOT NULL
+"""
+
+# Recalcula las columnas derivadas de un registro escolar a partir de la tabla calificaciones
+SQL_ACTUALIZAR_DERIVADOS_REGISTRO = """
+    UPDATE datos_escolares SET
+        tiene_calificaciones = (calificaciones IS NOT NULL AND calificaciones != '' AND calificaciones != '[]'),
+        promedio_general = (
+            SELECT AVG(c.calificacion) FROM calificaciones c
+            WHERE c.datos_escolares_id = datos_escolares.id
+              AND c.periodo = 'promedio' AND c.calificacion != 0
+        )
+    WHERE {condicion}
+"""
+
+# Año y mes de nacimiento. fecha_nacimiento se guarda como llega: "AAAA-MM-DD"
+# desde la interfaz, "DD/MM/AAAA" o "26 DE MAYO DEL 2018" desde los PDF.
+# Cualquier otro formato queda en NULL
+_FECHA_NACIMIENTO = "upper(trim(fecha_nacimiento))"
+_FECHA_ISO = f"{_FECHA_NACIMIENTO} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*'"
+_FECHA_BARRAS = f"{_FECHA_NACIMIENTO} GLOB '[0-9]*/[0-9]*/[0-9][0-9][0-9][0-9]'"
+_FECHA_TEXTO = f"{_FECHA_NACIMIENTO} GLOB '[0-9]* DE *[0-9][0-9][0-9][0-9]'"
+_MESES = ["ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO", "AGOSTO",
+          "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"]
+_MES_TEXTO = "CASE " + " ".join(
+    f"WHEN instr({_FECHA_NACIMIENTO}, ' {mes} ') > 0 THEN {numero}"
+    for numero, mes in enumerate(_MESES, start=1)
+) + " END"
+
+SQL_ACTUALIZAR_NACIMIENTO = f"""
+    UPDATE alumnos SET
+        anio_nacimiento = CASE
+            WHEN {_FECHA_ISO} THEN CAST(substr({_FECHA_NACIMIENTO}, 1, 4) AS INTEGER)
+            WHEN {_FECHA_BARRAS} OR {_FECHA_TEXTO} THEN CAST(substr({_FECHA_NACIMIENTO}, -4) AS INTEGER)
+        END,
+        mes_nacimiento = CASE
+            WHEN {_FECHA_ISO} THEN CAST(substr({_FECHA_NACIMIENTO}, 6, 2) AS INTEGER)
+            WHEN {_FECHA_BARRAS} THEN CAST(substr({_FECHA_NACIMIENTO}, instr({_FECHA_NACIMIENTO}, '/') + 1, 2) AS INTEGER)
+            WHEN {_FECHA_TEXTO} THEN {_MES_TEXTO}
+        END
+    WHERE {{condicion}}
+"""
+
 class SchemaMigrator:
     """
     🗄️ MIGRADOR DE ESQUEMA DE BASE DE DATOS
@@ -19,6 +128,19 @@ class SchemaMigrator:
     - Mantener compatibilidad con código actual
     - Validar integridad de datos
     """
+
+    # (versión, descripción, método) en orden de aplicación
+    MIGRACIONES = [
+        (1, "Crear tablas básicas del sistema escolar", "_migrate_to_v1"),
+        (2, "Agregar índices y optimizaciones", "_migrate_to_v2"),
+        (3, "Agregar campos adicionales", "_migrate_to_v3"),
+        (4, "Agregar índices de cobertura para consultas frecuentes", "_migrate_to_v4"),
+        (5, "Agregar índice FTS5 de nombre/CURP sin acentos", "_migrate_to_v5"),
+        (6, "Materializar calificaciones por materia y periodo", "_migrate_to_v6"),
+        (7, "Agregar columnas derivadas de calificaciones y nacimiento", "_migrate_to_v7"),
+        (8, "Leer año/mes de nacimiento de las fechas extraídas de PDF", "_migrate_to_v8"),
+    ]
+    ULTIMA_VERSION = MIGRACIONES[-1][0]
     
     def __init__(self, db_path: str):
         self.db_path = db_path
@@ -84,16 +206,10 @@ class SchemaMigrator:
             current_version = self.get_current_schema_version()
             self.logger.info(f"🔍 Versión actual del esquema: {current_version}")
             
-            migrations = [
-                (1, "Crear tablas básicas del sistema escolar", self._migrate_to_v1),
-                (2, "Agregar índices y optimizaciones", self._migrate_to_v2),
-                (3, "Agregar campos adicionales", self._migrate_to_v3)
-            ]
-            
-            for version, description, migration_func in migrations:
+            for version, description, metodo in self.MIGRACIONES:
                 if current_version < version:
                     self.logger.info(f"🚀 Aplicando migración v{version}: {description}")
-                    success = migration_func()
+                    success = getattr(self, metodo)()
                     if success:
                         self.set_schema_version(version, description)
                     else:
@@ -325,6 +441,333 @@ class SchemaMigrator:
             self.conn.rollback()
             return False
     
+    def _migrate_to_v4(self) -> bool:
+        """Migración v4: Índices de cobertura para los accesos más frecuentes"""
+        try:
+            cursor = self.conn.cursor()
+
+            # Los índices de SQLite incluyen el rowid al final: (alumno_id) sirve también
+            # para ORDER BY id DESC y (nombre) para ordenar por (nombre, id)
+            indices = [
+                # get_by_alumno(latest_only=True): WHERE alumno_id = ? ORDER BY id DESC LIMIT 1
+                "CREATE INDEX IF NOT EXISTS idx_datos_escolares_alumno ON datos_escolares(alumno_id)",
+                # Filtros del ActionExecutor por grado/grupo/turno con join a alumnos
+                "CREATE INDEX IF NOT EXISTS idx_datos_escolares_grado_grupo_turno ON datos_escolares(grado, grupo, turno, alumno_id)",
+                # ConstanciaRepository.get_by_alumno: WHERE alumno_id = ? ORDER BY fecha_generacion DESC
+                "CREATE INDEX IF NOT EXISTS idx_constancias_alumno_fecha ON constancias(alumno_id, fecha_generacion)",
+                # ConstanciaRepository.list_recent: ORDER BY fecha_generacion DESC LIMIT ?
+                "CREATE INDEX IF NOT EXISTS idx_constancias_fecha ON constancias(fecha_generacion)",
+                # AlumnoRepository.list_all / search: ORDER BY nombre
+                "CREATE INDEX IF NOT EXISTS idx_alumnos_nombre ON alumnos(nombre)",
+                # Reemplazado por idx_datos_escolares_grado_grupo_turno (mismo prefijo)
+                "DROP INDEX IF EXISTS idx_datos_escolares_grado_grupo"
+            ]
+
+            for indice in indices:
+                cursor.execute(indice)
+
+            # Estadísticas para el planificador (sqlite_stat1)
+            cursor.execute("ANALYZE")
+
+            self.conn.commit()
+            self.logger.info("✅ Índices de cobertura creados exitosamente")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error en migración v4: {e}")
+            self.conn.rollback()
+            return False
+
+    def _migrate_to_v5(self) -> bool:
+        """Migración v5: Índice FTS5 de nombre/CURP sin acentos ni mayúsculas"""
+        try:
+            cursor = self.conn.cursor()
+
+            try:
+                # remove_diacritics 2: "José" y "JOSE" producen el mismo token
+                cursor.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS alumnos_fts USING fts5(
+                        nombre,
+                        curp,
+                        content='alumnos',
+                        content_rowid='id',
+                        tokenize="unicode61 remove_diacritics 2"
+                    )
+                """)
+            except sqlite3.OperationalError as e:
+                # SQLite compilado sin FTS5: la búsqueda sigue usando LIKE
+                self.logger.warning(f"⚠️ FTS5 no disponible, se omite el índice de búsqueda: {e}")
+                return True
+
+            # Triggers para mantener el índice sincronizado con alumnos
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS alumnos_fts_ai AFTER INSERT ON alumnos BEGIN
+                    INSERT INTO alumnos_fts(rowid, nombre, curp) VALUES (new.id, new.nombre, new.curp);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS alumnos_fts_ad AFTER DELETE ON alumnos BEGIN
+                    INSERT INTO alumnos_fts(alumnos_fts, rowid, nombre, curp)
+                    VALUES ('delete', old.id, old.nombre, old.curp);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS alumnos_fts_au AFTER UPDATE OF nombre, curp ON alumnos BEGIN
+                    INSERT INTO alumnos_fts(alumnos_fts, rowid, nombre, curp)
+                    VALUES ('delete', old.id, old.nombre, old.curp);
+                    INSERT INTO alumnos_fts(rowid, nombre, curp) VALUES (new.id, new.nombre, new.curp);
+                END
+            """)
+
+            # Indexar los alumnos existentes
+            cursor.execute("INSERT INTO alumnos_fts(alumnos_fts) VALUES ('rebuild')")
+
+            self.conn.commit()
+            self.logger.info("✅ Índice FTS5 de alumnos creado exitosamente")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error en migración v5: {e}")
+            self.conn.rollback()
+            return False
+
+    def _migrate_to_v6(self) -> bool:
+        """Migración v6: Tabla calificaciones (registro, materia, periodo) sincronizada por triggers"""
+        try:
+            cursor = self.conn.cursor()
+
+            # La tabla calificaciones de v1 (por materia_id/grupo_id) nunca se usó:
+            # se reemplaza si está vacía y se conserva renombrada si tiene datos
+            columnas = [row[1] for row in cursor.execute("PRAGMA table_info(calificaciones)")]
+            if "materia_id" in columnas:
+                total = cursor.execute("SELECT COUNT(*) FROM calificaciones").fetchone()[0]
+                if total:
+                    cursor.execute("ALTER TABLE calificaciones RENAME TO calificaciones_v1")
+                    self.logger.warning(f"⚠️ Tabla calificaciones de v1 con {total} filas renombrada a calificaciones_v1")
+                else:
+                    cursor.execute("DROP TABLE calificaciones")
+
+            # periodo: 'i', 'ii', 'iii' o 'promedio' (mismas claves que el JSON)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS calificaciones (
+                    datos_escolares_id INTEGER NOT NULL,
+                    alumno_id INTEGER NOT NULL,
+                    materia TEXT NOT NULL,
+                    periodo TEXT NOT NULL,
+                    calificacion REAL,
+                    PRIMARY KEY (datos_escolares_id, materia, periodo),
+                    FOREIGN KEY (datos_escolares_id) REFERENCES datos_escolares(id)
+                ) WITHOUT ROWID
+            """)
+
+            indices = [
+                # Filtros por materia: WHERE materia = ? AND periodo = 'promedio' AND calificacion > ?
+                "CREATE INDEX IF NOT EXISTS idx_calificaciones_materia_periodo ON calificaciones(materia, periodo, calificacion)",
+                # Promedio general por registro: WHERE periodo = 'promedio' GROUP BY datos_escolares_id
+                "CREATE INDEX IF NOT EXISTS idx_calificaciones_periodo_registro ON calificaciones(periodo, datos_escolares_id, calificacion)",
+                "CREATE INDEX IF NOT EXISTS idx_calificaciones_alumno ON calificaciones(alumno_id)"
+            ]
+            for indice in indices:
+                cursor.execute(indice)
+
+            # Triggers: cualquier escritura en datos_escolares mantiene la tabla al día
+            extraer_nuevas = SQL_EXTRAER_CALIFICACIONES.format(fila="new", origen="")
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS calificaciones_ai AFTER INSERT ON datos_escolares BEGIN
+                    INSERT OR REPLACE INTO calificaciones (datos_escolares_id, alumno_id, materia, periodo, calificacion)
+                    {extraer_nuevas};
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS calificaciones_ad AFTER DELETE ON datos_escolares BEGIN
+                    DELETE FROM calificaciones WHERE datos_escolares_id = old.id;
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS calificaciones_au AFTER UPDATE OF alumno_id, calificaciones ON datos_escolares BEGIN
+                    DELETE FROM calificaciones WHERE datos_escolares_id = old.id;
+                    INSERT OR REPLACE INTO calificaciones (datos_escolares_id, alumno_id, materia, periodo, calificacion)
+                    {extraer_nuevas};
+                END
+            """)
+
+            # Respaldo inicial desde el JSON existente
+            cursor.execute("DELETE FROM calificaciones")
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO calificaciones (datos_escolares_id, alumno_id, materia, periodo, calificacion)
+                {SQL_EXTRAER_CALIFICACIONES.format(fila="de", origen="datos_escolares AS de,")}
+            """)
+            total = cursor.execute("SELECT COUNT(*) FROM calificaciones").fetchone()[0]
+
+            # La vista (creada fuera de las migraciones) ahora lee la tabla indexada
+            cursor.execute("DROP VIEW IF EXISTS calificaciones_normalizadas")
+            cursor.execute("""
+                CREATE VIEW calificaciones_normalizadas AS
+                SELECT
+                    de.id AS datos_escolares_id,
+                    de.alumno_id,
+                    a.nombre AS alumno_nombre,
+                    a.curp,
+                    a.matricula,
+                    de.ciclo_escolar,
+                    de.grado,
+                    de.grupo,
+                    de.turno,
+                    de.escuela,
+                    de.cct,
+                    c.materia,
+                    MAX(CASE WHEN c.periodo = 'i' THEN c.calificacion END) AS periodo_1,
+                    MAX(CASE WHEN c.periodo = 'ii' THEN c.calificacion END) AS periodo_2,
+                    MAX(CASE WHEN c.periodo = 'iii' THEN c.calificacion END) AS periodo_3,
+                    MAX(CASE WHEN c.periodo = 'promedio' THEN c.calificacion END) AS promedio
+                FROM calificaciones c
+                JOIN datos_escolares de ON de.id = c.datos_escolares_id
+                JOIN alumnos a ON a.id = de.alumno_id
+                GROUP BY c.datos_escolares_id, c.materia
+            """)
+
+            cursor.execute("ANALYZE calificaciones")
+
+            self.conn.commit()
+            self.logger.info(f"✅ Tabla calificaciones materializada: {total} filas")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error en migración v6: {e}")
+            self.conn.rollback()
+            return False
+
+    def _migrate_to_v7(self) -> bool:
+        """Migración v7: Columnas derivadas (tiene_calificaciones, promedio_general, año/mes de nacimiento)"""
+        try:
+            cursor = self.conn.cursor()
+
+            columnas_derivadas = [
+                ("datos_escolares", "tiene_calificaciones", "INTEGER NOT NULL DEFAULT 0"),
+                ("datos_escolares", "promedio_general", "REAL"),
+                ("alumnos", "anio_nacimiento", "INTEGER"),
+                ("alumnos", "mes_nacimiento", "INTEGER")
+            ]
+
+            for tabla, campo, tipo in columnas_derivadas:
+                try:
+                    cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {campo} {tipo}")
+                    self.logger.info(f"✅ Campo {campo} agregado a tabla {tabla}")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column name" in str(e).lower():
+                        self.logger.info(f"ℹ️ Campo {campo} ya existe en tabla {tabla}")
+                    else:
+                        raise
+
+            indices = [
+                "CREATE INDEX IF NOT EXISTS idx_datos_escolares_tiene_calificaciones ON datos_escolares(tiene_calificaciones, grado, grupo)",
+                "CREATE INDEX IF NOT EXISTS idx_datos_escolares_promedio_general ON datos_escolares(promedio_general)",
+                "CREATE INDEX IF NOT EXISTS idx_alumnos_nacimiento ON alumnos(anio_nacimiento, mes_nacimiento)"
+            ]
+            for indice in indices:
+                cursor.execute(indice)
+
+            # Los triggers de v6 se reemplazan para recalcular las columnas derivadas
+            # justo después de refrescar la tabla calificaciones (mismo cuerpo, orden garantizado)
+            extraer_nuevas = SQL_EXTRAER_CALIFICACIONES.format(fila="new", origen="")
+            derivados_nuevos = SQL_ACTUALIZAR_DERIVADOS_REGISTRO.format(condicion="id = new.id")
+            cursor.execute("DROP TRIGGER IF EXISTS calificaciones_ai")
+            cursor.execute("DROP TRIGGER IF EXISTS calificaciones_au")
+            cursor.execute(f"""
+                CREATE TRIGGER calificaciones_ai AFTER INSERT ON datos_escolares BEGIN
+                    INSERT OR REPLACE INTO calificaciones (datos_escolares_id, alumno_id, materia, periodo, calificacion)
+                    {extraer_nuevas};
+                    {derivados_nuevos};
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER calificaciones_au AFTER UPDATE OF alumno_id, calificaciones ON datos_escolares BEGIN
+                    DELETE FROM calificaciones WHERE datos_escolares_id = old.id;
+                    INSERT OR REPLACE INTO calificaciones (datos_escolares_id, alumno_id, materia, periodo, calificacion)
+                    {extraer_nuevas};
+                    {derivados_nuevos};
+                END
+            """)
+
+            self._crear_triggers_nacimiento(cursor)
+
+            # Calcular los valores de los registros existentes
+            cursor.execute(SQL_ACTUALIZAR_DERIVADOS_REGISTRO.format(condicion="1 = 1"))
+            cursor.execute(SQL_ACTUALIZAR_NACIMIENTO.format(condicion="1 = 1"))
+
+            cursor.execute("ANALYZE datos_escolares")
+            cursor.execute("ANALYZE alumnos")
+
+            self.conn.commit()
+            self.logger.info("✅ Columnas derivadas agregadas exitosamente")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error en migración v7: {e}")
+            self.conn.rollback()
+            return False
+
+    def _migrate_to_v8(self) -> bool:
+        """Migración v8: Año/mes de nacimiento también para fechas DD/MM/AAAA y "DD DE MES DEL AAAA" """
+        try:
+            cursor = self.conn.cursor()
+
+            # Los triggers de v7 solo entendían fechas ISO: se reemplazan y se recalcula
+            self._crear_triggers_nacimiento(cursor)
+            cursor.execute(SQL_ACTUALIZAR_NACIMIENTO.format(condicion="1 = 1"))
+            cursor.execute("ANALYZE alumnos")
+
+            self.conn.commit()
+            self.logger.info("✅ Año/mes de nacimiento recalculados")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error en migración v8: {e}")
+            self.conn.rollback()
+            return False
+
+    @staticmethod
+    def _crear_triggers_nacimiento(cursor):
+        """(Re)crea los triggers que mantienen anio_nacimiento y mes_nacimiento"""
+        nacimiento_nuevo = SQL_ACTUALIZAR_NACIMIENTO.format(condicion="id = new.id")
+        cursor.execute("DROP TRIGGER IF EXISTS alumnos_nacimiento_ai")
+        cursor.execute("DROP TRIGGER IF EXISTS alumnos_nacimiento_au")
+        cursor.execute(f"""
+            CREATE TRIGGER alumnos_nacimiento_ai AFTER INSERT ON alumnos BEGIN
+                {nacimiento_nuevo};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER alumnos_nacimiento_au AFTER UPDATE OF fecha_nacimiento ON alumnos BEGIN
+                {nacimiento_nuevo};
+            END
+        """)
+
+    def verify_query_plans(self) -> Dict[str, str]:
+        """
+        Ejecuta EXPLAIN QUERY PLAN sobre las consultas canónicas
+
+        Returns:
+            Diccionario {consulta: plan} con las consultas que recorren una tabla completa
+            (vacío si todas usan índice)
+        """
+        cursor = self.conn.cursor()
+        full_scans = {}
+
+        for name, sql, params in CANONICAL_QUERIES:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            details = [row[3] for row in cursor.fetchall()]
+
+            # "SCAN tabla" sin "USING ... INDEX" es un recorrido completo de la tabla
+            if any(detail.startswith("SCAN") and "INDEX" not in detail for detail in details):
+                full_scans[name] = " | ".join(details)
+                self.logger.error(f"❌ Consulta '{name}' hace recorrido completo: {full_scans[name]}")
+
+        if not full_scans:
+            self.logger.info(f"✅ {len(CANONICAL_QUERIES)} consultas canónicas usan índices")
+
+        return full_scans
+
     def populate_initial_data(self, school_config: Dict) -> bool:
         """Poblar datos iniciales basados en configuración escolar"""
         try:
@@ -389,6 +832,29 @@ class SchemaMigrator:
             return {}
 
 
+def version_esquema(db_path: str) -> int:
+    """
+    Versión del esquema de una base sin modificarla (conexión mode=ro)
+
+    Returns:
+        Versión aplicada (0 si la base no tiene tabla schema_version)
+
+    Raises:
+        sqlite3.Error: Si la base no existe o no se puede leer
+    """
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        existe = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        ).fetchone()
+        if not existe:
+            return 0
+        version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+        return version or 0
+    finally:
+        conn.close()
+
+
 def migrate_database(db_path: str, school_config: Dict = None) -> bool:
     """
     Función principal para migrar base de datos
@@ -421,6 +887,10 @@ def migrate_database(db_path: str, school_config: Dict = None) -> bool:
         if tablas_faltantes:
             migrator.logger.error(f"❌ Tablas faltantes: {tablas_faltantes}")
             return False
+
+        # Validar que los accesos frecuentes usen índices
+        if migrator.verify_query_plans():
+            return False
         
         migrator.logger.info("✅ Migración completada exitosamente")
         return True
@@ -3,12 +3,16 @@ Gestor de base de datos para operaciones administrativas
 """
 import os
 import sqlite3
-import shutil
 import json
 from datetime import datetime
 from typing import List, Tuple, Dict, Any, Optional
 from app.core.config import Config
 from app.core.executable_paths import get_path_manager
+from app.core.database.backup_store import SnapshotInfo, get_backup_store
+from app.core.database.schema_catalog import get_schema_catalog
+from app.core.database.schema_migrator import migrate_database
+from app.data.indices.cubo_agregados import get_cubo_agregados
+from app.data.indices.nombre_index import get_nombre_index
 
 class DatabaseManager:
     """Gestor de base de datos para operaciones administrativas"""
@@ -38,8 +42,8 @@ class DatabaseManager:
         Returns:
             Lista de nombres de tablas
         """
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-        return [row[0] for row in self.cursor.fetchall()]
+        # El catálogo excluye el índice FTS (alumnos_fts y sus tablas sombra): se mantiene con triggers
+        return list(get_schema_catalog(self.db_path).tablas())
 
     def get_table_info(self, table_name: str) -> List[Dict[str, Any]]:
         """
@@ -51,18 +55,8 @@ class DatabaseManager:
         Returns:
             Lista de diccionarios con información de las columnas
         """
-        self.cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = []
-        for row in self.cursor.fetchall():
-            columns.append({
-                'cid': row['cid'],
-                'name': row['name'],
-                'type': row['type'],
-                'notnull': row['notnull'],
-                'dflt_value': row['dflt_value'],
-                'pk': row['pk']
-            })
-        return columns
+        tabla = get_schema_catalog(self.db_path).tabla(table_name)
+        return [columna.to_dict() for columna in tabla.columnas] if tabla else []
 
     def get_table_row_count(self, table_name: str) -> int:
         """
@@ -74,8 +68,8 @@ class DatabaseManager:
         Returns:
             Número de filas
         """
-        self.cursor.execute(f"SELECT COUNT(*) as count FROM {table_name}")
-        return self.cursor.fetchone()['count']
+        # Conteo exacto, recalculado solo si la base cambió desde la última vez
+        return get_schema_catalog(self.db_path).contar_filas(table_name)
 
     def truncate_table(self, table_name: str) -> Tuple[bool, str]:
         """
@@ -94,6 +88,10 @@ class DatabaseManager:
             self.cursor.execute(f"DELETE FROM sqlite_sequence WHERE name='{table_name}'")
 
             self.conn.commit()
+            if table_name == "alumnos":
+                get_nombre_index().invalidar()
+            if table_name in ("alumnos", "datos_escolares"):
+                get_cubo_agregados().invalidar()
             return True, f"Tabla {table_name} vaciada correctamente"
         except Exception as e:
             return False, f"Error al vaciar tabla {table_name}: {str(e)}"
@@ -114,75 +112,71 @@ class DatabaseManager:
 
         return results
 
-    def backup_database(self) -> Tuple[bool, str, Optional[str]]:
+    def backup_database(self, reason: str = "manual") -> Tuple[bool, str, Optional[str]]:
         """
-        Crea una copia de seguridad de la base de datos
+        Crea una instantánea de la base de datos sin cerrar conexiones
+
+        La copia se hace con la API de respaldo de SQLite y se guarda en el
+        almacén deduplicado (solo se escriben los fragmentos que cambiaron);
+        luego se aplica la política de retención.
+
+        Args:
+            reason: Motivo del respaldo (se muestra al listar instantáneas)
 
         Returns:
-            Tupla con (éxito, mensaje, ruta_backup)
+            Tupla con (éxito, mensaje, id_instantánea)
         """
         try:
-            # Usar gestor de rutas para directorio de backups
-            path_manager = get_path_manager()
-            backup_dir = path_manager.get_data_dir() / "backups"
-            backup_dir.mkdir(parents=True, exist_ok=True)
-
-            # Generar nombre de archivo con timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = backup_dir / f"alumnos_backup_{timestamp}.db"
-
-            # Cerrar la conexión actual para evitar problemas
-            self.close()
-
-            # Copiar la base de datos
-            shutil.copy2(self.db_path, str(backup_file))
-
-            # Reabrir la conexión
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-            self.cursor = self.conn.cursor()
-
-            return True, f"Respaldo creado: {backup_file}", str(backup_file)
+            store = get_backup_store()
+            info = store.create_snapshot(self.conn, reason=reason)
+            store.apply_retention()
+
+            return True, (
+                f"Respaldo creado: {info.describe()}\n"
+                f"{info.new_chunks} de {len(info.chunks)} fragmentos nuevos "
+                f"({info.bytes_written / 1024:.1f} KB escritos)"
+            ), info.id
         except Exception as e:
             return False, f"Error al crear respaldo: {str(e)}", None
 
-    def restore_database(self, backup_path: str) -> Tuple[bool, str]:
+    def list_backups(self) -> List[SnapshotInfo]:
+        """Instantáneas disponibles, de la más reciente a la más antigua"""
+        return get_backup_store().list_snapshots()
+
+    def restore_database(self, backup: str) -> Tuple[bool, str]:
         """
-        Restaura la base de datos desde una copia de seguridad
+        Restaura la base de datos sin cerrar las conexiones en uso
 
         Args:
-            backup_path: Ruta al archivo de respaldo
+            backup: ID de una instantánea del almacén o ruta a un archivo .db
+                    (respaldos anteriores al almacén)
 
         Returns:
             Tupla con (éxito, mensaje)
         """
         try:
-            # Verificar que el archivo de respaldo existe
-            if not os.path.exists(backup_path):
-                return False, f"El archivo de respaldo {backup_path} no existe"
-
-            # Cerrar la conexión actual
-            self.close()
-
-            # Hacer una copia de seguridad antes de restaurar
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pre_restore_backup = os.path.join(
-                os.path.dirname(self.db_path),
-                "backups",
-                f"pre_restore_backup_{timestamp}.db"
-            )
-            os.makedirs(os.path.dirname(pre_restore_backup), exist_ok=True)
-            shutil.copy2(self.db_path, pre_restore_backup)
-
-            # Restaurar la base de datos
-            shutil.copy2(backup_path, self.db_path)
-
-            # Reabrir la conexión
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-            self.cursor = self.conn.cursor()
-
-            return True, f"Base de datos restaurada desde {backup_path}"
+            store = get_backup_store()
+            snapshot = store.get_snapshot(backup)
+            if snapshot is None and not os.path.exists(backup):
+                return False, f"El respaldo {backup} no existe"
+
+            # Instantánea del estado actual antes de restaurar
+            store.create_snapshot(self.conn, reason="antes de restaurar")
+
+            if snapshot is not None:
+                store.restore_snapshot(snapshot.id, self.conn)
+                origen = snapshot.describe()
+            else:
+                store.restore_into(backup, self.conn)
+                origen = backup
+
+            # El respaldo puede ser de una versión anterior del esquema
+            migrate_database(self.db_path)
+            get_nombre_index().invalidar()
+            get_schema_catalog(self.db_path).invalidar()
+            get_cubo_agregados().invalidar()
+
+            return True, f"Base de datos restaurada desde {origen}"
         except Exception as e:
             return False, f"Error al restaurar base de datos: {str(e)}"
 
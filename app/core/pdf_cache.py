@@ -0,0 +1,240 @@
+"""
+Caché de constancias ya renderizadas
+
+Una constancia se identifica por el hash de lo que determina su contenido:
+tipo, renderizador y su versión, fuente de la plantilla, datos ya preparados,
+y bytes de la foto y del logo. Si se pide otra vez la misma constancia (la
+vista previa y luego la definitiva, o el mismo alumno dos veces) el PDF se
+entrega desde el caché con una copia del archivo, sin volver a renderizar.
+
+    <temp>/render_cache/<hash>.pdf
+
+El caché tiene un tamaño máximo (Config.PDF['render_cache_max_mb']); al
+superarlo se eliminan primero las entradas usadas hace más tiempo.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import Config
+from app.core.executable_paths import get_path_manager
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Datos que no cambian el documento (la foto se identifica por sus bytes)
+_CLAVES_IGNORADAS = {"foto_path"}
+
+
+def copiar_archivo(origen: str, destino: str):
+    """
+    Pone en destino una copia propia del contenido de origen
+
+    Nunca un enlace duro: destino (un archivo del usuario o una entrada del
+    caché) se puede firmar o anotar en su lugar, y con un enlace ese cambio
+    aparecería también en el otro archivo. Si destino ya existe se reemplaza
+    de forma atómica.
+    """
+    if os.path.exists(destino) and os.path.samefile(origen, destino):
+        return
+
+    temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(origen, temporal)
+        os.replace(temporal, destino)
+    finally:
+        # Si la copia o el reemplazo fallaron, no dejar el temporal
+        if os.path.lexists(temporal):
+            try:
+                os.unlink(temporal)
+            except OSError:
+                pass
+
+
+class RenderCache:
+    """
+    💾 CACHÉ DE RENDERIZADO
+
+    Responsabilidades:
+    - Calcular la clave de contenido de una constancia
+    - Entregar una copia de una constancia ya renderizada en la ruta pedida
+    - Guardar las constancias nuevas y limitar el tamaño total del caché
+    """
+
+    def __init__(self, directorio: Path, max_bytes: int):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._tamano_total: Optional[int] = None
+        # Hash de archivos (plantillas, fotos, logo) por (ruta, mtime, tamaño)
+        self._hashes_archivo: Dict[Tuple[str, int, int], str] = {}
+        self._stats = {'aciertos': 0, 'fallos': 0, 'guardados': 0, 'eliminados': 0}
+
+    # ------------------------------------------------------------------
+    # Clave
+    # ------------------------------------------------------------------
+
+    def _hash_archivo(self, ruta) -> str:
+        """SHA-256 del archivo ("" si no existe), recordado mientras no cambie"""
+        ruta = str(ruta)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            return ""
+        firma = (ruta, estado.st_mtime_ns, estado.st_size)
+        valor = self._hashes_archivo.get(firma)
+        if valor is None:
+            with open(ruta, "rb") as f:
+                valor = hashlib.sha256(f.read()).hexdigest()
+            if len(self._hashes_archivo) > 512:
+                self._hashes_archivo.clear()
+            self._hashes_archivo[firma] = valor
+        return valor
+
+    def clave(self, tipo_constancia: str, renderizador, datos: Dict[str, Any],
+              plantilla: Optional[str] = None) -> str:
+        """
+        Clave de contenido de la constancia
+
+        Args:
+            tipo_constancia: estudio, calificaciones o traslado
+            renderizador: RenderizadorPDF que la generaría (nombre y versión)
+            datos: Datos ya preparados (PDFGenerator.preparar_datos)
+            plantilla: Ruta de la plantilla HTML si el renderizador la usa
+        """
+        path_manager = get_path_manager()
+        foto = ""
+        if datos.get("has_photo"):
+            curp = datos.get("curp", "")
+            foto = self._hash_archivo(path_manager.get_photos_dir() / f"{curp}.jpg")
+            if not foto and datos.get("foto_path"):
+                foto = self._hash_archivo(datos["foto_path"])
+
+        contenido = {
+            "tipo": tipo_constancia,
+            "renderizador": renderizador.nombre,
+            "version": getattr(renderizador, "version", 0),
+            "plantilla": self._hash_archivo(plantilla) if plantilla else "",
+            "datos": {k: v for k, v in datos.items() if k not in _CLAVES_IGNORADAS},
+            "foto": foto,
+            "logo": self._hash_archivo(path_manager.get_logos_dir() / "logo_educacion.png"),
+        }
+        serializado = json.dumps(contenido, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Entradas
+    # ------------------------------------------------------------------
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / f"{clave}.pdf"
+
+    def obtener(self, clave: str, destino: str) -> bool:
+        """Pone la constancia en destino si está en el caché (True si estaba)"""
+        entrada = self._ruta(clave)
+        try:
+            if entrada.stat().st_size == 0:
+                raise FileNotFoundError(entrada)
+            copiar_archivo(str(entrada), destino)
+            os.utime(entrada)  # Usada ahora: es la última en eliminarse
+        except OSError:
+            self._stats['fallos'] += 1
+            return False
+        self._stats['aciertos'] += 1
+        logger.debug(f"Constancia tomada del caché de renderizado: {destino}")
+        return True
+
+    def guardar(self, clave: str, ruta: str):
+        """Agrega al caché el PDF recién generado en ruta"""
+        entrada = self._ruta(clave)
+        try:
+            tamano = os.path.getsize(ruta)
+            if tamano == 0 or tamano > self.max_bytes:
+                return
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            existia = entrada.exists()
+            copiar_archivo(ruta, str(entrada))
+        except OSError as e:
+            logger.debug(f"No se pudo guardar la constancia en el caché: {e}")
+            return
+
+        self._stats['guardados'] += 1
+        with self._lock:
+            if self._tamano_total is not None and not existia:
+                self._tamano_total += tamano
+        self._limitar_tamano()
+
+    def _limitar_tamano(self):
+        """Elimina las entradas usadas hace más tiempo hasta quedar bajo el 90% del máximo"""
+        with self._lock:
+            if self._tamano_total is None:
+                self._tamano_total = sum(self._tamanos())
+            if self._tamano_total <= self.max_bytes:
+                return
+
+            entradas = []
+            for entrada in self.directorio.glob("*.pdf"):
+                try:
+                    estado = entrada.stat()
+                except OSError:
+                    continue
+                entradas.append((estado.st_mtime, estado.st_size, entrada))
+            entradas.sort()
+
+            total = sum(tamano for _, tamano, _ in entradas)
+            objetivo = self.max_bytes * 0.9
+            for _, tamano, entrada in entradas:
+                if total <= objetivo:
+                    break
+                try:
+                    entrada.unlink()
+                except OSError:
+                    continue
+                total -= tamano
+                self._stats['eliminados'] += 1
+            self._tamano_total = total
+
+    def _tamanos(self):
+        for entrada in self.directorio.glob("*.pdf"):
+            try:
+                yield entrada.stat().st_size
+            except OSError:
+                continue
+
+    def limpiar(self):
+        """Elimina todas las entradas del caché"""
+        with self._lock:
+            for entrada in self.directorio.glob("*.pdf"):
+                try:
+                    entrada.unlink()
+                except OSError:
+                    pass
+            self._tamano_total = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos, fallos, guardados, eliminados y tamaño actual"""
+        with self._lock:
+            if self._tamano_total is None:
+                self._tamano_total = sum(self._tamanos())
+            return dict(self._stats, bytes=self._tamano_total, max_bytes=self.max_bytes)
+
+
+# Instancia global
+_render_cache: Optional[RenderCache] = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> Optional[RenderCache]:
+    """Caché de renderizado del proceso (None si está deshabilitado en Config.PDF)"""
+    global _render_cache
+    if not Config.PDF.get('render_cache_enabled', True):
+        return None
+    with _render_cache_lock:
+        if _render_cache is None:
+            directorio = get_path_manager().get_temp_dir() / "render_cache"
+            max_bytes = int(Config.PDF.get('render_cache_max_mb', 200) * 1024 * 1024)
+            _render_cache = RenderCache(directorio, max_bytes)
+        return _render_cache
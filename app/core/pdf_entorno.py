@@ -0,0 +1,196 @@
+"""
+Recursos del generador de PDF compartidos por todo el proceso
+
+- Entorno Jinja por carpeta de plantillas, con caché de bytecode en disco: las
+  plantillas se compilan una vez y no en cada PDFGenerator
+- Ubicación de wkhtmltopdf: se busca una vez por proceso y se recuerda entre
+  ejecuciones en <temp>/wkhtmltopdf.json (ruta, versión, fecha de
+  modificación y tamaño). Mientras el ejecutable recordado no cambie no se
+  vuelve a lanzar ningún "wkhtmltopdf --version"
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from app.core.executable_paths import get_path_manager
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_lock = threading.Lock()
+_entornos: Dict[str, Environment] = {}
+_directorios_listos = False
+
+# Resultado de la búsqueda de wkhtmltopdf en este proceso (_SIN_BUSCAR hasta la primera)
+_SIN_BUSCAR = object()
+_wkhtmltopdf: Any = _SIN_BUSCAR
+
+
+def _cache_dir() -> Path:
+    return get_path_manager().get_temp_dir()
+
+
+# ----------------------------------------------------------------------
+# Plantillas y directorios
+# ----------------------------------------------------------------------
+
+def get_entorno_plantillas(template_dir: str) -> Environment:
+    """Entorno Jinja compartido para la carpeta de plantillas (uno por carpeta y proceso)"""
+    clave = os.path.abspath(template_dir)
+    with _lock:
+        entorno = _entornos.get(clave)
+        if entorno is None:
+            bytecode_cache = None
+            try:
+                directorio = _cache_dir() / "jinja"
+                directorio.mkdir(parents=True, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(str(directorio))
+            except OSError as e:
+                logger.warning(f"⚠️ Sin caché de bytecode para las plantillas: {e}")
+            entorno = Environment(loader=FileSystemLoader(template_dir), bytecode_cache=bytecode_cache)
+            _entornos[clave] = entorno
+        return entorno
+
+
+def preparar_directorios_salida():
+    """Crea los directorios de trabajo y de PDFs (una sola vez por proceso)"""
+    global _directorios_listos
+    if _directorios_listos:
+        return
+    from app.core.utils import ensure_directories_exist
+
+    ensure_directories_exist()
+    get_path_manager().get_pdf_output_dir().mkdir(parents=True, exist_ok=True)
+    _directorios_listos = True
+
+
+# ----------------------------------------------------------------------
+# wkhtmltopdf
+# ----------------------------------------------------------------------
+
+def _candidatos_wkhtmltopdf() -> List[str]:
+    """Rutas comunes donde podría estar instalado wkhtmltopdf"""
+    if platform.system() == "Windows":
+        return [
+            r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe",
+            r"C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe",
+            # Ubicaciones adicionales comunes en Windows
+            r"C:\wkhtmltopdf\bin\wkhtmltopdf.exe",
+            r"C:\wkhtmltopdf\wkhtmltopdf.exe",
+            # Buscar en el directorio actual
+            os.path.join(os.getcwd(), "wkhtmltopdf.exe"),
+            os.path.join(os.getcwd(), "bin", "wkhtmltopdf.exe"),
+            # Si está en el PATH
+            r"wkhtmltopdf.exe"
+        ]
+    return [
+        "/usr/bin/wkhtmltopdf",
+        "/usr/local/bin/wkhtmltopdf",
+        "wkhtmltopdf"  # Si está en el PATH
+    ]
+
+
+def _firma(ruta: str) -> Optional[Tuple[float, int]]:
+    """(fecha de modificación, tamaño) del ejecutable o None si ya no existe"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_mtime, estado.st_size
+
+
+def _version(ruta: str) -> Optional[str]:
+    """Salida de "wkhtmltopdf --version" o None si no se puede ejecutar"""
+    try:
+        resultado = subprocess.run([ruta, "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   check=False, timeout=15)
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.debug(f"No se pudo ejecutar wkhtmltopdf en: {ruta} - Error: {e}")
+        return None
+    if resultado.returncode != 0:
+        return None
+    return resultado.stdout.decode("utf-8", errors="ignore").strip()
+
+
+def _leer_recordado() -> Optional[str]:
+    """Ruta recordada en disco si el ejecutable sigue igual que cuando se verificó"""
+    try:
+        with open(_cache_dir() / "wkhtmltopdf.json", encoding="utf-8") as f:
+            recordado = json.load(f)
+        ruta = recordado["ruta"]
+        if _firma(ruta) == (recordado["mtime"], recordado["tamano"]):
+            return ruta
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _recordar(ruta: str, version: str):
+    firma = _firma(ruta)
+    if firma is None:
+        return
+    archivo = _cache_dir() / "wkhtmltopdf.json"
+    temporal = archivo.with_suffix(".json.tmp")
+    try:
+        archivo.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"ruta": ruta, "version": version, "mtime": firma[0], "tamano": firma[1]}, f)
+        os.replace(temporal, archivo)
+    except OSError as e:
+        logger.debug(f"No se pudo recordar la ubicación de wkhtmltopdf: {e}")
+
+
+def _buscar_wkhtmltopdf() -> Optional[str]:
+    for candidato in _candidatos_wkhtmltopdf():
+        # shutil.which resuelve nombres del PATH y descarta rutas que no existen sin lanzar procesos
+        ruta = shutil.which(candidato)
+        if ruta is None:
+            logger.debug(f"No se encontró wkhtmltopdf en: {candidato}")
+            continue
+
+        print(f"Verificando wkhtmltopdf en: {ruta}")
+        version = _version(ruta)
+        if version is not None:
+            ruta = os.path.abspath(ruta)
+            print(f"wkhtmltopdf encontrado en: {ruta}")
+            logger.info(f"wkhtmltopdf encontrado en: {ruta} ({version})")
+            _recordar(ruta, version)
+            return ruta
+    return None
+
+
+def get_wkhtmltopdf() -> Optional[str]:
+    """
+    Ruta de wkhtmltopdf (None si no está instalado)
+
+    La primera llamada del proceso usa la ruta recordada en disco si el
+    ejecutable no cambió; si cambió o no hay nada recordado, busca en las
+    rutas comunes. Las siguientes llamadas devuelven el mismo resultado.
+    """
+    global _wkhtmltopdf
+    with _lock:
+        if _wkhtmltopdf is _SIN_BUSCAR:
+            ruta = _leer_recordado()
+            if ruta is None:
+                ruta = _buscar_wkhtmltopdf()
+                if ruta is None:
+                    logger.warning("No se encontró wkhtmltopdf en ninguna ubicación. "
+                                   "Solo se generarán archivos HTML.")
+            _wkhtmltopdf = ruta
+        return _wkhtmltopdf
+
+
+def olvidar_wkhtmltopdf():
+    """Descarta la ubicación recordada (la próxima llamada vuelve a buscar)"""
+    global _wkhtmltopdf
+    with _lock:
+        _wkhtmltopdf = _SIN_BUSCAR
+        try:
+            os.unlink(_cache_dir() / "wkhtmltopdf.json")
+        except OSError:
+            pass
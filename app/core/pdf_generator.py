@@ -1,20 +1,31 @@
-from jinja2 import FileSystemLoader, Environment
 import os
 from datetime import datetime
 import subprocess
 import tempfile
-import platform
+import threading
 from app.core.config import Config
-from app.core.utils import ensure_directories_exist, copy_file_safely
+from app.core.utils import copy_file_safely
 from app.core.logging import get_logger
 from app.core.executable_paths import get_path_manager
+from app.core.pdf_cache import get_render_cache
+from app.core.pdf_entorno import get_entorno_plantillas, get_wkhtmltopdf, preparar_directorios_salida
+from app.core.pdf_renderers import (
+    RENDERIZADOR_NATIVO, RENDERIZADOR_WKHTMLTOPDF, RenderizadorNativo, RenderizadorWkhtmltopdf,
+    renderizador_configurado
+)
 
 class PDFGenerator:
     """
     Clase para generar diferentes tipos de constancias en PDF
-    usando wkhtmltopdf
+    con el renderizador nativo (reportlab) o con wkhtmltopdf
     """
 
+    # Borradores de vista previa pendientes de su versión definitiva: ruta -> (tipo, datos).
+    # Compartidos por todo el proceso: la vista previa suele generarse en el hilo del
+    # chat y confirmarse desde la interfaz, cada uno con su propio PDFGenerator
+    _borradores = {}
+    _borradores_lock = threading.Lock()
+
     def __init__(self, template_dir=None):
         """Inicializa el generador con el directorio de plantillas"""
         # Usar gestor de rutas para obtener directorios correctos
@@ -31,61 +42,50 @@ class PDFGenerator:
         self.logger = get_logger(__name__)
 
         # Crear directorio de salida si no existe
-        ensure_directories_exist()
-        path_manager.get_pdf_output_dir().mkdir(parents=True, exist_ok=True)
+        preparar_directorios_salida()
 
-        # Configurar entorno Jinja2
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
+        # Entorno Jinja2 compartido (plantillas compiladas una vez por proceso)
+        self.env = get_entorno_plantillas(self.template_dir)
 
-        # Verificar si wkhtmltopdf está instalado
+        # Verificar si wkhtmltopdf está instalado (búsqueda recordada entre ejecuciones)
         self.wkhtmltopdf_path = self._find_wkhtmltopdf()
 
+        # Renderizadores disponibles (el de cada tipo se elige en Config.PDF['renderers'])
+        self.renderizadores = {
+            RENDERIZADOR_NATIVO: RenderizadorNativo(),
+            RENDERIZADOR_WKHTMLTOPDF: RenderizadorWkhtmltopdf(self),
+        }
+
+        # Caché de constancias ya renderizadas (None si está deshabilitado)
+        self.render_cache = get_render_cache()
+
+    def renderizador_nativo(self, tipo_constancia, borrador=False):
+        """
+        Renderizador que trabaja sin HTML para el tipo de constancia, si es el elegido
+
+        Args:
+            tipo_constancia: Tipo de constancia
+            borrador: Si es True se usa aunque el tipo tenga configurado otro renderizador
+
+        Returns:
+            El renderizador nativo si está configurado para el tipo (o es un
+            borrador), disponible y con diseño para él; None si la constancia
+            debe pasar por el HTML
+        """
+        nombre = RENDERIZADOR_NATIVO if borrador else renderizador_configurado(tipo_constancia)
+        renderizador = self.renderizadores.get(nombre)
+        if renderizador is None or renderizador.usa_html:
+            return None
+        if not renderizador.disponible() or not renderizador.soporta(tipo_constancia):
+            return None
+        return renderizador
+
     def _find_wkhtmltopdf(self):
-        """Busca la ruta al ejecutable wkhtmltopdf"""
-        # Rutas comunes donde podría estar instalado wkhtmltopdf
-        if platform.system() == "Windows":
-            paths = [
-                r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe",
-                r"C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe",
-                # Ubicaciones adicionales comunes en Windows
-                r"C:\wkhtmltopdf\bin\wkhtmltopdf.exe",
-                r"C:\wkhtmltopdf\wkhtmltopdf.exe",
-                # Buscar en el directorio actual
-                os.path.join(os.getcwd(), "wkhtmltopdf.exe"),
-                os.path.join(os.getcwd(), "bin", "wkhtmltopdf.exe"),
-                # Si está en el PATH
-                r"wkhtmltopdf.exe"
-            ]
-        else:
-            paths = [
-                "/usr/bin/wkhtmltopdf",
-                "/usr/local/bin/wkhtmltopdf",
-                "wkhtmltopdf"  # Si está en el PATH
-            ]
-
-        # Verificar cada ruta
-        for path in paths:
-            try:
-                # Intentar ejecutar wkhtmltopdf con la opción --version
-                print(f"Verificando wkhtmltopdf en: {path}")
-                result = subprocess.run([path, "--version"],
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE,
-                               check=False)  # Cambiado a False para no lanzar excepción
-
-                if result.returncode == 0:
-                    print(f"wkhtmltopdf encontrado en: {path}")
-                    self.logger.info(f"wkhtmltopdf encontrado en: {path}")
-                    return path
-            except (subprocess.SubprocessError, FileNotFoundError) as e:
-                self.logger.debug(f"No se encontró wkhtmltopdf en: {path} - Error: {str(e)}")
-                continue
-
-        # Si no se encuentra, devolver None
-        self.logger.warning("No se encontró wkhtmltopdf en ninguna ubicación. Solo se generarán archivos HTML.")
-        return None
-
-    def generar_constancia(self, tipo_constancia, datos, output_path=None, output_dir=None, filename_prefix=""):
+        """Busca la ruta al ejecutable wkhtmltopdf (una vez por proceso, recordada en disco)"""
+        return get_wkhtmltopdf()
+
+    def generar_constancia(self, tipo_constancia, datos, output_path=None, output_dir=None, filename_prefix="",
+                           borrador=False):
         """
         Genera una constancia del tipo especificado con los datos proporcionados
 
@@ -95,15 +95,132 @@ class PDFGenerator:
             output_path: Ruta personalizada donde guardar el PDF (opcional)
             output_dir: Directorio personalizado donde guardar el PDF (opcional)
             filename_prefix: Prefijo para el nombre del archivo (opcional)
+            borrador: Vista previa rápida con el renderizador nativo aunque el tipo use
+                      wkhtmltopdf; la versión definitiva se genera con finalizar_borrador
 
         Returns:
             Ruta al archivo PDF generado
         """
+        try:
+            self.preparar_datos(tipo_constancia, datos)
 
-        # Seleccionar la plantilla adecuada
-        template_file = f"constancia_{tipo_constancia}.html"
+            # Determinar el directorio de salida
+            output_directory = output_dir if output_dir else self.output_dir
+            curp = datos.get("curp", "sin_curp")
+
+            # Usar la ruta personalizada si se proporciona, de lo contrario generar una
+            if output_path:
+                output_filename = output_path
+            else:
+                output_filename = self.ruta_unica(
+                    output_directory, f"{filename_prefix}constancia_{tipo_constancia}_{curp}_{self._marca_tiempo()}"
+                )
+
+            # Renderizador nativo: el PDF sale directo de los datos, sin HTML ni procesos
+            nativo = self.renderizador_nativo(tipo_constancia, borrador=borrador)
+            if nativo is not None:
+                clave = self.clave_cache(tipo_constancia, nativo, datos)
+                generado = self.desde_cache(clave, output_filename)
+                if not generado and nativo.generar(tipo_constancia, datos, output_filename):
+                    self.logger.info(f"PDF generado exitosamente ({nativo.nombre}): {output_filename}")
+                    self.guardar_en_cache(clave, output_filename)
+                    generado = True
+                if generado:
+                    if borrador and self.wkhtmltopdf_path and self.renderizador_nativo(tipo_constancia) is None:
+                        # El definitivo usa otro renderizador: se genera cuando se confirme
+                        self._registrar_borrador(output_filename, tipo_constancia, datos)
+                    return output_filename
+                self.logger.warning("El renderizador nativo falló; se usa la plantilla HTML")
+
+            # Con wkhtmltopdf el caché se consulta antes de renderizar el HTML
+            wkhtmltopdf = self.renderizadores[RENDERIZADOR_WKHTMLTOPDF]
+            clave = self.clave_cache(tipo_constancia, wkhtmltopdf, datos) if wkhtmltopdf.disponible() else None
+            if self.desde_cache(clave, output_filename):
+                return output_filename
 
-        # Configurar mostrar_calificaciones según el tipo de constancia
+            html_out = self.renderizar_html(tipo_constancia, datos)
+            if html_out is None:
+                self._eliminar_reservada(output_filename)
+                return None
+
+            html_final = self.preparar_imagenes(html_out, output_directory, datos)
+
+            # Sin wkhtmltopdf el HTML (con rutas absolutas) queda como resultado
+            if not self.wkhtmltopdf_path:
+                self.logger.info("wkhtmltopdf no está disponible. Generando solo archivo HTML.")
+                return self._guardar_html(html_final, output_filename)
+
+            self.logger.info(f"Generando PDF con wkhtmltopdf: {self.wkhtmltopdf_path}")
+            if wkhtmltopdf.generar(tipo_constancia, datos, output_filename, html=html_final):
+                self.logger.info(f"PDF generado exitosamente: {output_filename}")
+                self.guardar_en_cache(clave, output_filename)
+                return output_filename
+
+            # Si falla la conversión se entrega el HTML para abrirlo en el navegador
+            self._eliminar_reservada(output_filename)
+            return self._guardar_html(html_final, output_filename)
+
+        except Exception as e:
+            self.logger.error(f"Error general en generar_constancia: {str(e)}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            return None
+
+    # ------------------------------------------------------------------
+    # Borradores de vista previa
+    # ------------------------------------------------------------------
+
+    def _registrar_borrador(self, ruta, tipo_constancia, datos):
+        with self._borradores_lock:
+            if len(self._borradores) >= 32:
+                # Las vistas previas más antiguas ya no se van a confirmar
+                self._borradores.pop(next(iter(self._borradores)))
+            self._borradores[os.path.abspath(ruta)] = (tipo_constancia, dict(datos))
+
+    def es_borrador(self, ruta):
+        """True si ruta es una vista previa cuya versión definitiva aún no se genera"""
+        with self._borradores_lock:
+            return bool(ruta) and os.path.abspath(ruta) in self._borradores
+
+    def finalizar_borrador(self, ruta):
+        """
+        Reemplaza una vista previa por la constancia definitiva
+
+        Solo hace trabajo si la vista previa se generó con el renderizador
+        nativo y el tipo de constancia tiene configurado otro; en cualquier
+        otro caso la vista previa ya es la constancia definitiva.
+
+        Args:
+            ruta: Ruta de la vista previa (generar_constancia con borrador=True)
+
+        Returns:
+            Ruta de la constancia (siempre ruta). Si la versión definitiva no se
+            pudo generar queda la vista previa, que también es un PDF válido
+        """
+        with self._borradores_lock:
+            pendiente = self._borradores.pop(os.path.abspath(ruta), None) if ruta else None
+        if pendiente is None:
+            return ruta
+
+        tipo_constancia, datos = pendiente
+        self.logger.info(f"Generando la versión definitiva de la vista previa: {ruta}")
+        base, extension = os.path.splitext(ruta)
+        temporal = f"{base}.definitiva{extension}"
+        resultado = self.generar_constancia(tipo_constancia, datos, output_path=temporal)
+        if resultado == temporal:
+            # Reemplazar la ruta de una vez: el visor nunca ve un PDF a medio escribir
+            os.replace(temporal, ruta)
+        else:
+            self.logger.warning(f"No se pudo generar la versión definitiva; se conserva la vista previa: {ruta}")
+        return ruta
+
+    # ------------------------------------------------------------------
+    # Pasos de la generación (también los usa la generación por lote)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def preparar_datos(tipo_constancia, datos):
+        """Ajusta mostrar_calificaciones y calificaciones según el tipo de constancia"""
         if tipo_constancia == "estudio":
             # Para constancia de estudios, NUNCA incluir calificaciones
             datos["mostrar_calificaciones"] = False
@@ -123,183 +240,216 @@ class PDFGenerator:
             if "calificaciones" not in datos:
                 datos["calificaciones"] = []
 
+    def renderizar_html(self, tipo_constancia, datos):
+        """
+        Renderiza la plantilla de la constancia en memoria
+
+        Returns:
+            HTML (con rutas relativas logos/ y fotos/) o None si falla
+        """
+        self.preparar_datos(tipo_constancia, datos)
+
+        # Seleccionar la plantilla adecuada
+        template_file = f"constancia_{tipo_constancia}.html"
         try:
-            # Cargar la plantilla
-            try:
-                template = self.env.get_template(template_file)
-            except Exception as e:
-                print(f"Error al cargar la plantilla {template_file}: {str(e)}")
-                return None
+            template = self.env.get_template(template_file)
+        except Exception as e:
+            print(f"Error al cargar la plantilla {template_file}: {str(e)}")
+            return None
 
-            # Renderizar HTML
-            try:
-                html_out = template.render(**datos)
-            except Exception as e:
-                print(f"Error al renderizar HTML con los datos proporcionados: {str(e)}")
-                return None
+        try:
+            return template.render(**datos)
+        except Exception as e:
+            print(f"Error al renderizar HTML con los datos proporcionados: {str(e)}")
+            return None
 
-            # Generar nombre de archivo de salida
-            curp = datos.get("curp", "sin_curp")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def clave_cache(self, tipo_constancia, renderizador, datos):
+        """Clave del caché de renderizado para la constancia (None sin caché)"""
+        if self.render_cache is None:
+            return None
+        plantilla = None
+        if renderizador.usa_html:
+            plantilla = os.path.join(self.template_dir, f"constancia_{tipo_constancia}.html")
+        try:
+            return self.render_cache.clave(tipo_constancia, renderizador, datos, plantilla)
+        except Exception as e:
+            self.logger.warning(f"No se pudo calcular la clave del caché de renderizado: {e}")
+            return None
 
-            # Determinar el directorio de salida
-            output_directory = output_dir if output_dir else self.output_dir
+    def desde_cache(self, clave, output_filename):
+        """Pone en output_filename la constancia del caché si ya se había renderizado"""
+        if clave is None or not self.render_cache.obtener(clave, output_filename):
+            return False
+        self.logger.info(f"PDF tomado del caché de renderizado: {output_filename}")
+        return True
 
-            # Usar la ruta personalizada si se proporciona, de lo contrario generar una
-            if output_path:
-                output_filename = output_path
-            else:
-                output_filename = os.path.join(
-                    output_directory,
-                    f"{filename_prefix}constancia_{tipo_constancia}_{curp}_{timestamp}.pdf"
-                )
+    def guardar_en_cache(self, clave, output_filename):
+        """Guarda en el caché de renderizado el PDF recién generado"""
+        if clave is not None:
+            self.render_cache.guardar(clave, output_filename)
 
-            # Crear un archivo HTML temporal (que se eliminará después)
-            html_output_filename = os.path.join(
-                tempfile.gettempdir(),
-                f"{filename_prefix}constancia_{tipo_constancia}_{curp}_{timestamp}.html"
-            )
+    @staticmethod
+    def _marca_tiempo():
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
 
-            # Crear carpetas para imágenes en la carpeta de salida
-            salida_logos_dir = os.path.join(output_directory, "logos")
-            salida_fotos_dir = os.path.join(output_directory, "fotos")
-            try:
-                os.makedirs(salida_logos_dir, exist_ok=True)
-                os.makedirs(salida_fotos_dir, exist_ok=True)
-            except Exception as e:
-                print(f"Error al crear directorios para imágenes: {str(e)}")
-                # Continuar a pesar del error
-
-            # Copiar el logo si existe
-            path_manager = get_path_manager()
-            logos_dir = path_manager.get_logos_dir()
-            photos_dir = path_manager.get_photos_dir()
-
-            logo_origen = logos_dir / "logo_educacion.png"
-            logo_destino = os.path.join(salida_logos_dir, "logo_educacion.png")
-            if logo_origen.exists():
-                copy_file_safely(str(logo_origen), logo_destino)
-
-            # Copiar la foto del alumno si existe
-            foto_origen = photos_dir / f"{curp}.jpg"
-            foto_destino = os.path.join(salida_fotos_dir, f"{curp}.jpg")
-            if foto_origen.exists():
-                copy_file_safely(str(foto_origen), foto_destino)
-
-            # Modificar el HTML para usar rutas absolutas para las imágenes en la vista del navegador
-            # Usar rutas absolutas para los directorios de salida
-            output_logos_dir = os.path.abspath(salida_logos_dir)
-            output_fotos_dir = os.path.abspath(salida_fotos_dir)
-
-            # Reemplazar las rutas en el HTML
-            html_for_browser = html_out.replace('src="logos/', f'src="file:///{output_logos_dir}/')
-            html_for_browser = html_for_browser.replace('src="fotos/', f'src="file:///{output_fotos_dir}/')
-
-            # Verificar si existe la foto del alumno
-            curp = datos.get("curp", "")
-            foto_path = photos_dir / f"{curp}.jpg"
-            if not foto_path.exists() and "has_photo" in datos and datos["has_photo"] == True:
-                # Si la foto no existe pero se supone que debería tenerla, intentar copiarla desde foto_path
-                if "foto_path" in datos and datos["foto_path"] and os.path.exists(datos["foto_path"]):
-                    copy_file_safely(datos["foto_path"], str(foto_path))
-
-            # Guardar el HTML modificado
+    @staticmethod
+    def ruta_unica(directorio, nombre_base, extension=".pdf"):
+        """
+        Reserva una ruta de salida que no exista
+
+        El archivo se crea vacío de forma exclusiva (O_EXCL), así que dos
+        constancias generadas en el mismo segundo (o en paralelo) nunca
+        comparten nombre: la segunda recibe el sufijo _2, _3, ...
+        """
+        os.makedirs(directorio, exist_ok=True)
+        intento = 1
+        while True:
+            sufijo = f"_{intento}" if intento > 1 else ""
+            ruta = os.path.join(directorio, f"{nombre_base}{sufijo}{extension}")
             try:
-                with open(html_output_filename, "w", encoding="utf-8") as f:
-                    f.write(html_for_browser)
-                self.logger.info(f"Archivo HTML guardado en: {html_output_filename}")
-            except Exception as e:
-                self.logger.error(f"Error al guardar el archivo HTML: {str(e)}")
-                return None
+                os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return ruta
+            except FileExistsError:
+                intento += 1
+
+    @staticmethod
+    def _eliminar_reservada(ruta):
+        """Elimina la ruta reservada si quedó vacía (conversión fallida o cancelada)"""
+        try:
+            if os.path.exists(ruta) and os.path.getsize(ruta) == 0:
+                os.unlink(ruta)
+        except OSError:
+            pass
 
-            # Generar PDF usando wkhtmltopdf si está disponible
-            if self.wkhtmltopdf_path:
-                self.logger.info(f"Generando PDF con wkhtmltopdf: {self.wkhtmltopdf_path}")
-                # Crear archivo HTML temporal
-                try:
-                    with tempfile.NamedTemporaryFile(suffix=".html", delete=False, mode="w", encoding="utf-8") as temp_html:
-                        temp_html.write(html_out)
-                        temp_html_path = temp_html.name
-                    self.logger.debug(f"Archivo HTML temporal creado en: {temp_html_path}")
-                except Exception as e:
-                    self.logger.error(f"Error al crear archivo HTML temporal: {str(e)}")
-                    return html_output_filename
+    def preparar_imagenes(self, html_out, output_directory, datos):
+        """
+        Copia logo y foto junto a la salida y apunta el HTML a ellos con rutas absolutas
 
-                try:
-                    # Modificar el HTML para usar rutas absolutas para las imágenes
-                    with open(temp_html_path, 'r', encoding='utf-8') as f:
-                        html_content = f.read()
-
-                    # Obtener rutas absolutas para los directorios de imágenes
-                    output_logos_dir = os.path.abspath(salida_logos_dir)
-                    output_fotos_dir = os.path.abspath(salida_fotos_dir)
-
-                    # Reemplazar rutas relativas con rutas absolutas
-                    html_content = html_content.replace('src="logos/', f'src="file:///{output_logos_dir}/')
-                    html_content = html_content.replace('src="fotos/', f'src="file:///{output_fotos_dir}/')
-
-                    # Guardar el HTML modificado
-                    with open(temp_html_path, 'w', encoding='utf-8') as f:
-                        f.write(html_content)
-
-                    # Ejecutar wkhtmltopdf para convertir HTML a PDF
-                    self.logger.info(f"Ejecutando wkhtmltopdf para generar PDF: {output_filename}")
-                    result = subprocess.run([
-                        self.wkhtmltopdf_path,
-                        "--enable-local-file-access",  # Permitir acceso a archivos locales (imágenes)
-                        "--page-size", "Letter",
-                        "--margin-top", "5mm",
-                        "--margin-bottom", "5mm",
-                        "--margin-left", "5mm",
-                        "--margin-right", "5mm",
-                        temp_html_path,
-                        output_filename
-                    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-
-                    self.logger.debug(f"wkhtmltopdf ejecutado exitosamente. Salida: {result.stdout.decode('utf-8', errors='ignore')}")
-
-                    # Eliminar archivos HTML temporales
-                    os.unlink(temp_html_path)
-
-                    # También eliminar el HTML de salida si existe
-                    if os.path.exists(html_output_filename):
-                        try:
-                            os.unlink(html_output_filename)
-                        except Exception as e:
-                            self.logger.warning(f"No se pudo eliminar el archivo HTML temporal: {e}")
-
-                    self.logger.info(f"PDF generado exitosamente: {output_filename}")
-                    return output_filename
+        Returns:
+            HTML listo para wkhtmltopdf o para abrir en el navegador
+        """
+        curp = datos.get("curp", "sin_curp")
 
-                except subprocess.SubprocessError as e:
-                    self.logger.error(f"Error al ejecutar wkhtmltopdf: {str(e)}")
-                    # Intentar capturar la salida de error
-                    if hasattr(e, 'stderr') and e.stderr:
-                        self.logger.error(f"Error de wkhtmltopdf: {e.stderr.decode('utf-8', errors='ignore')}")
-                    # Eliminar archivo HTML temporal en caso de error
-                    try:
-                        os.unlink(temp_html_path)
-                    except:
-                        pass
-                    return html_output_filename
-                except Exception as e:
-                    self.logger.error(f"Error inesperado al generar PDF: {str(e)}")
-                    # Eliminar archivo HTML temporal en caso de error
-                    try:
-                        os.unlink(temp_html_path)
-                    except:
-                        pass
-                    return html_output_filename
-            else:
-                self.logger.info("wkhtmltopdf no está disponible. Generando solo archivo HTML.")
-                return html_output_filename
+        # Crear carpetas para imágenes en la carpeta de salida
+        salida_logos_dir = os.path.join(output_directory, "logos")
+        salida_fotos_dir = os.path.join(output_directory, "fotos")
+        try:
+            os.makedirs(salida_logos_dir, exist_ok=True)
+            os.makedirs(salida_fotos_dir, exist_ok=True)
+        except Exception as e:
+            print(f"Error al crear directorios para imágenes: {str(e)}")
+            # Continuar a pesar del error
 
+        path_manager = get_path_manager()
+        logos_dir = path_manager.get_logos_dir()
+        photos_dir = path_manager.get_photos_dir()
+
+        # Copiar el logo si existe
+        logo_origen = logos_dir / "logo_educacion.png"
+        logo_destino = os.path.join(salida_logos_dir, "logo_educacion.png")
+        if logo_origen.exists():
+            copy_file_safely(str(logo_origen), logo_destino)
+
+        # Copiar la foto del alumno si existe
+        foto_origen = photos_dir / f"{curp}.jpg"
+        foto_destino = os.path.join(salida_fotos_dir, f"{curp}.jpg")
+        if foto_origen.exists():
+            copy_file_safely(str(foto_origen), foto_destino)
+
+        # Verificar si existe la foto del alumno
+        curp = datos.get("curp", "")
+        foto_path = photos_dir / f"{curp}.jpg"
+        if not foto_path.exists() and "has_photo" in datos and datos["has_photo"] == True:
+            # Si la foto no existe pero se supone que debería tenerla, intentar copiarla desde foto_path
+            if "foto_path" in datos and datos["foto_path"] and os.path.exists(datos["foto_path"]):
+                copy_file_safely(datos["foto_path"], str(foto_path))
+
+        # Reemplazar rutas relativas con rutas absolutas
+        output_logos_dir = os.path.abspath(salida_logos_dir)
+        output_fotos_dir = os.path.abspath(salida_fotos_dir)
+        html_final = html_out.replace('src="logos/', f'src="file:///{output_logos_dir}/')
+        return html_final.replace('src="fotos/', f'src="file:///{output_fotos_dir}/')
+
+    def _guardar_html(self, html, output_filename):
+        """Guarda el HTML en la carpeta temporal con el nombre previsto del PDF (extensión .html)"""
+        html_output_filename = os.path.join(
+            tempfile.gettempdir(), os.path.splitext(os.path.basename(output_filename))[0] + ".html"
+        )
+        try:
+            with open(html_output_filename, "w", encoding="utf-8") as f:
+                f.write(html)
+            self._eliminar_reservada(output_filename)
+            self.logger.info(f"Archivo HTML guardado en: {html_output_filename}")
+            return html_output_filename
         except Exception as e:
-            self.logger.error(f"Error general en generar_constancia: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error al guardar el archivo HTML: {str(e)}")
             return None
 
+    def convertir_html_a_pdf(self, html, output_filename, cancelar=None):
+        """
+        Convierte HTML a PDF con un proceso de wkhtmltopdf
+
+        El HTML se pasa por la entrada estándar (sin archivos temporales). Es
+        seguro llamarlo desde varios hilos a la vez: cada llamada usa su
+        propio proceso.
+
+        Args:
+            html: HTML con rutas absolutas (ver preparar_imagenes)
+            output_filename: Ruta del PDF
+            cancelar: threading.Event opcional; si se activa se termina el proceso
+
+        Returns:
+            True si se generó el PDF
+        """
+        try:
+            self.logger.info(f"Ejecutando wkhtmltopdf para generar PDF: {output_filename}")
+            proceso = subprocess.Popen([
+                self.wkhtmltopdf_path,
+                "--enable-local-file-access",  # Permitir acceso a archivos locales (imágenes)
+                "--page-size", "Letter",
+                "--margin-top", "5mm",
+                "--margin-bottom", "5mm",
+                "--margin-left", "5mm",
+                "--margin-right", "5mm",
+                "-",  # HTML desde la entrada estándar
+                output_filename
+            ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            # communicate() con entrada y sin límite de tiempo en un hilo aparte: con
+            # timeout, un reintento ya no enviaría el resto del HTML ni cerraría la entrada
+            resultado = {}
+
+            def comunicar():
+                try:
+                    resultado['salida'] = proceso.communicate(html.encode("utf-8"))
+                except Exception as e:
+                    resultado['error'] = e
+
+            hilo = threading.Thread(target=comunicar, name="wkhtmltopdf-stdin", daemon=True)
+            hilo.start()
+            while hilo.is_alive():
+                hilo.join(0.2)
+                if hilo.is_alive() and cancelar is not None and cancelar.is_set():
+                    proceso.kill()
+                    proceso.wait()
+                    self._eliminar_reservada(output_filename)
+                    return False
+
+            if 'error' in resultado:
+                raise resultado['error']
+            _, stderr = resultado['salida']
+
+            if proceso.returncode != 0:
+                self.logger.error(f"Error al ejecutar wkhtmltopdf (código {proceso.returncode})")
+                if stderr:
+                    self.logger.error(f"Error de wkhtmltopdf: {stderr.decode('utf-8', errors='ignore')}")
+                return False
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error inesperado al generar PDF: {str(e)}")
+            return False
+
     def crear_todas_plantillas(self):
         """Crea todas las plantillas si no existen"""
         # Verificar que el directorio de plantillas exista
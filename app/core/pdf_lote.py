@@ -0,0 +1,259 @@
+"""
+Generación de constancias por lote (grupo o grado completo)
+
+Con el renderizador nativo cada PDF se arma en el proceso, uno tras otro. Con
+wkhtmltopdf el HTML se renderiza en el proceso (Jinja, milisegundos por
+alumno) y la conversión a PDF, que es lo costoso, se reparte entre un número
+acotado de procesos de wkhtmltopdf que trabajan en paralelo.
+"""
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.config import Config
+from app.core.logging import get_logger
+from app.core.pdf_renderers import RENDERIZADOR_WKHTMLTOPDF
+
+logger = get_logger(__name__)
+
+# Formatos de salida del lote
+FORMATO_ARCHIVOS = "archivos"   # Un PDF por alumno
+FORMATO_PDF = "pdf"             # Además, un PDF combinado con todas las constancias
+FORMATO_ZIP = "zip"             # Además, un ZIP con todas las constancias
+FORMATOS_LOTE = (FORMATO_ARCHIVOS, FORMATO_PDF, FORMATO_ZIP)
+
+# progreso(hechos, total, nombre del alumno recién terminado)
+Progreso = Callable[[int, int, str], None]
+
+
+@dataclass
+class DocumentoLote:
+    """Una constancia del lote: alumno y datos ya preparados para la plantilla"""
+    alumno_id: int
+    nombre: str
+    datos: Dict[str, Any]
+
+
+@dataclass
+class ResultadoLote:
+    """Resultado de generar un lote de constancias"""
+    directorio: str
+    generados: List[Tuple[int, str]] = field(default_factory=list)    # (alumno_id, ruta)
+    fallidos: List[Tuple[str, str]] = field(default_factory=list)     # (nombre, motivo)
+    archivo_combinado: Optional[str] = None
+    cancelado: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "directorio": self.directorio,
+            "archivos": [ruta for _, ruta in self.generados],
+            "generadas": len(self.generados),
+            "fallidos": [{"nombre": nombre, "motivo": motivo} for nombre, motivo in self.fallidos],
+            "archivo_combinado": self.archivo_combinado,
+            "cancelado": self.cancelado
+        }
+
+
+def max_procesos_lote() -> int:
+    """Procesos de conversión simultáneos (Config.PDF['batch_max_workers'], acotado a los núcleos)"""
+    configurados = Config.PDF.get('batch_max_workers', 4)
+    return max(1, min(configurados, os.cpu_count() or 1))
+
+
+def crear_directorio_lote(base: str, nombre: str) -> str:
+    """Carpeta nueva para el lote (sufijo _2, _3, ... si ya existe una igual)"""
+    intento = 1
+    while True:
+        sufijo = f"_{intento}" if intento > 1 else ""
+        ruta = os.path.join(base, f"{nombre}{sufijo}")
+        try:
+            os.makedirs(ruta)
+            return ruta
+        except FileExistsError:
+            intento += 1
+
+
+class GeneradorLote:
+    """
+    Genera un lote de constancias con un PDFGenerator
+
+    Los documentos se renderizan en orden en el hilo que llama. Si el tipo de
+    constancia usa el renderizador nativo el PDF se genera ahí mismo (reportlab
+    necesita el GIL: más hilos no lo acelerarían). Si no, cada HTML pasa a un
+    pool de hilos acotado; cada hilo del pool solo espera a su
+    proceso de wkhtmltopdf, así que el paralelismo real es de procesos. Como
+    mucho hay 2×procesos documentos renderizados esperando conversión.
+    """
+
+    def __init__(self, pdf_generator, max_procesos: Optional[int] = None):
+        self.pdf_generator = pdf_generator
+        self.max_procesos = max_procesos or max_procesos_lote()
+
+    def generar(self, tipo_constancia: str, documentos: List[DocumentoLote], directorio: str,
+                progreso: Optional[Progreso] = None,
+                cancelar: Optional[threading.Event] = None) -> ResultadoLote:
+        """
+        Genera un PDF por documento dentro de directorio
+
+        Args:
+            tipo_constancia: estudio, calificaciones o traslado
+            documentos: Constancias a generar
+            directorio: Carpeta (ya creada) donde quedan los archivos
+            progreso: Se llama al terminar cada documento (hechos, total, nombre)
+            cancelar: threading.Event; al activarse no se inician más conversiones
+                      y las que están en curso se terminan
+
+        Returns:
+            ResultadoLote con los archivos en el orden de documentos
+        """
+        cancelar = cancelar or threading.Event()
+        resultado = ResultadoLote(directorio=directorio)
+        total = len(documentos)
+        hechos = 0
+        por_indice: Dict[int, Tuple[int, str]] = {}
+        generador = self.pdf_generator
+        nativo = generador.renderizador_nativo(tipo_constancia)
+
+        def avisar(nombre: str):
+            nonlocal hechos
+            hechos += 1
+            if progreso:
+                try:
+                    progreso(hechos, total, nombre)
+                except Exception as e:
+                    logger.warning(f"⚠️ Error en el aviso de progreso del lote: {e}")
+
+        def convertir(html: str, ruta: str, clave: Optional[str]) -> Optional[str]:
+            if cancelar.is_set():
+                generador._eliminar_reservada(ruta)
+                return None
+            if generador.wkhtmltopdf_path:
+                if not generador.convertir_html_a_pdf(html, ruta, cancelar):
+                    return None
+                generador.guardar_en_cache(clave, ruta)
+                return ruta
+            # Sin wkhtmltopdf cada constancia queda como HTML en la carpeta del lote
+            ruta_html = os.path.splitext(ruta)[0] + ".html"
+            with open(ruta_html, "w", encoding="utf-8") as f:
+                f.write(html)
+            generador._eliminar_reservada(ruta)
+            return ruta_html
+
+        en_curso = {}
+
+        def recoger():
+            for futuro in wait(en_curso, return_when=FIRST_COMPLETED).done:
+                indice, documento = en_curso.pop(futuro)
+                try:
+                    ruta = futuro.result()
+                except Exception as e:
+                    ruta = None
+                    logger.error(f"❌ Error al convertir la constancia de {documento.nombre}: {e}")
+                if ruta:
+                    por_indice[indice] = (documento.alumno_id, ruta)
+                elif not cancelar.is_set():
+                    resultado.fallidos.append((documento.nombre, "Error al convertir a PDF"))
+                avisar(documento.nombre)
+
+        with ThreadPoolExecutor(max_workers=self.max_procesos, thread_name_prefix="ConstanciasLote") as pool:
+            for indice, documento in enumerate(documentos):
+                if cancelar.is_set():
+                    break
+
+                curp = documento.datos.get("curp", "sin_curp")
+                ruta = generador.ruta_unica(directorio, f"constancia_{tipo_constancia}_{curp}")
+
+                generador.preparar_datos(tipo_constancia, documento.datos)
+
+                if nativo is not None:
+                    clave = generador.clave_cache(tipo_constancia, nativo, documento.datos)
+                    if generador.desde_cache(clave, ruta):
+                        generado = True
+                    else:
+                        generado = nativo.generar(tipo_constancia, documento.datos, ruta, cancelar=cancelar)
+                        if generado:
+                            generador.guardar_en_cache(clave, ruta)
+                    if generado:
+                        por_indice[indice] = (documento.alumno_id, ruta)
+                        avisar(documento.nombre)
+                        continue
+                    if cancelar.is_set():
+                        generador._eliminar_reservada(ruta)
+                        break
+                    logger.warning(f"⚠️ Renderizador nativo falló para {documento.nombre}; se usa la plantilla HTML")
+
+                clave = None
+                if generador.wkhtmltopdf_path:
+                    wkhtmltopdf = generador.renderizadores[RENDERIZADOR_WKHTMLTOPDF]
+                    clave = generador.clave_cache(tipo_constancia, wkhtmltopdf, documento.datos)
+                    if generador.desde_cache(clave, ruta):
+                        por_indice[indice] = (documento.alumno_id, ruta)
+                        avisar(documento.nombre)
+                        continue
+
+                html = generador.renderizar_html(tipo_constancia, documento.datos)
+                if html is None:
+                    generador._eliminar_reservada(ruta)
+                    resultado.fallidos.append((documento.nombre, "Error al renderizar la plantilla"))
+                    avisar(documento.nombre)
+                    continue
+
+                html = generador.preparar_imagenes(html, directorio, documento.datos)
+                en_curso[pool.submit(convertir, html, ruta, clave)] = (indice, documento)
+
+                # Contrapresión: no renderizar mucho más rápido de lo que se convierte
+                while len(en_curso) >= 2 * self.max_procesos:
+                    recoger()
+
+            while en_curso:
+                recoger()
+
+        resultado.generados = [por_indice[indice] for indice in sorted(por_indice)]
+        resultado.cancelado = cancelar.is_set()
+        return resultado
+
+
+def combinar_pdfs(rutas: List[str], destino: str) -> bool:
+    """Une los PDF en uno solo, en el orden dado (PyPDF2)"""
+    try:
+        from PyPDF2 import PdfMerger
+    except ImportError:
+        logger.warning("⚠️ PyPDF2 no está instalado: no se puede combinar el lote en un PDF")
+        return False
+
+    merger = PdfMerger()
+    try:
+        for ruta in rutas:
+            merger.append(ruta)
+        with open(destino, "wb") as salida:
+            merger.write(salida)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error al combinar las constancias: {e}")
+        return False
+    finally:
+        merger.close()
+
+
+def empaquetar_zip(rutas: List[str], destino: str) -> bool:
+    """Guarda los archivos en un ZIP (sin recomprimir: los PDF ya van comprimidos)"""
+    try:
+        with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as archivo_zip:
+            for ruta in rutas:
+                archivo_zip.write(ruta, arcname=os.path.basename(ruta))
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error al crear el ZIP de constancias: {e}")
+        return False
+
+
+def nombre_lote(tipo_constancia: str, grado=None, grupo=None) -> str:
+    """Nombre de carpeta/archivo del lote: constancias_estudio_3A_20250101_120000"""
+    partes = [f"constancias_{tipo_constancia}"]
+    if grado:
+        partes.append(f"{grado}{grupo or ''}")
+    partes.append(datetime.now().strftime("%Y%m%d_%H%M%S"))
+    return "_".join(partes)
@@ -0,0 +1,469 @@
+"""
+Renderizadores de PDF para las constancias
+
+Un renderizador convierte una constancia en PDF. Hay dos:
+
+- nativo: arma las tres constancias directamente con reportlab, dentro del
+  proceso (sin HTML, sin archivos temporales y sin arrancar WebKit)
+- wkhtmltopdf: convierte el HTML de la plantilla Jinja con un proceso externo
+
+El renderizador de cada tipo de constancia se elige en Config.PDF['renderers']
+(o Config.PDF['renderer_default']); si no está disponible o falla, PDFGenerator
+usa wkhtmltopdf y, sin él, entrega el HTML.
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+from app.core.config import Config
+from app.core.executable_paths import get_path_manager
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+RENDERIZADOR_NATIVO = "nativo"
+RENDERIZADOR_WKHTMLTOPDF = "wkhtmltopdf"
+RENDERIZADORES = (RENDERIZADOR_NATIVO, RENDERIZADOR_WKHTMLTOPDF)
+
+
+def renderizador_configurado(tipo_constancia: str) -> str:
+    """Nombre del renderizador elegido para el tipo de constancia"""
+    por_tipo = Config.PDF.get('renderers', {})
+    return por_tipo.get(tipo_constancia, Config.PDF.get('renderer_default', RENDERIZADOR_NATIVO))
+
+
+class RenderizadorPDF:
+    """
+    Interfaz de los renderizadores
+
+    usa_html indica si generar() necesita el HTML de la plantilla ya
+    renderizado (con las imágenes preparadas); los que no lo usan trabajan
+    directamente con los datos. version forma parte de la clave del caché
+    de renderizado (app/core/pdf_cache.py).
+    """
+
+    nombre = ""
+    usa_html = True
+    # Subir al cambiar lo que produce el renderizador (invalida el caché de renderizado)
+    version = 1
+
+    def disponible(self) -> bool:
+        """True si el renderizador puede usarse en este equipo"""
+        raise NotImplementedError
+
+    def soporta(self, tipo_constancia: str) -> bool:
+        """True si el renderizador sabe generar ese tipo de constancia"""
+        return True
+
+    def generar(self, tipo_constancia: str, datos: Dict[str, Any], output_filename: str,
+                html: Optional[str] = None, cancelar: Optional[threading.Event] = None) -> bool:
+        """
+        Genera el PDF de la constancia en output_filename
+
+        Args:
+            tipo_constancia: estudio, calificaciones o traslado
+            datos: Datos de la plantilla (ya ajustados con PDFGenerator.preparar_datos)
+            output_filename: Ruta del PDF
+            html: HTML listo para convertir (solo si usa_html)
+            cancelar: threading.Event opcional para abandonar la generación
+
+        Returns:
+            True si se generó el PDF
+        """
+        raise NotImplementedError
+
+
+class RenderizadorWkhtmltopdf(RenderizadorPDF):
+    """Convierte el HTML de la plantilla con wkhtmltopdf (un proceso por constancia)"""
+
+    nombre = RENDERIZADOR_WKHTMLTOPDF
+    usa_html = True
+
+    def __init__(self, pdf_generator):
+        self.pdf_generator = pdf_generator
+
+    def disponible(self) -> bool:
+        return bool(self.pdf_generator.wkhtmltopdf_path)
+
+    def generar(self, tipo_constancia, datos, output_filename, html=None, cancelar=None) -> bool:
+        if html is None:
+            return False
+        return self.pdf_generator.convertir_html_a_pdf(html, output_filename, cancelar)
+
+
+# ----------------------------------------------------------------------
+# Renderizador nativo
+# ----------------------------------------------------------------------
+
+# Textos y campos de cada plantilla (resources/templates/constancia_<tipo>.html).
+# Los valores entre llaves se toman de los datos de la plantilla.
+_PLANTILLAS: Dict[str, Dict[str, Any]] = {
+    "estudio": {
+        "titulo": "Constancia de Estudios",
+        "destinatario": "A QUIEN CORRESPONDA:",
+        "introduccion": "La dirección del Plantel hace constar que, según documentos existentes en el "
+                        "archivo de esta Institución, el alumno que a continuación se describe esta "
+                        "debidamente inscrito (a) en el presente Ciclo Escolar, con los siguientes datos:",
+        "campos": (
+            "<b>ID ALUMNO:</b> {id_alumno}",
+            "<b>NOMBRE:</b> {nombre}",
+            "<b>CURP:</b> {curp}",
+            "<b>MATRICULA:</b> {matricula}",
+            "<b>FECHA DE NACIMIENTO:</b> {nacimiento}",
+            "<b>CICLO ESCOLAR:</b> {ciclo}",
+            "<b>INICIO DEL CICLO:</b> 26 DE AGOSTO DE 2024",
+            "<b>FIN DEL CICLO:</b> 17 DE JULIO DE 2025",
+            "<b>GRADO Y GRUPO:</b> {grado}{grupo} {turno}",
+        ),
+        "despues_de_datos": (),
+        "titulo_calificaciones": None,
+        "encabezados": None,  # La constancia de estudios nunca lleva calificaciones
+        "nota": "Se expide la presente a petición del interesado, para los usos y fines legales "
+                "a que hubiese lugar.",
+        "atentamente": "A T E N T A M E N T E",
+    },
+    "calificaciones": {
+        "titulo": "Constancia con Calificaciones",
+        "destinatario": "A QUIEN CORRESPONDA",
+        "introduccion": "Por medio de la presente, se hace constar que, según documentos existentes "
+                        "en el archivo de esta Oficina, el alumno:",
+        "campos": (
+            "<b>NOMBRE:</b> {nombre}",
+            "<b>CURP:</b> {curp}",
+            "<b>MATRICULA:</b> {matricula}",
+            "<b>FECHA DE NACIMIENTO:</b> {nacimiento}",
+        ),
+        "despues_de_datos": (
+            "Cursa el {grado}er. grado de Educación Primaria, en el ciclo escolar {ciclo} "
+            "en la escuela {escuela}",
+            "<b>CLAVE:</b> {cct}",
+            "<b>ESTABLECIDA EN:</b> VICTORIA DE DURANGO, DURANGO",
+            "<b>GRADO:</b> {grado}",
+            "<b>GRUPO:</b> {grupo}",
+            "<b>TURNO:</b> {turno}",
+        ),
+        "titulo_calificaciones": None,
+        "encabezados": ("MATERIAS", "I", "II", "III", "Promedio"),
+        "nota": "Se extiende la presente CONSTANCIA a petición del interesado, para los usos y fines "
+                "legales a que hubiese lugar, en VICTORIA DE DURANGO, DURANGO, a los {fecha_actual}.",
+        "atentamente": "ATENTAMENTE",
+    },
+    "traslado": {
+        "titulo": "Constancia de Traslado",
+        "destinatario": "A QUIEN CORRESPONDA:",
+        "introduccion": "La dirección del plantel hace constar que, según documentos existentes en el "
+                        "archivo de esta institución, el alumno que a continuación se describe estuvo "
+                        "debidamente inscrito en el presente Ciclo Escolar, con los siguientes datos:",
+        "campos": (
+            "<b>CICLO ESCOLAR:</b> {ciclo}",
+            "<b>NOMBRE:</b> {nombre}",
+            "<b>CURP:</b> {curp}",
+            "<b>FECHA DE NACIMIENTO:</b> {nacimiento}",
+            "<b>MATRICULA:</b> {matricula}",
+            "<b>GRADO:</b> {grado} <b>GRUPO:</b> {grupo} <b>TURNO:</b> {turno}",
+        ),
+        "despues_de_datos": (),
+        "titulo_calificaciones": "CALIFICACIONES DE LAS ASIGNATURAS CURSADAS",
+        "encabezados": ("ASIGNATURA", "P1", "P2", "P3", "Promedio"),
+        "nota": "Se expide la presente a petición del interesado, para los usos y fines legales "
+                "a que hubiese lugar",
+        "atentamente": "A T E N T A M E N T E",
+    },
+}
+
+
+class _Valores(dict):
+    """Datos de la plantilla para str.format_map: escapados y vacíos si faltan (como Jinja)"""
+
+    def __getitem__(self, clave):
+        valor = self.get(clave)
+        return "" if valor is None else escape(str(valor))
+
+
+def _campo(materia: Any, clave: str) -> str:
+    valor = materia.get(clave) if isinstance(materia, dict) else getattr(materia, clave, None)
+    return "" if valor is None else escape(str(valor))
+
+
+class RenderizadorNativo(RenderizadorPDF):
+    """
+    Arma las constancias con reportlab, dentro del proceso
+
+    Reproduce el diseño de las plantillas HTML (carta, Helvetica en lugar de
+    Arial, mismos textos, recuadro de datos con foto y tabla de
+    calificaciones). Los estilos se crean una sola vez por instancia; cada
+    generar() es independiente y puede llamarse desde varios hilos.
+    """
+
+    nombre = RENDERIZADOR_NATIVO
+    usa_html = False
+
+    # 1 px de las plantillas = 0.75 pt
+    _PX = 0.75
+
+    def __init__(self):
+        self._estilos = None
+        self._lock = threading.Lock()
+
+    def disponible(self) -> bool:
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def soporta(self, tipo_constancia: str) -> bool:
+        """True si hay diseño nativo para el tipo de constancia"""
+        return tipo_constancia in _PLANTILLAS
+
+    def generar(self, tipo_constancia, datos, output_filename, html=None, cancelar=None) -> bool:
+        plantilla = _PLANTILLAS.get(tipo_constancia)
+        if plantilla is None:
+            logger.warning(f"⚠️ No hay diseño nativo para la constancia de {tipo_constancia}")
+            return False
+        if cancelar is not None and cancelar.is_set():
+            return False
+
+        try:
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.units import mm
+            from reportlab.platypus import SimpleDocTemplate
+
+            margen = 5 * mm + 15 * self._PX  # Márgenes de wkhtmltopdf (5mm) + margen del body
+            documento = SimpleDocTemplate(
+                output_filename, pagesize=letter,
+                leftMargin=margen, rightMargin=margen, topMargin=margen, bottomMargin=margen,
+                title=plantilla["titulo"], author=str(datos.get("escuela") or ""),
+            )
+            documento.build(self._contenido(plantilla, datos, documento.width))
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error al generar la constancia con reportlab: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Diseño
+    # ------------------------------------------------------------------
+
+    def _obtener_estilos(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._estilos is None:
+                self._estilos = self._crear_estilos()
+            return self._estilos
+
+    @staticmethod
+    def _crear_estilos() -> Dict[str, Any]:
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+        from reportlab.lib.styles import ParagraphStyle
+
+        texto = ParagraphStyle("texto", fontName="Helvetica", fontSize=12, leading=15,
+                               textColor=colors.HexColor("#333333"), alignment=TA_LEFT, spaceAfter=5)
+        return {
+            "texto": texto,
+            "titulo": ParagraphStyle("titulo", parent=texto, fontName="Helvetica-Bold", fontSize=18,
+                                     leading=22, alignment=TA_CENTER, spaceAfter=0),
+            "fecha": ParagraphStyle("fecha", parent=texto, fontName="Helvetica-Oblique", fontSize=10,
+                                    leading=14, alignment=TA_RIGHT, spaceBefore=6),
+            "escuela": ParagraphStyle("escuela", parent=texto, fontSize=14, leading=20, alignment=TA_CENTER),
+            "destinatario": ParagraphStyle("destinatario", parent=texto, fontName="Helvetica-Bold"),
+            "sangria": ParagraphStyle("sangria", parent=texto, leading=14, leftIndent=30, rightIndent=15, spaceAfter=0),
+            "dato": ParagraphStyle("dato", parent=texto, fontSize=13, leading=16, spaceAfter=0),
+            "foto": ParagraphStyle("foto", parent=texto, fontSize=10, leading=13, alignment=TA_CENTER,
+                                   textColor=colors.HexColor("#999999"), spaceAfter=0),
+            "subtitulo": ParagraphStyle("subtitulo", parent=texto, fontName="Helvetica-Bold", fontSize=14,
+                                        leading=18, leftIndent=30, spaceBefore=12),
+            "celda": ParagraphStyle("celda", parent=texto, fontSize=11, leading=13, spaceAfter=0),
+            "nota": ParagraphStyle("nota", parent=texto, fontName="Helvetica-Oblique", fontSize=10,
+                                   leading=14, alignment=TA_JUSTIFY, leftIndent=30, rightIndent=15,
+                                   spaceBefore=12),
+            "firma": ParagraphStyle("firma", parent=texto, alignment=TA_CENTER, spaceAfter=0),
+        }
+
+    def _contenido(self, plantilla: Dict[str, Any], datos: Dict[str, Any], ancho: float) -> List[Any]:
+        from reportlab.lib import colors
+        from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+        estilos = self._obtener_estilos()
+        valores = _Valores(datos)
+        px = self._PX
+
+        def parrafo(texto: str, estilo: str) -> Paragraph:
+            return Paragraph(texto.format_map(valores), estilos[estilo])
+
+        contenido: List[Any] = []
+
+        # Encabezado: logo y título
+        titulo = Paragraph(escape(plantilla["titulo"].upper()), estilos["titulo"])
+        logo = self._logo(60 * px)
+        if logo is not None:
+            encabezado = Table([[logo, titulo]], colWidths=[logo.drawWidth + 10, None])
+        else:
+            encabezado = Table([[titulo]])
+        encabezado.setStyle(TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("LINEBELOW", (-1, 0), (-1, 0), 2 * px, colors.HexColor("#333333")),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 5 * px),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ]))
+        contenido.append(encabezado)
+
+        contenido.append(parrafo("<b>Victoria de Durango, Durango</b> a los {fecha_actual}", "fecha"))
+        contenido.append(parrafo("<b>{escuela}</b> CCT: {cct}", "escuela"))
+        contenido.append(parrafo(escape(plantilla["destinatario"]), "destinatario"))
+        contenido.append(parrafo(escape(plantilla["introduccion"]), "texto"))
+
+        # Recuadro con foto y datos del alumno
+        contenido.append(self._recuadro_datos(plantilla, datos, valores, ancho))
+
+        for linea in plantilla["despues_de_datos"]:
+            contenido.append(parrafo(linea, "sangria"))
+
+        calificaciones = datos.get("calificaciones") or []
+        if plantilla["encabezados"] and datos.get("mostrar_calificaciones") and len(calificaciones) > 0:
+            if plantilla["titulo_calificaciones"]:
+                contenido.append(Paragraph(plantilla["titulo_calificaciones"], estilos["subtitulo"]))
+            contenido.append(self._tabla_calificaciones(plantilla["encabezados"], calificaciones, ancho))
+
+        contenido.append(parrafo(plantilla["nota"], "nota"))
+
+        # Firma
+        contenido.append(Spacer(1, 20 * px))
+        firma = Table([[parrafo(escape(plantilla["atentamente"]), "firma")],
+                       [parrafo("<b>{director}</b>", "firma")],
+                       [parrafo("DIRECTOR", "firma")]], colWidths=[ancho * 0.9])
+        firma.setStyle(TableStyle([
+            ("LINEABOVE", (0, 0), (-1, 0), 1 * px, colors.HexColor("#333333")),
+            ("TOPPADDING", (0, 0), (-1, -1), 2),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+        ]))
+        contenido.append(firma)
+        return contenido
+
+    def _recuadro_datos(self, plantilla: Dict[str, Any], datos: Dict[str, Any],
+                        valores: _Valores, ancho: float):
+        from reportlab.lib import colors
+        from reportlab.platypus import Paragraph, Table, TableStyle
+
+        estilos = self._obtener_estilos()
+        px = self._PX
+
+        filas = [[Paragraph(campo.format_map(valores), estilos["dato"])] for campo in plantilla["campos"]]
+        lista = Table(filas)
+        lista.setStyle(TableStyle([
+            ("LINEBELOW", (0, 0), (-1, -1), 1 * px, colors.HexColor("#eeeeee"), 1, (1, 2)),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+            ("TOPPADDING", (0, 0), (-1, -1), 4 * px),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 4 * px),
+        ]))
+
+        foto = self._foto(datos)
+        ancho_recuadro = ancho - 30
+        if foto is not None:
+            celdas = [[foto, lista]]
+            columnas = [170 * px, ancho_recuadro - 170 * px - 40 * px]
+        else:
+            celdas = [[lista]]
+            columnas = [ancho_recuadro - 40 * px]
+
+        recuadro = Table(celdas, colWidths=columnas)
+        recuadro.setStyle(TableStyle([
+            ("BOX", (0, 0), (-1, -1), 1 * px, colors.HexColor("#dddddd")),
+            ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#f9f9f9")),
+            ("VALIGN", (0, 0), (0, 0), "MIDDLE" if foto is not None else "TOP"),
+            ("VALIGN", (-1, 0), (-1, 0), "TOP"),
+            ("LEFTPADDING", (0, 0), (0, 0), 40 * px),
+            ("RIGHTPADDING", (-1, 0), (-1, 0), 20 * px),
+            ("TOPPADDING", (0, 0), (-1, -1), 10 * px),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 10 * px),
+        ]))
+        recuadro.spaceBefore = 15 * px
+        recuadro.spaceAfter = 15 * px
+        return recuadro
+
+    def _tabla_calificaciones(self, encabezados: Tuple[str, ...], calificaciones: List[Any], ancho: float):
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import ParagraphStyle
+        from reportlab.platypus import Paragraph, Table, TableStyle
+
+        estilos = self._obtener_estilos()
+        celda = estilos["celda"]
+        centrada = ParagraphStyle("celda_centrada", parent=celda, alignment=TA_CENTER)
+        px = self._PX
+
+        filas = [[Paragraph(f"<b>{escape(encabezado)}</b>", celda if i == 0 else centrada)
+                  for i, encabezado in enumerate(encabezados)]]
+        for materia in calificaciones:
+            filas.append([
+                Paragraph(_campo(materia, "nombre"), celda),
+                Paragraph(_campo(materia, "i"), centrada),
+                Paragraph(_campo(materia, "ii"), centrada),
+                Paragraph(_campo(materia, "iii"), centrada),
+                Paragraph(f"<b>{_campo(materia, 'promedio')}</b>", centrada),
+            ])
+
+        ancho_tabla = (ancho - 60 * px) * 0.9
+        tabla = Table(filas, colWidths=[ancho_tabla * p for p in (0.55, 0.10, 0.10, 0.10, 0.15)],
+                      repeatRows=1)
+        tabla.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f5f5f5")),
+            ("LINEBELOW", (0, 0), (-1, 0), 1 * px, colors.HexColor("#dddddd")),
+            ("LINEBELOW", (0, 1), (-1, -1), 1 * px, colors.HexColor("#eeeeee")),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("TOPPADDING", (0, 0), (-1, -1), 3 * px),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 3 * px),
+        ]))
+        tabla.spaceBefore = 10 * px
+        tabla.spaceAfter = 5 * px
+        return tabla
+
+    # ------------------------------------------------------------------
+    # Imágenes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _logo(alto: float):
+        """Logo de la escuela escalado a alto (o None si no existe)"""
+        from reportlab.lib.utils import ImageReader
+        from reportlab.platypus import Image
+
+        ruta = get_path_manager().get_logos_dir() / "logo_educacion.png"
+        if not ruta.exists():
+            return None
+        try:
+            ancho_px, alto_px = ImageReader(str(ruta)).getSize()
+            return Image(str(ruta), width=alto * ancho_px / alto_px, height=alto)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar el logo: {e}")
+            return None
+
+    def _foto(self, datos: Dict[str, Any]):
+        """Foto del alumno, recuadro "Espacio para foto" o None (según has_photo/show_placeholder)"""
+        from reportlab.lib import colors
+        from reportlab.platypus import Image, Paragraph, Table, TableStyle
+
+        px = self._PX
+        if datos.get("has_photo"):
+            curp = datos.get("curp", "")
+            ruta = get_path_manager().get_photos_dir() / f"{curp}.jpg"
+            candidatas = [str(ruta), datos.get("foto_path")]
+            for candidata in candidatas:
+                if candidata and os.path.exists(candidata):
+                    try:
+                        return Image(candidata, width=135 * px, height=180 * px)
+                    except Exception as e:
+                        logger.warning(f"⚠️ No se pudo cargar la foto {candidata}: {e}")
+            # Como en el HTML, una foto que no se encuentra deja el espacio vacío
+            return Table([[""]], colWidths=[135 * px], rowHeights=[180 * px])
+
+        if datos.get("show_placeholder"):
+            espacio = Table([[Paragraph("Espacio para<br/>foto", self._obtener_estilos()["foto"])]],
+                            colWidths=[135 * px], rowHeights=[180 * px])
+            espacio.setStyle(TableStyle([
+                ("BOX", (0, 0), (-1, -1), 1 * px, colors.HexColor("#999999"), 1, (3, 2)),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ]))
+            return espacio
+        return None
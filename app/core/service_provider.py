@@ -1,10 +1,15 @@
 """
 Proveedor centralizado de servicios para la aplicación
 """
-import sqlite3
+import threading
 from app.services.alumno_service import AlumnoService
 from app.services.constancia_service import ConstanciaService
 from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.escritor import get_escritor
+from app.core.database.schema_migrator import migrate_database
+from app.core.logging import get_logger
+from app.data.indices.cubo_agregados import get_cubo_agregados
 
 class ServiceProvider:
     """Clase que proporciona acceso centralizado a los servicios de la aplicación"""
@@ -20,33 +25,72 @@ class ServiceProvider:
 
     def __init__(self):
         """Inicializa los servicios"""
-        # Crear una única conexión a la base de datos que será compartida por todos los servicios
-        self.db_connection = sqlite3.connect(Config.DB_PATH)
-        self.db_connection.row_factory = sqlite3.Row
+        # Aplicar migraciones pendientes del esquema (índices, columnas nuevas)
+        if not migrate_database(Config.DB_PATH):
+            # La app sigue arrancando, pero un índice faltante o un plan con
+            # recorrido completo de tabla deja las consultas lentas sin avisar
+            get_logger(__name__).warning(
+                "⚠️ La migración del esquema o la verificación de planes de consulta falló; "
+                "revise el log del migrador (posible índice faltante)"
+            )
 
-        # Inicializar servicios como None para crearlos bajo demanda
-        self._alumno_service = None
-        self._constancia_service = None
+        # Las conexiones vienen del gestor central: una por hilo (UI, AsyncChatWorker, ...)
+        self.connection_manager = get_connection_manager(Config.DB_PATH)
+
+        # Servicios por hilo, creados bajo demanda sobre la conexión de ese hilo
+        self._local = threading.local()
+
+        # Escritor único: las escrituras de los servicios se encolan en su hilo
+        self.escritor = get_escritor(Config.DB_PATH) if Config.DATABASE.get('single_writer_enabled', True) else None
+
+        # Cubo de conteos por ciclo/grado/grupo/turno: un recorrido al arrancar y
+        # después se mantiene desde los repositorios
+        if Config.DATABASE.get('aggregate_cube_enabled', True):
+            try:
+                get_cubo_agregados(Config.DB_PATH).construir()
+            except Exception as e:
+                # Sin cubo las estadísticas se calculan con SQL; se reintenta en el primer uso
+                get_logger(__name__).warning(f"⚠️ No se pudo construir el cubo de agregados: {e}")
+
+    @property
+    def db_connection(self):
+        """Obtiene la conexión a la base de datos del hilo actual"""
+        return self.connection_manager.get_connection()
 
     @property
     def alumno_service(self):
         """Obtiene el servicio de alumnos"""
-        if self._alumno_service is None:
-            self._alumno_service = AlumnoService(db_connection=self.db_connection)
+        service = getattr(self._local, 'alumno_service', None)
+        if service is None:
+            service = AlumnoService(db_connection=self.db_connection)
             # Marcar la conexión como compartida para evitar que se cierre al cerrar el servicio
-            self._alumno_service.shared_connection = True
-        return self._alumno_service
+            service.shared_connection = True
+            service.escritor = self.escritor
+            self._local.alumno_service = service
+        return service
 
     @property
     def constancia_service(self):
         """Obtiene el servicio de constancias"""
-        if self._constancia_service is None:
-            self._constancia_service = ConstanciaService(db_connection=self.db_connection)
+        service = getattr(self._local, 'constancia_service', None)
+        if service is None:
+            service = ConstanciaService(db_connection=self.db_connection)
             # Marcar la conexión como compartida para evitar que se cierre al cerrar el servicio
-            self._constancia_service.shared_connection = True
-        return self._constancia_service
+            service.shared_connection = True
+            service.escritor = service.alumno_service.escritor = self.escritor
+            self._local.constancia_service = service
+        return service
+
+    def release_thread_resources(self):
+        """Libera servicios y conexiones del hilo actual (al terminar un worker)"""
+        self._local.alumno_service = None
+        self._local.constancia_service = None
+        self.connection_manager.close_thread_connections()
 
     def close(self):
         """Cierra todas las conexiones de servicios"""
-        if self.db_connection:
-            self.db_connection.close()
+        # Confirmar lo que quede en la cola antes de cerrar las conexiones
+        if self.escritor is not None:
+            self.escritor.detener()
+        self.connection_manager.close_all()
+        self._local = threading.local()
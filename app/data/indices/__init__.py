@@ -0,0 +1,3 @@
+"""
+app/data/indices package
+"""
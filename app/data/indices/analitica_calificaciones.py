@@ -0,0 +1,471 @@
+"""
+Analítica de calificaciones en memoria con NumPy
+
+Carga la tabla calificaciones (registro, materia, periodo) en un arreglo
+registros × materias × periodos y calcula promedios, medianas, percentiles,
+rankings, comparaciones entre grupos y cambios entre periodos sin una consulta
+SQL por cada corte.
+
+NumPy es opcional: sin él NUMPY_DISPONIBLE es False y las estadísticas que
+dependen de este módulo no están disponibles.
+"""
+import os
+import threading
+import unicodedata
+import warnings
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.logging import get_logger
+from app.data.indices.cubo_agregados import normalizar_valor
+
+try:
+    import numpy as np
+    NUMPY_DISPONIBLE = True
+except ImportError:
+    np = None
+    NUMPY_DISPONIBLE = False
+
+# Periodos en el orden del arreglo (mismas claves que el JSON de calificaciones)
+PERIODOS = ('i', 'ii', 'iii', 'promedio')
+PERIODOS_PARCIALES = ('i', 'ii', 'iii')
+
+# Dimensiones del registro escolar por las que se puede filtrar y agrupar
+DIMENSIONES = ('ciclo_escolar', 'grado', 'grupo', 'turno')
+
+# Campos de alumnos filtrables por coincidencia parcial (como LIKE '%valor%')
+CAMPOS_TEXTO = ('nombre', 'curp', 'matricula')
+
+SQL_REGISTROS = """
+    SELECT de.id, de.alumno_id, a.nombre, a.curp, a.matricula,
+           de.ciclo_escolar, de.grado, de.grupo, de.turno
+    FROM datos_escolares de
+    JOIN alumnos a ON a.id = de.alumno_id
+    WHERE EXISTS (SELECT 1 FROM calificaciones c WHERE c.datos_escolares_id = de.id)
+    ORDER BY de.id
+"""
+
+SQL_CALIFICACIONES = """
+    SELECT datos_escolares_id, materia, periodo, calificacion
+    FROM calificaciones
+    WHERE calificacion IS NOT NULL AND calificacion != 0
+"""
+
+
+def normalizar_texto(texto: Any) -> str:
+    """Mayúsculas sin acentos: "matemáticas" y "MATEMATICAS" son la misma materia"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').strip().upper())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _redondear(valor, decimales: int = 2) -> Optional[float]:
+    """float redondeado, o None para NaN (sin calificaciones)"""
+    valor = float(valor)
+    return None if valor != valor else round(valor, decimales)
+
+
+class AnaliticaCalificaciones:
+    """
+    Calificaciones cargadas como arreglo denso con máscara de ausentes
+
+    - valores[r, m, p]: calificación del registro r en la materia m y periodo p
+      (NaN si no está capturada; 0 cuenta como no capturada, igual que
+      promedio_general)
+    - presente: máscara booleana de los valores capturados
+    - Los metadatos de cada registro (grado, grupo, nombre...) son arreglos
+      paralelos al primer eje
+
+    Se recarga completo cuando cambia la versión de datos (PRAGMA data_version).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.logger = get_logger(__name__)
+        self._lock = threading.RLock()
+        self._version: Optional[Tuple[int, int]] = None
+
+        self.materias: List[str] = []
+        self.valores = None
+        self.presente = None
+        self.metadatos: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def cargar(self):
+        """Lee registros y calificaciones y arma los arreglos"""
+        if not NUMPY_DISPONIBLE:
+            raise RuntimeError("NumPy no está instalado")
+
+        from app.core.database.connection_manager import get_connection_manager
+        manager = get_connection_manager(self.db_path)
+        version = manager.version_datos()
+        conn = manager.get_readonly_connection()
+        registros = conn.execute(SQL_REGISTROS).fetchall()
+        calificaciones = conn.execute(SQL_CALIFICACIONES).fetchall()
+
+        fila_de_registro = {registro[0]: i for i, registro in enumerate(registros)}
+        materias = sorted({materia for _, materia, _, _ in calificaciones})
+        columna_de_materia = {materia: j for j, materia in enumerate(materias)}
+        indice_periodo = {periodo: k for k, periodo in enumerate(PERIODOS)}
+
+        valores = np.full((len(registros), len(materias), len(PERIODOS)), np.nan)
+        capturadas = [(fila_de_registro[registro], columna_de_materia[materia], indice_periodo[periodo], valor)
+                      for registro, materia, periodo, valor in calificaciones
+                      if registro in fila_de_registro and periodo in indice_periodo]
+        if capturadas:
+            filas, columnas, periodos, datos = zip(*capturadas)
+            valores[list(filas), list(columnas), list(periodos)] = datos
+
+        metadatos = {
+            'datos_escolares_id': np.array([r[0] for r in registros], dtype=np.int64),
+            'alumno_id': np.array([r[1] for r in registros], dtype=np.int64),
+        }
+        for posicion, campo in enumerate(('nombre', 'curp', 'matricula') + DIMENSIONES, start=2):
+            metadatos[campo] = np.array([r[posicion] for r in registros], dtype=object)
+
+        with self._lock:
+            self.materias = materias
+            self.valores = valores
+            self.presente = ~np.isnan(valores)
+            self.metadatos = metadatos
+            self._version = version
+
+        self.logger.info(f"✅ Analítica de calificaciones cargada: {len(registros)} registros × "
+                         f"{len(materias)} materias × {len(PERIODOS)} periodos")
+
+    def _asegurar_vigente(self):
+        """Recarga si la base cambió desde la última carga"""
+        from app.core.database.connection_manager import get_connection_manager
+        if self._version is None or get_connection_manager(self.db_path).version_datos() != self._version:
+            self.cargar()
+
+    # ------------------------------------------------------------------
+    # Selección
+    # ------------------------------------------------------------------
+
+    def resolver_materias(self, materia: Optional[str]) -> List[int]:
+        """
+        Columnas de las materias que coinciden con el texto (todas si es None)
+
+        Coincidencia exacta primero; si no hay, las que contienen el texto
+        ("civica" → FORMACION CIVICA Y ETICA y FORMACION CIVICA Y ETICA 1).
+        """
+        if not materia or normalizar_texto(materia) in ('', 'CALIFICACIONES', 'TODAS', 'GENERAL'):
+            return list(range(len(self.materias)))
+        buscada = normalizar_texto(materia)
+        normalizadas = [normalizar_texto(m) for m in self.materias]
+        exactas = [j for j, nombre in enumerate(normalizadas) if nombre == buscada]
+        return exactas or [j for j, nombre in enumerate(normalizadas) if buscada in nombre]
+
+    def tiene_materia(self, materia: str) -> bool:
+        """True si alguna materia con calificaciones coincide con el texto"""
+        with self._lock:
+            self._asegurar_vigente()
+            return bool(self.resolver_materias(materia))
+
+    def seleccionar(self, filtros: Optional[Dict[str, Any]] = None):
+        """
+        Máscara de registros que cumplen los filtros {campo: valor}
+
+        Dimensiones por igualdad (como _aplicar_filtro_simple); nombre, curp y
+        matrícula por coincidencia parcial.
+        """
+        seleccion = np.ones(len(self.metadatos['datos_escolares_id']), dtype=bool)
+        for campo, valor in (filtros or {}).items():
+            if valor is None or valor == '':
+                continue
+            if campo in DIMENSIONES:
+                buscado = normalizar_valor(campo, str(valor).upper())
+                seleccion &= np.array([normalizar_valor(campo, v) == buscado
+                                       for v in self.metadatos[campo]], dtype=bool)
+            elif campo in CAMPOS_TEXTO:
+                buscado = str(valor).upper()
+                seleccion &= np.array([buscado in str(v or '').upper()
+                                       for v in self.metadatos[campo]], dtype=bool)
+        return seleccion
+
+    @staticmethod
+    def _media(valores, presente, eje):
+        """Promedio ignorando ausentes (NaN donde no hay ningún valor)"""
+        cantidad = presente.sum(axis=eje)
+        suma = np.where(presente, valores, 0.0).sum(axis=eje)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(cantidad > 0, suma / np.maximum(cantidad, 1), np.nan), cantidad
+
+    @staticmethod
+    def _percentiles(valores, cuantiles: Iterable[float], eje=None):
+        """np.nanpercentile sin advertencias por cortes vacíos"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanpercentile(valores, list(cuantiles), axis=eje)
+
+    def puntajes(self, periodo: str = 'promedio', materia: Optional[str] = None):
+        """
+        Puntaje por registro: promedio de las materias elegidas en el periodo
+
+        Returns:
+            (puntajes, materias_con_valor) por registro; NaN sin calificaciones
+        """
+        columnas = self.resolver_materias(materia)
+        k = PERIODOS.index(periodo)
+        return self._media(self.valores[:, columnas, k], self.presente[:, columnas, k], eje=1)
+
+    # ------------------------------------------------------------------
+    # Estadísticas
+    # ------------------------------------------------------------------
+
+    def resumen(self, puntajes) -> Dict[str, Any]:
+        """Cantidad, media, mediana, percentiles 25/75, mínimo y máximo"""
+        validos = puntajes[~np.isnan(puntajes)]
+        if validos.size == 0:
+            return {"alumnos": 0, "promedio": None, "mediana": None, "p25": None, "p75": None,
+                    "minimo": None, "maximo": None}
+        p25, mediana, p75 = np.percentile(validos, [25, 50, 75])
+        return {
+            "alumnos": int(validos.size),
+            "promedio": _redondear(validos.mean()),
+            "mediana": _redondear(mediana),
+            "p25": _redondear(p25),
+            "p75": _redondear(p75),
+            "minimo": _redondear(validos.min()),
+            "maximo": _redondear(validos.max()),
+        }
+
+    def ranking(self, limite: int = 10, descendente: bool = True, periodo: str = 'promedio',
+                materia: Optional[str] = None, filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Los N mejores (o peores) alumnos por puntaje
+
+        La posición es de competencia (empates comparten lugar: 1, 2, 2, 4) y
+        el percentil se calcula dentro de la población filtrada.
+        """
+        with self._lock:
+            self._asegurar_vigente()
+            puntajes, materias_con_valor = self.puntajes(periodo, materia)
+            indices = np.flatnonzero(self.seleccionar(filtros) & ~np.isnan(puntajes))
+            valores = puntajes[indices]
+
+            orden = np.argsort(-valores if descendente else valores, kind='stable')[:max(0, limite)]
+            ascendentes = np.sort(valores)
+            # Posición: 1 + cuántos tienen un puntaje estrictamente mejor
+            if descendente:
+                posiciones = valores.size - np.searchsorted(ascendentes, valores[orden], side='right') + 1
+            else:
+                posiciones = np.searchsorted(ascendentes, valores[orden], side='left') + 1
+            percentiles = np.searchsorted(ascendentes, valores[orden], side='right') / max(valores.size, 1) * 100
+
+            filas = []
+            for posicion, percentil, i in zip(posiciones, percentiles, indices[orden]):
+                filas.append({
+                    "posicion": int(posicion),
+                    "nombre": self.metadatos['nombre'][i],
+                    "grado": self.metadatos['grado'][i],
+                    "grupo": self.metadatos['grupo'][i],
+                    "turno": self.metadatos['turno'][i],
+                    "promedio": _redondear(puntajes[i]),
+                    "materias": int(materias_con_valor[i]),
+                    "percentil": _redondear(percentil, 1),
+                    "alumno_id": int(self.metadatos['alumno_id'][i]),
+                })
+            return filas
+
+    def por_grupo(self, dimension: str, periodo: str = 'promedio', materia: Optional[str] = None,
+                  filtros: Optional[Dict[str, Any]] = None,
+                  valores_grupo: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Resumen por valor de una dimensión (grado, grupo, turno, ciclo_escolar)
+
+        Los promedios salen de un solo bincount; medianas y percentiles se
+        calculan por grupo sobre el mismo vector de puntajes.
+        """
+        if dimension not in DIMENSIONES:
+            raise KeyError(f"No se puede agrupar por {dimension}")
+        with self._lock:
+            self._asegurar_vigente()
+            puntajes, _ = self.puntajes(periodo, materia)
+            seleccion = self.seleccionar(filtros) & ~np.isnan(puntajes)
+            if valores_grupo:
+                aceptados = {normalizar_valor(dimension, str(v).upper()) for v in valores_grupo}
+                seleccion &= np.array([normalizar_valor(dimension, v) in aceptados
+                                       for v in self.metadatos[dimension]], dtype=bool)
+
+            etiquetas = np.array([str(v) for v in self.metadatos[dimension][seleccion]], dtype=object)
+            valores = puntajes[seleccion]
+            if valores.size == 0:
+                return []
+            grupos, codigos = np.unique(etiquetas, return_inverse=True)
+            cantidades = np.bincount(codigos, minlength=len(grupos))
+            medias = np.bincount(codigos, weights=valores, minlength=len(grupos)) / cantidades
+            media_general = valores.mean()
+
+            filas = []
+            for g, grupo in enumerate(grupos):
+                del_grupo = valores[codigos == g]
+                p25, mediana, p75 = np.percentile(del_grupo, [25, 50, 75])
+                filas.append({
+                    dimension: grupo,
+                    "alumnos": int(cantidades[g]),
+                    "promedio": _redondear(medias[g]),
+                    "mediana": _redondear(mediana),
+                    "p25": _redondear(p25),
+                    "p75": _redondear(p75),
+                    "diferencia_vs_general": _redondear(medias[g] - media_general),
+                })
+            return filas
+
+    def por_materia(self, periodo: str = 'promedio', filtros: Optional[Dict[str, Any]] = None,
+                    dimension: Optional[str] = None,
+                    valores_grupo: Optional[Iterable[Any]] = None,
+                    materia: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Promedio, mediana y percentiles de cada materia; con dimension, además
+        el promedio de cada materia por grupo (matriz grupos × materias)
+
+        Returns:
+            {"materias": filas por materia, "grupos": etiquetas, "matriz": filas por materia con
+             una columna por grupo} (grupos y matriz vacíos sin dimension)
+        """
+        with self._lock:
+            self._asegurar_vigente()
+            k = PERIODOS.index(periodo)
+            columnas = self.resolver_materias(materia)
+            nombres = [self.materias[j] for j in columnas]
+            seleccion = self.seleccionar(filtros)
+            valores = self.valores[seleccion][:, columnas, k]
+            presente = self.presente[seleccion][:, columnas, k]
+
+            medias, cantidades = self._media(valores, presente, eje=0)
+            p25, medianas, p75 = self._percentiles(valores, (25, 50, 75), eje=0)
+
+            materias = []
+            for j, materia in enumerate(nombres):
+                if cantidades[j] == 0:
+                    continue
+                materias.append({
+                    "materia": materia,
+                    "alumnos": int(cantidades[j]),
+                    "promedio": _redondear(medias[j]),
+                    "mediana": _redondear(medianas[j]),
+                    "p25": _redondear(p25[j]),
+                    "p75": _redondear(p75[j]),
+                })
+
+            grupos, matriz = [], []
+            if dimension:
+                if dimension not in DIMENSIONES:
+                    raise KeyError(f"No se puede agrupar por {dimension}")
+                etiquetas = np.array([str(v) for v in self.metadatos[dimension][seleccion]], dtype=object)
+                if valores_grupo:
+                    aceptados = {str(normalizar_valor(dimension, str(v).upper())) for v in valores_grupo}
+                    en_grupo = np.array([e in aceptados for e in etiquetas], dtype=bool)
+                else:
+                    en_grupo = np.ones(etiquetas.size, dtype=bool)
+                grupos_arr = np.unique(etiquetas[en_grupo]) if en_grupo.any() else np.array([], dtype=object)
+                grupos = [str(g) for g in grupos_arr]
+
+                # Pertenencia registro × grupo: sumas y conteos por grupo en un producto matricial
+                pertenencia = (etiquetas[:, None] == grupos_arr[None, :]).astype(float)
+                sumas = pertenencia.T @ np.where(presente, valores, 0.0)
+                conteos = pertenencia.T @ presente.astype(float)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    medias_grupo = np.where(conteos > 0, sumas / np.maximum(conteos, 1), np.nan)
+
+                for j, materia in enumerate(nombres):
+                    if not conteos[:, j].any():
+                        continue
+                    fila = {"materia": materia}
+                    columna = medias_grupo[:, j]
+                    for g, grupo in enumerate(grupos):
+                        fila[grupo] = _redondear(columna[g])
+                    validas = columna[~np.isnan(columna)]
+                    fila["diferencia"] = _redondear(validas.max() - validas.min()) if validas.size > 1 else None
+                    matriz.append(fila)
+
+            return {"materias": materias, "grupos": grupos, "matriz": matriz}
+
+    def deltas_periodo(self, materia: Optional[str] = None,
+                       filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Promedio por periodo (i, ii, iii) de cada materia y el cambio entre periodos
+
+        Solo cuentan los alumnos con ambos periodos capturados en cada delta,
+        para no confundir un cambio real con una captura incompleta.
+        """
+        with self._lock:
+            self._asegurar_vigente()
+            columnas = self.resolver_materias(materia)
+            parciales = [PERIODOS.index(p) for p in PERIODOS_PARCIALES]
+            seleccion = self.seleccionar(filtros)
+            valores = self.valores[seleccion][:, columnas][:, :, parciales]
+            presente = self.presente[seleccion][:, columnas][:, :, parciales]
+
+            medias, cantidades = self._media(valores, presente, eje=0)       # materias × periodos
+            ambos = presente[:, :, 1:] & presente[:, :, :-1]                 # pares (ii,i), (iii,ii)
+            deltas, _ = self._media(valores[:, :, 1:] - valores[:, :, :-1], ambos, eje=0)
+
+            # Fila general: puntaje por alumno (promedio de materias) en cada periodo
+            generales, presentes_generales = self._media(valores, presente, eje=1)   # alumnos × periodos
+            con_valor = presentes_generales > 0
+            media_general, _ = self._media(generales, con_valor, eje=0)
+            delta_general, _ = self._media(generales[:, 1:] - generales[:, :-1],
+                                           con_valor[:, 1:] & con_valor[:, :-1], eje=0)
+
+            filas = []
+            for posicion, j in enumerate(columnas):
+                if cantidades[posicion].sum() == 0:
+                    continue
+                filas.append(self._fila_periodos(self.materias[j], medias[posicion], deltas[posicion]))
+            if len(filas) > 1:
+                filas.append(self._fila_periodos("GENERAL", media_general, delta_general))
+            return filas
+
+    @staticmethod
+    def _fila_periodos(materia: str, medias, deltas) -> Dict[str, Any]:
+        return {
+            "materia": materia,
+            "periodo_i": _redondear(medias[0]),
+            "periodo_ii": _redondear(medias[1]),
+            "periodo_iii": _redondear(medias[2]),
+            "cambio_i_ii": _redondear(deltas[0]),
+            "cambio_ii_iii": _redondear(deltas[1]),
+        }
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tamaño de los arreglos cargados (diagnóstico)"""
+        with self._lock:
+            if self.valores is None:
+                return {'cargado': False}
+            return {
+                'cargado': True,
+                'registros': int(self.valores.shape[0]),
+                'materias': len(self.materias),
+                'calificaciones': int(self.presente.sum()),
+                'bytes': int(self.valores.nbytes + self.presente.nbytes),
+            }
+
+
+# Una instancia por archivo de base de datos
+_analiticas: Dict[str, AnaliticaCalificaciones] = {}
+_analiticas_lock = threading.Lock()
+
+def get_analitica_calificaciones(db_path: Optional[str] = None) -> AnaliticaCalificaciones:
+    """
+    Obtiene la analítica de calificaciones global para una base de datos
+
+    Args:
+        db_path: Ruta a la base de datos (por defecto Config.DB_PATH)
+
+    Returns:
+        Instancia compartida de AnaliticaCalificaciones (se carga en el primer uso)
+    """
+    if db_path is None:
+        from app.core.config import Config
+        db_path = Config.DB_PATH
+
+    key = os.path.abspath(str(db_path))
+    with _analiticas_lock:
+        analitica = _analiticas.get(key)
+        if analitica is None:
+            analitica = AnaliticaCalificaciones(key)
+            _analiticas[key] = analitica
+    return analitica
@@ -0,0 +1,259 @@
+"""
+Cubo de conteos en memoria por (ciclo, grado, grupo, turno, tiene_calificaciones)
+"""
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.core.logging import get_logger
+
+# Dimensiones del cubo, en el orden de la clave
+DIMENSIONES = ('ciclo_escolar', 'grado', 'grupo', 'turno', 'tiene_calificaciones')
+
+# Dimensiones con afinidad INTEGER en datos_escolares
+DIMENSIONES_ENTERAS = frozenset({'grado', 'tiene_calificaciones'})
+
+# Filas de alumnos a LEFT JOIN datos_escolares de, por alumno
+SQL_FILAS = """
+    SELECT a.id, de.id IS NOT NULL AS con_registro,
+           de.ciclo_escolar, de.grado, de.grupo, de.turno, de.tiene_calificaciones
+    FROM alumnos a
+    LEFT JOIN datos_escolares de ON a.id = de.alumno_id
+"""
+
+# (con_registro, *DIMENSIONES): con_registro distingue al alumno sin datos escolares
+# (columnas de "de" en NULL por el LEFT JOIN) de un registro con esas columnas vacías
+Clave = Tuple[Any, ...]
+
+
+def normalizar_valor(dimension: str, valor: Any) -> Any:
+    """
+    Convierte un valor de filtro como lo haría SQLite al compararlo con la columna
+
+    grado = '3' coincide con 3 por la afinidad INTEGER; el texto se compara tal cual.
+    """
+    if dimension in DIMENSIONES_ENTERAS and isinstance(valor, str):
+        texto = valor.strip()
+        try:
+            return int(texto)
+        except ValueError:
+            try:
+                numero = float(texto)
+                return int(numero) if numero.is_integer() else numero
+            except ValueError:
+                return valor
+    return valor
+
+
+def _orden_sqlite(valor: Any) -> Tuple[int, Any]:
+    """Orden de ORDER BY en SQLite: NULL < números < texto"""
+    if valor is None:
+        return 0, 0
+    if isinstance(valor, (int, float)):
+        return 1, valor
+    return 2, str(valor)
+
+
+class CuboAgregados:
+    """
+    Conteos de las filas de "alumnos a LEFT JOIN datos_escolares de" por las
+    dimensiones de DIMENSIONES
+
+    - Se construye con un solo recorrido (al arrancar o en el primer uso)
+    - Se actualiza de forma incremental desde los repositorios: tras cada
+      commit se recalcula la contribución de los alumnos afectados
+    - Si la base cambió por otra vía (PRAGMA data_version distinto al último
+      visto) se reconstruye antes de responder
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self.logger = get_logger(__name__)
+        self._lock = threading.RLock()
+        self._construido = False
+        self._version: Optional[Tuple[int, int]] = None
+
+        self._conteos: Counter = Counter()
+        self._claves_por_alumno: Dict[int, List[Clave]] = {}
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+
+    def construir(self):
+        """Recorre todas las filas y arma el cubo completo"""
+        manager = self._connection_manager()
+        version = manager.version_datos()
+        conn = manager.get_readonly_connection()
+        filas = conn.execute(SQL_FILAS).fetchall()
+
+        with self._lock:
+            self._conteos.clear()
+            self._claves_por_alumno.clear()
+            for fila in filas:
+                self._agregar_fila(fila)
+            self._version = version
+            self._construido = True
+
+        self.logger.info(f"✅ Cubo de agregados construido: {len(self._claves_por_alumno)} alumnos, "
+                         f"{len(self._conteos)} celdas")
+
+    def version_actual(self) -> Optional[Tuple[int, int]]:
+        """
+        Versión de los datos antes de escribir (None si el cubo aún no se construye)
+
+        Los repositorios la toman antes de su escritura y la pasan a
+        actualizar_alumnos tras el commit.
+        """
+        if not self._construido:
+            return None
+        return self._connection_manager().version_datos()
+
+    def actualizar_alumnos(self, alumno_ids: Iterable[int], version_previa: Optional[Tuple[int, int]] = None):
+        """
+        Recalcula la contribución de los alumnos indicados (llamar tras el commit)
+
+        Sirve para altas, cambios y bajas de alumnos o de sus datos escolares.
+
+        Args:
+            alumno_ids: Alumnos escritos
+            version_previa: version_actual() tomada antes de la escritura. Si el
+                cubo no estaba al día en ese momento (otra conexión o proceso
+                confirmó cambios) no basta con recalcular estos alumnos: el cubo
+                se reconstruye en el próximo uso. Sin ella también se reconstruye.
+        """
+        ids = sorted({int(alumno_id) for alumno_id in alumno_ids if alumno_id is not None})
+        with self._lock:
+            if not self._construido or not ids:
+                return  # Se cargará completo en el primer uso
+
+            manager = self._connection_manager()
+            version = manager.version_datos()
+            # _version == version: otro aviso del mismo commit (grupo del escritor) ya la adoptó
+            if version_previa is None or self._version not in (version_previa, version):
+                self._construido = False
+                return
+            conn = manager.get_readonly_connection()
+            filas = []
+            for inicio in range(0, len(ids), 500):
+                lote = ids[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(lote))
+                filas.extend(conn.execute(f"{SQL_FILAS} WHERE a.id IN ({marcadores})", lote).fetchall())
+
+            for alumno_id in ids:
+                for clave in self._claves_por_alumno.pop(alumno_id, []):
+                    self._conteos[clave] -= 1
+                    if self._conteos[clave] <= 0:
+                        del self._conteos[clave]
+            for fila in filas:
+                self._agregar_fila(fila)
+            self._version = version
+
+    def invalidar(self):
+        """Fuerza reconstrucción en el próximo uso (restauraciones, borrados masivos)"""
+        with self._lock:
+            self._construido = False
+
+    def _agregar_fila(self, fila):
+        alumno_id = fila[0]
+        clave = (bool(fila[1]),) + tuple(fila[2:])
+        self._conteos[clave] += 1
+        self._claves_por_alumno.setdefault(alumno_id, []).append(clave)
+
+    def _asegurar_vigente(self):
+        """Construye o reconstruye si la base cambió sin pasar por los repositorios"""
+        if self._construido and self._connection_manager().version_datos() == self._version:
+            return
+        self.construir()
+
+    def _connection_manager(self):
+        from app.core.database.connection_manager import get_connection_manager
+        return get_connection_manager(self.db_path)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def total_alumnos(self) -> int:
+        """Equivalente a SELECT COUNT(*) FROM alumnos"""
+        with self._lock:
+            self._asegurar_vigente()
+            return len(self._claves_por_alumno)
+
+    def contar(self, filtros: Optional[Dict[str, Iterable[Any]]] = None,
+               solo_con_registro: bool = False) -> int:
+        """
+        Filas del LEFT JOIN que cumplen los filtros
+
+        Args:
+            filtros: {dimensión: valores aceptados}; None entre los valores
+                     acepta también NULL (p. ej. tiene_calificaciones 0 o NULL)
+            solo_con_registro: True para contar como INNER JOIN (o sobre datos_escolares)
+        """
+        return sum(self.distribucion(None, filtros, solo_con_registro).values())
+
+    def distribucion(self, dimension: Optional[str], filtros: Optional[Dict[str, Iterable[Any]]] = None,
+                     solo_con_registro: bool = False) -> Dict[Any, int]:
+        """
+        Conteo agrupado por una dimensión (GROUP BY); con dimension=None, un solo grupo
+
+        Returns:
+            {valor de la dimensión: cantidad}, con None para el grupo NULL
+        """
+        if dimension is not None and dimension not in DIMENSIONES:
+            raise KeyError(f"Dimensión no incluida en el cubo: {dimension}")
+        aceptados = self._preparar_filtros(filtros)
+        posicion = DIMENSIONES.index(dimension) + 1 if dimension else None
+
+        resultado: Counter = Counter()
+        with self._lock:
+            self._asegurar_vigente()
+            for clave, cantidad in self._conteos.items():
+                if solo_con_registro and not clave[0]:
+                    continue
+                if all(clave[i] in valores for i, valores in aceptados):
+                    resultado[clave[posicion] if posicion is not None else None] += cantidad
+        return dict(resultado)
+
+    def distribucion_ordenada(self, dimension: str, filtros: Optional[Dict[str, Iterable[Any]]] = None,
+                              solo_con_registro: bool = False) -> List[Tuple[Any, int]]:
+        """distribucion() en el orden de ORDER BY dimension"""
+        conteos = self.distribucion(dimension, filtros, solo_con_registro)
+        return sorted(conteos.items(), key=lambda item: _orden_sqlite(item[0]))
+
+    @staticmethod
+    def _preparar_filtros(filtros: Optional[Dict[str, Iterable[Any]]]) -> List[Tuple[int, Set[Any]]]:
+        aceptados = []
+        for dimension, valores in (filtros or {}).items():
+            if dimension not in DIMENSIONES:
+                raise KeyError(f"Dimensión no incluida en el cubo: {dimension}")
+            aceptados.append((DIMENSIONES.index(dimension) + 1,
+                              {normalizar_valor(dimension, valor) for valor in valores}))
+        return aceptados
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del cubo (diagnóstico)"""
+        with self._lock:
+            return {
+                'construido': self._construido,
+                'alumnos': len(self._claves_por_alumno),
+                'celdas': len(self._conteos),
+                'filas': sum(self._conteos.values()),
+            }
+
+
+# Instancia global del cubo
+_cubo_agregados = None
+_cubo_agregados_lock = threading.Lock()
+
+def get_cubo_agregados(db_path: str = None) -> CuboAgregados:
+    """Obtiene la instancia global del cubo de agregados"""
+    global _cubo_agregados
+
+    with _cubo_agregados_lock:
+        if _cubo_agregados is None:
+            if db_path is None:
+                from app.core.config import Config
+                db_path = Config.DB_PATH
+            _cubo_agregados = CuboAgregados(db_path)
+
+    return _cubo_agregados
@@ -0,0 +1,228 @@
+"""
+Índice en memoria de nombres de alumnos tolerante a errores tipográficos
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.utils import tokenize_name
+from app.core.logging import get_logger
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """
+    Distancia de Levenshtein entre dos palabras, acotada
+
+    Returns:
+        La distancia, o maximo + 1 si la supera (se corta el cálculo)
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (ca != cb)
+            ))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+def _trigramas(palabra: str) -> Set[str]:
+    """Trigramas de una palabra con relleno en los extremos ("$$ga", ..., "la$")"""
+    texto = f"$${palabra}$"
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _maxima_distancia(palabra: str) -> int:
+    """Errores tolerados según el largo de la palabra"""
+    if len(palabra) <= 4:
+        return 1
+    if len(palabra) <= 8:
+        return 2
+    return 3
+
+
+class NombreIndex:
+    """
+    Índice de trigramas sobre los nombres normalizados de los alumnos
+
+    - Se construye una sola vez (al primer uso) con SELECT id, nombre FROM alumnos
+    - Se actualiza de forma incremental desde AlumnoRepository (alta, cambio, baja)
+    - buscar() devuelve candidatos ordenados por distancia de edición sin tocar la BD
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self.logger = get_logger(__name__)
+        self._lock = threading.RLock()
+        self._construido = False
+
+        self._tokens_por_alumno: Dict[int, List[str]] = {}
+        self._alumnos_por_token: Dict[str, Set[int]] = defaultdict(set)
+        self._tokens_por_trigrama: Dict[str, Set[str]] = defaultdict(set)
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+
+    def construir(self):
+        """Carga todos los nombres de la base de datos"""
+        from app.core.database.connection_manager import get_connection_manager
+
+        conn = get_connection_manager(self.db_path).get_readonly_connection()
+        filas = conn.execute("SELECT id, nombre FROM alumnos").fetchall()
+
+        with self._lock:
+            self._tokens_por_alumno.clear()
+            self._alumnos_por_token.clear()
+            self._tokens_por_trigrama.clear()
+            for alumno_id, nombre in filas:
+                self._agregar(alumno_id, nombre)
+            self._construido = True
+
+        self.logger.info(f"✅ Índice de nombres construido: {len(filas)} alumnos, "
+                         f"{len(self._alumnos_por_token)} palabras")
+
+    def _asegurar_construido(self):
+        if not self._construido:
+            self.construir()
+
+    def agregar(self, alumno_id: int, nombre: str):
+        """Registra (o reemplaza) el nombre de un alumno"""
+        with self._lock:
+            if not self._construido:
+                return  # Se cargará completo en el primer uso
+            self._eliminar(alumno_id)
+            self._agregar(alumno_id, nombre)
+
+    def eliminar(self, alumno_id: int):
+        """Quita un alumno del índice"""
+        with self._lock:
+            if self._construido:
+                self._eliminar(alumno_id)
+
+    def invalidar(self):
+        """Fuerza reconstrucción en el próximo uso (restauraciones, borrados masivos)"""
+        with self._lock:
+            self._construido = False
+
+    def _agregar(self, alumno_id: int, nombre: str):
+        tokens = tokenize_name(nombre)
+        self._tokens_por_alumno[alumno_id] = tokens
+        for token in tokens:
+            if not self._alumnos_por_token[token]:
+                for trigrama in _trigramas(token):
+                    self._tokens_por_trigrama[trigrama].add(token)
+            self._alumnos_por_token[token].add(alumno_id)
+
+    def _eliminar(self, alumno_id: int):
+        for token in self._tokens_por_alumno.pop(alumno_id, []):
+            alumnos = self._alumnos_por_token.get(token)
+            if alumnos is None:
+                continue
+            alumnos.discard(alumno_id)
+            if not alumnos:
+                # Palabra sin alumnos: sacarla también de los trigramas
+                del self._alumnos_por_token[token]
+                for trigrama in _trigramas(token):
+                    self._tokens_por_trigrama[trigrama].discard(token)
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def buscar(self, nombre: str, limite: int = 10) -> List[Tuple[int, int]]:
+        """
+        Busca alumnos cuyo nombre se parezca al texto dado
+
+        Cada palabra de la búsqueda se compara contra las palabras indexadas que
+        comparten trigramas con ella; un alumno califica si todas las palabras de
+        la búsqueda encuentran pareja en su nombre (o, si ninguno lo logra, los
+        que emparejen más palabras).
+
+        Args:
+            nombre: Texto a buscar (p. ej. "habriela lopez")
+            limite: Máximo de candidatos
+
+        Returns:
+            Lista de (alumno_id, distancia_total) ordenada de mejor a peor
+        """
+        palabras = [p for p in tokenize_name(nombre) if len(p) >= 2]
+        if not palabras:
+            return []
+
+        with self._lock:
+            self._asegurar_construido()
+
+            # alumno_id -> {indice_palabra: mejor distancia}
+            coincidencias: Dict[int, Dict[int, int]] = defaultdict(dict)
+
+            for indice, palabra in enumerate(palabras):
+                maximo = _maxima_distancia(palabra)
+                for token, distancia in self._tokens_parecidos(palabra, maximo):
+                    for alumno_id in self._alumnos_por_token[token]:
+                        previa = coincidencias[alumno_id].get(indice)
+                        if previa is None or distancia < previa:
+                            coincidencias[alumno_id][indice] = distancia
+
+        if not coincidencias:
+            return []
+
+        mejor_cobertura = max(len(por_palabra) for por_palabra in coincidencias.values())
+        candidatos = [
+            (alumno_id, sum(por_palabra.values()))
+            for alumno_id, por_palabra in coincidencias.items()
+            if len(por_palabra) == mejor_cobertura
+        ]
+        candidatos.sort(key=lambda c: (c[1], len(self._tokens_por_alumno.get(c[0], []))))
+        return candidatos[:limite]
+
+    def _tokens_parecidos(self, palabra: str, maximo: int) -> List[Tuple[str, int]]:
+        """Palabras indexadas a distancia <= maximo (filtradas primero por trigramas)"""
+        if palabra in self._alumnos_por_token:
+            exactas = [(palabra, 0)]
+        else:
+            exactas = []
+
+        trigramas = _trigramas(palabra)
+        compartidos: Dict[str, int] = defaultdict(int)
+        for trigrama in trigramas:
+            for token in self._tokens_por_trigrama.get(trigrama, ()):
+                compartidos[token] += 1
+
+        # Cada error de edición destruye a lo sumo 3 trigramas
+        minimo_compartidos = max(1, len(trigramas) - 3 * maximo)
+
+        parecidos = []
+        for token, total in compartidos.items():
+            if token == palabra or total < minimo_compartidos:
+                continue
+            distancia = distancia_edicion(palabra, token, maximo)
+            if distancia <= maximo:
+                parecidos.append((token, distancia))
+
+        return exactas + parecidos
+
+
+# Instancia global del índice
+_nombre_index = None
+_nombre_index_lock = threading.Lock()
+
+def get_nombre_index(db_path: str = None) -> NombreIndex:
+    """Obtiene la instancia global del índice de nombres"""
+    global _nombre_index
+
+    with _nombre_index_lock:
+        if _nombre_index is None:
+            if db_path is None:
+                from app.core.config import Config
+                db_path = Config.DB_PATH
+            _nombre_index = NombreIndex(db_path)
+
+    return _nombre_index
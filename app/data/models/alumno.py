@@ -5,9 +5,9 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class Alumno:
-    """Clase que representa un alumno"""
+    """Clase que representa un alumno (con __slots__: sin __dict__ por instancia)"""
     curp: str
     nombre: str
     matricula: Optional[str] = None
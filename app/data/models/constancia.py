@@ -5,9 +5,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class Constancia:
-    """Clase que representa una constancia"""
+    """Clase que representa una constancia (con __slots__)"""
     alumno_id: int
     tipo: str  # "traslado", "estudio", "calificaciones"
     ruta_archivo: str
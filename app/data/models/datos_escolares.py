@@ -5,9 +5,9 @@ from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any
 import json
 
-@dataclass
+@dataclass(slots=True)
 class DatosEscolares:
-    """Clase que representa los datos escolares de un alumno"""
+    """Clase que representa los datos escolares de un alumno (con __slots__)"""
     alumno_id: int
     ciclo_escolar: str
     grado: int
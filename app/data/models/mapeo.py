@@ -0,0 +1,142 @@
+"""
+Mapeo rápido de filas de SQLite a modelos y vistas de fila sin diccionarios
+"""
+import threading
+from collections.abc import Mapping
+from dataclasses import MISSING, fields
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
+from app.data.models.registro_alumno import decodificar_calificaciones
+
+Modelo = TypeVar('Modelo')
+
+# Conversión por nombre de campo/columna al leer la fila (el resto pasa tal cual)
+CONVERTIDORES: Dict[str, Callable[[Any], Any]] = {
+    'calificaciones': decodificar_calificaciones,
+}
+
+# Planes de construcción por (modelo, columnas de la consulta)
+_planes: Dict[Tuple[type, Tuple[str, ...]], Callable[[Sequence], Any]] = {}
+_planes_lock = threading.Lock()
+
+
+def columnas_de(cursor) -> Tuple[str, ...]:
+    """Nombres de las columnas de la última consulta del cursor"""
+    return tuple(descripcion[0] for descripcion in cursor.description)
+
+
+def _crear_plan(cls: type, columnas: Tuple[str, ...]) -> Callable[[Sequence], Any]:
+    """
+    Arma la función fila → modelo para un orden de columnas
+
+    Las posiciones se resuelven una sola vez: por fila solo queda un
+    itemgetter (en C) y la llamada al constructor, sin búsquedas por nombre.
+    """
+    posiciones = {nombre: indice for indice, nombre in enumerate(columnas)}
+    campos = [campo for campo in fields(cls) if campo.init]
+
+    faltantes = [campo.name for campo in campos if campo.name not in posiciones
+                 and campo.default is MISSING and campo.default_factory is MISSING]
+    if faltantes:
+        raise ValueError(f"La consulta no trae los campos obligatorios de {cls.__name__}: {faltantes}")
+
+    presentes = [campo.name for campo in campos if campo.name in posiciones]
+    obtener = itemgetter(*(posiciones[nombre] for nombre in presentes))
+    if len(presentes) == 1:
+        # itemgetter de un solo índice devuelve el valor, no una tupla
+        obtener_uno = obtener
+        obtener = lambda fila: (obtener_uno(fila),)
+
+    conversiones = [(indice, CONVERTIDORES[nombre]) for indice, nombre in enumerate(presentes)
+                    if nombre in CONVERTIDORES]
+    if conversiones:
+        obtener_crudo = obtener
+
+        def obtener(fila):
+            valores = list(obtener_crudo(fila))
+            for indice, convertir in conversiones:
+                valores[indice] = convertir(valores[indice])
+            return valores
+
+    if len(presentes) == len(campos):
+        # Todos los campos en la consulta: argumentos posicionales en el orden del modelo
+        return lambda fila: cls(*obtener(fila))
+    return lambda fila: cls(**dict(zip(presentes, obtener(fila))))
+
+
+def mapeador(cls: Type[Modelo], columnas: Sequence[str]) -> Callable[[Sequence], Modelo]:
+    """
+    Función que convierte una fila (sqlite3.Row o tupla) en una instancia de cls
+
+    Args:
+        cls: Dataclass del modelo (Alumno, DatosEscolares, Constancia, ...)
+        columnas: Nombres de las columnas en el orden de la fila (ver columnas_de)
+    """
+    clave = (cls, tuple(columnas))
+    plan = _planes.get(clave)
+    if plan is None:
+        with _planes_lock:
+            plan = _planes.get(clave)
+            if plan is None:
+                plan = _planes[clave] = _crear_plan(cls, clave[1])
+    return plan
+
+
+def mapear_uno(cls: Type[Modelo], cursor) -> Optional[Modelo]:
+    """Siguiente fila del cursor como modelo (None si no hay)"""
+    fila = cursor.fetchone()
+    if fila is None:
+        return None
+    return mapeador(cls, columnas_de(cursor))(fila)
+
+
+def mapear_todos(cls: Type[Modelo], cursor) -> List[Modelo]:
+    """Filas restantes del cursor como lista de modelos"""
+    convertir = mapeador(cls, columnas_de(cursor))
+    return [convertir(fila) for fila in cursor.fetchall()]
+
+
+class VistaFila(Mapping):
+    """
+    Vista de solo lectura sobre un sqlite3.Row
+
+    Se lee como el diccionario del servicio (vista['nombre'], vista.get(...),
+    'grado' in vista, dict(vista)) pero no copia la fila: cada instancia solo
+    guarda una referencia. Las columnas de CONVERTIDORES (calificaciones) se
+    decodifican cada vez que se leen; usar to_dict() para conservar el valor.
+    """
+
+    __slots__ = ('_fila',)
+
+    def __init__(self, fila):
+        self._fila = fila
+
+    def __getitem__(self, clave):
+        try:
+            valor = self._fila[clave]
+        except IndexError:
+            # sqlite3.Row lanza IndexError con claves inexistentes; Mapping.get espera KeyError
+            raise KeyError(clave) from None
+        convertir = CONVERTIDORES.get(clave)
+        return convertir(valor) if convertir else valor
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fila.keys())
+
+    def __len__(self) -> int:
+        return len(self._fila)
+
+    def __contains__(self, clave) -> bool:
+        return clave in self._fila.keys()
+
+    @property
+    def fila(self):
+        """Fila original (sqlite3.Row)"""
+        return self._fila
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Copia la vista a un diccionario (con las columnas ya convertidas)"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"VistaFila({dict(zip(self._fila.keys(), tuple(self._fila)))!r})"
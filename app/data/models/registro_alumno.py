@@ -0,0 +1,85 @@
+"""
+Modelo para representar un alumno junto con sus datos escolares vigentes
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+
+def decodificar_calificaciones(valor: Optional[str]) -> List[Dict[str, Any]]:
+    """Convierte el JSON de calificaciones a lista (vacía si no es válido)"""
+    if not valor:
+        return []
+    if not isinstance(valor, str):
+        return valor
+    try:
+        return json.loads(valor)
+    except json.JSONDecodeError:
+        return []
+
+
+class RegistroAlumno(dict):
+    """
+    Diccionario con los datos del alumno y de su registro escolar más reciente
+
+    Se comporta como el diccionario que devolvía AlumnoService (alumno.to_dict()
+    actualizado con datos_escolares.to_dict()), pero la clave 'calificaciones'
+    guarda el JSON crudo y solo se decodifica la primera vez que alguien la lee.
+    """
+
+    __slots__ = ('_calificaciones_pendientes',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._calificaciones_pendientes = 'calificaciones' in self
+
+    def _decodificar(self):
+        """Decodifica el JSON de calificaciones si aún no se ha hecho"""
+        if self._calificaciones_pendientes:
+            self._calificaciones_pendientes = False
+            dict.__setitem__(self, 'calificaciones',
+                             decodificar_calificaciones(dict.__getitem__(self, 'calificaciones')))
+
+    def __getitem__(self, key):
+        if key == 'calificaciones':
+            self._decodificar()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key == 'calificaciones':
+            self._decodificar()
+        return super().get(key, default)
+
+    def __setitem__(self, key, value):
+        if key == 'calificaciones':
+            self._calificaciones_pendientes = False
+        super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        if 'calificaciones' in kwargs or (args and 'calificaciones' in args[0]):
+            self._calificaciones_pendientes = False
+
+    def pop(self, key, *default):
+        if key == 'calificaciones':
+            self._decodificar()
+        return super().pop(key, *default)
+
+    # Accesos en bloque: dict(registro), {**registro}, json.dumps, copy()
+    def __iter__(self):
+        return super().__iter__()
+
+    def items(self):
+        self._decodificar()
+        return super().items()
+
+    def values(self):
+        self._decodificar()
+        return super().values()
+
+    def copy(self) -> 'RegistroAlumno':
+        self._decodificar()
+        return RegistroAlumno(self)
+
+    def __repr__(self) -> str:
+        self._decodificar()
+        return super().__repr__()
@@ -0,0 +1,86 @@
+"""
+Modelos para el reporte de una importación masiva de alumnos
+"""
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+# Estados posibles de cada fila importada
+ESTADO_INSERTADO = "insertado"
+ESTADO_ACTUALIZADO = "actualizado"
+ESTADO_OMITIDO = "omitido"
+ESTADO_ERROR = "error"
+
+
+@dataclass
+class FilaImportacion:
+    """Resultado de importar una fila (un alumno)"""
+    indice: int
+    curp: str
+    nombre: str
+    estado: str
+    mensaje: str = ""
+    alumno_id: Optional[int] = None
+    # ESTADO_INSERTADO / ESTADO_ACTUALIZADO si la fila traía datos escolares
+    datos_escolares: Optional[str] = None
+
+    @property
+    def exitosa(self) -> bool:
+        """True si la fila quedó guardada (insertada o actualizada)"""
+        return self.estado in (ESTADO_INSERTADO, ESTADO_ACTUALIZADO)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el objeto a un diccionario"""
+        return {
+            "indice": self.indice,
+            "curp": self.curp,
+            "nombre": self.nombre,
+            "estado": self.estado,
+            "mensaje": self.mensaje,
+            "alumno_id": self.alumno_id,
+            "datos_escolares": self.datos_escolares
+        }
+
+
+@dataclass
+class ReporteImportacion:
+    """Reporte detallado de una importación masiva"""
+    filas: List[FilaImportacion] = field(default_factory=list)
+    duracion_segundos: float = 0.0
+
+    def contar(self, estado: str) -> int:
+        """Número de filas con el estado dado"""
+        return sum(1 for fila in self.filas if fila.estado == estado)
+
+    @property
+    def insertados(self) -> int:
+        return self.contar(ESTADO_INSERTADO)
+
+    @property
+    def actualizados(self) -> int:
+        return self.contar(ESTADO_ACTUALIZADO)
+
+    @property
+    def omitidos(self) -> int:
+        return self.contar(ESTADO_OMITIDO)
+
+    @property
+    def errores(self) -> int:
+        return self.contar(ESTADO_ERROR)
+
+    def resumen(self) -> str:
+        """Resumen en una línea para mostrar al usuario"""
+        return (f"{len(self.filas)} filas: {self.insertados} registrados, "
+                f"{self.actualizados} actualizados, {self.omitidos} omitidos, "
+                f"{self.errores} con error ({self.duracion_segundos:.2f} s)")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el objeto a un diccionario"""
+        return {
+            "total": len(self.filas),
+            "insertados": self.insertados,
+            "actualizados": self.actualizados,
+            "omitidos": self.omitidos,
+            "errores": self.errores,
+            "duracion_segundos": self.duracion_segundos,
+            "filas": [fila.to_dict() for fila in self.filas]
+        }
@@ -1,14 +1,45 @@
 """
 Repositorio para acceso a datos de alumnos
 """
+import re
 import sqlite3
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from app.data.models.alumno import Alumno
+from app.data.models.mapeo import VistaFila, mapear_todos, mapear_uno
+from app.data.models.registro_alumno import RegistroAlumno
+from app.data.indices.cubo_agregados import get_cubo_agregados
+from app.data.indices.nombre_index import get_nombre_index
 from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.escritor import al_confirmar
 
 class AlumnoRepository:
     """Repositorio para acceso a datos de alumnos"""
 
+    # Alumno + su registro de datos_escolares más reciente en una sola sentencia
+    # (la subconsulta correlacionada usa idx_datos_escolares_alumno)
+    COLUMNAS_CON_DATOS_ESCOLARES = """
+        SELECT a.id, a.curp, a.nombre, a.matricula, a.fecha_nacimiento, a.fecha_registro,
+               de.id AS datos_escolares_id, de.ciclo_escolar, de.grado, de.grupo,
+               de.turno, de.escuela, de.cct, de.calificaciones
+    """
+    JOIN_DATOS_ESCOLARES_VIGENTES = """
+        LEFT JOIN datos_escolares de ON de.id = (
+            SELECT MAX(id) FROM datos_escolares WHERE alumno_id = a.id
+        )
+    """
+    SELECT_CON_DATOS_ESCOLARES = f"""
+        {COLUMNAS_CON_DATOS_ESCOLARES}
+        FROM alumnos a
+        {JOIN_DATOS_ESCOLARES_VIGENTES}
+    """
+
+    # Máximo de parámetros por consulta IN (...) en operaciones por lote
+    TAMANO_LOTE = 500
+
+    CAMPOS_ALUMNO = ('id', 'curp', 'nombre', 'matricula', 'fecha_nacimiento', 'fecha_registro')
+    CAMPOS_DATOS_ESCOLARES = ('ciclo_escolar', 'grado', 'grupo', 'turno', 'escuela', 'cct', 'calificaciones')
+
     def __init__(self, db_connection=None):
         """
         Inicializa el repositorio
@@ -16,13 +47,15 @@ class AlumnoRepository:
         Args:
             db_connection: Conexión a la base de datos (opcional)
         """
+        # Sin conexión explícita se usa la conexión del hilo actual del pool central
+        self._pooled_connection = not db_connection
         if db_connection:
             self.conn = db_connection
         else:
-            self.conn = sqlite3.connect(Config.DB_PATH)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection_manager(Config.DB_PATH).get_connection()
 
         self.cursor = self.conn.cursor()
+        self._fts_cache = None
 
     def get_by_id(self, alumno_id: int) -> Optional[Alumno]:
         """
@@ -40,18 +73,7 @@ class AlumnoRepository:
         WHERE id = ?
         """, (alumno_id,))
 
-        row = self.cursor.fetchone()
-        if not row:
-            return None
-
-        return Alumno(
-            id=row['id'],
-            curp=row['curp'],
-            nombre=row['nombre'],
-            matricula=row['matricula'],
-            fecha_nacimiento=row['fecha_nacimiento'],
-            fecha_registro=row['fecha_registro']
-        )
+        return mapear_uno(Alumno, self.cursor)
 
     def get_by_curp(self, curp: str) -> Optional[Alumno]:
         """
@@ -69,18 +91,7 @@ class AlumnoRepository:
         WHERE curp = ?
         """, (curp,))
 
-        row = self.cursor.fetchone()
-        if not row:
-            return None
-
-        return Alumno(
-            id=row['id'],
-            curp=row['curp'],
-            nombre=row['nombre'],
-            matricula=row['matricula'],
-            fecha_nacimiento=row['fecha_nacimiento'],
-            fecha_registro=row['fecha_registro']
-        )
+        return mapear_uno(Alumno, self.cursor)
 
     def save(self, alumno: Alumno) -> Alumno:
         """
@@ -92,6 +103,7 @@ class AlumnoRepository:
         Returns:
             Objeto Alumno con ID actualizado
         """
+        version = get_cubo_agregados().version_actual()
         if alumno.id:
             # Actualizar alumno existente
             self.cursor.execute("""
@@ -119,8 +131,79 @@ class AlumnoRepository:
             alumno.id = self.cursor.lastrowid
 
         self.conn.commit()
+        al_confirmar(get_nombre_index().agregar, alumno.id, alumno.nombre)
+        al_confirmar(get_cubo_agregados().actualizar_alumnos, [alumno.id], version)
         return alumno
 
+    # ------------------------------------------------------------------
+    # Operaciones por lote (sin commit: las confirma quien abre la transacción)
+    # ------------------------------------------------------------------
+
+    def get_ids_by_curps(self, curps: Iterable[str]) -> Dict[str, int]:
+        """
+        Busca varias CURPs de una vez (usa el índice único de curp)
+
+        Args:
+            curps: CURPs a buscar
+
+        Returns:
+            Diccionario {curp: id} solo con las CURPs que ya están registradas
+        """
+        curps = list(curps)
+        resultado = {}
+        for inicio in range(0, len(curps), self.TAMANO_LOTE):
+            lote = curps[inicio:inicio + self.TAMANO_LOTE]
+            marcadores = ','.join('?' * len(lote))
+            self.cursor.execute(f"SELECT curp, id FROM alumnos WHERE curp IN ({marcadores})", lote)
+            resultado.update((row['curp'], row['id']) for row in self.cursor.fetchall())
+        return resultado
+
+    def insert_many(self, alumnos: List[Alumno]):
+        """
+        Inserta varios alumnos con una sola sentencia preparada (no hace commit)
+
+        Los IDs asignados se obtienen después con get_ids_by_curps; el índice
+        de nombres se actualiza con refresh_name_index al confirmar.
+        """
+        self.cursor.executemany("""
+        INSERT INTO alumnos (curp, nombre, matricula, fecha_nacimiento)
+        VALUES (?, ?, ?, ?)
+        """, [
+            (alumno.curp, alumno.nombre, alumno.matricula, alumno.fecha_nacimiento)
+            for alumno in alumnos
+        ])
+
+    def update_many(self, alumnos: List[Alumno]):
+        """
+        Actualiza varios alumnos existentes (por id) sin hacer commit
+
+        matricula y fecha_nacimiento en None conservan el valor guardado.
+        """
+        self.cursor.executemany("""
+        UPDATE alumnos
+        SET nombre = ?,
+            matricula = COALESCE(?, matricula),
+            fecha_nacimiento = COALESCE(?, fecha_nacimiento)
+        WHERE id = ?
+        """, [
+            (alumno.nombre, alumno.matricula, alumno.fecha_nacimiento, alumno.id)
+            for alumno in alumnos
+        ])
+
+    @staticmethod
+    def refresh_name_index(alumnos: Iterable[Alumno], version_previa=None):
+        """
+        Registra en el índice de nombres y en el cubo los alumnos escritos por lote (tras el commit)
+
+        version_previa: get_cubo_agregados().version_actual() tomada antes de abrir la transacción
+        """
+        nombre_index = get_nombre_index()
+        ids = []
+        for alumno in alumnos:
+            al_confirmar(nombre_index.agregar, alumno.id, alumno.nombre)
+            ids.append(alumno.id)
+        al_confirmar(get_cubo_agregados().actualizar_alumnos, ids, version_previa)
+
     def delete(self, alumno_id: int) -> bool:
         """
         Elimina un alumno de la base de datos
@@ -132,8 +215,11 @@ class AlumnoRepository:
             True si se eliminó correctamente, False en caso contrario
         """
         try:
+            version = get_cubo_agregados().version_actual()
             self.cursor.execute("DELETE FROM alumnos WHERE id = ?", (alumno_id,))
             self.conn.commit()
+            al_confirmar(get_nombre_index().eliminar, alumno_id)
+            al_confirmar(get_cubo_agregados().actualizar_alumnos, [alumno_id], version)
             return self.cursor.rowcount > 0
         except Exception as e:
             print(f"Error al eliminar alumno: {e}")
@@ -157,15 +243,7 @@ class AlumnoRepository:
         LIMIT ? OFFSET ?
         """, (limit, offset))
 
-        rows = self.cursor.fetchall()
-        return [Alumno(
-            id=row['id'],
-            curp=row['curp'],
-            nombre=row['nombre'],
-            matricula=row['matricula'],
-            fecha_nacimiento=row['fecha_nacimiento'],
-            fecha_registro=row['fecha_registro']
-        ) for row in rows]
+        return mapear_todos(Alumno, self.cursor)
 
     def search(self, query: str, limit: int = 100) -> List[Alumno]:
         """
@@ -189,15 +267,236 @@ class AlumnoRepository:
         LIMIT ?
         """, (search_term, search_term, limit))
 
-        rows = self.cursor.fetchall()
-        return [Alumno(
-            id=row['id'],
-            curp=row['curp'],
-            nombre=row['nombre'],
-            matricula=row['matricula'],
-            fecha_nacimiento=row['fecha_nacimiento'],
-            fecha_registro=row['fecha_registro']
-        ) for row in rows]
+        return mapear_todos(Alumno, self.cursor)
+
+    def list_all_with_datos_escolares(self, limit: int = 100, offset: int = 0) -> List[RegistroAlumno]:
+        """
+        Lista alumnos junto con sus datos escolares más recientes en una sola consulta
+
+        Args:
+            limit: Límite de resultados
+            offset: Desplazamiento para paginación
+
+        Returns:
+            Lista de RegistroAlumno (calificaciones se decodifican al leerlas)
+        """
+        self.cursor.execute(f"""
+        {self.SELECT_CON_DATOS_ESCOLARES}
+        ORDER BY a.nombre
+        LIMIT ? OFFSET ?
+        """, (limit, offset))
+
+        return [self._row_to_registro(row) for row in self.cursor.fetchall()]
+
+    def list_views_with_datos_escolares(self, limit: int = 100, offset: int = 0) -> List[VistaFila]:
+        """
+        Como list_all_with_datos_escolares, pero sin armar un diccionario por fila
+
+        Cada VistaFila solo referencia el sqlite3.Row. A diferencia de
+        RegistroAlumno, siempre trae las columnas de datos escolares (en None
+        si el alumno no tiene registro) y también datos_escolares_id.
+        """
+        self.cursor.execute(f"""
+        {self.SELECT_CON_DATOS_ESCOLARES}
+        ORDER BY a.nombre
+        LIMIT ? OFFSET ?
+        """, (limit, offset))
+
+        return [VistaFila(row) for row in self.cursor.fetchall()]
+
+    def iter_views_with_datos_escolares(self, tamano_lote: int = TAMANO_LOTE) -> Iterator[VistaFila]:
+        """
+        Recorre todos los alumnos (ordenados por nombre) como VistaFila, por lotes
+
+        Usa un cursor propio, así que se puede intercalar con otras llamadas al
+        repositorio; en memoria solo vive el lote actual.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"""
+            {self.SELECT_CON_DATOS_ESCOLARES}
+            ORDER BY a.nombre
+            """)
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    break
+                for row in filas:
+                    yield VistaFila(row)
+        finally:
+            cursor.close()
+
+    def list_page_with_datos_escolares(self, limit: int = 100,
+                                       despues_de: Optional[Tuple[Optional[str], int]] = None) -> List[RegistroAlumno]:
+        """
+        Página de alumnos con datos escolares, paginada por clave (nombre, id)
+
+        A diferencia de OFFSET, cada página arranca justo después de la última
+        fila vista: el costo no crece con el número de página y altas o bajas
+        entre páginas no duplican ni saltan alumnos. idx_alumnos_nombre incluye
+        el rowid (= id), así que sirve el orden y el WHERE sin ordenar en memoria.
+
+        Args:
+            limit: Tamaño de la página
+            despues_de: (nombre, id) de la última fila de la página anterior
+                        (None para la primera página)
+
+        Returns:
+            Lista de RegistroAlumno ordenada por nombre e id
+        """
+        if despues_de is None:
+            condicion, params = "", ()
+        elif despues_de[0] is None:
+            # Los nombres NULL ordenan primero: seguir con los NULL restantes y luego el resto
+            condicion = "WHERE (a.nombre IS NULL AND a.id > ?) OR a.nombre IS NOT NULL"
+            params = (despues_de[1],)
+        else:
+            condicion = "WHERE (a.nombre, a.id) > (?, ?)"
+            params = (despues_de[0], despues_de[1])
+
+        self.cursor.execute(f"""
+        {self.SELECT_CON_DATOS_ESCOLARES}
+        {condicion}
+        ORDER BY a.nombre, a.id
+        LIMIT ?
+        """, params + (limit,))
+
+        return [self._row_to_registro(row) for row in self.cursor.fetchall()]
+
+    def search_with_datos_escolares(self, query: str, limit: int = 100) -> List[RegistroAlumno]:
+        """
+        Busca alumnos por nombre o CURP junto con sus datos escolares más recientes
+
+        Usa el índice FTS5 (prefijos, sin acentos, ordenado por relevancia) y solo
+        recurre a LIKE cuando no hay coincidencias por prefijo o el índice no existe.
+
+        Args:
+            query: Texto a buscar
+            limit: Límite de resultados
+
+        Returns:
+            Lista de RegistroAlumno (calificaciones se decodifican al leerlas)
+        """
+        resultados = self.search_fts(query, limit)
+        if resultados:
+            return resultados
+
+        search_term = f"%{query}%"
+
+        self.cursor.execute(f"""
+        {self.SELECT_CON_DATOS_ESCOLARES}
+        WHERE a.nombre LIKE ? OR a.curp LIKE ?
+        ORDER BY a.nombre
+        LIMIT ?
+        """, (search_term, search_term, limit))
+
+        return [self._row_to_registro(row) for row in self.cursor.fetchall()]
+
+    def get_many_with_datos_escolares(self, alumno_ids: List[int]) -> List[RegistroAlumno]:
+        """
+        Obtiene varios alumnos (con sus datos escolares más recientes) en una consulta
+
+        Args:
+            alumno_ids: IDs de los alumnos, en el orden deseado
+
+        Returns:
+            Lista de RegistroAlumno en el mismo orden que alumno_ids
+        """
+        if not alumno_ids:
+            return []
+
+        placeholders = ", ".join("?" for _ in alumno_ids)
+        self.cursor.execute(f"""
+        {self.SELECT_CON_DATOS_ESCOLARES}
+        WHERE a.id IN ({placeholders})
+        """, tuple(alumno_ids))
+
+        por_id = {row['id']: self._row_to_registro(row) for row in self.cursor.fetchall()}
+        return [por_id[alumno_id] for alumno_id in alumno_ids if alumno_id in por_id]
+
+    def list_by_grupo_with_datos_escolares(self, grado: Optional[int] = None, grupo: Optional[str] = None,
+                                           turno: Optional[str] = None) -> List[RegistroAlumno]:
+        """
+        Alumnos de un grado (y opcionalmente grupo/turno) con sus datos escolares vigentes, por nombre
+
+        Args:
+            grado: Grado escolar (None: todos)
+            grupo: Letra del grupo (None: todos los del grado)
+            turno: MATUTINO/VESPERTINO (None: ambos)
+
+        Returns:
+            Lista de RegistroAlumno en una sola consulta
+        """
+        condiciones, parametros = [], []
+        for columna, valor in (("de.grado", grado), ("de.grupo", grupo), ("de.turno", turno)):
+            if valor is not None and valor != "":
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor.upper() if isinstance(valor, str) else valor)
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        self.cursor.execute(f"""
+        {self.SELECT_CON_DATOS_ESCOLARES}
+        {where}
+        ORDER BY a.nombre
+        """, tuple(parametros))
+
+        return [self._row_to_registro(row) for row in self.cursor.fetchall()]
+
+    def search_fts(self, query: str, limit: int = 100) -> List[RegistroAlumno]:
+        """
+        Busca alumnos por prefijos de nombre o CURP en el índice FTS5
+
+        "jose mar" encuentra "JOSÉ MARTÍNEZ" y "MARÍA JOSEFINA": cada palabra se
+        busca como prefijo, sin distinguir acentos ni mayúsculas.
+
+        Args:
+            query: Texto a buscar
+            limit: Límite de resultados
+
+        Returns:
+            Lista de RegistroAlumno ordenada por relevancia (bm25)
+        """
+        fts_query = self._build_fts_query(query)
+        if not fts_query or not self._fts_disponible():
+            return []
+
+        self.cursor.execute(f"""
+        {self.COLUMNAS_CON_DATOS_ESCOLARES}
+        FROM alumnos_fts
+        JOIN alumnos a ON a.id = alumnos_fts.rowid
+        {self.JOIN_DATOS_ESCOLARES_VIGENTES}
+        WHERE alumnos_fts MATCH ?
+        ORDER BY alumnos_fts.rank, a.nombre
+        LIMIT ?
+        """, (fts_query, limit))
+
+        return [self._row_to_registro(row) for row in self.cursor.fetchall()]
+
+    @staticmethod
+    def _build_fts_query(query: str) -> Optional[str]:
+        """Convierte texto libre en una consulta FTS5 de prefijos ("jose"* "mar"*)"""
+        tokens = re.findall(r"\w+", query or "")
+        if not tokens:
+            return None
+        # Entre comillas para que ninguna palabra se interprete como operador FTS
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def _fts_disponible(self) -> bool:
+        """Indica si la migración v5 creó el índice alumnos_fts"""
+        if self._fts_cache is None:
+            self.cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alumnos_fts'"
+            )
+            self._fts_cache = self.cursor.fetchone() is not None
+        return self._fts_cache
+
+    def _row_to_registro(self, row) -> RegistroAlumno:
+        """Convierte una fila alumno + datos_escolares al diccionario del servicio"""
+        campos = self.CAMPOS_ALUMNO
+        # Sin registro escolar, el alumno no lleva esas claves (igual que antes)
+        if row['datos_escolares_id'] is not None:
+            campos += self.CAMPOS_DATOS_ESCOLARES
+        return RegistroAlumno((campo, row[campo]) for campo in campos)
 
     def count(self) -> int:
         """
@@ -222,6 +521,7 @@ class AlumnoRepository:
         if not alumno.id:
             raise ValueError("No se puede actualizar un alumno sin ID")
 
+        version = get_cubo_agregados().version_actual()
         self.cursor.execute("""
         UPDATE alumnos
         SET curp = ?, nombre = ?, matricula = ?, fecha_nacimiento = ?
@@ -235,9 +535,11 @@ class AlumnoRepository:
         ))
 
         self.conn.commit()
+        al_confirmar(get_nombre_index().agregar, alumno.id, alumno.nombre)
+        al_confirmar(get_cubo_agregados().actualizar_alumnos, [alumno.id], version)
         return alumno
 
     def close(self):
-        """Cierra la conexión a la base de datos"""
-        if self.conn:
+        """Cierra la conexión a la base de datos (las del pool las administra el gestor)"""
+        if self.conn and not self._pooled_connection:
             self.conn.close()
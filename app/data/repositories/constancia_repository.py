@@ -5,7 +5,9 @@ import sqlite3
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from app.data.models.constancia import Constancia
+from app.data.models.mapeo import mapear_todos, mapear_uno
 from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
 
 class ConstanciaRepository:
     """Repositorio para acceso a datos de constancias"""
@@ -17,11 +19,12 @@ class ConstanciaRepository:
         Args:
             db_connection: Conexión a la base de datos (opcional)
         """
+        # Sin conexión explícita se usa la conexión del hilo actual del pool central
+        self._pooled_connection = not db_connection
         if db_connection:
             self.conn = db_connection
         else:
-            self.conn = sqlite3.connect(Config.DB_PATH)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection_manager(Config.DB_PATH).get_connection()
 
         self.cursor = self.conn.cursor()
 
@@ -41,17 +44,7 @@ class ConstanciaRepository:
         WHERE id = ?
         """, (constancia_id,))
 
-        row = self.cursor.fetchone()
-        if not row:
-            return None
-
-        return Constancia(
-            id=row['id'],
-            alumno_id=row['alumno_id'],
-            tipo=row['tipo'],
-            ruta_archivo=row['ruta_archivo'],
-            fecha_generacion=row['fecha_generacion']
-        )
+        return mapear_uno(Constancia, self.cursor)
 
     def get_by_alumno(self, alumno_id: int) -> List[Constancia]:
         """
@@ -70,14 +63,7 @@ class ConstanciaRepository:
         ORDER BY fecha_generacion DESC
         """, (alumno_id,))
 
-        rows = self.cursor.fetchall()
-        return [Constancia(
-            id=row['id'],
-            alumno_id=row['alumno_id'],
-            tipo=row['tipo'],
-            ruta_archivo=row['ruta_archivo'],
-            fecha_generacion=row['fecha_generacion']
-        ) for row in rows]
+        return mapear_todos(Constancia, self.cursor)
 
     def save(self, constancia: Constancia) -> Constancia:
         """
@@ -151,14 +137,7 @@ class ConstanciaRepository:
         LIMIT ?
         """, (limit,))
 
-        rows = self.cursor.fetchall()
-        return [Constancia(
-            id=row['id'],
-            alumno_id=row['alumno_id'],
-            tipo=row['tipo'],
-            ruta_archivo=row['ruta_archivo'],
-            fecha_generacion=row['fecha_generacion']
-        ) for row in rows]
+        return mapear_todos(Constancia, self.cursor)
 
     def count_by_tipo(self) -> Dict[str, int]:
         """
@@ -195,6 +174,6 @@ class ConstanciaRepository:
             return False
 
     def close(self):
-        """Cierra la conexión a la base de datos"""
-        if self.conn:
+        """Cierra la conexión a la base de datos (las del pool las administra el gestor)"""
+        if self.conn and not self._pooled_connection:
             self.conn.close()
@@ -3,13 +3,20 @@ Repositorio para acceso a datos escolares
 """
 import sqlite3
 import json
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any
 from app.data.models.datos_escolares import DatosEscolares
+from app.data.models.mapeo import mapear_todos, mapear_uno
+from app.data.indices.cubo_agregados import get_cubo_agregados
 from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.escritor import al_confirmar
 
 class DatosEscolaresRepository:
     """Repositorio para acceso a datos escolares"""
 
+    # Máximo de parámetros por consulta IN (...) en operaciones por lote
+    TAMANO_LOTE = 500
+
     def __init__(self, db_connection=None):
         """
         Inicializa el repositorio
@@ -17,11 +24,12 @@ class DatosEscolaresRepository:
         Args:
             db_connection: Conexión a la base de datos (opcional)
         """
+        # Sin conexión explícita se usa la conexión del hilo actual del pool central
+        self._pooled_connection = not db_connection
         if db_connection:
             self.conn = db_connection
         else:
-            self.conn = sqlite3.connect(Config.DB_PATH)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection_manager(Config.DB_PATH).get_connection()
 
         self.cursor = self.conn.cursor()
 
@@ -41,29 +49,8 @@ class DatosEscolaresRepository:
         WHERE id = ?
         """, (datos_id,))
 
-        row = self.cursor.fetchone()
-        if not row:
-            return None
-
-        # Convertir calificaciones de JSON a lista
-        calificaciones = []
-        if row['calificaciones']:
-            try:
-                calificaciones = json.loads(row['calificaciones'])
-            except json.JSONDecodeError:
-                pass
-
-        return DatosEscolares(
-            id=row['id'],
-            alumno_id=row['alumno_id'],
-            ciclo_escolar=row['ciclo_escolar'],
-            grado=row['grado'],
-            grupo=row['grupo'],
-            turno=row['turno'],
-            escuela=row['escuela'],
-            cct=row['cct'],
-            calificaciones=calificaciones
-        )
+        # calificaciones se convierte de JSON a lista al mapear la fila
+        return mapear_uno(DatosEscolares, self.cursor)
 
     def get_by_alumno(self, alumno_id: int, latest_only: bool = False) -> List[DatosEscolares]:
         """
@@ -85,29 +72,8 @@ class DatosEscolaresRepository:
             LIMIT 1
             """, (alumno_id,))
 
-            row = self.cursor.fetchone()
-            if not row:
-                return []
-
-            # Convertir calificaciones de JSON a lista
-            calificaciones = []
-            if row['calificaciones']:
-                try:
-                    calificaciones = json.loads(row['calificaciones'])
-                except json.JSONDecodeError:
-                    pass
-
-            return [DatosEscolares(
-                id=row['id'],
-                alumno_id=row['alumno_id'],
-                ciclo_escolar=row['ciclo_escolar'],
-                grado=row['grado'],
-                grupo=row['grupo'],
-                turno=row['turno'],
-                escuela=row['escuela'],
-                cct=row['cct'],
-                calificaciones=calificaciones
-            )]
+            datos = mapear_uno(DatosEscolares, self.cursor)
+            return [datos] if datos else []
         else:
             self.cursor.execute("""
             SELECT id, alumno_id, ciclo_escolar, grado, grupo, turno, escuela, cct, calificaciones
@@ -116,31 +82,7 @@ class DatosEscolaresRepository:
             ORDER BY id DESC
             """, (alumno_id,))
 
-            rows = self.cursor.fetchall()
-            result = []
-
-            for row in rows:
-                # Convertir calificaciones de JSON a lista
-                calificaciones = []
-                if row['calificaciones']:
-                    try:
-                        calificaciones = json.loads(row['calificaciones'])
-                    except json.JSONDecodeError:
-                        pass
-
-                result.append(DatosEscolares(
-                    id=row['id'],
-                    alumno_id=row['alumno_id'],
-                    ciclo_escolar=row['ciclo_escolar'],
-                    grado=row['grado'],
-                    grupo=row['grupo'],
-                    turno=row['turno'],
-                    escuela=row['escuela'],
-                    cct=row['cct'],
-                    calificaciones=calificaciones
-                ))
-
-            return result
+            return mapear_todos(DatosEscolares, self.cursor)
 
     def save(self, datos: DatosEscolares) -> DatosEscolares:
         """
@@ -155,7 +97,12 @@ class DatosEscolaresRepository:
         # Convertir calificaciones a JSON
         calificaciones_json = json.dumps(datos.calificaciones)
 
+        version = get_cubo_agregados().version_actual()
+        alumnos_afectados = [datos.alumno_id]
         if datos.id:
+            # El registro puede cambiar de alumno: el anterior también se recalcula en el cubo
+            alumnos_afectados.extend(self._get_alumno_ids([datos.id]))
+
             # Actualizar datos existentes
             self.cursor.execute("""
             UPDATE datos_escolares
@@ -192,8 +139,73 @@ class DatosEscolaresRepository:
             datos.id = self.cursor.lastrowid
 
         self.conn.commit()
+        al_confirmar(get_cubo_agregados().actualizar_alumnos, alumnos_afectados, version)
         return datos
 
+    def _get_alumno_ids(self, datos_ids: Iterable[int]) -> List[int]:
+        """Alumnos dueños de los registros indicados (antes de modificarlos)"""
+        datos_ids = list(datos_ids)
+        alumno_ids = []
+        for inicio in range(0, len(datos_ids), self.TAMANO_LOTE):
+            lote = datos_ids[inicio:inicio + self.TAMANO_LOTE]
+            marcadores = ','.join('?' * len(lote))
+            self.cursor.execute(f"SELECT alumno_id FROM datos_escolares WHERE id IN ({marcadores})", lote)
+            alumno_ids.extend(row[0] for row in self.cursor.fetchall())
+        return alumno_ids
+
+    # ------------------------------------------------------------------
+    # Operaciones por lote (sin commit: las confirma quien abre la transacción)
+    # ------------------------------------------------------------------
+
+    def get_latest_ids_by_alumnos(self, alumno_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        Obtiene el ID del registro de datos escolares más reciente de varios alumnos
+
+        Args:
+            alumno_ids: IDs de los alumnos
+
+        Returns:
+            Diccionario {alumno_id: datos_escolares_id} (sin los alumnos que no tienen registro)
+        """
+        ids = list(alumno_ids)
+        resultado = {}
+        for inicio in range(0, len(ids), self.TAMANO_LOTE):
+            lote = ids[inicio:inicio + self.TAMANO_LOTE]
+            marcadores = ','.join('?' * len(lote))
+            self.cursor.execute(f"""
+            SELECT alumno_id, MAX(id) AS id
+            FROM datos_escolares
+            WHERE alumno_id IN ({marcadores})
+            GROUP BY alumno_id
+            """, lote)
+            resultado.update((row['alumno_id'], row['id']) for row in self.cursor.fetchall())
+        return resultado
+
+    def insert_many(self, registros: List[DatosEscolares]):
+        """Inserta varios registros con una sola sentencia preparada (no hace commit)"""
+        self.cursor.executemany("""
+        INSERT INTO datos_escolares
+        (alumno_id, ciclo_escolar, grado, grupo, turno, escuela, cct, calificaciones)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (datos.alumno_id, datos.ciclo_escolar, datos.grado, datos.grupo, datos.turno,
+             datos.escuela, datos.cct, json.dumps(datos.calificaciones))
+            for datos in registros
+        ])
+
+    def update_many(self, registros: List[DatosEscolares]):
+        """Actualiza varios registros existentes (por id) sin hacer commit"""
+        self.cursor.executemany("""
+        UPDATE datos_escolares
+        SET alumno_id = ?, ciclo_escolar = ?, grado = ?, grupo = ?,
+            turno = ?, escuela = ?, cct = ?, calificaciones = ?
+        WHERE id = ?
+        """, [
+            (datos.alumno_id, datos.ciclo_escolar, datos.grado, datos.grupo, datos.turno,
+             datos.escuela, datos.cct, json.dumps(datos.calificaciones), datos.id)
+            for datos in registros
+        ])
+
     def delete(self, datos_id: int) -> bool:
         """
         Elimina datos escolares de la base de datos
@@ -205,9 +217,13 @@ class DatosEscolaresRepository:
             True si se eliminó correctamente, False en caso contrario
         """
         try:
+            version = get_cubo_agregados().version_actual()
+            alumno_ids = self._get_alumno_ids([datos_id])
             self.cursor.execute("DELETE FROM datos_escolares WHERE id = ?", (datos_id,))
+            eliminado = self.cursor.rowcount > 0
             self.conn.commit()
-            return self.cursor.rowcount > 0
+            al_confirmar(get_cubo_agregados().actualizar_alumnos, alumno_ids, version)
+            return eliminado
         except Exception as e:
             print(f"Error al eliminar datos escolares: {e}")
             return False
@@ -223,14 +239,16 @@ class DatosEscolaresRepository:
             True si se eliminó correctamente, False en caso contrario
         """
         try:
+            version = get_cubo_agregados().version_actual()
             self.cursor.execute("DELETE FROM datos_escolares WHERE alumno_id = ?", (alumno_id,))
             self.conn.commit()
+            al_confirmar(get_cubo_agregados().actualizar_alumnos, [alumno_id], version)
             return True
         except Exception as e:
             print(f"Error al eliminar datos escolares del alumno {alumno_id}: {e}")
             return False
 
     def close(self):
-        """Cierra la conexión a la base de datos"""
-        if self.conn:
+        """Cierra la conexión a la base de datos (las del pool las administra el gestor)"""
+        if self.conn and not self._pooled_connection:
             self.conn.close()
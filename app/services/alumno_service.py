@@ -2,15 +2,28 @@
 Servicio para gestión de alumnos
 """
 import sqlite3
-from typing import List, Optional, Dict, Any, Tuple
+import time
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from app.data.models.alumno import Alumno
 from app.data.models.datos_escolares import DatosEscolares
+from app.data.models.mapeo import VistaFila
+from app.data.models.reporte_importacion import (
+    FilaImportacion, ReporteImportacion,
+    ESTADO_INSERTADO, ESTADO_ACTUALIZADO, ESTADO_OMITIDO, ESTADO_ERROR
+)
 from app.data.repositories.alumno_repository import AlumnoRepository
 from app.data.repositories.datos_escolares_repository import DatosEscolaresRepository
 from app.data.repositories.constancia_repository import ConstanciaRepository
+from app.data.indices.nombre_index import get_nombre_index
+from app.data.indices.cubo_agregados import get_cubo_agregados
 from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.escritor import en_escritor
 from app.core.utils import format_curp, format_name, is_valid_curp
 
+# (nombre, id) de la última fila entregada en una página de listar_alumnos_pagina
+CursorPagina = Tuple[Optional[str], int]
+
 class AlumnoService:
     """Servicio para gestión de alumnos"""
 
@@ -24,12 +37,15 @@ class AlumnoService:
         if db_connection:
             self.conn = db_connection
         else:
-            self.conn = sqlite3.connect(Config.DB_PATH)
-            self.conn.row_factory = sqlite3.Row
+            # Conexión del hilo actual del pool central (no se cierra desde el servicio)
+            self.conn = get_connection_manager(Config.DB_PATH).get_connection()
+            self.shared_connection = True
 
         self.alumno_repository = AlumnoRepository(self.conn)
         self.datos_escolares_repository = DatosEscolaresRepository(self.conn)
         self.constancia_repository = ConstanciaRepository(self.conn)
+        # Escritor único (lo asigna ServiceProvider): los métodos @en_escritor se ejecutan en su hilo
+        self.escritor = None
 
     def get_alumno(self, alumno_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -80,6 +96,7 @@ class AlumnoService:
 
         return result
 
+    @en_escritor
     def registrar_alumno(self, datos: Dict[str, Any]) -> Tuple[bool, str, Dict[str, Any]]:
         """
         Registra un nuevo alumno
@@ -155,6 +172,177 @@ class AlumnoService:
         except Exception as e:
             return False, f"Error al registrar alumno: {str(e)}", {}
 
+    @en_escritor
+    def importar_alumnos(self, registros: List[Dict[str, Any]], actualizar_existentes: bool = False,
+                         normalizar: bool = True) -> Tuple[bool, str, ReporteImportacion]:
+        """
+        Importa muchos alumnos (con sus datos escolares) en una sola transacción
+
+        A diferencia de registrar_alumno (consulta de existencia y dos commits por
+        alumno), las CURPs se comparan contra un diccionario en memoria y las
+        escrituras se agrupan con executemany: un ciclo escolar completo se
+        confirma con un solo commit.
+
+        Args:
+            registros: Diccionarios con curp y nombre, y opcionalmente matricula,
+                       fecha_nacimiento, grado, grupo, turno, ciclo_escolar, escuela,
+                       cct y calificaciones (las mismas claves que registrar_alumno)
+            actualizar_existentes: Si es True, las CURPs ya registradas se actualizan
+                                   junto con su registro escolar más reciente;
+                                   si es False, se omiten
+            normalizar: Aplicar el formato de registrar_alumno (nombre en mayúsculas
+                        sin acentos y validación del formato de la CURP)
+
+        Returns:
+            Tupla con (éxito, mensaje, reporte con el resultado de cada fila)
+        """
+        inicio = time.perf_counter()
+        reporte = ReporteImportacion()
+
+        # 1. Validar en memoria (sin tocar la base de datos)
+        validas = []  # (fila, alumno, datos escolares o None)
+        curps_vistas = set()
+        for indice, datos in enumerate(registros):
+            curp = format_curp(datos.get("curp") or "")
+            nombre = datos.get("nombre") or ""
+            if normalizar:
+                nombre = format_name(nombre, uppercase=True, remove_accents=True)
+
+            fila = FilaImportacion(indice=indice, curp=curp, nombre=nombre, estado=ESTADO_ERROR)
+            reporte.filas.append(fila)
+
+            if not curp:
+                fila.mensaje = "La CURP es obligatoria"
+                continue
+            if not nombre:
+                fila.mensaje = "El nombre es obligatorio"
+                continue
+            if normalizar and not is_valid_curp(curp):
+                fila.mensaje = "La CURP no tiene un formato válido"
+                continue
+            if curp in curps_vistas:
+                fila.estado = ESTADO_OMITIDO
+                fila.mensaje = "CURP repetida dentro de la importación"
+                continue
+
+            try:
+                datos_escolares = self._datos_escolares_para_importar(datos)
+            except (TypeError, ValueError):
+                fila.mensaje = f"Grado no válido: {datos.get('grado')}"
+                continue
+
+            curps_vistas.add(curp)
+            alumno = Alumno(
+                curp=curp,
+                nombre=nombre,
+                matricula=datos.get("matricula"),
+                fecha_nacimiento=datos.get("fecha_nacimiento")
+            )
+            validas.append((fila, alumno, datos_escolares))
+
+        if not validas:
+            reporte.duracion_segundos = time.perf_counter() - inicio
+            return False, f"No hay alumnos válidos para importar. {reporte.resumen()}", reporte
+
+        # 2. Escribir todo en una transacción
+        nuevos, existentes = [], []
+        # Versión de los datos antes de escribir, para el cubo de agregados
+        version_previa = get_cubo_agregados().version_actual()
+        try:
+            if not self.conn.in_transaction:
+                # IMMEDIATE: nadie más puede registrar estas CURPs entre la consulta y el INSERT
+                self.conn.execute("BEGIN IMMEDIATE")
+
+            registrados = self.alumno_repository.get_ids_by_curps(alumno.curp for _, alumno, _ in validas)
+            for fila, alumno, datos_escolares in validas:
+                alumno_id = registrados.get(alumno.curp)
+                if alumno_id is None:
+                    nuevos.append((fila, alumno, datos_escolares))
+                elif actualizar_existentes:
+                    alumno.id = alumno_id
+                    # Vacíos no sobrescriben lo guardado (COALESCE en update_many)
+                    alumno.matricula = alumno.matricula or None
+                    alumno.fecha_nacimiento = alumno.fecha_nacimiento or None
+                    existentes.append((fila, alumno, datos_escolares))
+                else:
+                    fila.estado = ESTADO_OMITIDO
+                    fila.alumno_id = alumno_id
+                    fila.mensaje = f"Ya existe un alumno con la CURP {alumno.curp}"
+
+            self.alumno_repository.insert_many([alumno for _, alumno, _ in nuevos])
+            self.alumno_repository.update_many([alumno for _, alumno, _ in existentes])
+
+            asignados = self.alumno_repository.get_ids_by_curps(alumno.curp for _, alumno, _ in nuevos)
+            for _, alumno, _ in nuevos:
+                alumno.id = asignados[alumno.curp]
+
+            # Solo los alumnos que ya existían pueden tener un registro escolar previo
+            recientes = self.datos_escolares_repository.get_latest_ids_by_alumnos(
+                alumno.id for _, alumno, datos_escolares in existentes if datos_escolares
+            )
+            por_insertar, por_actualizar = [], []
+            for fila, alumno, datos_escolares in nuevos + existentes:
+                if not datos_escolares:
+                    continue
+                datos_escolares.alumno_id = alumno.id
+                datos_escolares.id = recientes.get(alumno.id)
+                if datos_escolares.id:
+                    por_actualizar.append(datos_escolares)
+                    fila.datos_escolares = ESTADO_ACTUALIZADO
+                else:
+                    por_insertar.append(datos_escolares)
+                    fila.datos_escolares = ESTADO_INSERTADO
+
+            self.datos_escolares_repository.insert_many(por_insertar)
+            self.datos_escolares_repository.update_many(por_actualizar)
+            self.conn.commit()
+
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            for fila, _, _ in validas:
+                fila.estado = ESTADO_ERROR
+                fila.alumno_id = None
+                fila.datos_escolares = None
+                fila.mensaje = f"Importación revertida: {e}"
+            reporte.duracion_segundos = time.perf_counter() - inicio
+            return False, f"Error al importar alumnos: {str(e)}", reporte
+
+        for estado, grupo in ((ESTADO_INSERTADO, nuevos), (ESTADO_ACTUALIZADO, existentes)):
+            for fila, alumno, _ in grupo:
+                fila.estado = estado
+                fila.alumno_id = alumno.id
+        self.alumno_repository.refresh_name_index((alumno for _, alumno, _ in nuevos + existentes),
+                                                  version_previa)
+
+        reporte.duracion_segundos = time.perf_counter() - inicio
+        return True, f"Importación completada: {reporte.resumen()}", reporte
+
+    @staticmethod
+    def _datos_escolares_para_importar(datos: Dict[str, Any]) -> Optional[DatosEscolares]:
+        """DatosEscolares (sin alumno_id todavía) de una fila a importar, o None si no trae grado y grupo"""
+        if not (datos.get("grado") and datos.get("grupo")):
+            return None
+
+        calificaciones = datos.get("calificaciones") or []
+        if isinstance(calificaciones, dict):
+            # {"asignatura": calificacion} -> lista de materias
+            calificaciones = [
+                {"asignatura": asignatura, "calificacion": calificacion}
+                for asignatura, calificacion in calificaciones.items()
+            ]
+
+        return DatosEscolares(
+            alumno_id=0,
+            ciclo_escolar=datos.get("ciclo_escolar", Config.get_current_year()),
+            grado=int(datos.get("grado", 1)),
+            grupo=datos.get("grupo", "A"),
+            turno=datos.get("turno", "MATUTINO"),
+            escuela=datos.get("escuela", Config.get_school_name()),
+            cct=datos.get("cct", Config.get_school_cct()),
+            calificaciones=calificaciones
+        )
+
+    @en_escritor
     def actualizar_alumno_datos(self, alumno_id: int, datos: Dict[str, Any]) -> Tuple[bool, str, Optional[Alumno]]:
         """
         Actualiza los datos de un alumno
@@ -248,6 +436,7 @@ class AlumnoService:
         except Exception as e:
             return False, f"Error al actualizar alumno: {str(e)}", None
 
+    @en_escritor
     def eliminar_alumno(self, alumno_id: int) -> Tuple[bool, str]:
         """
         Elimina un alumno
@@ -290,28 +479,24 @@ class AlumnoService:
         Returns:
             Lista de diccionarios con los datos de los alumnos
         """
-        alumnos = self.alumno_repository.search(query, limit)
-
-        result = []
-        for alumno in alumnos:
-            # Obtener datos escolares más recientes
-            datos_escolares = self.datos_escolares_repository.get_by_alumno(alumno.id, latest_only=True)
-
-            alumno_dict = alumno.to_dict()
-            if datos_escolares:
-                datos_dict = datos_escolares[0].to_dict()
-                # Eliminar campos redundantes
-                if 'id' in datos_dict:
-                    del datos_dict['id']
-                if 'alumno_id' in datos_dict:
-                    del datos_dict['alumno_id']
+        # Una sola consulta: alumno + datos escolares más recientes
+        return self.alumno_repository.search_with_datos_escolares(query, limit)
 
-                # Actualizar el diccionario del alumno con todos los datos escolares
-                alumno_dict.update(datos_dict)
+    def buscar_alumnos_similares(self, nombre: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Busca alumnos con nombre parecido (tolerante a errores tipográficos)
 
-            result.append(alumno_dict)
+        Args:
+            nombre: Nombre, posiblemente mal escrito (p. ej. "habriela")
+            limit: Límite de resultados
 
-        return result
+        Returns:
+            Lista de diccionarios ordenada de más a menos parecido
+        """
+        candidatos = get_nombre_index().buscar(nombre, limit)
+        return self.alumno_repository.get_many_with_datos_escolares(
+            [alumno_id for alumno_id, _ in candidatos]
+        )
 
     # MÉTODO ELIMINADO: buscar_por_nombre() era alias de buscar_alumnos()
     # Usar buscar_alumnos() directamente para evitar duplicación
@@ -327,28 +512,57 @@ class AlumnoService:
         Returns:
             Lista de diccionarios con los datos de los alumnos
         """
-        alumnos = self.alumno_repository.list_all(limit, offset)
+        # Una sola consulta: alumno + datos escolares más recientes
+        return self.alumno_repository.list_all_with_datos_escolares(limit, offset)
 
-        result = []
-        for alumno in alumnos:
-            # Obtener datos escolares más recientes
-            datos_escolares = self.datos_escolares_repository.get_by_alumno(alumno.id, latest_only=True)
+    def listar_alumnos_vistas(self, limit: int = 100, offset: int = 0) -> List[VistaFila]:
+        """
+        Lista alumnos como vistas de solo lectura sobre las filas (sin copiar a diccionarios)
 
-            alumno_dict = alumno.to_dict()
-            if datos_escolares:
-                datos_dict = datos_escolares[0].to_dict()
-                # Eliminar campos redundantes
-                if 'id' in datos_dict:
-                    del datos_dict['id']
-                if 'alumno_id' in datos_dict:
-                    del datos_dict['alumno_id']
+        Para tablas y exportaciones grandes que solo leen los valores; usar
+        listar_alumnos() si se van a modificar los resultados.
+
+        Args:
+            limit: Límite de resultados
+            offset: Desplazamiento para paginación
+
+        Returns:
+            Lista de VistaFila (vista['nombre'], vista.get('grado'), dict(vista))
+        """
+        return self.alumno_repository.list_views_with_datos_escolares(limit, offset)
+
+    def iterar_alumnos(self, tamano_lote: int = 500) -> Iterator[VistaFila]:
+        """
+        Recorre todos los alumnos ordenados por nombre sin cargarlos todos en memoria
 
-                # Actualizar el diccionario del alumno con todos los datos escolares
-                alumno_dict.update(datos_dict)
+        Args:
+            tamano_lote: Filas leídas de SQLite en cada lote
 
-            result.append(alumno_dict)
+        Returns:
+            Iterador de VistaFila
+        """
+        return self.alumno_repository.iter_views_with_datos_escolares(tamano_lote)
 
-        return result
+    def listar_alumnos_pagina(self, limit: int = 100,
+                              cursor: Optional[CursorPagina] = None) -> Tuple[List[Dict[str, Any]], Optional[CursorPagina]]:
+        """
+        Lista alumnos por páginas ordenadas por nombre (paginación por clave)
+
+        Args:
+            limit: Tamaño de la página
+            cursor: Cursor devuelto por la página anterior (None para la primera)
+
+        Returns:
+            Tupla (alumnos, cursor_siguiente); cursor_siguiente es None en la última página
+        """
+        # Se pide una fila extra para saber si hay otra página sin un COUNT(*)
+        alumnos = self.alumno_repository.list_page_with_datos_escolares(limit + 1, cursor)
+        if len(alumnos) <= limit:
+            return alumnos, None
+
+        alumnos = alumnos[:limit]
+        ultimo = alumnos[-1]
+        return alumnos, (ultimo['nombre'], ultimo['id'])
 
     # MÉTODO ELIMINADO: get_alumno_by_id() era duplicado de get_alumno()
     # Usar get_alumno() en su lugar para evitar inconsistencias
@@ -369,6 +583,7 @@ class AlumnoService:
     # MÉTODO ELIMINADO: get_constancias() era alias de get_constancias_by_alumno_id()
     # Usar get_constancias_by_alumno_id() directamente para evitar duplicación
 
+    @en_escritor
     def actualizar_alumno(self, alumno_id: int, datos_personales: Dict[str, Any], datos_escolares: Dict[str, Any] = None) -> bool:
         """
         Actualiza los datos de un alumno y sus datos escolares
@@ -4,16 +4,25 @@ Servicio para gestión de constancias
 import sqlite3
 import os
 import tempfile
+import threading
 from typing import List, Optional, Dict, Any, Tuple
 from app.data.models.alumno import Alumno
 from app.data.models.constancia import Constancia
 from app.data.models.datos_escolares import DatosEscolares
+from app.data.models.reporte_importacion import ESTADO_ACTUALIZADO, ESTADO_INSERTADO
 from app.data.repositories.alumno_repository import AlumnoRepository
 from app.data.repositories.constancia_repository import ConstanciaRepository
 from app.data.repositories.datos_escolares_repository import DatosEscolaresRepository
+from app.services.alumno_service import AlumnoService
 from app.core.pdf_extractor import PDFExtractor
 from app.core.pdf_generator import PDFGenerator
+from app.core.pdf_lote import (
+    FORMATO_ARCHIVOS, FORMATO_PDF, FORMATOS_LOTE, DocumentoLote, GeneradorLote, Progreso,
+    combinar_pdfs, crear_directorio_lote, empaquetar_zip, nombre_lote
+)
 from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.escritor import en_escritor
 from app.core.utils import ensure_directories_exist
 from app.core.executable_paths import get_path_manager
 
@@ -33,13 +42,18 @@ class ConstanciaService:
             # Usar gestor de rutas para obtener la ruta correcta de la BD
             path_manager = get_path_manager()
             db_path = str(path_manager.get_database_path())
-            self.conn = sqlite3.connect(db_path)
-            self.conn.row_factory = sqlite3.Row
+            # Conexión del hilo actual del pool central (no se cierra desde el servicio)
+            self.conn = get_connection_manager(db_path).get_connection()
+            self.shared_connection = True
 
         self.alumno_repository = AlumnoRepository(self.conn)
         self.constancia_repository = ConstanciaRepository(self.conn)
         self.datos_escolares_repository = DatosEscolaresRepository(self.conn)
+        # Altas desde PDF usan la ruta de importación por lote de AlumnoService
+        self.alumno_service = AlumnoService(self.conn)
         self.pdf_generator = PDFGenerator()
+        # Escritor único (lo asigna ServiceProvider): los métodos @en_escritor se ejecutan en su hilo
+        self.escritor = None
 
         # Asegurar que los directorios necesarios existan
         ensure_directories_exist()
@@ -107,59 +121,7 @@ class ConstanciaService:
             # Buscar o crear alumno si se debe guardar (solo si no estamos en modo vista previa)
             alumno = None
             if not preview_mode and guardar_alumno:
-                alumno = self.alumno_repository.get_by_curp(datos["curp"])
-                if not alumno:
-                    # Crear nuevo alumno con los datos extraídos
-                    alumno = Alumno(
-                        curp=datos["curp"],
-                        nombre=datos["nombre"],
-                        matricula=datos.get("matricula"),
-                        fecha_nacimiento=datos.get("nacimiento")
-                    )
-                    alumno = self.alumno_repository.save(alumno)
-
-                # Guardar o actualizar datos escolares si están disponibles
-                if datos.get("grado") and datos.get("grupo"):
-                    # Verificar si ya existen datos escolares para este alumno
-                    datos_escolares_list = self.datos_escolares_repository.get_by_alumno(alumno.id, latest_only=True)
-
-                    # Convertir calificaciones a lista si es necesario
-                    calificaciones = datos.get("calificaciones", [])
-                    if isinstance(calificaciones, dict):
-                        calificaciones_list = []
-                        for asignatura, calificacion in calificaciones.items():
-                            calificaciones_list.append({
-                                "asignatura": asignatura,
-                                "calificacion": calificacion
-                            })
-                        calificaciones = calificaciones_list
-
-                    if datos_escolares_list:
-                        # Actualizar datos escolares existentes
-                        datos_escolares = datos_escolares_list[0]
-                        datos_escolares.ciclo_escolar = datos.get("ciclo", Config.get_current_year())
-                        datos_escolares.grado = int(datos.get("grado", 1))
-                        datos_escolares.grupo = datos.get("grupo", "A")
-                        datos_escolares.turno = datos.get("turno", "MATUTINO")
-                        datos_escolares.escuela = datos.get("escuela", Config.get_school_name())
-                        datos_escolares.cct = datos.get("cct", Config.get_school_cct())
-                        datos_escolares.calificaciones = calificaciones
-
-                        self.datos_escolares_repository.save(datos_escolares)
-                    else:
-                        # Crear nuevos datos escolares
-                        datos_escolares = DatosEscolares(
-                            alumno_id=alumno.id,
-                            ciclo_escolar=datos.get("ciclo", Config.get_current_year()),
-                            grado=int(datos.get("grado", 1)),
-                            grupo=datos.get("grupo", "A"),
-                            turno=datos.get("turno", "MATUTINO"),
-                            escuela=datos.get("escuela", Config.get_school_name()),
-                            cct=datos.get("cct", Config.get_school_cct()),
-                            calificaciones=calificaciones
-                        )
-
-                        self.datos_escolares_repository.save(datos_escolares)
+                alumno = self._guardar_datos_extraidos(datos)
 
             # Generar constancia
             if preview_mode and output_dir:
@@ -168,7 +130,8 @@ class ConstanciaService:
                     tipo_constancia,
                     datos,
                     output_dir=output_dir,
-                    filename_prefix="preview_"
+                    filename_prefix="preview_",
+                    borrador=True
                 )
             else:
                 # Generación normal
@@ -180,12 +143,7 @@ class ConstanciaService:
             # Registrar constancia en la base de datos si se debe guardar (solo si no estamos en modo vista previa)
             constancia = None
             if not preview_mode and guardar_alumno and alumno:
-                constancia = Constancia(
-                    alumno_id=alumno.id,
-                    tipo=tipo_constancia,
-                    ruta_archivo=output_path
-                )
-                constancia = self.constancia_repository.save(constancia)
+                constancia = self._registrar_constancia(alumno.id, tipo_constancia, output_path)
 
             result_data = {
                 "ruta_archivo": output_path
@@ -202,6 +160,83 @@ class ConstanciaService:
         except Exception as e:
             return False, f"Error al generar constancia: {str(e)}", None
 
+    @en_escritor
+    def _guardar_datos_extraidos(self, datos: Dict[str, Any]) -> Alumno:
+        """
+        Busca o crea el alumno de los datos extraídos y guarda sus datos escolares
+
+        Args:
+            datos: Datos extraídos del PDF (curp, nombre, grado, grupo, calificaciones, ...)
+
+        Returns:
+            Alumno guardado
+        """
+        alumno = self.alumno_repository.get_by_curp(datos["curp"])
+        if not alumno:
+            # Crear nuevo alumno con los datos extraídos
+            alumno = Alumno(
+                curp=datos["curp"],
+                nombre=datos["nombre"],
+                matricula=datos.get("matricula"),
+                fecha_nacimiento=datos.get("nacimiento")
+            )
+            alumno = self.alumno_repository.save(alumno)
+
+        # Guardar o actualizar datos escolares si están disponibles
+        if datos.get("grado") and datos.get("grupo"):
+            # Verificar si ya existen datos escolares para este alumno
+            datos_escolares_list = self.datos_escolares_repository.get_by_alumno(alumno.id, latest_only=True)
+
+            # Convertir calificaciones a lista si es necesario
+            calificaciones = datos.get("calificaciones", [])
+            if isinstance(calificaciones, dict):
+                calificaciones_list = []
+                for asignatura, calificacion in calificaciones.items():
+                    calificaciones_list.append({
+                        "asignatura": asignatura,
+                        "calificacion": calificacion
+                    })
+                calificaciones = calificaciones_list
+
+            if datos_escolares_list:
+                # Actualizar datos escolares existentes
+                datos_escolares = datos_escolares_list[0]
+                datos_escolares.ciclo_escolar = datos.get("ciclo", Config.get_current_year())
+                datos_escolares.grado = int(datos.get("grado", 1))
+                datos_escolares.grupo = datos.get("grupo", "A")
+                datos_escolares.turno = datos.get("turno", "MATUTINO")
+                datos_escolares.escuela = datos.get("escuela", Config.get_school_name())
+                datos_escolares.cct = datos.get("cct", Config.get_school_cct())
+                datos_escolares.calificaciones = calificaciones
+
+                self.datos_escolares_repository.save(datos_escolares)
+            else:
+                # Crear nuevos datos escolares
+                datos_escolares = DatosEscolares(
+                    alumno_id=alumno.id,
+                    ciclo_escolar=datos.get("ciclo", Config.get_current_year()),
+                    grado=int(datos.get("grado", 1)),
+                    grupo=datos.get("grupo", "A"),
+                    turno=datos.get("turno", "MATUTINO"),
+                    escuela=datos.get("escuela", Config.get_school_name()),
+                    cct=datos.get("cct", Config.get_school_cct()),
+                    calificaciones=calificaciones
+                )
+
+                self.datos_escolares_repository.save(datos_escolares)
+
+        return alumno
+
+    @en_escritor
+    def _registrar_constancia(self, alumno_id: int, tipo_constancia: str, ruta_archivo: str) -> Constancia:
+        """Registra en la base de datos una constancia ya generada"""
+        constancia = Constancia(
+            alumno_id=alumno_id,
+            tipo=tipo_constancia,
+            ruta_archivo=ruta_archivo
+        )
+        return self.constancia_repository.save(constancia)
+
     def generar_constancia_para_alumno(self, alumno_id: int, tipo_constancia: str, incluir_foto: Optional[bool] = None, preview_mode: bool = False) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
         """
         Genera una constancia para un alumno existente
@@ -250,74 +285,11 @@ class ConstanciaService:
                 datos_escolares = datos_escolares_list[0]
 
             # Preparar datos para la constancia
-            datos = {
-                "curp": alumno.curp,
-                "nombre": alumno.nombre,
-                "matricula": alumno.matricula,
-                "nacimiento": alumno.fecha_nacimiento,
-                "mostrar_calificaciones": tipo_constancia in ["traslado", "calificaciones"],
-                "has_photo": False  # Por defecto, no incluir foto
-            }
-
-            # Añadir datos escolares si están disponibles
-            if datos_escolares:
-                datos.update({
-                    "grado": datos_escolares.grado,
-                    "grupo": datos_escolares.grupo,
-                    "turno": datos_escolares.turno,
-                    "ciclo": datos_escolares.ciclo_escolar,
-                    "escuela": datos_escolares.escuela or Config.get_school_name(),
-                    "cct": datos_escolares.cct or Config.get_school_cct(),
-                    "calificaciones": datos_escolares.calificaciones,
-                    "tiene_calificaciones": bool(datos_escolares.calificaciones and len(datos_escolares.calificaciones) > 0)
-                })
-            else:
-                # Valores predeterminados para datos escolares
-                datos.update({
-                    "grado": "",
-                    "grupo": "",
-                    "turno": "MATUTINO",
-                    "ciclo": Config.get_current_year(),
-                    "escuela": Config.get_school_name(),
-                    "cct": Config.get_school_cct(),
-                    "calificaciones": [],
-                    "tiene_calificaciones": False
-                })
-
-            # Verificar si hay foto y si se debe incluir
-            path_manager = get_path_manager()
-            photos_dir = path_manager.get_photos_dir()
-            foto_path = photos_dir / f"{alumno.curp}.jpg"
-
-            # 🎯 LÓGICA INTELIGENTE DE FOTO
-            if incluir_foto is False:
-                # Usuario solicita explícitamente NO incluir foto
-                datos["has_photo"] = False
-                datos["show_placeholder"] = False
-                # No asignar foto_path para asegurar que no se muestre
-                if "foto_path" in datos:
-                    del datos["foto_path"]
-            elif incluir_foto is True:
-                # Usuario solicita explícitamente incluir foto
-                if foto_path.exists():
-                    datos["has_photo"] = True
-                    datos["foto_path"] = str(foto_path)
-                    datos["show_placeholder"] = True
-                else:
-                    # Si no hay foto pero se solicitó incluirla, mostrar un espacio para foto
-                    datos["has_photo"] = False
-                    datos["show_placeholder"] = True
-            else:
-                # incluir_foto es None - COMPORTAMIENTO AUTOMÁTICO INTELIGENTE
-                # ✅ Si existe la foto, mostrarla automáticamente
-                # ❌ Si no existe, no mostrar nada
-                if foto_path.exists():
-                    datos["has_photo"] = True
-                    datos["foto_path"] = str(foto_path)
-                    datos["show_placeholder"] = True
-                else:
-                    datos["has_photo"] = False
-                    datos["show_placeholder"] = False
+            datos = self._datos_constancia(
+                alumno.curp, alumno.nombre, alumno.matricula, alumno.fecha_nacimiento,
+                datos_escolares.to_dict() if datos_escolares else None,
+                tipo_constancia, incluir_foto
+            )
 
             # Generar constancia
             if preview_mode:
@@ -327,7 +299,8 @@ class ConstanciaService:
                     tipo_constancia,
                     datos,
                     output_dir=temp_dir,
-                    filename_prefix="preview_"
+                    filename_prefix="preview_",
+                    borrador=True
                 )
 
                 # 🔧 OBTENER DATOS COMPLETOS DEL ALUMNO (incluyendo datos escolares)
@@ -348,12 +321,7 @@ class ConstanciaService:
                     return False, "Error al generar la constancia", None
 
                 # Registrar constancia en la base de datos
-                constancia = Constancia(
-                    alumno_id=alumno.id,
-                    tipo=tipo_constancia,
-                    ruta_archivo=output_path
-                )
-                constancia = self.constancia_repository.save(constancia)
+                constancia = self._registrar_constancia(alumno.id, tipo_constancia, output_path)
 
                 # 🔧 OBTENER DATOS COMPLETOS DEL ALUMNO (incluyendo datos escolares)
                 from app.services.alumno_service import AlumnoService
@@ -369,6 +337,224 @@ class ConstanciaService:
         except Exception as e:
             return False, f"Error al generar constancia: {str(e)}", None
 
+    def finalizar_vista_previa(self, ruta_archivo: str) -> Tuple[bool, str, Optional[str]]:
+        """
+        Deja lista la versión definitiva de una vista previa antes de guardarla o abrirla
+
+        Las vistas previas se generan con el renderizador nativo para mostrarse
+        al instante; si el tipo de constancia usa wkhtmltopdf, aquí se genera
+        el PDF definitivo en la misma ruta. En otro caso no hace nada.
+
+        Args:
+            ruta_archivo: Ruta de la vista previa
+
+        Returns:
+            Tupla con (éxito, mensaje, ruta del archivo)
+        """
+        if not ruta_archivo or not os.path.exists(ruta_archivo):
+            return False, f"No existe la vista previa: {ruta_archivo}", None
+        try:
+            if not self.pdf_generator.es_borrador(ruta_archivo):
+                return True, "La vista previa ya es la constancia definitiva", ruta_archivo
+            ruta = self.pdf_generator.finalizar_borrador(ruta_archivo)
+            return True, "Constancia definitiva generada correctamente", ruta
+        except Exception as e:
+            return False, f"Error al generar la constancia definitiva: {str(e)}", ruta_archivo
+
+    @staticmethod
+    def _datos_constancia(curp: str, nombre: str, matricula: Optional[str], nacimiento: Optional[str],
+                          datos_escolares: Optional[Dict[str, Any]], tipo_constancia: str,
+                          incluir_foto: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Arma los datos de la plantilla para un alumno registrado
+
+        Args:
+            curp, nombre, matricula, nacimiento: Datos personales del alumno
+            datos_escolares: Registro escolar vigente (grado, grupo, turno, ciclo_escolar,
+                             escuela, cct, calificaciones) o None
+            tipo_constancia: Tipo de constancia (traslado, estudio, calificaciones)
+            incluir_foto: True/False para forzar la foto; None la muestra si existe
+
+        Returns:
+            Diccionario para PDFGenerator
+        """
+        datos = {
+            "curp": curp,
+            "nombre": nombre,
+            "matricula": matricula,
+            "nacimiento": nacimiento,
+            "mostrar_calificaciones": tipo_constancia in ["traslado", "calificaciones"],
+            "has_photo": False  # Por defecto, no incluir foto
+        }
+
+        # Añadir datos escolares si están disponibles
+        if datos_escolares:
+            calificaciones = datos_escolares.get("calificaciones")
+            datos.update({
+                "grado": datos_escolares.get("grado"),
+                "grupo": datos_escolares.get("grupo"),
+                "turno": datos_escolares.get("turno"),
+                "ciclo": datos_escolares.get("ciclo_escolar"),
+                "escuela": datos_escolares.get("escuela") or Config.get_school_name(),
+                "cct": datos_escolares.get("cct") or Config.get_school_cct(),
+                "calificaciones": calificaciones,
+                "tiene_calificaciones": bool(calificaciones and len(calificaciones) > 0)
+            })
+        else:
+            # Valores predeterminados para datos escolares
+            datos.update({
+                "grado": "",
+                "grupo": "",
+                "turno": "MATUTINO",
+                "ciclo": Config.get_current_year(),
+                "escuela": Config.get_school_name(),
+                "cct": Config.get_school_cct(),
+                "calificaciones": [],
+                "tiene_calificaciones": False
+            })
+
+        # Verificar si hay foto y si se debe incluir
+        path_manager = get_path_manager()
+        photos_dir = path_manager.get_photos_dir()
+        foto_path = photos_dir / f"{curp}.jpg"
+
+        # 🎯 LÓGICA INTELIGENTE DE FOTO
+        if incluir_foto is False:
+            # Usuario solicita explícitamente NO incluir foto (sin foto_path para que no se muestre)
+            datos["has_photo"] = False
+            datos["show_placeholder"] = False
+        elif incluir_foto is True:
+            # Usuario solicita explícitamente incluir foto
+            if foto_path.exists():
+                datos["has_photo"] = True
+                datos["foto_path"] = str(foto_path)
+                datos["show_placeholder"] = True
+            else:
+                # Si no hay foto pero se solicitó incluirla, mostrar un espacio para foto
+                datos["has_photo"] = False
+                datos["show_placeholder"] = True
+        else:
+            # incluir_foto es None - COMPORTAMIENTO AUTOMÁTICO INTELIGENTE
+            # ✅ Si existe la foto, mostrarla automáticamente
+            # ❌ Si no existe, no mostrar nada
+            if foto_path.exists():
+                datos["has_photo"] = True
+                datos["foto_path"] = str(foto_path)
+                datos["show_placeholder"] = True
+            else:
+                datos["has_photo"] = False
+                datos["show_placeholder"] = False
+
+        return datos
+
+    def generar_constancias_grupo(self, tipo_constancia: str, grado: Optional[int] = None,
+                                  grupo: Optional[str] = None, turno: Optional[str] = None,
+                                  alumno_ids: Optional[List[int]] = None, incluir_foto: Optional[bool] = None,
+                                  formato: str = FORMATO_ARCHIVOS, progreso: Optional[Progreso] = None,
+                                  cancelar: Optional[threading.Event] = None) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """
+        Genera las constancias de todo un grupo o grado (o de una lista de alumnos)
+
+        Los alumnos se leen en una sola consulta, el HTML se renderiza en el
+        proceso y la conversión a PDF corre en paralelo (ver GeneradorLote).
+        Las constancias generadas se registran en la base de datos en una sola
+        escritura.
+
+        Args:
+            tipo_constancia: Tipo de constancia (traslado, estudio, calificaciones)
+            grado, grupo, turno: Alumnos a incluir (se ignoran si se da alumno_ids)
+            alumno_ids: IDs concretos de alumnos (opcional)
+            incluir_foto: True/False para forzar la foto; None la muestra si existe
+            formato: "archivos" (un PDF por alumno), "pdf" (además un PDF combinado) o "zip"
+            progreso: Función (hechos, total, nombre) llamada al terminar cada constancia
+            cancelar: threading.Event para detener el lote
+
+        Returns:
+            Tupla con (éxito, mensaje, datos del lote)
+        """
+        try:
+            if tipo_constancia not in ["traslado", "estudio", "calificaciones"]:
+                return False, f"Tipo de constancia no válido: {tipo_constancia}", None
+            if formato not in FORMATOS_LOTE:
+                return False, f"Formato de salida no válido: {formato}", None
+            if not alumno_ids and not grado:
+                return False, "Indique un grado (y opcionalmente un grupo) o una lista de alumnos", None
+
+            if alumno_ids:
+                registros = self.alumno_repository.get_many_with_datos_escolares(list(alumno_ids))
+            else:
+                registros = self.alumno_repository.list_by_grupo_with_datos_escolares(grado, grupo, turno)
+
+            if not registros:
+                return False, "No se encontraron alumnos para generar constancias", None
+
+            # Las constancias con calificaciones necesitan datos escolares con calificaciones
+            documentos, omitidos = [], []
+            for registro in registros:
+                tiene_escolares = 'grado' in registro
+                if tipo_constancia in ["calificaciones", "traslado"] and not (
+                        tiene_escolares and registro.get('calificaciones')):
+                    omitidos.append({"nombre": registro['nombre'], "motivo": "Sin calificaciones registradas"})
+                    continue
+
+                datos = self._datos_constancia(
+                    registro['curp'], registro['nombre'], registro['matricula'], registro['fecha_nacimiento'],
+                    registro if tiene_escolares else None, tipo_constancia, incluir_foto
+                )
+                documentos.append(DocumentoLote(registro['id'], registro['nombre'], datos))
+
+            if not documentos:
+                return False, "Ningún alumno tiene los datos necesarios para esta constancia", {"omitidos": omitidos}
+
+            directorio = crear_directorio_lote(self.pdf_generator.output_dir,
+                                               nombre_lote(tipo_constancia, grado, grupo))
+            resultado = GeneradorLote(self.pdf_generator).generar(
+                tipo_constancia, documentos, directorio, progreso, cancelar
+            )
+
+            # Registrar las constancias generadas (una sola transacción)
+            pdfs = [(alumno_id, ruta) for alumno_id, ruta in resultado.generados if ruta.endswith(".pdf")]
+            if pdfs:
+                self._registrar_constancias(tipo_constancia, pdfs)
+
+            rutas = [ruta for _, ruta in resultado.generados]
+            if rutas and not resultado.cancelado and formato != FORMATO_ARCHIVOS:
+                destino = os.path.join(directorio, f"{os.path.basename(directorio)}.{formato}")
+                if formato == FORMATO_PDF and len(pdfs) == len(rutas):
+                    empaquetado = combinar_pdfs(rutas, destino)
+                else:
+                    # Sin PDFs (solo HTML) no hay nada que combinar: se entrega el ZIP
+                    destino = os.path.splitext(destino)[0] + ".zip"
+                    empaquetado = empaquetar_zip(rutas, destino)
+                if empaquetado:
+                    resultado.archivo_combinado = destino
+
+            datos_lote = resultado.to_dict()
+            datos_lote["omitidos"] = omitidos
+            datos_lote["total"] = len(registros)
+
+            if resultado.cancelado:
+                mensaje = f"Generación cancelada: {len(rutas)} de {len(documentos)} constancias generadas"
+            else:
+                mensaje = f"{len(rutas)} constancias de {tipo_constancia} generadas"
+            if omitidos:
+                mensaje += f", {len(omitidos)} alumnos omitidos por falta de datos"
+            if resultado.fallidos:
+                mensaje += f", {len(resultado.fallidos)} con error"
+
+            return bool(rutas), mensaje, datos_lote
+
+        except Exception as e:
+            return False, f"Error al generar constancias del grupo: {str(e)}", None
+
+    @en_escritor
+    def _registrar_constancias(self, tipo_constancia: str, archivos: List[Tuple[int, str]]) -> List[Constancia]:
+        """Registra las constancias de un lote (alumno_id, ruta) en una sola transacción"""
+        return [
+            self.constancia_repository.save(Constancia(alumno_id=alumno_id, tipo=tipo_constancia, ruta_archivo=ruta))
+            for alumno_id, ruta in archivos
+        ]
+
     def obtener_constancias_alumno(self, alumno_id: int) -> List[Dict[str, Any]]:
         """
         Obtiene las constancias de un alumno
@@ -406,6 +592,7 @@ class ConstanciaService:
 
         return result
 
+    @en_escritor
     def eliminar_constancia(self, constancia_id: int) -> Tuple[bool, str]:
         """
         Elimina una constancia
@@ -466,38 +653,9 @@ class ConstanciaService:
             if not datos.get("nombre"):
                 return False, "No se pudo obtener el nombre del alumno", None
 
-            # Buscar si el alumno ya existe
-            alumno = self.alumno_repository.get_by_curp(datos["curp"])
-
-            if alumno:
-                # Actualizar datos del alumno existente
-                alumno.nombre = datos["nombre"]
-                if datos.get("matricula"):
-                    alumno.matricula = datos["matricula"]
-                if datos.get("nacimiento"):
-                    alumno.fecha_nacimiento = datos["nacimiento"]
-
-                alumno = self.alumno_repository.update(alumno)
-                mensaje = f"Datos del alumno {alumno.nombre} actualizados correctamente"
-            else:
-                # Crear nuevo alumno con los datos extraídos
-                alumno = Alumno(
-                    curp=datos["curp"],
-                    nombre=datos["nombre"],
-                    matricula=datos.get("matricula"),
-                    fecha_nacimiento=datos.get("nacimiento")
-                )
-                alumno = self.alumno_repository.save(alumno)
-                mensaje = f"Alumno {alumno.nombre} registrado correctamente"
-
-            # Guardar o actualizar datos escolares si están disponibles
+            # Asegurarse de que las calificaciones sean una lista válida
+            calificaciones = datos.get("calificaciones", [])
             if datos.get("grado") and datos.get("grupo"):
-                # Verificar si ya existen datos escolares para este alumno
-                datos_escolares_list = self.datos_escolares_repository.get_by_alumno(alumno.id, latest_only=True)
-
-                # Asegurarse de que las calificaciones sean una lista válida
-                calificaciones = datos.get("calificaciones", [])
-
                 # Verificar si hay calificaciones pero están vacías o son None
                 if not calificaciones and "tiene_calificaciones" in datos and datos["tiene_calificaciones"]:
                     # Intentar extraer calificaciones nuevamente
@@ -508,48 +666,29 @@ class ConstanciaService:
                     except Exception as e:
                         print(f"Error al extraer calificaciones: {e}")
 
-                # Convertir calificaciones a lista si es necesario
-                if isinstance(calificaciones, dict):
-                    calificaciones_list = []
-                    for asignatura, calificacion in calificaciones.items():
-                        calificaciones_list.append({
-                            "asignatura": asignatura,
-                            "calificacion": calificacion
-                        })
-                    calificaciones = calificaciones_list
-
-                # Asegurarse de que calificaciones sea una lista (no None o cadena vacía)
-                if calificaciones is None:
-                    calificaciones = []
-
-                if datos_escolares_list:
-                    # Actualizar datos escolares existentes
-                    datos_escolares = datos_escolares_list[0]
-                    datos_escolares.ciclo_escolar = datos.get("ciclo", Config.get_current_year())
-                    datos_escolares.grado = int(datos.get("grado", 1))
-                    datos_escolares.grupo = datos.get("grupo", "A")
-                    datos_escolares.turno = datos.get("turno", "MATUTINO")
-                    datos_escolares.escuela = datos.get("escuela", Config.get_school_name())
-                    datos_escolares.cct = datos.get("cct", Config.get_school_cct())
-                    datos_escolares.calificaciones = calificaciones
-
-                    self.datos_escolares_repository.save(datos_escolares)
-                    mensaje += " y sus datos escolares han sido actualizados"
-                else:
-                    # Crear nuevos datos escolares
-                    datos_escolares = DatosEscolares(
-                        alumno_id=alumno.id,
-                        ciclo_escolar=datos.get("ciclo", Config.get_current_year()),
-                        grado=int(datos.get("grado", 1)),
-                        grupo=datos.get("grupo", "A"),
-                        turno=datos.get("turno", "MATUTINO"),
-                        escuela=datos.get("escuela", Config.get_school_name()),
-                        cct=datos.get("cct", Config.get_school_cct()),
-                        calificaciones=calificaciones
-                    )
-
-                    self.datos_escolares_repository.save(datos_escolares)
-                    mensaje += " y sus datos escolares han sido registrados"
+            # Guardar con la ruta de importación (alta o actualización + datos escolares, un commit)
+            registro = dict(datos)
+            registro["fecha_nacimiento"] = datos.get("nacimiento")
+            registro["ciclo_escolar"] = datos.get("ciclo", Config.get_current_year())
+            registro["calificaciones"] = calificaciones
+            _, mensaje_importacion, reporte = self.alumno_service.importar_alumnos(
+                [registro], actualizar_existentes=True, normalizar=False
+            )
+
+            fila = reporte.filas[0]
+            if not fila.exitosa:
+                return False, f"Error al guardar datos del alumno: {fila.mensaje or mensaje_importacion}", None
+
+            alumno = self.alumno_repository.get_by_id(fila.alumno_id)
+            if fila.estado == ESTADO_ACTUALIZADO:
+                mensaje = f"Datos del alumno {alumno.nombre} actualizados correctamente"
+            else:
+                mensaje = f"Alumno {alumno.nombre} registrado correctamente"
+
+            if fila.datos_escolares == ESTADO_ACTUALIZADO:
+                mensaje += " y sus datos escolares han sido actualizados"
+            elif fila.datos_escolares == ESTADO_INSERTADO:
+                mensaje += " y sus datos escolares han sido registrados"
 
             # Manejar la foto si está disponible
             if incluir_foto and 'has_photo' in datos and datos['has_photo'] and 'foto_path' in datos:
@@ -72,8 +72,20 @@ class AsyncChatWorker(QThread):
             self.error_occurred.emit(str(e))
 
         finally:
+            self._release_thread_connections()
             self.processing_finished.emit()
 
+    def _release_thread_connections(self):
+        """Cierra las conexiones SQLite abiertas por este hilo en el pool central"""
+        try:
+            from app.core.service_provider import ServiceProvider
+            from app.core.ai.interpretation.sql_executor import get_sql_executor
+
+            ServiceProvider.get_instance().release_thread_resources()
+            get_sql_executor().connection_manager.close_thread_connections()
+        except Exception as e:
+            self.logger.error(f"❌ Error liberando conexiones del hilo: {e}")
+
     def _create_thread_chat_engine(self):
         """
         🆕 CREA UN CHATENGINE ESPECÍFICO PARA ESTE HILO
@@ -175,14 +187,9 @@ class AsyncChatWorker(QThread):
         """
         try:
             # Limpiar instancias singleton que pueden tener conexiones SQLite del hilo principal
-            from app.core.service_provider import ServiceProvider
+            # (ServiceProvider ya entrega servicios y conexiones por hilo vía ConnectionManager)
             from app.core.database_manager import DatabaseManager
 
-            # Forzar recreación del ServiceProvider en este hilo
-            if hasattr(ServiceProvider, '_instance'):
-                ServiceProvider._instance = None
-                self.logger.debug("🔄 ServiceProvider instance cleared for thread")
-
             # Forzar recreación del DatabaseManager en este hilo
             if hasattr(DatabaseManager, '_instance'):
                 DatabaseManager._instance = None
@@ -412,6 +412,10 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
         #     # Estamos esperando una respuesta sobre si abrir un archivo
         #     self._handle_file_open_response(message_text)
         #     return
+        elif self.data_display_manager.es_solicitud_ver_mas(message_text):
+            # "Mostrar más alumnos": siguiente página de la última lista, sin consultar a la IA
+            self.data_display_manager.mostrar_mas_alumnos()
+            return
 
         # 🆕 USAR CHATENGINE CENTRALIZADO para mensajes normales
         self._process_message_with_chat_engine(message_text)
@@ -896,8 +900,8 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
                       de error en el chat pero no se propaga la excepción.
         """
         import os
-        import shutil
         from datetime import datetime
+        from app.core.pdf_cache import copiar_archivo
 
         # Crear un nombre de archivo con fecha y hora
         now = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -910,33 +914,38 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
         # Ruta de destino
         dest_path = os.path.join(output_dir, filename)
 
-        # Copiar el archivo temporal al destino permanente
-        try:
-            shutil.copy2(self.temp_transformed_file, dest_path)
-            from datetime import datetime
-            current_time = datetime.now().strftime("%H:%M:%S")
+        def guardar(ruta):
+            try:
+                self.temp_transformed_file = ruta
+                copiar_archivo(ruta, dest_path)
+                from datetime import datetime
+                current_time = datetime.now().strftime("%H:%M:%S")
 
-            self.chat_list.add_assistant_message(
-                f"✅ Archivo guardado correctamente en: {dest_path}",
-                current_time
-            )
+                self.chat_list.add_assistant_message(
+                    f"✅ Archivo guardado correctamente en: {dest_path}",
+                    current_time
+                )
 
-            # Actualizar la ruta del archivo para posible apertura
-            self.last_generated_file = dest_path
+                # Actualizar la ruta del archivo para posible apertura
+                self.last_generated_file = dest_path
 
-            # Preguntar si desea abrir el archivo
-            self.chat_list.add_assistant_message(
-                "¿Deseas abrir el archivo? Responde 'sí' o 'no'.",
-                current_time
-            )
-            self.waiting_for_file_open_response = True
-        except Exception as e:
-            from datetime import datetime
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.chat_list.add_assistant_message(
-                f"❌ Error al guardar el archivo: {str(e)}",
-                current_time
-            )
+                # Preguntar si desea abrir el archivo
+                self.chat_list.add_assistant_message(
+                    "¿Deseas abrir el archivo? Responde 'sí' o 'no'.",
+                    current_time
+                )
+                self.waiting_for_file_open_response = True
+            except Exception as e:
+                from datetime import datetime
+                current_time = datetime.now().strftime("%H:%M:%S")
+                self.chat_list.add_assistant_message(
+                    f"❌ Error al guardar el archivo: {str(e)}",
+                    current_time
+                )
+
+        # Copiar la versión definitiva al destino permanente, sin volver a renderizar
+        # (si hay que generarla con wkhtmltopdf, se genera en otro hilo)
+        self.pdf_panel.finalizar_vista_previa(self.temp_transformed_file, guardar)
 
     def _open_transformed_file(self):
         """Abre el archivo transformado sin guardarlo.
@@ -956,41 +965,47 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
             Exception: Si ocurre un error al abrir el archivo, se muestra un mensaje
                       de error en el chat pero no se propaga la excepción.
         """
-        try:
-            import subprocess
-            import platform
-            from datetime import datetime
-            current_time = datetime.now().strftime("%H:%M:%S")
-
-            # En Windows, usar el comando predeterminado para abrir (que permite imprimir)
-            if platform.system() == "Windows":
-                subprocess.Popen(['start', '', self.temp_transformed_file], shell=True)
-                self.chat_list.add_assistant_message(
-                    "✅ Abriendo el archivo en el navegador. Desde allí puedes verlo o imprimirlo.",
-                    current_time
-                )
-                self.chat_list.add_assistant_message(
-                    "Recuerda que este archivo es temporal y se eliminará al cerrar la aplicación.",
-                    current_time
-                )
-            else:  # macOS o Linux
-                from app.core.utils import open_file_with_default_app
-                open_file_with_default_app(self.temp_transformed_file)
-                self.chat_list.add_assistant_message(
-                    "✅ Abriendo el archivo en el navegador. Desde allí puedes verlo o imprimirlo.",
-                    current_time
-                )
+        def abrir(ruta):
+            try:
+                import subprocess
+                import platform
+                from datetime import datetime
+                current_time = datetime.now().strftime("%H:%M:%S")
+                self.temp_transformed_file = ruta
+
+                # En Windows, usar el comando predeterminado para abrir (que permite imprimir)
+                if platform.system() == "Windows":
+                    subprocess.Popen(['start', '', self.temp_transformed_file], shell=True)
+                    self.chat_list.add_assistant_message(
+                        "✅ Abriendo el archivo en el navegador. Desde allí puedes verlo o imprimirlo.",
+                        current_time
+                    )
+                    self.chat_list.add_assistant_message(
+                        "Recuerda que este archivo es temporal y se eliminará al cerrar la aplicación.",
+                        current_time
+                    )
+                else:  # macOS o Linux
+                    from app.core.utils import open_file_with_default_app
+                    open_file_with_default_app(self.temp_transformed_file)
+                    self.chat_list.add_assistant_message(
+                        "✅ Abriendo el archivo en el navegador. Desde allí puedes verlo o imprimirlo.",
+                        current_time
+                    )
+                    self.chat_list.add_assistant_message(
+                        "Recuerda que este archivo es temporal y se eliminará al cerrar la aplicación.",
+                        current_time
+                    )
+            except Exception as e:
+                from datetime import datetime
+                current_time = datetime.now().strftime("%H:%M:%S")
                 self.chat_list.add_assistant_message(
-                    "Recuerda que este archivo es temporal y se eliminará al cerrar la aplicación.",
+                    f"❌ Error al abrir el archivo: {str(e)}",
                     current_time
                 )
-        except Exception as e:
-            from datetime import datetime
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.chat_list.add_assistant_message(
-                f"❌ Error al abrir el archivo: {str(e)}",
-                current_time
-            )
+
+        # Abrir la vista previa la confirma: se abre la versión definitiva
+        # (si hay que generarla con wkhtmltopdf, se genera en otro hilo)
+        self.pdf_panel.finalizar_vista_previa(self.temp_transformed_file, abrir)
 
     def _save_data_to_database(self):
         """Guarda los datos extraídos en la base de datos"""
@@ -1408,8 +1423,8 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
     def _save_constancia_definitively(self):
         """Guarda la constancia definitivamente"""
         import os
-        import shutil
         from datetime import datetime
+        from app.core.pdf_cache import copiar_archivo
 
         try:
             # Crear un nombre de archivo con fecha y hora
@@ -1422,54 +1437,72 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
 
             # Ruta de destino
             dest_path = os.path.join(output_dir, filename)
-
-            # Copiar el archivo temporal al destino permanente
-            shutil.copy2(self.temp_constancia_file, dest_path)
-
-            self.chat_list.add_assistant_message(
-                f"✅ Constancia guardada correctamente en: {dest_path}",
-                self._get_current_time()
-            )
-
-            # Preguntar si desea abrir el archivo
-            self.chat_list.add_assistant_message(
-                "¿Deseas abrir el archivo? Responde 'sí' o 'no'.",
-                self._get_current_time()
-            )
-            self.last_generated_file = dest_path
-            self.waiting_for_file_open_response = True
-
         except Exception as e:
             self.chat_list.add_assistant_message(
                 f"❌ Error al guardar la constancia: {str(e)}",
                 self._get_current_time()
             )
+            return
+
+        def guardar(ruta):
+            try:
+                self.temp_constancia_file = ruta
+                copiar_archivo(ruta, dest_path)
+
+                self.chat_list.add_assistant_message(
+                    f"✅ Constancia guardada correctamente en: {dest_path}",
+                    self._get_current_time()
+                )
+
+                # Preguntar si desea abrir el archivo
+                self.chat_list.add_assistant_message(
+                    "¿Deseas abrir el archivo? Responde 'sí' o 'no'.",
+                    self._get_current_time()
+                )
+                self.last_generated_file = dest_path
+                self.waiting_for_file_open_response = True
+
+            except Exception as e:
+                self.chat_list.add_assistant_message(
+                    f"❌ Error al guardar la constancia: {str(e)}",
+                    self._get_current_time()
+                )
+
+        # Copiar la versión definitiva al destino permanente, sin volver a renderizar
+        # (si hay que generarla con wkhtmltopdf, se genera en otro hilo)
+        self.pdf_panel.finalizar_vista_previa(self.temp_constancia_file, guardar)
 
     def _open_constancia_file(self):
         """Abre la constancia temporal sin guardarla"""
-        try:
-            import subprocess
-            import platform
+        def abrir(ruta):
+            try:
+                import subprocess
+                import platform
+                self.temp_constancia_file = ruta
 
-            if platform.system() == "Windows":
-                subprocess.Popen(['start', '', self.temp_constancia_file], shell=True)
-            else:
-                from app.core.utils import open_file_with_default_app
-                open_file_with_default_app(self.temp_constancia_file)
+                if platform.system() == "Windows":
+                    subprocess.Popen(['start', '', self.temp_constancia_file], shell=True)
+                else:
+                    from app.core.utils import open_file_with_default_app
+                    open_file_with_default_app(self.temp_constancia_file)
 
-            self.chat_list.add_assistant_message(
-                "✅ Abriendo la constancia en el navegador. Desde allí puedes verla o imprimirla.",
-                self._get_current_time()
-            )
-            self.chat_list.add_assistant_message(
-                "Recuerda que este archivo es temporal y se eliminará al cerrar la aplicación.",
-                self._get_current_time()
-            )
-        except Exception as e:
-            self.chat_list.add_assistant_message(
-                f"❌ Error al abrir la constancia: {str(e)}",
-                self._get_current_time()
-            )
+                self.chat_list.add_assistant_message(
+                    "✅ Abriendo la constancia en el navegador. Desde allí puedes verla o imprimirla.",
+                    self._get_current_time()
+                )
+                self.chat_list.add_assistant_message(
+                    "Recuerda que este archivo es temporal y se eliminará al cerrar la aplicación.",
+                    self._get_current_time()
+                )
+            except Exception as e:
+                self.chat_list.add_assistant_message(
+                    f"❌ Error al abrir la constancia: {str(e)}",
+                    self._get_current_time()
+                )
+
+        # Abrir la vista previa la confirma: se abre la versión definitiva
+        # (si hay que generarla con wkhtmltopdf, se genera en otro hilo)
+        self.pdf_panel.finalizar_vista_previa(self.temp_constancia_file, abrir)
 
     def _cancel_constancia(self):
         """Cancela la constancia generada"""
@@ -1609,10 +1642,13 @@ Escribe "ayuda" para ver todas las funciones disponibles."""
         # Para muchos alumnos, usar formato compacto y paginación
         if total_alumnos > 50:
             self._mostrar_tabla_grande(alumnos)
+            self.data_display_manager.registrar_paginacion(alumnos, 25)
         elif total_alumnos > 10:
             self._mostrar_tabla_mediana(alumnos)
+            self.data_display_manager.registrar_paginacion(alumnos, total_alumnos)
         else:
             self._mostrar_tabla_pequena(alumnos)
+            self.data_display_manager.registrar_paginacion(alumnos, total_alumnos)
 
     def _mostrar_tabla_grande(self, alumnos):
         """Muestra tabla optimizada para 50+ alumnos con paginación mejorada"""
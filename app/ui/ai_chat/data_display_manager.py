@@ -2,12 +2,21 @@
 🎯 GESTOR CENTRALIZADO DE PRESENTACIÓN DE DATOS
 Maneja TODA la lógica de formateo y presentación de datos estructurados
 """
+import re
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from app.core.logging import get_logger
 from app.ui.ai_chat.response_formatter import ResponseFormatter
 
 
+# "Mostrar más alumnos", "ver más", "siguientes", "más resultados", ...
+PATRON_VER_MAS = re.compile(
+    r"^\s*(mostrar|muestra|muéstrame|muestrame|ver|dame)?\s*(los\s+)?(m[aá]s|siguientes)"
+    r"(\s+(alumnos|resultados))?\s*[.!]*\s*$",
+    re.IGNORECASE
+)
+
+
 class DataDisplayManager:
     """
     🎯 GESTOR CENTRALIZADO para presentación de datos estructurados
@@ -19,11 +28,19 @@ class DataDisplayManager:
     - Centralizar toda la lógica de presentación
     """
 
+    # Alumnos por página en "Mostrar más alumnos"
+    TAMANO_PAGINA = 25
+
     def __init__(self, chat_list, response_formatter: ResponseFormatter):
         self.chat_list = chat_list
         self.response_formatter = response_formatter
         self.logger = get_logger(__name__)
 
+        # Última lista mostrada y cuántos alumnos de ella ya se vieron
+        self._lista_paginada: List[Dict] = []
+        self._mostrados = 0
+        self._campos_paginados: List[str] = []
+
     def display_data(self, data: Dict[str, Any], context: Optional[str] = None) -> bool:
         """
         🎯 PUNTO DE ENTRADA ÚNICO para mostrar cualquier tipo de datos
@@ -119,9 +136,10 @@ class DataDisplayManager:
             data_content = data["data"]
             if isinstance(data_content, list) and len(data_content) > 1:
                 # 🎯 DETECTAR DISTRIBUCIONES AUTOMÁTICAMENTE
-                if all(isinstance(item, dict) for item in data_content):
-                    first_item = data_content[0]
-
+                # Las filas de una consulta tienen todas la misma forma: basta la primera
+                # (recorrerlas todas convertiría a dict cientos de filas que no se muestran)
+                first_item = data_content[0]
+                if isinstance(first_item, dict):
                     # Una distribución tiene 'cantidad' + otro campo de agrupación
                     if 'cantidad' in first_item and len(first_item.keys()) >= 2:
                         # Encontrar el campo de agrupación (cualquier campo que no sea cantidad/porcentaje/total_referencia)
@@ -235,10 +253,15 @@ class DataDisplayManager:
         # 🎯 DECISIÓN CENTRALIZADA DE FORMATO SEGÚN CANTIDAD (OPTIMIZADA)
         if total_alumnos > 50:
             content = self._format_large_student_list(alumnos, full_data, fields_to_show)
+            mostrados = 25
         elif total_alumnos > 25:  # 26-50: Lista mediana con primeros 20
             content = self._format_medium_student_list(alumnos, full_data, fields_to_show)
+            mostrados = 20
         else:  # ≤ 25: Lista completa detallada
             content = self._format_small_student_list(alumnos, full_data, fields_to_show)
+            mostrados = total_alumnos
+
+        self.registrar_paginacion(alumnos, mostrados, fields_to_show)
 
         self.logger.info(f"🎯 [DATA_DISPLAY] Formato seleccionado para {total_alumnos} alumnos: {'large' if total_alumnos > 50 else 'medium' if total_alumnos > 25 else 'small'}")
 
@@ -248,6 +271,104 @@ class DataDisplayManager:
 
         return True
 
+    # ------------------------------------------------------------------
+    # 📄 PAGINACIÓN "MOSTRAR MÁS ALUMNOS"
+    # ------------------------------------------------------------------
+
+    def registrar_paginacion(self, alumnos: List[Dict], mostrados: int, fields_to_show: List[str] = None):
+        """Recuerda la lista mostrada para continuarla con "Mostrar más alumnos" """
+        self._lista_paginada = alumnos
+        self._mostrados = min(mostrados, len(alumnos))
+        self._campos_paginados = fields_to_show or ['nombre', 'curp', 'turno']
+
+    def es_solicitud_ver_mas(self, mensaje: str) -> bool:
+        """True si el mensaje pide la siguiente página y aún quedan alumnos por mostrar"""
+        return self._mostrados < len(self._lista_paginada) and bool(PATRON_VER_MAS.match(mensaje))
+
+    def mostrar_mas_alumnos(self) -> bool:
+        """
+        📄 MUESTRA LA SIGUIENTE PÁGINA DE LA ÚLTIMA LISTA
+
+        Los resultados ya están en memoria (los trajo la consulta original), así
+        que la página se arma sin volver a consultar la base ni al modelo.
+
+        Returns:
+            bool: True si se mostró una página
+        """
+        total = len(self._lista_paginada)
+        inicio = self._mostrados
+        if inicio >= total:
+            return False
+
+        fin = min(inicio + self.TAMANO_PAGINA, total)
+        content = f"""
+📋 **Alumnos {inicio + 1}-{fin} de {total}**
+{'═' * 45}
+
+"""
+        for i, alumno in enumerate(self._lista_paginada[inicio:fin], inicio + 1):
+            content += self._format_student_entry(i, alumno, self._campos_paginados)
+
+        restantes = total - fin
+        if restantes:
+            content += f"""{'─' * 45}
+💡 "Mostrar más alumnos" - Ver siguientes {min(self.TAMANO_PAGINA, restantes)} (quedan {restantes})
+"""
+        else:
+            content += f"""{'─' * 45}
+✅ **Fin de la lista** ({total} alumnos)
+"""
+
+        self._mostrados = fin
+        formatted_content = self.response_formatter.format_response(content, "data")
+        self._show_message(formatted_content, "formatted")
+        return True
+
+    def _format_student_entry(self, i: int, alumno: Dict, fields_to_show: List[str]) -> str:
+        """📋 FORMATO DE UN ALUMNO DENTRO DE UNA LISTA (número, nombre y detalles)"""
+        nombre = alumno.get('nombre', '').upper()
+        content = f"**{i:2d}.** {nombre}\n"
+
+        # 🎯 MOSTRAR CAMPOS DINÁMICOS BASADOS EN CRITERIOS DE BÚSQUEDA
+        details = []
+
+        # Siempre mostrar grado y grupo si están disponibles
+        grado = alumno.get('grado', '')
+        grupo = alumno.get('grupo', '')
+        if grado and grupo:
+            turno = alumno.get('turno', '')[:3] if alumno.get('turno') else ''
+            details.append(f"🎓 {grado}° {grupo} - {turno}")
+
+        # Agregar campos específicos según criterios de búsqueda
+        for field in fields_to_show:
+            if field == 'curp':
+                curp = alumno.get('curp', '')
+                if curp:
+                    details.append(f"📋 {curp}")
+            elif field == 'fecha_nacimiento':
+                fecha = alumno.get('fecha_nacimiento', '')
+                if fecha:
+                    details.append(f"📅 {fecha}")
+            elif field == 'matricula':
+                matricula = alumno.get('matricula', '')
+                if matricula:
+                    details.append(f"🆔 {matricula}")
+            elif field == 'calificaciones_status':
+                # Verificar si tiene calificaciones
+                calificaciones = alumno.get('calificaciones', '')
+                if calificaciones and calificaciones not in ['', '[]']:
+                    details.append(f"📊 Con calificaciones")
+                else:
+                    details.append(f"📊 Sin calificaciones")
+
+        # Mostrar detalles en una línea
+        if details:
+            content += f"     {' • '.join(details)}\n\n"
+        else:
+            content += "\n"
+
+        return content
+
     def _format_large_student_list(self, alumnos: List[Dict], full_data: Dict, fields_to_show: List[str] = None) -> str:
         """📊 FORMATO PARA LISTAS GRANDES (50+ alumnos)"""
         total = len(alumnos)
@@ -266,46 +387,7 @@ class DataDisplayManager:
             fields_to_show = ['nombre', 'curp', 'turno']
 
         for i, alumno in enumerate(alumnos[:limite], 1):
-            nombre = alumno.get('nombre', '').upper()
-            content += f"**{i:2d}.** {nombre}\n"
-
-            # 🎯 MOSTRAR CAMPOS DINÁMICOS BASADOS EN CRITERIOS DE BÚSQUEDA
-            details = []
-
-            # Siempre mostrar grado y grupo si están disponibles
-            grado = alumno.get('grado', '')
-            grupo = alumno.get('grupo', '')
-            if grado and grupo:
-                turno = alumno.get('turno', '')[:3] if alumno.get('turno') else ''
-                details.append(f"🎓 {grado}° {grupo} - {turno}")
-
-            # Agregar campos específicos según criterios de búsqueda
-            for field in fields_to_show:
-                if field == 'curp':
-                    curp = alumno.get('curp', '')
-                    if curp:
-                        details.append(f"📋 {curp}")
-                elif field == 'fecha_nacimiento':
-                    fecha = alumno.get('fecha_nacimiento', '')
-                    if fecha:
-                        details.append(f"📅 {fecha}")
-                elif field == 'matricula':
-                    matricula = alumno.get('matricula', '')
-                    if matricula:
-                        details.append(f"🆔 {matricula}")
-                elif field == 'calificaciones_status':
-                    # Verificar si tiene calificaciones
-                    calificaciones = alumno.get('calificaciones', '')
-                    if calificaciones and calificaciones not in ['', '[]']:
-                        details.append(f"📊 Con calificaciones")
-                    else:
-                        details.append(f"📊 Sin calificaciones")
-
-            # Mostrar detalles en una línea
-            if details:
-                content += f"     {' • '.join(details)}\n\n"
-            else:
-                content += "\n"
+            content += self._format_student_entry(i, alumno, fields_to_show)
 
         if total > limite:
             restantes = total - limite
@@ -344,46 +426,7 @@ class DataDisplayManager:
             fields_to_show = ['nombre', 'curp', 'turno']
 
         for i, alumno in enumerate(alumnos[:limite], 1):
-            nombre = alumno.get('nombre', '').upper()
-            content += f"**{i:2d}.** {nombre}\n"
-
-            # 🎯 MOSTRAR CAMPOS DINÁMICOS BASADOS EN CRITERIOS DE BÚSQUEDA
-            details = []
-
-            # Siempre mostrar grado y grupo si están disponibles
-            grado = alumno.get('grado', '')
-            grupo = alumno.get('grupo', '')
-            if grado and grupo:
-                turno = alumno.get('turno', '')[:3] if alumno.get('turno') else ''
-                details.append(f"🎓 {grado}° {grupo} - {turno}")
-
-            # Agregar campos específicos según criterios de búsqueda
-            for field in fields_to_show:
-                if field == 'curp':
-                    curp = alumno.get('curp', '')
-                    if curp:
-                        details.append(f"📋 {curp}")
-                elif field == 'fecha_nacimiento':
-                    fecha = alumno.get('fecha_nacimiento', '')
-                    if fecha:
-                        details.append(f"📅 {fecha}")
-                elif field == 'matricula':
-                    matricula = alumno.get('matricula', '')
-                    if matricula:
-                        details.append(f"🆔 {matricula}")
-                elif field == 'calificaciones_status':
-                    # Verificar si tiene calificaciones
-                    calificaciones = alumno.get('calificaciones', '')
-                    if calificaciones and calificaciones not in ['', '[]']:
-                        details.append(f"📊 Con calificaciones")
-                    else:
-                        details.append(f"📊 Sin calificaciones")
-
-            # Mostrar detalles en una línea
-            if details:
-                content += f"     {' • '.join(details)}\n\n"
-            else:
-                content += "\n"
+            content += self._format_student_entry(i, alumno, fields_to_show)
 
         restantes = total - limite
         content += f"""{'─' * 45}
@@ -394,6 +437,7 @@ class DataDisplayManager:
 • "Alumno número [21-{total}]" - Acceder a cualquier posición
 • "Mostrar todos" - Ver lista completa
 • "Filtrar por [criterio]" - Refinar búsqueda
+• "Mostrar más alumnos" - Ver siguientes {min(self.TAMANO_PAGINA, restantes)}
 
 💡 **Opciones disponibles:**
 • "Detalles de [nombre]" - Ver información completa
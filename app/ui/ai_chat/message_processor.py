@@ -49,6 +49,7 @@ class MessageProcessor:
             # NUNCA mostrar datos técnicos (solo respuesta humana)
             "OBTENER_ALUMNO_EXACTO": "never",
             "GENERAR_CONSTANCIA_COMPLETA": "never",
+            "GENERAR_CONSTANCIAS_GRUPO": "never",
             "ayuda_proporcionada": "never",
             "ayuda_funcionalidades": "never",
             "conversacion_general": "never",
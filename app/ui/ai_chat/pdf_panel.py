@@ -7,13 +7,32 @@ from PyQt5.QtWidgets import (
     QFileDialog, QFrame, QMessageBox, QApplication, QDialog,
     QScrollArea, QTextEdit, QCheckBox
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent
 
 from app.ui.pdf_viewer import PDFViewer
 from app.core.pdf_extractor import PDFExtractor
 from app.core.service_provider import ServiceProvider
 
+
+class FinalizarVistaPreviaWorker(QThread):
+    """Genera la versión definitiva de una vista previa (wkhtmltopdf) sin bloquear la interfaz"""
+
+    terminado = pyqtSignal(bool, str, object)   # éxito, mensaje, ruta
+
+    def __init__(self, constancia_service, pdf_path, parent=None):
+        super().__init__(parent)
+        self.constancia_service = constancia_service
+        self.pdf_path = pdf_path
+
+    def run(self):
+        try:
+            success, message, ruta = self.constancia_service.finalizar_vista_previa(self.pdf_path)
+        except Exception as e:
+            success, message, ruta = False, str(e), None
+        self.terminado.emit(success, message, ruta)
+
+
 class PDFPanel(QWidget):
     """Panel para visualización y gestión de PDFs con soporte para drag and drop"""
 
@@ -32,6 +51,10 @@ class PDFPanel(QWidget):
         self.data_context = "extracted"  # "extracted" o "constancia_generada"
         self.alumno_data = None  # Datos del alumno para constancias generadas
 
+        # Vistas previas cuya versión definitiva se está generando: ruta -> funciones a llamar
+        self._finalizando = {}
+        self._workers_finalizar = []
+
         self.setAcceptDrops(True)  # Habilitar soporte para drag and drop
 
         # Obtener el servicio de constancias
@@ -76,8 +99,9 @@ class PDFPanel(QWidget):
         # Actualizar la interfaz de usuario
         self._update_ui_for_loaded_pdf(file_path)
 
-        # Extraer datos del PDF automáticamente
-        self._extract_pdf_data()
+        # Extraer datos del PDF automáticamente (las constancias generadas ya traen los del alumno)
+        if self.data_context != "constancia_generada":
+            self._extract_pdf_data()
 
         # Emitir señal de PDF cargado
         self.pdf_loaded.emit()
@@ -102,7 +126,7 @@ class PDFPanel(QWidget):
         self._update_pdf_label(filename)
 
         # Mostrar el PDF en el visor
-        self.pdf_viewer.load_pdf(file_path)
+        self._cargar_en_visor(file_path)
 
         # Configurar la visibilidad de los componentes
         self._update_component_visibility()
@@ -110,6 +134,68 @@ class PDFPanel(QWidget):
         # Actualizar el estilo del área de drop
         self._update_drop_area_style()
 
+    def _cargar_en_visor(self, pdf_path):
+        """Carga el PDF en el visor; las constancias generadas se muestran con la vista rápida"""
+        if self.data_context == "constancia_generada":
+            # Primera página rasterizada en segundo plano: no bloquea el chat
+            return self.pdf_viewer.load_pdf_rapido(pdf_path)
+        return self.pdf_viewer.load_pdf(pdf_path)
+
+    def finalizar_vista_previa(self, pdf_path, al_terminar):
+        """
+        Genera la versión definitiva de una vista previa antes de guardarla o abrirla
+
+        Las vistas previas de constancias salen del renderizador nativo; si el
+        tipo de constancia usa wkhtmltopdf, el PDF definitivo se genera en otro
+        hilo cuando el usuario lo confirma.
+
+        Args:
+            pdf_path: Ruta de la vista previa
+            al_terminar: Función (ruta) que se llama en el hilo de la interfaz con
+                el archivo a guardar o abrir; de inmediato si no hay nada que generar
+        """
+        clave = os.path.abspath(pdf_path) if pdf_path else pdf_path
+        pendientes = self._finalizando.get(clave)
+        if pendientes is not None:
+            # Ya se está generando (doble clic, guardar y abrir): esperar al mismo resultado
+            pendientes.append(al_terminar)
+            return
+        if not self.constancia_service.pdf_generator.es_borrador(pdf_path):
+            al_terminar(pdf_path)
+            return
+
+        # El visor no debe tener abierto el archivo que se va a reemplazar
+        mostrado = pdf_path == self.current_pdf
+        if mostrado:
+            self.pdf_viewer.close_pdf()
+
+        self._finalizando[clave] = [al_terminar]
+        QApplication.setOverrideCursor(Qt.BusyCursor)
+        worker = FinalizarVistaPreviaWorker(self.constancia_service, pdf_path, self)
+        worker.terminado.connect(
+            lambda success, message, ruta: self._vista_previa_finalizada(pdf_path, mostrado, success, message, ruta)
+        )
+        worker.finished.connect(lambda: self._liberar_worker_finalizar(worker))
+        self._workers_finalizar.append(worker)
+        worker.start()
+
+    def _vista_previa_finalizada(self, pdf_path, mostrado, success, message, ruta):
+        """Continúa en el hilo de la interfaz cuando la versión definitiva está lista"""
+        QApplication.restoreOverrideCursor()
+        if not success:
+            print(f"⚠️ {message}")
+            ruta = pdf_path
+
+        if mostrado and self.current_pdf == pdf_path:
+            self._cargar_en_visor(ruta)
+        for al_terminar in self._finalizando.pop(os.path.abspath(pdf_path), []):
+            al_terminar(ruta)
+
+    def _liberar_worker_finalizar(self, worker):
+        if worker in self._workers_finalizar:
+            self._workers_finalizar.remove(worker)
+        worker.deleteLater()
+
     def _update_pdf_label(self, filename):
         """Actualiza las etiquetas relacionadas con el PDF"""
         # Etiqueta de PDF cargado
@@ -519,19 +605,24 @@ class PDFPanel(QWidget):
             QMessageBox.warning(self, "Sin PDF", "No hay ningún PDF cargado para abrir.")
             return
 
+        # Abrir una vista previa es confirmarla: se abre la versión definitiva
+        self.finalizar_vista_previa(self.current_pdf, self._abrir_en_navegador)
+
+    def _abrir_en_navegador(self, pdf_path):
+        """Abre pdf_path en el navegador web y muestra cómo imprimirlo"""
         try:
             import webbrowser
             import os
 
             # Convertir a URL de archivo para el navegador
-            file_url = f"file:///{os.path.abspath(self.current_pdf).replace(os.sep, '/')}"
+            file_url = f"file:///{os.path.abspath(pdf_path).replace(os.sep, '/')}"
             webbrowser.open(file_url)
 
             # Mostrar mensaje de confirmación mejorado con estilo claro
             msg_box = QMessageBox(self)
             msg_box.setWindowTitle("PDF Abierto")
             msg_box.setText(f"✅ El PDF se ha abierto en tu navegador web.\n\n"
-                           f"📄 Archivo: {os.path.basename(self.current_pdf)}\n\n"
+                           f"📄 Archivo: {os.path.basename(pdf_path)}\n\n"
                            f"💡 Para imprimir: Usa Ctrl+P en el navegador")
             msg_box.setIcon(QMessageBox.Information)
 
@@ -1890,7 +1981,7 @@ class PDFPanel(QWidget):
                 self.current_pdf = pdf_path
 
                 # Cargar el PDF transformado en el visor
-                if self.pdf_viewer.load_pdf(pdf_path):
+                if self._cargar_en_visor(pdf_path):
                     # Actualizar el título de la vista previa
                     filename = os.path.basename(pdf_path)
                     self.preview_label.setText(f"Vista Previa (Transformado): {filename}")
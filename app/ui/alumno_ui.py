@@ -12,6 +12,7 @@ from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QFont
 
 from app.core.service_provider import ServiceProvider
+from app.ui.components.escritura import escribir_en_segundo_plano
 from app.core.config import Config
 from app.core.utils import format_curp, is_valid_curp, open_file_with_default_app
 
@@ -348,28 +349,46 @@ class RegistroAlumnoDialog(QDialog):
             "turno": self.combo_turno.currentText()
         }
 
-        try:
-            if self.alumno_id:
-                # Actualizar alumno existente
-                # El método actualizar_alumno devuelve un booleano, no una tupla
-                success = self.alumno_service.actualizar_alumno(self.alumno_id, datos)
-                message = "Alumno actualizado correctamente" if success else "No se pudo actualizar el alumno"
-            else:
-                # Registrar nuevo alumno
-                success, message, _ = self.alumno_service.registrar_alumno(datos)
-
-            if success:
-                QMessageBox.information(self, "Operación Exitosa", message)
-                self.accept()
-            else:
-                QMessageBox.warning(self, "Error", message)
+        # La escritura va al hilo escritor; el diálogo sigue respondiendo mientras tanto
+        self.btn_guardar.setEnabled(False)
+        self.btn_guardar.setText("Guardando...")
+        if self.alumno_id:
+            # Actualizar alumno existente
+            escribir_en_segundo_plano(self, self.alumno_service, "actualizar_alumno",
+                                      self._alumno_guardado, self.alumno_id, datos)
+        else:
+            # Registrar nuevo alumno
+            escribir_en_segundo_plano(self, self.alumno_service, "registrar_alumno",
+                                      self._alumno_guardado, datos)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error al guardar alumno: {str(e)}")
+    def _alumno_guardado(self, resultado, error):
+        """Muestra el resultado de save_alumno (en el hilo de la interfaz)"""
+        self.btn_guardar.setEnabled(True)
+        self.btn_guardar.setText("Guardar Alumno")
+
+        if error is not None:
+            QMessageBox.critical(self, "Error", f"Error al guardar alumno: {str(error)}")
+            return
+
+        if self.alumno_id:
+            # El método actualizar_alumno devuelve un booleano, no una tupla
+            success = resultado
+            message = "Alumno actualizado correctamente" if success else "No se pudo actualizar el alumno"
+        else:
+            success, message, _ = resultado
+
+        if success:
+            QMessageBox.information(self, "Operación Exitosa", message)
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Error", message)
 
 class AlumnoManagerWindow(QMainWindow):
     """Ventana principal para gestión de alumnos"""
 
+    # Alumnos por página del listado general
+    TAMANO_PAGINA = 100
+
     def __init__(self):
         super().__init__()
 
@@ -377,6 +396,7 @@ class AlumnoManagerWindow(QMainWindow):
         service_provider = ServiceProvider.get_instance()
         self.alumno_service = service_provider.alumno_service
         self.constancia_service = service_provider.constancia_service
+        self.cursor_alumnos = None  # Cursor de la siguiente página (None: no hay más)
 
         self.setWindowTitle("Gestión de Alumnos")
         self.setMinimumSize(900, 700)
@@ -667,21 +687,60 @@ class AlumnoManagerWindow(QMainWindow):
         self.btn_refresh.setMinimumHeight(50)
         self.btn_refresh.clicked.connect(self.load_alumnos)
 
+        # Siguiente página del listado general (paginación por nombre)
+        self.btn_cargar_mas = QPushButton("Cargar más")
+        self.btn_cargar_mas.setStyleSheet("""
+            QPushButton {
+                background-color: #9b59b6;
+                color: white;
+                border-radius: 5px;
+                padding: 10px;
+                font-size: 14px;
+                font-weight: bold;
+                min-width: 150px;
+            }
+            QPushButton:hover {
+                background-color: #8e44ad;
+            }
+            QPushButton:disabled {
+                background-color: #95a5a6;
+            }
+        """)
+        self.btn_cargar_mas.setMinimumHeight(50)
+        self.btn_cargar_mas.setEnabled(False)
+        self.btn_cargar_mas.clicked.connect(self.load_more_alumnos)
+
         action_layout.addStretch()
         action_layout.addWidget(self.btn_nuevo)
+        action_layout.addWidget(self.btn_cargar_mas)
         action_layout.addWidget(self.btn_refresh)
         action_layout.addStretch()
 
         main_layout.addLayout(action_layout)
 
     def load_alumnos(self):
-        """Carga la lista de alumnos"""
+        """Carga la primera página de la lista de alumnos"""
         try:
-            alumnos = self.alumno_service.listar_alumnos(limit=100)
+            alumnos, self.cursor_alumnos = self.alumno_service.listar_alumnos_pagina(self.TAMANO_PAGINA)
             self.populate_table(alumnos)
+            self.btn_cargar_mas.setEnabled(self.cursor_alumnos is not None)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al cargar alumnos: {str(e)}")
 
+    def load_more_alumnos(self):
+        """Agrega la siguiente página del listado al final de la tabla"""
+        if self.cursor_alumnos is None:
+            return
+
+        try:
+            alumnos, self.cursor_alumnos = self.alumno_service.listar_alumnos_pagina(
+                self.TAMANO_PAGINA, self.cursor_alumnos
+            )
+            self.populate_table(alumnos, agregar=True)
+            self.btn_cargar_mas.setEnabled(self.cursor_alumnos is not None)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al cargar más alumnos: {str(e)}")
+
     def search_alumnos(self):
         """Busca alumnos por nombre o CURP"""
         query = self.txt_search.text().strip()
@@ -692,6 +751,9 @@ class AlumnoManagerWindow(QMainWindow):
         try:
             alumnos = self.alumno_service.buscar_alumnos(query)
             self.populate_table(alumnos)
+            # Los resultados de búsqueda no se paginan
+            self.cursor_alumnos = None
+            self.btn_cargar_mas.setEnabled(False)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al buscar alumnos: {str(e)}")
 
@@ -700,11 +762,12 @@ class AlumnoManagerWindow(QMainWindow):
         self.txt_search.clear()
         self.load_alumnos()
 
-    def populate_table(self, alumnos):
-        """Rellena la tabla con los datos de los alumnos"""
-        self.table_alumnos.setRowCount(0)
+    def populate_table(self, alumnos, agregar=False):
+        """Rellena la tabla con los datos de los alumnos (agregar=True los añade al final)"""
+        if not agregar:
+            self.table_alumnos.setRowCount(0)
 
-        for row, alumno in enumerate(alumnos):
+        for row, alumno in enumerate(alumnos, self.table_alumnos.rowCount()):
             self.table_alumnos.insertRow(row)
 
             # Nombre (con ID oculto como dato de usuario)
@@ -829,17 +892,22 @@ class AlumnoManagerWindow(QMainWindow):
         )
 
         if reply == QMessageBox.Yes:
-            try:
-                success, message = self.alumno_service.eliminar_alumno(alumno_id)
-
-                if success:
-                    QMessageBox.information(self, "Operación Exitosa", message)
-                    self.load_alumnos()
-                else:
-                    QMessageBox.warning(self, "Error", message)
+            # La escritura va al hilo escritor; la ventana sigue respondiendo mientras tanto
+            escribir_en_segundo_plano(self, self.alumno_service, "eliminar_alumno",
+                                      self._alumno_eliminado, alumno_id)
+
+    def _alumno_eliminado(self, resultado, error):
+        """Muestra el resultado de delete_alumno (en el hilo de la interfaz)"""
+        if error is not None:
+            QMessageBox.critical(self, "Error", f"Error al eliminar alumno: {str(error)}")
+            return
 
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error al eliminar alumno: {str(e)}")
+        success, message = resultado
+        if success:
+            QMessageBox.information(self, "Operación Exitosa", message)
+            self.load_alumnos()
+        else:
+            QMessageBox.warning(self, "Error", message)
 
     def volver_menu_principal(self):
         """Cierra esta ventana y vuelve al menú principal"""
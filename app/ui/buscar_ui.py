@@ -2,16 +2,18 @@
 Interfaz para buscar alumnos y generar constancias
 """
 import os
+import threading
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
     QDialog, QComboBox, QCheckBox, QLineEdit, QGroupBox, QScrollArea, QFrame,
-    QSizePolicy
+    QSizePolicy, QProgressDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QBrush, QColor
 
 from app.core.service_provider import ServiceProvider
+from app.core.pdf_lote import FORMATO_ARCHIVOS, FORMATO_PDF, FORMATO_ZIP
 from app.core.utils import open_file_with_default_app, format_curp
 from app.ui.pdf_viewer import PDFViewer
 
@@ -734,15 +736,113 @@ class GenerarConstanciaDialog(QDialog):
             pass
         super().closeEvent(event)
 
+class ConstanciasGrupoDialog(QDialog):
+    """Diálogo para elegir tipo y formato de las constancias de un grupo"""
+
+    def __init__(self, parent=None, grado=None, grupo=None):
+        super().__init__(parent)
+        self.setWindowTitle("Constancias del grupo")
+        self.setMinimumWidth(420)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        destino = f"{grado}° {grupo}" if grupo else f"todo {grado}°"
+        titulo = QLabel(f"Generar constancias para {destino}")
+        titulo.setStyleSheet("font-size: 16px; font-weight: bold; color: #2c3e50;")
+        layout.addWidget(titulo)
+
+        # Tipo de constancia
+        layout.addWidget(QLabel("Tipo de constancia:"))
+        self.combo_tipo = QComboBox()
+        for tipo in ["estudio", "calificaciones", "traslado"]:
+            self.combo_tipo.addItem(tipo.capitalize(), tipo)
+        layout.addWidget(self.combo_tipo)
+
+        # Formato de salida
+        layout.addWidget(QLabel("Salida:"))
+        self.combo_formato = QComboBox()
+        self.combo_formato.addItem("Un PDF por alumno", FORMATO_ARCHIVOS)
+        self.combo_formato.addItem("Un PDF por alumno + PDF combinado", FORMATO_PDF)
+        self.combo_formato.addItem("Un PDF por alumno + archivo ZIP", FORMATO_ZIP)
+        layout.addWidget(self.combo_formato)
+
+        self.check_foto = QCheckBox("Incluir foto del alumno (si existe)")
+        self.check_foto.setChecked(True)
+        layout.addWidget(self.check_foto)
+
+        botones = QHBoxLayout()
+        btn_cancelar = QPushButton("Cancelar")
+        btn_cancelar.clicked.connect(self.reject)
+        btn_generar = QPushButton("Generar")
+        btn_generar.setStyleSheet("""
+            QPushButton {
+                background-color: #2ecc71;
+                color: white;
+                border-radius: 5px;
+                padding: 8px 16px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #27ae60;
+            }
+        """)
+        btn_generar.clicked.connect(self.accept)
+        botones.addStretch()
+        botones.addWidget(btn_cancelar)
+        botones.addWidget(btn_generar)
+        layout.addLayout(botones)
+
+    def opciones(self):
+        """(tipo, formato, incluir_foto) elegidos"""
+        # Sin marcar: sin foto; marcado: la foto aparece solo si existe
+        incluir_foto = None if self.check_foto.isChecked() else False
+        return self.combo_tipo.currentData(), self.combo_formato.currentData(), incluir_foto
+
+
+class ConstanciasGrupoWorker(QThread):
+    """Genera las constancias de un grupo sin bloquear la interfaz"""
+
+    progreso = pyqtSignal(int, int, str)          # hechos, total, alumno
+    terminado = pyqtSignal(bool, str, object)     # éxito, mensaje, datos del lote
+
+    def __init__(self, tipo, grado, grupo, formato, incluir_foto, parent=None):
+        super().__init__(parent)
+        self.tipo = tipo
+        self.grado = grado
+        self.grupo = grupo
+        self.formato = formato
+        self.incluir_foto = incluir_foto
+        self.cancelar = threading.Event()
+
+    def run(self):
+        service_provider = ServiceProvider.get_instance()
+        try:
+            success, message, data = service_provider.constancia_service.generar_constancias_grupo(
+                self.tipo, grado=self.grado, grupo=self.grupo, incluir_foto=self.incluir_foto,
+                formato=self.formato, progreso=self.progreso.emit, cancelar=self.cancelar
+            )
+        except Exception as e:
+            success, message, data = False, f"Error al generar constancias: {str(e)}", None
+        finally:
+            # Servicios y conexión de este hilo
+            service_provider.release_thread_resources()
+        self.terminado.emit(success, message, data)
+
+
 class BuscarWindow(QMainWindow):
     """Ventana para buscar alumnos y generar constancias"""
 
+    # Alumnos por página del listado general
+    TAMANO_PAGINA = 100
+
     def __init__(self):
         super().__init__()
 
         # Usar el proveedor de servicios
         service_provider = ServiceProvider.get_instance()
         self.alumno_service = service_provider.alumno_service
+        self.cursor_alumnos = None  # Cursor de la siguiente página (None: no hay más)
 
         self.setWindowTitle("Buscar y Generar Constancias")
         self.setMinimumSize(900, 700)
@@ -1099,20 +1199,81 @@ class BuscarWindow(QMainWindow):
         self.btn_refresh.setMinimumHeight(50)
         self.btn_refresh.clicked.connect(self.load_alumnos)
 
+        # Siguiente página del listado general (paginación por nombre)
+        self.btn_cargar_mas = QPushButton("Cargar más")
+        self.btn_cargar_mas.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border-radius: 5px;
+                padding: 10px;
+                font-size: 14px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #2980b9;
+            }
+            QPushButton:disabled {
+                background-color: #95a5a6;
+            }
+        """)
+        self.btn_cargar_mas.setMinimumHeight(50)
+        self.btn_cargar_mas.setEnabled(False)
+        self.btn_cargar_mas.clicked.connect(self.load_more_alumnos)
+
+        # Constancias de todo el grado/grupo seleccionado en los filtros
+        self.btn_constancias_grupo = QPushButton("Constancias del grupo")
+        self.btn_constancias_grupo.setStyleSheet("""
+            QPushButton {
+                background-color: #2ecc71;
+                color: white;
+                border-radius: 5px;
+                padding: 10px;
+                font-size: 14px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #27ae60;
+            }
+            QPushButton:disabled {
+                background-color: #95a5a6;
+            }
+        """)
+        self.btn_constancias_grupo.setMinimumHeight(50)
+        self.btn_constancias_grupo.clicked.connect(self.generar_constancias_grupo)
+
+        action_layout.addWidget(self.btn_constancias_grupo)
         action_layout.addStretch()
+        action_layout.addWidget(self.btn_cargar_mas)
         action_layout.addWidget(self.btn_refresh)
 
         main_layout.addLayout(action_layout)
 
     def load_alumnos(self):
-        """Carga la lista de alumnos"""
+        """Carga la primera página de la lista de alumnos"""
         try:
-            alumnos = self.alumno_service.listar_alumnos(limit=100)
+            alumnos, self.cursor_alumnos = self.alumno_service.listar_alumnos_pagina(self.TAMANO_PAGINA)
             self.alumnos_data = alumnos  # Guardar los datos originales
+            self.btn_cargar_mas.setEnabled(self.cursor_alumnos is not None)
             self.apply_filters()  # Aplicar filtros a los datos cargados
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al cargar alumnos: {str(e)}")
 
+    def load_more_alumnos(self):
+        """Agrega la siguiente página del listado a los datos ya cargados"""
+        if self.cursor_alumnos is None:
+            return
+
+        try:
+            alumnos, self.cursor_alumnos = self.alumno_service.listar_alumnos_pagina(
+                self.TAMANO_PAGINA, self.cursor_alumnos
+            )
+            self.alumnos_data.extend(alumnos)
+            self.btn_cargar_mas.setEnabled(self.cursor_alumnos is not None)
+            self.apply_filters()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al cargar más alumnos: {str(e)}")
+
     def search_alumnos(self):
         """Busca alumnos por nombre o CURP"""
         query = self.txt_search.text().strip()
@@ -1123,6 +1284,9 @@ class BuscarWindow(QMainWindow):
         try:
             alumnos = self.alumno_service.buscar_alumnos(query)
             self.alumnos_data = alumnos  # Guardar los datos de búsqueda
+            # Los resultados de búsqueda no se paginan
+            self.cursor_alumnos = None
+            self.btn_cargar_mas.setEnabled(False)
             self.apply_filters()  # Aplicar filtros a los resultados de búsqueda
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al buscar alumnos: {str(e)}")
@@ -1267,6 +1431,62 @@ class BuscarWindow(QMainWindow):
         dialog = GenerarConstanciaDialog(self, alumno_id=alumno_id, alumno_nombre=alumno_nombre)
         dialog.exec_()
 
+    def generar_constancias_grupo(self):
+        """Genera las constancias del grado/grupo elegido en los filtros"""
+        grado = self.combo_grado.currentData()
+        if grado == -1:
+            QMessageBox.information(self, "Constancias del grupo",
+                                    "Seleccione un grado (y opcionalmente un grupo) en los filtros.")
+            return
+        grupo = self.combo_grupo.currentData() or None
+
+        dialog = ConstanciasGrupoDialog(self, grado=grado, grupo=grupo)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        tipo, formato, incluir_foto = dialog.opciones()
+
+        self.progreso_lote = QProgressDialog("Preparando constancias...", "Cancelar", 0, 0, self)
+        self.progreso_lote.setWindowTitle("Constancias del grupo")
+        self.progreso_lote.setWindowModality(Qt.WindowModal)
+        self.progreso_lote.setMinimumDuration(0)
+        self.progreso_lote.setAutoClose(False)
+        self.progreso_lote.setAutoReset(False)
+
+        self.worker_lote = ConstanciasGrupoWorker(tipo, grado, grupo, formato, incluir_foto, self)
+        self.worker_lote.progreso.connect(self._progreso_lote)
+        self.worker_lote.terminado.connect(self._lote_terminado)
+        self.progreso_lote.canceled.connect(self._cancelar_lote)
+
+        self.btn_constancias_grupo.setEnabled(False)
+        self.worker_lote.start()
+
+    def _progreso_lote(self, hechos, total, nombre):
+        self.progreso_lote.setMaximum(total)
+        self.progreso_lote.setValue(hechos)
+        self.progreso_lote.setLabelText(f"Constancia {hechos} de {total}\n{nombre}")
+
+    def _cancelar_lote(self):
+        self.worker_lote.cancelar.set()
+        self.progreso_lote.setLabelText("Cancelando...")
+
+    def _lote_terminado(self, success, message, data):
+        self.progreso_lote.canceled.disconnect(self._cancelar_lote)
+        self.progreso_lote.close()
+        self.btn_constancias_grupo.setEnabled(True)
+
+        if not success:
+            QMessageBox.warning(self, "Constancias del grupo", message)
+            return
+
+        # Abrir el archivo combinado si se pidió, si no la carpeta del lote
+        destino = data.get("archivo_combinado") or data.get("directorio")
+        respuesta = QMessageBox.question(
+            self, "Constancias del grupo", f"{message}\n\n¿Desea abrir {os.path.basename(destino)}?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if respuesta == QMessageBox.Yes:
+            open_file_with_default_app(destino)
+
     def ver_detalles_alumno(self):
         """Abre el diálogo para ver los detalles del alumno"""
         btn = self.sender()
@@ -0,0 +1,53 @@
+"""
+Escrituras en la base de datos sin bloquear la interfaz
+
+Los métodos @en_escritor de los servicios se envían al hilo escritor con
+enviar_escritura; el resultado vuelve al hilo de la interfaz por una señal
+de Qt y ahí se llama al_terminar(resultado, error).
+"""
+from typing import Any, Callable, Optional
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from app.core.database.escritor import enviar_escritura
+
+
+class _ReceptorEscritura(QObject):
+    """Recibe en el hilo de la interfaz el Future resuelto en el hilo escritor"""
+
+    listo = pyqtSignal(object)
+
+    def __init__(self, al_terminar: Callable[[Any, Optional[BaseException]], None], parent=None):
+        super().__init__(parent)
+        self.al_terminar = al_terminar
+        self.listo.connect(self._entregar)
+
+    def _entregar(self, futuro):
+        try:
+            error = futuro.exception()
+            self.al_terminar(None if error else futuro.result(), error)
+        finally:
+            self.deleteLater()
+
+    def emitir(self, futuro):
+        # Se llama desde el hilo escritor: la señal se entrega en el hilo del receptor
+        try:
+            self.listo.emit(futuro)
+        except RuntimeError:
+            pass  # El widget que esperaba el resultado ya se cerró
+
+
+def escribir_en_segundo_plano(parent: QObject, servicio: Any, metodo: str,
+                              al_terminar: Callable[[Any, Optional[BaseException]], None],
+                              *args, **kwargs):
+    """
+    Ejecuta servicio.metodo(*args, **kwargs) en el hilo escritor sin esperar
+
+    Args:
+        parent: Widget dueño de la operación (si se cierra, no se llama al_terminar)
+        servicio: AlumnoService, ConstanciaService, ...
+        metodo: Nombre de un método marcado con @en_escritor
+        al_terminar: Función (resultado, error) que se llama en el hilo de la interfaz
+    """
+    receptor = _ReceptorEscritura(al_terminar, parent)
+    enviar_escritura(servicio, metodo, *args, **kwargs).add_done_callback(receptor.emitir)
+    return receptor
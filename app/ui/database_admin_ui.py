@@ -6,7 +6,7 @@ from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QMessageBox, QFileDialog, QGroupBox,
     QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView,
-    QDialog, QProgressBar, QComboBox, QSplitter, QTextEdit
+    QDialog, QProgressBar, QComboBox, QSplitter, QTextEdit, QInputDialog
 )
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont, QIcon
@@ -715,20 +715,33 @@ class DatabaseAdminWindow(QMainWindow):
             QMessageBox.critical(self, "Error", f"Error al crear respaldo: {str(e)}")
 
     def restore_backup(self):
-        """Restaura la base de datos desde un respaldo"""
-        # Mostrar diálogo para seleccionar archivo
-        backup_file, _ = QFileDialog.getOpenFileName(
-            self, "Seleccionar Archivo de Respaldo",
-            os.path.join(os.path.dirname(self.db_manager.db_path), "backups"),
-            "Archivos de Base de Datos (*.db);;Todos los Archivos (*)"
-        )
+        """Restaura la base de datos desde una instantánea (o un archivo .db anterior)"""
+        otro_archivo = "Otro archivo de respaldo (.db)..."
+        snapshots = self.db_manager.list_backups()
+        opciones = [info.describe() for info in snapshots] + [otro_archivo]
 
-        if not backup_file:
+        seleccion, ok = QInputDialog.getItem(
+            self, "Seleccionar Respaldo", "Instantáneas disponibles:", opciones, 0, False
+        )
+        if not ok:
             return
 
+        if seleccion == otro_archivo:
+            backup_file, _ = QFileDialog.getOpenFileName(
+                self, "Seleccionar Archivo de Respaldo",
+                os.path.join(os.path.dirname(self.db_manager.db_path), "backups"),
+                "Archivos de Base de Datos (*.db);;Todos los Archivos (*)"
+            )
+            if not backup_file:
+                return
+            descripcion = backup_file
+        else:
+            backup_file = snapshots[opciones.index(seleccion)].id
+            descripcion = seleccion
+
         reply = QMessageBox.question(
             self, "Confirmar Restauración",
-            f"¿Está seguro de que desea restaurar la base de datos desde el archivo:\n\n{backup_file}?\n\n"
+            f"¿Está seguro de que desea restaurar la base de datos desde el respaldo:\n\n{descripcion}?\n\n"
             "Esta acción reemplazará TODOS los datos actuales y no se puede deshacer.\n\n"
             "Se creará un respaldo automático de la base de datos actual antes de restaurar.",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
@@ -4,13 +4,17 @@ Visor de PDF para la aplicación
 import fitz  # PyMuPDF
 import os
 import sys
+import threading
 from PyQt5.QtWidgets import QScrollArea, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSlider, QApplication
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QPixmap, QImage
 
 # Configurar el nivel de registro para PyMuPDF
 fitz.TOOLS.mupdf_display_errors(False)  # Desactivar mensajes de error de MuPDF
 
+# PyMuPDF no admite llamadas simultáneas desde varios hilos: la vista rápida y el visor se turnan
+_fitz_lock = threading.RLock()
+
 # Función para suprimir salidas de consola
 class SuppressOutput:
     """Clase para suprimir salidas a stdout y stderr"""
@@ -33,12 +37,43 @@ class SuppressOutput:
         if self.devnull:
             self.devnull.close()
 
+class VistaRapidaWorker(QThread):
+    """Rasteriza solo la primera página de un PDF, al ancho indicado, sin bloquear la interfaz"""
+
+    terminado = pyqtSignal(int, object, int)   # solicitud, QImage (None si falló), páginas
+
+    def __init__(self, solicitud, pdf_path, ancho_px, parent=None):
+        super().__init__(parent)
+        self.solicitud = solicitud
+        self.pdf_path = pdf_path
+        self.ancho_px = ancho_px
+
+    def run(self):
+        imagen, paginas = None, 0
+        try:
+            # El documento se abre en este hilo: PyMuPDF no comparte documentos entre hilos
+            with _fitz_lock, fitz.open(self.pdf_path) as documento:
+                paginas = len(documento)
+                pagina = documento.load_page(0)
+                escala = self.ancho_px / pagina.rect.width
+                pix = pagina.get_pixmap(matrix=fitz.Matrix(escala, escala), alpha=False)
+                # copy(): la QImage no debe depender del búfer del pixmap
+                imagen = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+        except Exception as e:
+            print(f"Error al generar vista rápida: {e}")
+        self.terminado.emit(self.solicitud, imagen, paginas)
+
+
 class PDFViewer(QScrollArea):
     """Visor de PDF integrado en la aplicación"""
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_pdf = None
+        # Vista rápida: PDF mostrado como imagen de su primera página, aún sin abrir en el visor
+        self.ruta_vista_rapida = None
+        self._solicitud_vista_rapida = 0
+        self._workers_vista_rapida = []
         self.current_page = 0
         self.total_pages = 0
         self.zoom_factor = 1.0  # Zoom predeterminado al 100%
@@ -253,7 +288,7 @@ class PDFViewer(QScrollArea):
                 current_page = 0
 
             # Usar el contexto para suprimir mensajes de consola
-            with SuppressOutput():
+            with _fitz_lock, SuppressOutput():
                 self.current_pdf = fitz.open(pdf_path)
                 self.total_pages = len(self.current_pdf)
 
@@ -288,6 +323,62 @@ class PDFViewer(QScrollArea):
             print(f"Error al cargar PDF: {e}")
             return False
 
+    def load_pdf_rapido(self, pdf_path):
+        """
+        Muestra la primera página de un PDF sin bloquear la interfaz
+
+        La página se rasteriza en otro hilo al ancho del visor (resolución de
+        pantalla) y se muestra en cuanto está lista. El documento completo solo
+        se abre en el visor si el usuario cambia el zoom.
+
+        Returns:
+            True si se inició la vista rápida
+        """
+        if not pdf_path or not os.path.exists(pdf_path):
+            return False
+
+        self.close_pdf()
+        self.ruta_vista_rapida = pdf_path
+        self._solicitud_vista_rapida += 1
+
+        ancho_px = max(1, int(self.viewport().width() * self.devicePixelRatioF()))
+        worker = VistaRapidaWorker(self._solicitud_vista_rapida, pdf_path, ancho_px, self)
+        worker.terminado.connect(self._mostrar_vista_rapida)
+        worker.finished.connect(lambda: self._liberar_worker_vista_rapida(worker))
+        self._workers_vista_rapida.append(worker)
+        worker.start()
+        return True
+
+    def _mostrar_vista_rapida(self, solicitud, imagen, paginas):
+        """Muestra la imagen de la vista rápida si sigue siendo la última solicitada"""
+        if solicitud != self._solicitud_vista_rapida or self.ruta_vista_rapida is None:
+            return  # Ya se pidió otro PDF o se cerró el visor
+
+        if imagen is None:
+            # Si no se pudo rasterizar en segundo plano, se abre el documento como siempre
+            ruta, self.ruta_vista_rapida = self.ruta_vista_rapida, None
+            self.load_pdf(ruta)
+            return
+
+        pixmap = QPixmap.fromImage(imagen)
+        pixmap.setDevicePixelRatio(self.devicePixelRatioF())
+        self.page_label.setPixmap(pixmap)
+        self.page_label.setVisible(True)
+        self.container.setFixedSize(pixmap.size() / pixmap.devicePixelRatio())
+
+        self.total_pages = paginas
+        self.current_page = 0
+        self.page_info.setText(f"1 / {paginas}")
+        self.zoom_slider.setEnabled(True)
+        # Navegar abre el documento completo (next_page)
+        self.prev_btn.setEnabled(False)
+        self.next_btn.setEnabled(paginas > 1)
+
+    def _liberar_worker_vista_rapida(self, worker):
+        if worker in self._workers_vista_rapida:
+            self._workers_vista_rapida.remove(worker)
+        worker.deleteLater()
+
     def show_page(self, page_num):
         """Muestra una página específica del PDF"""
         if not self.current_pdf or page_num < 0 or page_num >= self.total_pages:
@@ -295,7 +386,7 @@ class PDFViewer(QScrollArea):
 
         try:
             # Usar el contexto para suprimir mensajes de consola
-            with SuppressOutput():
+            with _fitz_lock, SuppressOutput():
                 # Obtener la página
                 page = self.current_pdf.load_page(page_num)
 
@@ -345,13 +436,22 @@ class PDFViewer(QScrollArea):
         except Exception as e:
             print(f"Error al mostrar página: {e}")
 
+    def _abrir_vista_rapida(self):
+        """Abre en el visor el documento que solo se mostraba como imagen (vista rápida)"""
+        if self.current_pdf or not self.ruta_vista_rapida:
+            return
+        ruta, self.ruta_vista_rapida = self.ruta_vista_rapida, None
+        self.load_pdf(ruta, maintain_state=True, zoom=self.zoom_factor, page=0)
+
     def next_page(self):
         """Avanza a la siguiente página"""
+        self._abrir_vista_rapida()
         if self.current_page < self.total_pages - 1:
             self.show_page(self.current_page + 1)
 
     def previous_page(self):
         """Retrocede a la página anterior"""
+        self._abrir_vista_rapida()
         if self.current_page > 0:
             self.show_page(self.current_page - 1)
 
@@ -360,6 +460,11 @@ class PDFViewer(QScrollArea):
         self.zoom_factor = value / 100.0
         self.zoom_percentage.setText(f"{value}%")
 
+        # Con vista rápida el documento se abre ahora, ya con el zoom pedido
+        if not self.current_pdf and self.ruta_vista_rapida:
+            self._abrir_vista_rapida()
+            return
+
         # Volver a mostrar la página actual con el nuevo zoom
         if self.current_pdf:
             self.show_page(self.current_page)
@@ -367,8 +472,11 @@ class PDFViewer(QScrollArea):
     def close_pdf(self):
         """Cierra el PDF actual"""
         if self.current_pdf:
-            self.current_pdf.close()
+            with _fitz_lock:
+                self.current_pdf.close()
             self.current_pdf = None
+        # Una vista rápida en curso ya no se mostrará
+        self.ruta_vista_rapida = None
 
         # Limpiar la vista
         self.page_label.clear()
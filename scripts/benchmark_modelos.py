@@ -0,0 +1,166 @@
+"""
+Benchmark de memoria al listar alumnos: modelos con y sin __slots__, diccionarios y vistas de fila
+
+Crea una base temporal con N alumnos (10 000 por defecto) y compara, con
+tracemalloc, lo que retiene y el pico de cada forma de listar:
+
+- dataclass + to_dict/update   (como se armaban los resultados antes)
+- RegistroAlumno               (listar_alumnos)
+- modelos sin/con __slots__    (mapeador de filas; alumnos + datos escolares)
+- VistaFila                    (listar_alumnos_vistas)
+- iterar_alumnos               (recorrido por lotes, sin lista)
+
+Uso:
+    python scripts/benchmark_modelos.py [--alumnos 10000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import Config
+from app.core.database.connection_manager import get_connection_manager
+from app.core.database.schema_migrator import migrate_database
+from app.data.models.alumno import Alumno
+from app.data.models.datos_escolares import DatosEscolares
+from app.data.models.mapeo import mapeador, columnas_de
+from app.data.repositories.alumno_repository import AlumnoRepository
+from app.services.alumno_service import AlumnoService
+
+MATERIAS = ["ESPAÑOL", "MATEMÁTICAS", "CONOCIMIENTO DEL MEDIO", "ARTES", "EDUCACIÓN FÍSICA"]
+
+
+def _sin_slots(modelo):
+    """Copia del modelo como dataclass normal (con __dict__), para comparar"""
+    return make_dataclass(
+        f"{modelo.__name__}SinSlots",
+        [(campo.name, campo.type, campo) for campo in fields(modelo)],
+        namespace={'to_dict': modelo.to_dict},
+    )
+
+
+AlumnoSinSlots = _sin_slots(Alumno)
+DatosEscolaresSinSlots = _sin_slots(DatosEscolares)
+
+
+def crear_base(db_path: str, total: int):
+    """Base temporal con total alumnos, cada uno con un registro escolar"""
+    migrate_database(db_path)
+    conn = get_connection_manager(db_path).get_connection()
+    aleatorio = random.Random(42)
+
+    alumnos = [(f"BENC{i:06d}HDFRRN{i % 10}{i % 7}", f"ALUMNO {i:05d} APELLIDO", f"M{i:06d}", "2015-03-01")
+               for i in range(total)]
+    conn.executemany("INSERT INTO alumnos (curp, nombre, matricula, fecha_nacimiento) VALUES (?, ?, ?, ?)",
+                     alumnos)
+    conn.executemany("""
+        INSERT INTO datos_escolares (alumno_id, ciclo_escolar, grado, grupo, turno, escuela, cct, calificaciones)
+        VALUES (?, '2024-2025', ?, ?, 'MATUTINO', 'ESCUELA DE PRUEBA', '10DPR0000X', ?)
+    """, [
+        (alumno_id, aleatorio.randint(1, 6), aleatorio.choice("AB"), json.dumps([
+            {"nombre": materia, "i": aleatorio.randint(6, 10), "ii": aleatorio.randint(6, 10),
+             "iii": aleatorio.randint(6, 10), "promedio": 8.0}
+            for materia in MATERIAS
+        ]))
+        for alumno_id in range(1, total + 1)
+    ])
+    conn.commit()
+
+
+def medir(nombre: str, funcion):
+    """Ejecuta funcion y devuelve (nombre, bytes retenidos, bytes pico, segundos)"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    retenido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return nombre, retenido, pico, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--alumnos", type=int, default=10000, help="Alumnos en la base temporal")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="benchmark_modelos_")
+    db_path = os.path.join(carpeta, "alumnos.db")
+    Config.DB_PATH = db_path
+    crear_base(db_path, args.alumnos)
+
+    conn = get_connection_manager(db_path).get_connection()
+    repo = AlumnoRepository(conn)
+    service = AlumnoService(conn)
+    total = args.alumnos
+
+    def dataclass_y_dict():
+        # Modelos armados campo por campo y fusionados con to_dict()/update()
+        filas = conn.execute(f"{repo.SELECT_CON_DATOS_ESCOLARES} ORDER BY a.nombre LIMIT ?", (total,)).fetchall()
+        resultado = []
+        for row in filas:
+            alumno = AlumnoSinSlots(id=row['id'], curp=row['curp'], nombre=row['nombre'],
+                                    matricula=row['matricula'], fecha_nacimiento=row['fecha_nacimiento'],
+                                    fecha_registro=row['fecha_registro'])
+            datos = DatosEscolaresSinSlots(id=row['datos_escolares_id'], alumno_id=row['id'],
+                                           ciclo_escolar=row['ciclo_escolar'], grado=row['grado'],
+                                           grupo=row['grupo'], turno=row['turno'], escuela=row['escuela'],
+                                           cct=row['cct'], calificaciones=json.loads(row['calificaciones']))
+            registro = alumno.to_dict()
+            registro.update(datos.to_dict())
+            resultado.append(registro)
+        return resultado
+
+    def modelos(clase_alumno, clase_datos):
+        # Alumno y DatosEscolares por separado, como los devuelven los repositorios
+        def listar():
+            resultado = []
+            for clase, sql in ((clase_alumno, "SELECT id, curp, nombre, matricula, fecha_nacimiento, "
+                                              "fecha_registro FROM alumnos ORDER BY nombre LIMIT ?"),
+                               (clase_datos, "SELECT id, alumno_id, ciclo_escolar, grado, grupo, turno, "
+                                             "escuela, cct, calificaciones FROM datos_escolares LIMIT ?")):
+                cursor = conn.execute(sql, (total,))
+                convertir = mapeador(clase, columnas_de(cursor))
+                resultado.extend(convertir(row) for row in cursor.fetchall())
+            return resultado
+        return listar
+
+    def recorrer_vistas():
+        filas = 0
+        for vista in service.iterar_alumnos():
+            filas += vista['grado'] is not None
+        return filas
+
+    mediciones = [
+        medir("dataclass + to_dict/update", dataclass_y_dict),
+        medir("RegistroAlumno (listar_alumnos)", lambda: service.listar_alumnos(total)),
+        medir("modelos sin __slots__ (mapeador)", modelos(AlumnoSinSlots, DatosEscolaresSinSlots)),
+        medir("modelos con __slots__ (mapeador)", modelos(Alumno, DatosEscolares)),
+        medir("VistaFila (listar_alumnos_vistas)", lambda: service.listar_alumnos_vistas(total)),
+        medir("iterar_alumnos (por lotes)", recorrer_vistas),
+    ]
+
+    base = mediciones[0][1]
+    print(f"\nListado de {total} alumnos\n")
+    print(f"{'Forma':<36}{'Retenido':>12}{'Pico':>12}{'Tiempo':>10}{'vs antes':>10}")
+    for nombre, retenido, pico, segundos in mediciones:
+        print(f"{nombre:<36}{retenido / 1024 / 1024:>10.1f}MB{pico / 1024 / 1024:>10.1f}MB"
+              f"{segundos * 1000:>8.0f}ms{retenido / base:>9.0%}")
+
+    get_connection_manager(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
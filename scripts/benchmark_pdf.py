@@ -0,0 +1,113 @@
+"""
+Benchmark de generación de constancias: renderizador nativo (reportlab) contra wkhtmltopdf
+
+Genera N constancias de cada tipo con cada renderizador, una tras otra (como
+la generación individual desde la interfaz o el chat), y muestra documentos
+por segundo. Los datos son de prueba; si existe la foto de algún alumno en
+resources/photos se usa su CURP para incluirla.
+
+Uso:
+    python scripts/benchmark_pdf.py [--documentos 20] [--tipos estudio calificaciones traslado]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import Config
+from app.core.executable_paths import get_path_manager
+from app.core.pdf_generator import PDFGenerator
+from app.core.pdf_renderers import RENDERIZADOR_NATIVO, RENDERIZADOR_WKHTMLTOPDF
+
+MATERIAS = ["ESPAÑOL", "MATEMÁTICAS", "CONOCIMIENTO DEL MEDIO", "ARTES", "EDUCACIÓN FÍSICA",
+            "FORMACIÓN CÍVICA Y ÉTICA", "INGLÉS", "HISTORIA", "GEOGRAFÍA"]
+
+
+def datos_prueba(indice: int, curp_con_foto: str = None) -> dict:
+    """Datos de una constancia como los arma ConstanciaService"""
+    curp = curp_con_foto or f"BENC{indice:06d}HDGRRN09"
+    return {
+        "curp": curp,
+        "nombre": f"ALUMNO DE PRUEBA NÚMERO {indice}",
+        "matricula": f"M{indice:06d}",
+        "nacimiento": "01/03/2015",
+        "grado": 3,
+        "grupo": "A",
+        "turno": "MATUTINO",
+        "ciclo": "2024-2025",
+        "escuela": Config.get_school_name(),
+        "cct": Config.get_school_cct(),
+        "director": Config.get_director_name(),
+        "fecha_actual": Config.get_current_date_formatted(),
+        "calificaciones": [
+            {"nombre": materia, "i": 8 + (indice + n) % 3, "ii": 9, "iii": 10, "promedio": 9.0}
+            for n, materia in enumerate(MATERIAS)
+        ],
+        "has_photo": curp_con_foto is not None,
+        "show_placeholder": True,
+    }
+
+
+def medir(generador: PDFGenerator, renderizador: str, tipo: str, total: int, carpeta: str,
+          curp_con_foto: str = None):
+    """Genera total constancias con el renderizador; devuelve (segundos, generados)"""
+    Config.PDF['renderers'] = {tipo: renderizador}
+    destino = os.path.join(carpeta, f"{renderizador}_{tipo}")
+    os.makedirs(destino)
+
+    generados = 0
+    inicio = time.perf_counter()
+    for indice in range(total):
+        ruta = generador.generar_constancia(tipo, datos_prueba(indice, curp_con_foto), output_dir=destino)
+        generados += bool(ruta and ruta.endswith(".pdf"))
+    return time.perf_counter() - inicio, generados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documentos", type=int, default=20, help="Constancias por tipo y renderizador")
+    parser.add_argument("--tipos", nargs="+", default=["estudio", "calificaciones", "traslado"])
+    args = parser.parse_args()
+
+    generador = PDFGenerator()
+    # Los datos se repiten en cada ejecución: con el caché se medirían copias, no
+    # renderizados, y quedarían entradas en el caché real
+    generador.render_cache = None
+    fotos = sorted(get_path_manager().get_photos_dir().glob("*.jpg"))
+    curp_con_foto = fotos[0].stem if fotos else None
+
+    renderizadores = [RENDERIZADOR_NATIVO]
+    if generador.wkhtmltopdf_path:
+        renderizadores.append(RENDERIZADOR_WKHTMLTOPDF)
+    else:
+        print("wkhtmltopdf no está instalado: solo se mide el renderizador nativo")
+
+    carpeta = tempfile.mkdtemp(prefix="benchmark_pdf_")
+    configurados = dict(Config.PDF.get('renderers', {}))
+    resultados = []
+    try:
+        for tipo in args.tipos:
+            for renderizador in renderizadores:
+                segundos, generados = medir(generador, renderizador, tipo, args.documentos, carpeta,
+                                            curp_con_foto)
+                resultados.append((tipo, renderizador, segundos, generados))
+    finally:
+        Config.PDF['renderers'] = configurados
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    print(f"\n{args.documentos} constancias por tipo{' (con foto)' if curp_con_foto else ''}\n")
+    print(f"{'Tipo':<16}{'Renderizador':<14}{'PDF':>6}{'Tiempo':>10}{'Docs/s':>10}{'ms/doc':>10}")
+    for tipo, renderizador, segundos, generados in resultados:
+        print(f"{tipo:<16}{renderizador:<14}{generados:>6}{segundos:>9.2f}s"
+              f"{generados / segundos:>10.1f}{segundos * 1000 / max(generados, 1):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Gestor de conexiones: las bases abiertas solo para lectura no se escriben
+"""
+import sqlite3
+
+import pytest
+
+from app.core.database.connection_manager import get_connection_manager
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    ruta = str(tmp_path / "escuela.db")
+    with sqlite3.connect(ruta) as conn:
+        conn.execute("CREATE TABLE alumnos (id INTEGER PRIMARY KEY, nombre TEXT)")
+    return ruta
+
+
+def test_solo_lectura_sobre_un_gestor_de_escritura_falla(db_path):
+    get_connection_manager(db_path).get_connection()
+
+    with pytest.raises(ValueError):
+        get_connection_manager(db_path, solo_lectura=True)
+
+
+def test_el_gestor_de_solo_lectura_se_conserva(db_path):
+    manager = get_connection_manager(db_path, solo_lectura=True)
+
+    # Quien lo pide después sin solo_lectura recibe el mismo gestor, que no escribe
+    assert get_connection_manager(db_path) is manager
+    with pytest.raises(sqlite3.OperationalError):
+        manager.get_connection()
+    assert manager.get_readonly_connection().execute("SELECT COUNT(*) FROM alumnos").fetchone()[0] == 0
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
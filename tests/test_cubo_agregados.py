@@ -0,0 +1,66 @@
+"""
+Cubo de agregados: conteos consistentes con SQL cuando otra conexión escribe
+"""
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.core.config import Config
+from app.core.database.schema_migrator import migrate_database
+from app.data.indices import cubo_agregados
+from app.data.indices.cubo_agregados import CuboAgregados
+from app.data.repositories.alumno_repository import AlumnoRepository
+
+BASE_RESPALDO = Path(__file__).resolve().parent.parent / "resources" / "data" / "alumnos.db.backup"
+
+
+@pytest.fixture
+def cubo(tmp_path, monkeypatch):
+    """Cubo global sobre una copia de la base de ejemplo"""
+    if not BASE_RESPALDO.exists():
+        pytest.skip("No está la base de ejemplo")
+    db_path = str(tmp_path / "alumnos.db")
+    shutil.copyfile(BASE_RESPALDO, db_path)
+    migrate_database(db_path)
+
+    monkeypatch.setattr(Config, "DB_PATH", db_path)
+    cubo = CuboAgregados(db_path)
+    monkeypatch.setattr(cubo_agregados, "_cubo_agregados", cubo)
+    cubo.construir()
+    return cubo
+
+
+def _contar_sql(db_path, grado):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM datos_escolares WHERE grado = ?", (grado,)).fetchone()[0]
+
+
+def test_escritura_externa_antes_de_escritura_del_repositorio(cubo):
+    db_path = Config.DB_PATH
+    grado = cubo.distribucion_ordenada("grado", solo_con_registro=True)[0][0]
+    assert cubo.contar({"grado": [grado]}, solo_con_registro=True) == _contar_sql(db_path, grado) > 0
+
+    # Otra conexión (otro proceso) cambia datos sin pasar por los repositorios
+    with sqlite3.connect(db_path) as externa:
+        externa.execute("UPDATE datos_escolares SET grado = 99 WHERE grado = ?", (grado,))
+
+    # Después un repositorio escribe y avisa al cubo de su alumno
+    repositorio = AlumnoRepository()
+    alumno = repositorio.list_all(limit=1)[0]
+    alumno.nombre = f"{alumno.nombre} X"
+    repositorio.update(alumno)
+
+    assert cubo.contar({"grado": [grado]}, solo_con_registro=True) == _contar_sql(db_path, grado) == 0
+    assert cubo.contar({"grado": [99]}, solo_con_registro=True) == _contar_sql(db_path, 99)
+
+
+def test_escritura_del_repositorio_se_aplica_sin_reconstruir(cubo):
+    repositorio = AlumnoRepository()
+    alumno = repositorio.list_all(limit=1)[0]
+    total = cubo.total_alumnos()
+    repositorio.delete(alumno.id)
+
+    assert cubo.estadisticas()["construido"]
+    assert cubo.total_alumnos() == total - 1
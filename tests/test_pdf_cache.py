@@ -0,0 +1,60 @@
+"""
+Caché de renderizado: los PDF entregados no comparten contenido con el caché
+"""
+import os
+
+import pytest
+
+from app.core.config import Config
+from app.core.pdf_cache import RenderCache
+
+pytest.importorskip("reportlab")
+
+from app.core.pdf_generator import PDFGenerator
+from app.core.pdf_renderers import RENDERIZADOR_NATIVO
+
+
+def _datos():
+    return {
+        "curp": "PRUE150301HDGRRN09",
+        "nombre": "ALUMNO DE PRUEBA",
+        "matricula": "M000001",
+        "nacimiento": "01/03/2015",
+        "grado": 3,
+        "grupo": "A",
+        "turno": "MATUTINO",
+        "ciclo": "2024-2025",
+        "escuela": "ESCUELA DE PRUEBA",
+        "cct": "10DPR0000X",
+        "director": "DIRECTOR DE PRUEBA",
+        "fecha_actual": "1 de enero de 2025",
+        "calificaciones": [],
+        "has_photo": False,
+    }
+
+
+@pytest.fixture
+def generador(tmp_path, monkeypatch):
+    """PDFGenerator con renderizador nativo y un caché propio en tmp_path"""
+    monkeypatch.setitem(Config.PDF, "renderers", {"estudio": RENDERIZADOR_NATIVO})
+    generador = PDFGenerator()
+    generador.render_cache = RenderCache(tmp_path / "render_cache", 50 * 1024 * 1024)
+    return generador
+
+
+def test_editar_la_constancia_guardada_no_cambia_el_caché(generador, tmp_path):
+    primera = generador.generar_constancia("estudio", _datos(), output_dir=str(tmp_path))
+    original = open(primera, "rb").read()
+
+    # Segunda vez con los mismos datos: sale del caché
+    segunda = generador.generar_constancia("estudio", _datos(), output_dir=str(tmp_path))
+    assert generador.render_cache.estadisticas()["aciertos"] == 1
+    assert os.stat(primera).st_nlink == os.stat(segunda).st_nlink == 1
+
+    # El usuario firma o anota los archivos en su lugar
+    for ruta in (primera, segunda):
+        with open(ruta, "ab") as f:
+            f.write(b"%% editado por el usuario\n")
+
+    tercera = generador.generar_constancia("estudio", _datos(), output_dir=str(tmp_path))
+    assert open(tercera, "rb").read() == original
@@ -0,0 +1,29 @@
+"""
+Migrador de esquema: columnas derivadas de la fecha de nacimiento
+"""
+import sqlite3
+
+import pytest
+
+from app.core.database.schema_migrator import migrate_database
+
+
+@pytest.mark.parametrize("fecha, anio, mes", [
+    ("2018-05-26", 2018, 5),
+    ("26/05/2018", 2018, 5),
+    ("5/3/2017", 2017, 3),
+    ("26 DE MAYO DEL 2018", 2018, 5),
+    ("3 de septiembre de 2016", 2016, 9),
+    ("sin fecha", None, None),
+])
+def test_anio_y_mes_de_nacimiento(tmp_path, fecha, anio, mes):
+    db_path = str(tmp_path / "alumnos.db")
+    assert migrate_database(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO alumnos (curp, nombre, fecha_nacimiento) VALUES ('X', 'ALUMNO', '2000-01-01')")
+        # El trigger de UPDATE también debe entender el formato
+        conn.execute("UPDATE alumnos SET fecha_nacimiento = ?", (fecha,))
+        fila = conn.execute("SELECT anio_nacimiento, mes_nacimiento FROM alumnos").fetchone()
+
+    assert fila == (anio, mes)